@@ -193,7 +193,16 @@ def step4_select_effective_factors(evaluation_results):
                 print(f"\n✅ 激活因子: {factor['name']}")
             except Exception as e:
                 logger.error(f"更新因子状态失败: {e}")
-    
+
+    # 剔除与更优因子高度相关的冗余因子，每簇只保留IC最高的因子
+    pipeline = get_evaluation_pipeline()
+    test_stocks = get_multi_factor_engine()._get_a_stocks()[:20]
+    pruning = pipeline.run_redundancy_pruning(stock_list=test_stocks, query=Query(-30))
+    if pruning['deactivated']:
+        print(f"\n剔除 {len(pruning['deactivated'])} 个冗余因子（转为测试状态）")
+        effective_factors = [f for f in effective_factors
+                             if f['factor_id'] not in pruning['deactivated']]
+
     return effective_factors
 
 
@@ -0,0 +1,145 @@
+"""
+异步因子注册器
+
+FactorRegistry 的协程版本，基于 AsyncMySQLManager，
+供异步服务和流水线在等待数据库时继续处理其他请求或计算。
+"""
+
+from typing import List, Dict, Optional, Any
+import asyncio
+import logging
+from datetime import datetime
+from .async_mysql_manager import AsyncMySQLManager, get_async_db_manager
+from .factor_registry import performance_write_sql, STATUS_UPDATE_SQL, format_factor_row
+from .config.evaluation_config import EVALUATION_CONFIG
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncFactorRegistry:
+    """异步因子注册器"""
+
+    def __init__(self, db: AsyncMySQLManager):
+        """
+        Args:
+            db: 已初始化的异步数据库管理器
+        """
+        self.db = db
+
+    @classmethod
+    async def create(cls) -> 'AsyncFactorRegistry':
+        """使用全局异步数据库管理器创建注册器"""
+        return cls(await get_async_db_manager())
+
+    async def get_factor(self, factor_id: int) -> Optional[Dict[str, Any]]:
+        """获取单个因子信息"""
+        try:
+            result = await self.db.execute_query("SELECT * FROM factors WHERE id = %s", (factor_id,))
+            return format_factor_row(result[0]) if result else None
+        except Exception as e:
+            logger.error(f"获取因子失败: {e}")
+            return None
+
+    async def get_factors(self, factor_ids: List[int]) -> Dict[int, Dict[str, Any]]:
+        """
+        批量获取因子信息，按 persist_chunk_size 分批 IN 查询，与 FactorRegistry.get_factors 一致
+
+        Returns:
+            Dict: 因子ID到因子信息的映射，不存在的因子不在结果中
+        """
+        factor_ids = list(dict.fromkeys(factor_ids))
+        chunk_size = EVALUATION_CONFIG['persist_chunk_size']
+        factors = {}
+        try:
+            for start in range(0, len(factor_ids), chunk_size):
+                chunk = factor_ids[start:start + chunk_size]
+                placeholders = ', '.join(['%s'] * len(chunk))
+                results = await self.db.execute_query(
+                    f"SELECT * FROM factors WHERE id IN ({placeholders})", tuple(chunk)
+                )
+                factors.update((row[0], format_factor_row(row)) for row in results)
+        except Exception as e:
+            logger.error(f"批量获取因子失败: {e}")
+        return factors
+
+    async def get_all_factors(self, status: str = None, category: str = None) -> List[Dict[str, Any]]:
+        """获取所有因子信息，参数同 FactorRegistry.get_all_factors"""
+        query = "SELECT * FROM factors WHERE 1=1"
+        params = []
+
+        if status:
+            query += " AND status = %s"
+            params.append(status)
+
+        if category:
+            query += " AND category = %s"
+            params.append(category)
+
+        query += " ORDER BY created_date DESC"
+
+        try:
+            results = await self.db.execute_query(query, tuple(params) if params else None)
+            return [format_factor_row(row) for row in results]
+        except Exception as e:
+            logger.error(f"获取因子列表失败: {e}")
+            return []
+
+    async def get_active_factors(self) -> List[Dict[str, Any]]:
+        """获取所有活跃因子"""
+        return await self.get_all_factors(status='active')
+
+    async def get_testing_factors(self) -> List[Dict[str, Any]]:
+        """获取所有测试中的因子"""
+        return await self.get_all_factors(status='testing')
+
+    async def get_factors_to_evaluate(self) -> List[Dict[str, Any]]:
+        """并发查询测试中和活跃的因子，顺序与每日评估一致"""
+        testing, active = await asyncio.gather(
+            self.get_testing_factors(), self.get_active_factors()
+        )
+        return testing + active
+
+    async def update_factor_status(self, factor_id: int, status: str) -> bool:
+        """更新因子状态"""
+        try:
+            affected_rows = await self.db.execute_update(STATUS_UPDATE_SQL, (status, factor_id))
+            return affected_rows > 0
+        except Exception as e:
+            logger.error(f"因子更新失败: {e}")
+            return False
+
+    async def save_performance_result(self, factor_id: int, evaluation_date: datetime,
+                                      ic_value: float = None, icir_value: float = None,
+                                      annual_return: float = None, sharpe_ratio: float = None,
+                                      max_drawdown: float = None,
+                                      information_ratio: float = None,
+                                      upsert: bool = None) -> int:
+        """保存因子绩效结果，返回绩效记录ID，upsert 语义同 FactorRegistry.save_performance_result"""
+        params = (
+            factor_id, evaluation_date, ic_value, icir_value,
+            annual_return, sharpe_ratio, max_drawdown, information_ratio
+        )
+        try:
+            performance_id = await self.db.execute_insert(performance_write_sql(upsert), params)
+            logger.info(f"因子绩效保存成功: 因子ID {factor_id}, 记录ID {performance_id}")
+            return performance_id
+        except Exception as e:
+            logger.error(f"因子绩效保存失败: {e}")
+            raise
+
+    async def save_performance_results(self, rows: List[tuple], chunk_size: int = None,
+                                       upsert: bool = None) -> List[Dict[str, Any]]:
+        """
+        批量保存绩效结果
+
+        Args:
+            rows: 参数元组列表，列顺序同 save_performance_result
+            chunk_size: 每个事务的行数，默认读取 EVALUATION_CONFIG['persist_chunk_size']
+            upsert: 是否覆盖同一因子同一日期的已有记录，默认读取 UPSERT_RESULTS
+
+        Returns:
+            List[Dict]: 失败列表，每项包含 factor_id 和 error
+        """
+        chunk_size = chunk_size or EVALUATION_CONFIG['persist_chunk_size']
+        failures = await self.db.execute_batch(performance_write_sql(upsert), rows, chunk_size)
+        return [{'factor_id': rows[index][0], 'error': error} for index, error in failures]
@@ -0,0 +1,251 @@
+"""
+异步MySQL数据库管理
+
+与 MySQLManager 提供相同的方法，但全部为协程，基于aiomysql异步连接池。
+等待数据库时不阻塞事件循环，评估计算可以与结果持久化、注册表查询重叠进行，
+服务端也可以在单线程中并发处理大量读请求。
+
+连接池可以通过构造参数注入，便于连接本地的MySQL兼容服务或测试替身。
+"""
+
+from typing import List, Tuple, Optional, Dict, Any
+import asyncio
+import logging
+from .config.database_config import DATABASE_CONFIG
+
+# aiomysql为可选依赖，未安装时只能使用注入的连接池
+try:
+    import aiomysql
+    from aiomysql import Error
+except ImportError:
+    aiomysql = None
+    Error = Exception
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncMySQLManager:
+    """异步MySQL数据库管理类"""
+
+    def __init__(self, pool=None):
+        """
+        Args:
+            pool: 已创建的aiomysql兼容连接池，None时在 initialize 中按 DATABASE_CONFIG 创建
+        """
+        self.pool = pool
+
+    async def initialize(self):
+        """创建连接池（未注入时）"""
+        if self.pool is not None:
+            return
+        if aiomysql is None:
+            raise ImportError("异步数据库访问需要安装aiomysql: pip install aiomysql")
+
+        try:
+            self.pool = await aiomysql.create_pool(
+                host=DATABASE_CONFIG['host'],
+                port=DATABASE_CONFIG['port'],
+                user=DATABASE_CONFIG['user'],
+                password=DATABASE_CONFIG['password'],
+                db=DATABASE_CONFIG['database'],
+                charset=DATABASE_CONFIG['charset'],
+                autocommit=DATABASE_CONFIG['autocommit'],
+                maxsize=DATABASE_CONFIG['pool_size']
+            )
+            logger.info("异步数据库连接池初始化成功")
+        except Error as e:
+            logger.error(f"异步数据库连接池初始化失败: {e}")
+            raise
+
+    async def close(self):
+        """关闭连接池"""
+        if self.pool is not None:
+            self.pool.close()
+            await self.pool.wait_closed()
+            self.pool = None
+
+    async def execute_query(self, query: str, params: Optional[Tuple] = None) -> List[Tuple]:
+        """执行查询语句"""
+        try:
+            async with self.pool.acquire() as connection:
+                async with connection.cursor() as cursor:
+                    await cursor.execute(query, params or ())
+                    return list(await cursor.fetchall())
+        except Error as e:
+            logger.error(f"查询执行失败: {e}")
+            raise
+
+    async def _execute_write(self, query: str, params, many: bool = False):
+        """在一个事务中执行写操作，返回游标"""
+        async with self.pool.acquire() as connection:
+            async with connection.cursor() as cursor:
+                try:
+                    await connection.begin()
+                    if many:
+                        await cursor.executemany(query, params)
+                    else:
+                        await cursor.execute(query, params or ())
+                    await connection.commit()
+                    return cursor
+                except Error:
+                    await connection.rollback()
+                    raise
+
+    async def execute_insert(self, query: str, params: Optional[Tuple] = None) -> int:
+        """执行插入语句，返回插入的ID"""
+        try:
+            cursor = await self._execute_write(query, params)
+            return cursor.lastrowid
+        except Error as e:
+            logger.error(f"插入执行失败: {e}")
+            raise
+
+    async def execute_update(self, query: str, params: Optional[Tuple] = None) -> int:
+        """执行更新语句，返回影响的行数"""
+        try:
+            cursor = await self._execute_write(query, params)
+            return cursor.rowcount
+        except Error as e:
+            logger.error(f"更新执行失败: {e}")
+            raise
+
+    async def execute_many(self, query: str, params_list: List[Tuple]) -> int:
+        """批量执行插入或更新"""
+        try:
+            cursor = await self._execute_write(query, params_list, many=True)
+            return cursor.rowcount
+        except Error as e:
+            logger.error(f"批量执行失败: {e}")
+            raise
+
+    async def execute_batch(self, query: str, params_list: List[Tuple],
+                            chunk_size: int = 500) -> List[Tuple[int, str]]:
+        """
+        分块批量执行插入或更新，语义同 MySQLManager.execute_batch
+
+        Returns:
+            List[Tuple[int, str]]: 失败行在 params_list 中的下标及错误信息
+        """
+        failures = []
+        for start in range(0, len(params_list), chunk_size):
+            chunk = params_list[start:start + chunk_size]
+            try:
+                await self._execute_write(query, chunk, many=True)
+                continue
+            except Error as e:
+                logger.warning(f"批量执行失败，逐行重试 {len(chunk)} 行: {e}")
+
+            try:
+                async with self.pool.acquire() as connection:
+                    async with connection.cursor() as cursor:
+                        # 单条语句失败只回滚该语句，事务中的其他行仍可提交
+                        await connection.begin()
+                        for offset, params in enumerate(chunk):
+                            try:
+                                await cursor.execute(query, params)
+                            except Error as e:
+                                failures.append((start + offset, str(e)))
+                        await connection.commit()
+            except Error as e:
+                logger.error(f"批量执行失败: {e}")
+                failed = {index for index, _ in failures}
+                failures.extend((start + offset, str(e)) for offset in range(len(chunk))
+                                if start + offset not in failed)
+
+        return failures
+
+    async def check_connection(self) -> bool:
+        """检查数据库连接是否正常"""
+        try:
+            result = await self.execute_query("SELECT 1")
+            return result[0][0] == 1
+        except Error:
+            return False
+
+    async def get_factor_count(self) -> int:
+        """获取因子数量"""
+        result = await self.execute_query("SELECT COUNT(*) FROM factors")
+        return result[0][0] if result else 0
+
+    async def get_factor_performance_stats(self, factor_id: int) -> Dict[str, Any]:
+        """获取因子绩效统计"""
+        query = """
+        SELECT
+            AVG(ic_value) as avg_ic,
+            AVG(icir_value) as avg_icir,
+            AVG(annual_return) as avg_annual_return,
+            AVG(sharpe_ratio) as avg_sharpe_ratio,
+            COUNT(*) as evaluation_count
+        FROM factor_performance
+        WHERE factor_id = %s
+        """
+        result = await self.execute_query(query, (factor_id,))
+
+        if result and result[0]:
+            return {
+                'avg_ic': result[0][0],
+                'avg_icir': result[0][1],
+                'avg_annual_return': result[0][2],
+                'avg_sharpe_ratio': result[0][3],
+                'evaluation_count': result[0][4]
+            }
+        return {}
+
+    async def get_factor_status_counts(self) -> Dict[str, int]:
+        """按状态统计因子数量"""
+        result = await self.execute_query("SELECT status, COUNT(*) FROM factors GROUP BY status")
+        return {row[0]: row[1] for row in result}
+
+    async def get_performance_summary(self, status: str = 'active') -> Dict[str, Any]:
+        """汇总指定状态因子的绩效，语义同 MySQLManager.get_performance_summary"""
+        query = """
+        SELECT
+            AVG(COALESCE(s.avg_ic, 0)),
+            AVG(COALESCE(s.avg_icir, 0)),
+            AVG(COALESCE(s.avg_annual_return, 0)),
+            AVG(COALESCE(s.avg_sharpe_ratio, 0)),
+            SUM(s.evaluation_count),
+            COUNT(*)
+        FROM (
+            SELECT
+                p.factor_id,
+                AVG(p.ic_value) as avg_ic,
+                AVG(p.icir_value) as avg_icir,
+                AVG(p.annual_return) as avg_annual_return,
+                AVG(p.sharpe_ratio) as avg_sharpe_ratio,
+                COUNT(*) as evaluation_count
+            FROM factor_performance p
+            JOIN factors f ON f.id = p.factor_id
+            WHERE f.status = %s
+            GROUP BY p.factor_id
+        ) s
+        """
+        result = await self.execute_query(query, (status,))
+
+        if result and result[0] and result[0][5]:
+            row = result[0]
+            return {
+                'avg_ic': float(row[0]),
+                'avg_icir': float(row[1]),
+                'avg_annual_return': float(row[2]),
+                'avg_sharpe_ratio': float(row[3]),
+                'total_evaluations': int(row[4]),
+                'factor_count': int(row[5])
+            }
+        return {}
+
+
+# 全局异步数据库管理器实例
+async_db_manager = None
+_async_db_lock = asyncio.Lock()
+
+
+async def get_async_db_manager() -> AsyncMySQLManager:
+    """获取全局异步数据库管理器实例"""
+    global async_db_manager
+    async with _async_db_lock:
+        if async_db_manager is None:
+            manager = AsyncMySQLManager()
+            await manager.initialize()
+            async_db_manager = manager
+    return async_db_manager
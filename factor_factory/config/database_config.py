@@ -21,6 +21,19 @@ DATABASE_CONFIG = {
     'pool_name': os.getenv('DB_POOL_NAME', 'factor_factory_pool')
 }
 
+# 流式查询每次从服务端读取的行数
+STREAM_BATCH_SIZE = int(os.getenv('DB_STREAM_BATCH_SIZE', '10000'))
+
+# 表结构模式：standard 为普通表；partitioned 时绩效和回测表按月RANGE分区，
+# (factor_id, 日期) 唯一，重复评估覆盖已有记录，过期数据按分区删除
+SCHEMA_MODE = os.getenv('DB_SCHEMA_MODE', 'standard')
+
+# 绩效和回测结果按 (factor_id, 日期) 覆盖写入，同一天重复评估不产生重复记录
+UPSERT_RESULTS = os.getenv('DB_UPSERT_RESULTS', 'true').lower() == 'true'
+
+# 分区表预先创建的未来月份数
+PARTITION_MONTHS_AHEAD = int(os.getenv('DB_PARTITION_MONTHS_AHEAD', '3'))
+
 # 表结构定义
 CREATE_TABLES_SQL = {
     'factors': """
@@ -49,7 +62,7 @@ CREATE_TABLES_SQL = {
             information_ratio FLOAT,
             created_date DATETIME DEFAULT CURRENT_TIMESTAMP,
             FOREIGN KEY (factor_id) REFERENCES factors(id) ON DELETE CASCADE,
-            INDEX idx_factor_date (factor_id, evaluation_date),
+            UNIQUE KEY uk_factor_date (factor_id, evaluation_date),
             INDEX idx_evaluation_date (evaluation_date)
         )
     """,
@@ -67,7 +80,132 @@ CREATE_TABLES_SQL = {
             win_rate FLOAT,
             created_date DATETIME DEFAULT CURRENT_TIMESTAMP,
             FOREIGN KEY (factor_id) REFERENCES factors(id) ON DELETE CASCADE,
-            INDEX idx_factor_backtest (factor_id, backtest_date)
+            UNIQUE KEY uk_factor_backtest (factor_id, backtest_date)
+        )
+    """,
+    'factor_ic_daily': """
+        CREATE TABLE IF NOT EXISTS factor_ic_daily (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            factor_id INT NOT NULL,
+            trade_date DATE NOT NULL,
+            seq INT NOT NULL,
+            ic_value DOUBLE,
+            rolling_icir DOUBLE,
+            ic_count INT NOT NULL,
+            ic_sum DOUBLE NOT NULL,
+            ic_sq_sum DOUBLE NOT NULL,
+            icir_count INT NOT NULL,
+            icir_sum DOUBLE NOT NULL,
+            created_date DATETIME DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (factor_id) REFERENCES factors(id) ON DELETE CASCADE,
+            UNIQUE KEY uk_factor_date (factor_id, trade_date),
+            UNIQUE KEY uk_factor_seq (factor_id, seq)
+        )
+    """,
+    'factor_quantile_stats': """
+        CREATE TABLE IF NOT EXISTS factor_quantile_stats (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            factor_id INT NOT NULL,
+            evaluation_date DATE NOT NULL,
+            horizon INT NOT NULL,
+            n_quantiles INT NOT NULL,
+            spread_return FLOAT,
+            monotonicity FLOAT,
+            autocorrelation FLOAT,
+            top_turnover FLOAT,
+            quantile_returns TEXT,
+            created_date DATETIME DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (factor_id) REFERENCES factors(id) ON DELETE CASCADE,
+            UNIQUE KEY uk_factor_date_horizon (factor_id, evaluation_date, horizon)
+        )
+    """,
+    'factor_redundancy': """
+        CREATE TABLE IF NOT EXISTS factor_redundancy (
+            factor_id INT PRIMARY KEY,
+            leader_id INT NOT NULL,
+            correlation FLOAT,
+            pruned_date DATE NOT NULL,
+            FOREIGN KEY (factor_id) REFERENCES factors(id) ON DELETE CASCADE,
+            FOREIGN KEY (leader_id) REFERENCES factors(id) ON DELETE CASCADE,
+            INDEX idx_leader (leader_id)
+        )
+    """,
+    'evaluation_runs': """
+        CREATE TABLE IF NOT EXISTS evaluation_runs (
+            run_id VARCHAR(64) PRIMARY KEY,
+            run_type VARCHAR(32) NOT NULL,
+            run_date DATE NOT NULL,
+            status ENUM('running', 'completed', 'abandoned') DEFAULT 'running',
+            total_factors INT DEFAULT 0,
+            started_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+            finished_at DATETIME,
+            INDEX idx_type_date_status (run_type, run_date, status)
+        )
+    """,
+    'evaluation_run_factors': """
+        CREATE TABLE IF NOT EXISTS evaluation_run_factors (
+            run_id VARCHAR(64) NOT NULL,
+            factor_id INT NOT NULL,
+            completed_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (run_id, factor_id),
+            FOREIGN KEY (run_id) REFERENCES evaluation_runs(run_id) ON DELETE CASCADE
         )
     """
-}
\ No newline at end of file
+}
+
+# 按月分区的时序表结构，{table} 为表名，{partitions} 为分区定义
+# MySQL分区表不支持外键，删除因子时由注册器删除关联记录；
+# 唯一键必须包含分区列，因此主键为 (id, 日期)
+PARTITIONED_TABLES_SQL = {
+    'factor_performance': """
+        CREATE TABLE IF NOT EXISTS {table} (
+            id INT AUTO_INCREMENT,
+            factor_id INT NOT NULL,
+            evaluation_date DATE NOT NULL,
+            ic_value FLOAT,
+            icir_value FLOAT,
+            annual_return FLOAT,
+            sharpe_ratio FLOAT,
+            max_drawdown FLOAT,
+            information_ratio FLOAT,
+            created_date DATETIME DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (id, evaluation_date),
+            UNIQUE KEY uk_factor_date (factor_id, evaluation_date),
+            INDEX idx_evaluation_date (evaluation_date),
+            INDEX idx_report (factor_id, ic_value, icir_value, annual_return, sharpe_ratio)
+        )
+        PARTITION BY RANGE COLUMNS (evaluation_date) ({partitions})
+    """,
+    'backtest_results': """
+        CREATE TABLE IF NOT EXISTS {table} (
+            id INT AUTO_INCREMENT,
+            factor_id INT NOT NULL,
+            backtest_date DATE NOT NULL,
+            total_return FLOAT,
+            annual_return FLOAT,
+            volatility FLOAT,
+            sharpe_ratio FLOAT,
+            max_drawdown FLOAT,
+            trade_count INT,
+            win_rate FLOAT,
+            created_date DATETIME DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (id, backtest_date),
+            UNIQUE KEY uk_factor_backtest (factor_id, backtest_date),
+            INDEX idx_backtest_date (backtest_date)
+        )
+        PARTITION BY RANGE COLUMNS (backtest_date) ({partitions})
+    """
+}
+
+# 分区表的分区列
+PARTITION_COLUMNS = {
+    'factor_performance': 'evaluation_date',
+    'backtest_results': 'backtest_date'
+}
+
+# 结果表的唯一键，覆盖写入依赖这些键：表名 -> (键名, 列)
+RESULT_UNIQUE_KEYS = {
+    'factor_performance': ('uk_factor_date', ('factor_id', 'evaluation_date')),
+    'backtest_results': ('uk_factor_backtest', ('factor_id', 'backtest_date')),
+    'factor_quantile_stats': ('uk_factor_date_horizon', ('factor_id', 'evaluation_date', 'horizon'))
+}
@@ -0,0 +1,82 @@
+import os
+
+# 尝试导入dotenv，如果不存在则跳过
+try:
+    from dotenv import load_dotenv
+    load_dotenv()
+except ImportError:
+    # 在测试环境中可能没有安装dotenv，使用默认配置
+    pass
+
+# 因子评估配置
+EVALUATION_CONFIG = {
+    # 并行评估的进程数，1表示串行评估
+    'max_workers': int(os.getenv('EVAL_MAX_WORKERS', '1')),
+    # 每个任务分片包含的因子数，0表示按进程数自动划分
+    'chunk_size': int(os.getenv('EVAL_CHUNK_SIZE', '0')),
+    # 评估使用的K线数量
+    'lookback': int(os.getenv('EVAL_LOOKBACK', '100')),
+    # 列式K线存储目录，为空表示不使用，直接从hikyuu加载KData
+    'kline_store_dir': os.getenv('KLINE_STORE_DIR', ''),
+    # 首次构建K线存储时加载的交易日数量
+    'kline_store_history': int(os.getenv('KLINE_STORE_HISTORY', '750')),
+    # 批量保存评估结果时每个事务包含的行数
+    'persist_chunk_size': int(os.getenv('EVAL_PERSIST_CHUNK_SIZE', '500')),
+    # 是否启用增量IC评估：每日只计算最新截面，窗口统计量由累计和推导
+    'incremental': os.getenv('EVAL_INCREMENTAL', 'false').lower() == 'true',
+    # 增量评估时在因子所需历史之外额外加载的K线数量，用于EMA等递推指标预热
+    'incremental_warmup': int(os.getenv('EVAL_INCREMENTAL_WARMUP', '20')),
+    # 增量评估漏跑交易日后最多补算的截面数，超出部分不再补算
+    'incremental_max_catchup': int(os.getenv('EVAL_INCREMENTAL_MAX_CATCHUP', '20')),
+    # 因子值存储目录，为空表示不保存因子值
+    'factor_value_store_dir': os.getenv('FACTOR_VALUE_STORE_DIR', ''),
+    # 因子值存储每个分区文件包含的交易日数量
+    'factor_value_partition_rows': int(os.getenv('FACTOR_VALUE_PARTITION_ROWS', '250')),
+    # 远期收益率缓存的内存预算（MB），超出后按最近最少使用淘汰
+    'forward_return_cache_mb': int(os.getenv('FORWARD_RETURN_CACHE_MB', '512')),
+    # 预先计算的远期收益率持有期（交易日数）
+    'forward_return_horizons': [int(h) for h in os.getenv('FORWARD_RETURN_HORIZONS', '1,5,10,20').split(',')],
+    # 因子注册器缓存的最大因子数，0表示不缓存
+    'registry_cache_size': int(os.getenv('REGISTRY_CACHE_SIZE', '4096')),
+    # 因子注册器缓存有效期（秒），0表示不过期；多进程部署时用于感知其他进程的修改
+    'registry_cache_ttl': float(os.getenv('REGISTRY_CACHE_TTL', '300')),
+    # 是否记录每日评估的检查点，中断后同一天再次运行只评估未完成的因子；
+    # 默认关闭，启用前需确保 evaluation_runs 和 evaluation_run_factors 表已创建
+    'checkpoint_enabled': os.getenv('EVAL_CHECKPOINT', 'false').lower() == 'true',
+    # 每个检查点包含的因子数，每完成一批即保存结果并记录检查点
+    'checkpoint_chunk_size': int(os.getenv('EVAL_CHECKPOINT_CHUNK_SIZE', '500')),
+    # 评估结果缓存目录，为空表示不缓存；表达式、股票池和行情窗口相同时直接复用结果
+    'evaluation_cache_dir': os.getenv('EVALUATION_CACHE_DIR', ''),
+    # 评估结果缓存的磁盘预算（MB），超出后按最近使用时间淘汰
+    'evaluation_cache_mb': int(os.getenv('EVALUATION_CACHE_MB', '1024')),
+    # 活跃因子平均截面秩相关的绝对值达到此阈值时视为冗余，每簇只保留IC最高的因子
+    'correlation_threshold': float(os.getenv('FACTOR_CORRELATION_THRESHOLD', '0.7')),
+    # 计算相关矩阵时每块包含的因子数
+    'correlation_block_size': int(os.getenv('FACTOR_CORRELATION_BLOCK_SIZE', '256')),
+    # 是否启用向量化指标内核：表达式只含 MA/STD/EMA/REF/HHV/LLV 等函数时，在 日期×股票 矩阵上一次计算
+    'vectorized_kernels': os.getenv('EVAL_VECTORIZED_KERNELS', 'false').lower() == 'true',
+    # 行业中性化（INDNEUTRALIZE）使用的hikyuu板块分类
+    'industry_block_category': os.getenv('FACTOR_INDUSTRY_CATEGORY', '行业板块')
+}
+
+# 遗传因子挖掘配置
+MINING_CONFIG = {
+    # 每代的候选表达式数量
+    'population_size': int(os.getenv('MINER_POPULATION', '200')),
+    # 进化代数
+    'generations': int(os.getenv('MINER_GENERATIONS', '10')),
+    # 表达式树的最大深度
+    'max_depth': int(os.getenv('MINER_MAX_DEPTH', '4')),
+    # 生成和变异时可选的窗口参数
+    'windows': [int(w) for w in os.getenv('MINER_WINDOWS', '3,5,10,20').split(',')],
+    # 交叉产生后代的概率，其余后代由变异产生
+    'crossover_rate': float(os.getenv('MINER_CROSSOVER_RATE', '0.6')),
+    # 直接保留到下一代的最优个体数
+    'elite_size': int(os.getenv('MINER_ELITE_SIZE', '10')),
+    # 适应度中每个节点的复杂度惩罚
+    'parsimony': float(os.getenv('MINER_PARSIMONY', '0.001')),
+    # 注册为测试因子所需的最小IC绝对值
+    'min_ic': float(os.getenv('MINER_MIN_IC', '0.03')),
+    # 每次挖掘最多注册的因子数
+    'register_top': int(os.getenv('MINER_REGISTER_TOP', '20'))
+}
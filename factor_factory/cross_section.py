@@ -0,0 +1,142 @@
+"""
+截面算子
+
+在 日期×股票 矩阵上逐日对全市场做标准化和中性化：排名、标准分、去均值、
+缩尾、行业中性化和对任意暴露序列的回归中性化。每个算子对所有日期一次向量化计算，
+缺失值（停牌）不参与截面统计，结果中保持为NaN。
+"""
+
+from typing import Callable, Dict, Optional
+import logging
+import numpy as np
+from .ic_evaluator import cross_sectional_rank
+
+logger = logging.getLogger(__name__)
+
+# 截面中性化回归所需的最少有效股票数，不足时只去均值
+MIN_REGRESSION_STOCKS = 3
+
+
+def _row_moments(values: np.ndarray):
+    """每个截面的有效值个数、均值和总体标准差"""
+    valid = np.isfinite(values)
+    count = valid.sum(axis=-1, keepdims=True)
+    safe = np.where(valid, values, 0.0)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = safe.sum(axis=-1, keepdims=True) / count
+        variance = (np.where(valid, values - mean, 0.0) ** 2).sum(axis=-1, keepdims=True) / count
+    return count, mean, np.sqrt(variance)
+
+
+def cs_rank(values: np.ndarray) -> np.ndarray:
+    """截面百分位排名，取值 (0, 1]，相同值取平均排名"""
+    values = np.asarray(values, dtype=float)
+    count = np.isfinite(values).sum(axis=-1, keepdims=True)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return cross_sectional_rank(values) / count
+
+
+def cs_demean(values: np.ndarray) -> np.ndarray:
+    """截面去均值"""
+    values = np.asarray(values, dtype=float)
+    _, mean, _ = _row_moments(values)
+    return values - mean
+
+
+def cs_zscore(values: np.ndarray) -> np.ndarray:
+    """截面标准分，截面上所有值相同时为0"""
+    values = np.asarray(values, dtype=float)
+    _, mean, std = _row_moments(values)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.where(std > 0, (values - mean) / std, values - mean)
+
+
+def cs_winsorize(values: np.ndarray, n_std: float = 3) -> np.ndarray:
+    """截面缩尾，超出均值 ± n_std 倍标准差的值截断到边界"""
+    values = np.asarray(values, dtype=float)
+    _, mean, std = _row_moments(values)
+    return np.clip(values, mean - n_std * std, mean + n_std * std)
+
+
+def group_demean(values: np.ndarray, groups: np.ndarray) -> np.ndarray:
+    """
+    按分组去均值（行业中性化），等价于对行业哑变量回归取残差
+
+    Args:
+        values: 日期×股票 矩阵
+        groups: 每只股票的分组编号，形状 (股票,)，负数表示未分类，未分类股票视为同一组
+
+    Returns:
+        np.ndarray: 每个截面内减去所在分组均值后的矩阵
+    """
+    values = np.asarray(values, dtype=float)
+    groups = np.asarray(groups)
+    _, codes = np.unique(np.where(groups < 0, -1, groups), return_inverse=True)
+    n_groups = int(codes.max()) + 1 if codes.size else 0
+
+    valid = np.isfinite(values)
+    rows = values.shape[0]
+    # 日期与分组组合为一维下标，一次 bincount 得到所有截面的分组和
+    index = (np.arange(rows)[:, None] * n_groups + codes[None, :]).ravel()
+    sums = np.bincount(index, weights=np.where(valid, values, 0.0).ravel(),
+                       minlength=rows * n_groups)
+    counts = np.bincount(index, weights=valid.ravel(), minlength=rows * n_groups)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        means = (sums / counts)[index].reshape(values.shape)
+    return values - means
+
+
+def cs_neutralize(values: np.ndarray, exposure: np.ndarray) -> np.ndarray:
+    """
+    截面回归中性化，取 values 对 [1, exposure] 逐日最小二乘回归的残差
+
+    如对数市值作为暴露即为市值中性化。两者同时有效的股票不足
+    MIN_REGRESSION_STOCKS 或暴露无差异的截面只去均值。
+    """
+    values = np.asarray(values, dtype=float)
+    exposure = np.broadcast_to(np.asarray(exposure, dtype=float), values.shape)
+    joint = np.isfinite(values) & np.isfinite(exposure)
+    x = np.where(joint, exposure, np.nan)
+    y = np.where(joint, values, np.nan)
+
+    count, x_mean, x_std = _row_moments(x)
+    _, y_mean, _ = _row_moments(y)
+    x_centered = np.where(joint, x - x_mean, 0.0)
+    y_centered = np.where(joint, y - y_mean, 0.0)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        beta = (x_centered * y_centered).sum(axis=-1, keepdims=True) / (x_centered ** 2).sum(axis=-1, keepdims=True)
+    beta = np.where((count >= MIN_REGRESSION_STOCKS) & (x_std > 0), beta, 0.0)
+    return np.where(joint, y_centered - beta * x_centered, np.nan)
+
+
+def cross_section_functions(valid: Optional[np.ndarray] = None,
+                            groups: Optional[np.ndarray] = None) -> Dict[str, Callable]:
+    """
+    表达式执行使用的截面函数
+
+    Args:
+        valid: 日期×股票 的交易日标记，非交易日不参与截面统计；常量参数按此形状广播
+        groups: 每只股票的行业编号，INDNEUTRALIZE 需要
+
+    Returns:
+        Dict: 函数名到实现的映射，函数名与编译器中的 CROSS_SECTION_FUNCTIONS 一致
+    """
+    def masked(values):
+        values = np.asarray(values, dtype=float)
+        if valid is None:
+            return values
+        return np.where(valid, np.broadcast_to(values, valid.shape), np.nan)
+
+    def industry_neutralize(values):
+        if groups is None:
+            raise ValueError("缺少行业分类数据，无法进行行业中性化")
+        return group_demean(masked(values), groups)
+
+    return {
+        'RANK': lambda values: cs_rank(masked(values)),
+        'ZSCORE': lambda values: cs_zscore(masked(values)),
+        'DEMEAN': lambda values: cs_demean(masked(values)),
+        'WINSORIZE': lambda values, n_std=3: cs_winsorize(masked(values), n_std),
+        'INDNEUTRALIZE': industry_neutralize,
+        'NEUTRALIZE': lambda values, exposure: cs_neutralize(masked(values), masked(exposure)),
+    }
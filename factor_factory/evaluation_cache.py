@@ -0,0 +1,193 @@
+"""
+因子评估结果缓存
+
+评估结果只取决于表达式、股票池和评估窗口内的行情数据。
+缓存以 (表达式内容哈希, 股票池快照, 评估窗口, 最新数据日期) 为键，
+把IC统计、IC序列和因子值矩阵保存为磁盘上的压缩npz文件：
+表达式相同的重复因子只计算一次，数据未更新时重复运行直接读取结果。
+文件按最近使用时间淘汰，总大小不超过配置的磁盘预算。
+"""
+
+from typing import Any, Dict, Optional, Sequence
+from datetime import datetime
+import hashlib
+import logging
+import os
+import threading
+import numpy as np
+from .factor_value_store import content_hash
+from .forward_return_cache import universe_key
+from .config.evaluation_config import EVALUATION_CONFIG
+
+logger = logging.getLogger(__name__)
+
+_SUFFIX = '.npz'
+_SCALARS = ('ic_mean', 'ic_std', 'icir_mean', 'stock_count')
+
+
+def evaluation_key(expression: str, stock_codes: Sequence[str], dates: Sequence[int]) -> str:
+    """
+    计算评估结果的缓存键
+
+    Args:
+        expression: 因子表达式，空白不同的等价表达式键相同
+        stock_codes: 股票代码列表，与因子矩阵的列一致
+        dates: 评估窗口的交易日列表（YYYYMMDD），最后一个为最新数据日期
+
+    Returns:
+        str: 40位十六进制哈希
+    """
+    window = f"{int(dates[0])}-{int(dates[-1])}-{len(dates)}" if len(dates) else 'empty'
+    raw = f"{content_hash(expression)}|{universe_key(stock_codes)}|{window}"
+    return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+
+class EvaluationCache:
+    """按磁盘预算LRU淘汰的评估结果缓存"""
+
+    def __init__(self, root_dir: str, max_bytes: int = None):
+        """
+        Args:
+            root_dir: 缓存目录
+            max_bytes: 缓存文件的最大总字节数，默认读取 EVALUATION_CONFIG['evaluation_cache_mb']
+        """
+        if max_bytes is None:
+            max_bytes = EVALUATION_CONFIG['evaluation_cache_mb'] * 1024 * 1024
+        self.root_dir = root_dir
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        os.makedirs(root_dir, exist_ok=True)
+        # 文件名到 (字节数, 最近使用时间)，启动时由目录扫描得到
+        self._index: Dict[str, list] = {}
+        for name in os.listdir(root_dir):
+            if name.endswith(_SUFFIX):
+                stat = os.stat(os.path.join(root_dir, name))
+                self._index[name] = [stat.st_size, stat.st_mtime]
+        self.current_bytes = sum(size for size, _ in self._index.values())
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """
+        读取缓存的评估结果
+
+        Returns:
+            Optional[Dict]: 与 evaluate_expressions_shared 中 evaluation_result 格式一致，未命中返回None
+        """
+        name = key + _SUFFIX
+        path = os.path.join(self.root_dir, name)
+        try:
+            with np.load(path, allow_pickle=False) as data:
+                result = {field: data[field].item() for field in _SCALARS}
+                result['stock_count'] = int(result['stock_count'])
+                result['ic_series'] = data['ic_series']
+                result['factor_values'] = data['factor_values']
+                result['evaluation_date'] = datetime.fromtimestamp(data['evaluation_date'].item())
+            now = datetime.now().timestamp()
+            os.utime(path, (now, now))
+        except FileNotFoundError:
+            with self._lock:
+                self.misses += 1
+                self._forget(name)
+            return None
+        except Exception as e:
+            logger.warning(f"评估缓存读取失败: {name}, 错误: {e}")
+            with self._lock:
+                self.misses += 1
+            return None
+
+        with self._lock:
+            self.hits += 1
+            if name in self._index:
+                self._index[name][1] = now
+        return result
+
+    def put(self, key: str, result: Dict[str, Any]) -> None:
+        """写入评估结果并按最近使用时间淘汰，超过预算的单个结果不缓存"""
+        name = key + _SUFFIX
+        path = os.path.join(self.root_dir, name)
+        tmp_path = path + '.tmp'
+        try:
+            with open(tmp_path, 'wb') as f:
+                np.savez_compressed(
+                    f,
+                    ic_series=np.asarray(result['ic_series'], dtype=float),
+                    factor_values=np.asarray(result['factor_values'], dtype=float),
+                    evaluation_date=np.float64(result['evaluation_date'].timestamp()),
+                    **{field: np.float64(result[field]) for field in _SCALARS}
+                )
+            size = os.path.getsize(tmp_path)
+            if size > self.max_bytes:
+                os.remove(tmp_path)
+                logger.warning(f"评估结果 {size} 字节超过缓存预算 {self.max_bytes} 字节，不缓存")
+                return
+            os.replace(tmp_path, path)
+        except Exception as e:
+            logger.warning(f"评估缓存写入失败: {name}, 错误: {e}")
+            return
+
+        with self._lock:
+            self._forget(name)
+            self._index[name] = [size, datetime.now().timestamp()]
+            self.current_bytes += size
+            self._evict()
+
+    def _forget(self, name: str) -> None:
+        entry = self._index.pop(name, None)
+        if entry is not None:
+            self.current_bytes -= entry[0]
+
+    def _evict(self) -> None:
+        """删除最久未使用的文件直到总大小不超过预算"""
+        if self.current_bytes <= self.max_bytes:
+            return
+        for name in sorted(self._index, key=lambda n: self._index[n][1]):
+            if self.current_bytes <= self.max_bytes:
+                break
+            self._forget(name)
+            try:
+                os.remove(os.path.join(self.root_dir, name))
+            except FileNotFoundError:
+                pass
+
+    def clear(self) -> None:
+        """删除所有缓存文件"""
+        with self._lock:
+            for name in list(self._index):
+                self._forget(name)
+                try:
+                    os.remove(os.path.join(self.root_dir, name))
+                except FileNotFoundError:
+                    pass
+
+    def stats(self) -> Dict[str, int]:
+        """缓存统计：条目数、占用字节数、命中和未命中次数"""
+        return {
+            'entries': len(self._index),
+            'bytes': self.current_bytes,
+            'hits': self.hits,
+            'misses': self.misses
+        }
+
+
+def open_evaluation_cache(root_dir: str = None) -> Optional[EvaluationCache]:
+    """
+    打开配置的评估结果缓存
+
+    Args:
+        root_dir: 缓存目录，默认读取 EVALUATION_CONFIG['evaluation_cache_dir']
+
+    Returns:
+        Optional[EvaluationCache]: 未配置时返回None
+    """
+    root_dir = root_dir or EVALUATION_CONFIG['evaluation_cache_dir']
+    if not root_dir:
+        return None
+    try:
+        return EvaluationCache(root_dir)
+    except Exception as e:
+        logger.error(f"打开评估结果缓存失败: {root_dir}, 错误: {e}")
+        return None
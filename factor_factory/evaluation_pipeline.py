@@ -2,11 +2,22 @@ from typing import List, Dict, Any, Optional
 import logging
 from datetime import datetime, timedelta
 import schedule
+import tempfile
 import time
 from hikyuu import *
 from .mysql_manager import get_db_manager
 from .factor_registry import get_factor_registry
 from .multi_factor_engine import get_multi_factor_engine
+from .parallel_evaluator import ParallelFactorEvaluator
+from .incremental_ic import IncrementalICEvaluator
+from .factor_value_store import FactorValueStore, StoredFactorMatrices, open_factor_value_store
+from .kline_store import open_kline_store, build_kline_store, append_daily_klines
+from .partition_manager import PartitionManager
+from .run_checkpoint import RunCheckpoint
+from .factor_correlation import rank_correlation_matrix, cluster_by_correlation
+from .factor_miner import FactorMiner
+from .config.evaluation_config import EVALUATION_CONFIG
+from .config.database_config import SCHEMA_MODE, PARTITIONED_TABLES_SQL
 
 logger = logging.getLogger(__name__)
 
@@ -18,71 +29,419 @@ class EvaluationPipeline:
         self.registry = get_factor_registry()
         self.engine = get_multi_factor_engine()
         self.sm = StockManager.instance()
+        # 配置了因子值存储时，每日评估保存完整的因子值矩阵供下游读取
+        self.factor_values = open_factor_value_store()
+        # 分区模式下过期数据按分区删除
+        self.partitions = PartitionManager(self.db) if SCHEMA_MODE == 'partitioned' else None
+        # 每日评估的运行检查点，中断后恢复时跳过已完成的因子
+        self.checkpoints = RunCheckpoint(self.db)
+        # 冗余剔除后代表因子仍活跃的因子ID到代表因子ID的映射，每日评估时不重新激活
+        self.redundant_factors: Dict[int, int] = {}
     
-    def run_daily_evaluation(self):
-        """运行每日因子评估"""
+    def run_daily_evaluation(self, max_workers: int = None, incremental: bool = None,
+                             checkpoint: bool = None):
+        """
+        运行每日因子评估
+
+        启用检查点时按批评估，每批结果保存后记录检查点；运行中断后同一天再次运行
+        会恢复该运行，只评估未完成的因子。评估或保存失败的因子不记录检查点，恢复时重新评估。
+
+        Args:
+            max_workers: 并行评估的进程数，None时读取配置，1表示串行评估
+            incremental: 是否增量评估（只计算最新截面的IC），None时读取配置
+            checkpoint: 是否记录检查点并恢复中断的运行，None时读取配置
+
+        Returns:
+            Dict: 本次评估的因子ID到评估结果的映射，不含恢复前已完成的因子
+        """
         logger.info("开始每日因子评估")
         
         # 获取所有测试中和活跃的因子
-        factors_to_evaluate = (
-            self.registry.get_testing_factors() + 
-            self.registry.get_active_factors()
-        )
+        active_factors = self.registry.get_active_factors()
+        factors_to_evaluate = self.registry.get_testing_factors() + active_factors
+
+        active_ids = {factor['id'] for factor in active_factors}
+        self.redundant_factors = {
+            factor_id: leader_id
+            for factor_id, leader_id in self.registry.get_redundancy_leaders().items()
+            if leader_id in active_ids
+        }
         
         logger.info(f"需要评估的因子数量: {len(factors_to_evaluate)}")
+
+        checkpoint = EVALUATION_CONFIG['checkpoint_enabled'] if checkpoint is None else checkpoint
+        run_id = None
+        if checkpoint:
+            run_id, completed = self.checkpoints.start(
+                'daily_evaluation', datetime.now().date(), len(factors_to_evaluate)
+            )
+            if completed:
+                factors_to_evaluate = [f for f in factors_to_evaluate if f['id'] not in completed]
+                logger.info(f"跳过已完成的因子 {len(completed)} 个, 剩余 {len(factors_to_evaluate)} 个")
         
         # 获取A股列表
         a_stocks = self._get_a_stocks()
         logger.info(f"A股数量: {len(a_stocks)}")
         
-        # 设置查询条件（最近100个交易日）
-        query = Query(-100)
-        
+        # 设置查询条件（最近 lookback 个交易日），增量评估的窗口由同一配置推导
+        query = Query(-EVALUATION_CONFIG['lookback'])
+
+        chunk_size = EVALUATION_CONFIG['checkpoint_chunk_size'] if checkpoint else 0
+        chunk_size = chunk_size or max(len(factors_to_evaluate), 1)
         evaluation_results = {}
-        
+        for offset in range(0, len(factors_to_evaluate), chunk_size):
+            chunk = factors_to_evaluate[offset:offset + chunk_size]
+            chunk_results = self._evaluate_factor_batch(chunk, a_stocks, query,
+                                                        max_workers, incremental)
+            evaluation_results.update(chunk_results)
+            if run_id is not None:
+                self.checkpoints.mark_completed(
+                    run_id, [factor_id for factor_id, entry in chunk_results.items()
+                             if 'error' not in entry]
+                )
+
+        if run_id is not None:
+            self.checkpoints.finish(run_id)
+        logger.info("每日因子评估完成")
+        return evaluation_results
+
+    def _evaluate_factor_batch(self, factors_to_evaluate: List[Dict[str, Any]],
+                               a_stocks: List[Stock], query: Query,
+                               max_workers: int = None,
+                               incremental: bool = None) -> Dict[int, Dict[str, Any]]:
+        """评估一批因子并保存结果，返回因子ID到评估结果的映射"""
+        evaluation_results = {}
+
+        incremental = EVALUATION_CONFIG['incremental'] if incremental is None else incremental
+        if incremental:
+            # 每日只计算最新截面的IC，窗口统计量由已保存的累计和推导
+            evaluator = IncrementalICEvaluator(self.engine, self.registry)
+            evaluations = evaluator.evaluate(factors_to_evaluate, a_stocks)
+            if self.factor_values is not None:
+                # 增量评估只返回本次计算的截面，按各自的交易日合并到已有分区
+                self._save_factor_values(factors_to_evaluate, evaluations, a_stocks, query)
+            for factor in factors_to_evaluate:
+                evaluation = evaluations.get(factor['id'], {'error': '评估结果缺失'})
+                if 'error' in evaluation:
+                    logger.error(f"因子评估失败: {factor['name']}, 错误: {evaluation['error']}")
+                    evaluation_results[factor['id']] = {'error': evaluation['error']}
+                    continue
+                evaluation_results[factor['id']] = self._queue_daily_result(
+                    factor, evaluation['evaluation_result']
+                )
+
+            return self._flush_daily_results(evaluation_results)
+
+        max_workers = max_workers or EVALUATION_CONFIG['max_workers']
+        if max_workers > 1:
+            # 并行计算，结果按因子顺序合并后在主进程中依次持久化；
+            # 因子值矩阵由各工作进程直接写入因子值存储
+            evaluator = ParallelFactorEvaluator(
+                max_workers=max_workers,
+                factor_value_dir=self.factor_values.root_dir if self.factor_values is not None else None
+            )
+            parallel_results = evaluator.evaluate(
+                factors_to_evaluate,
+                stock_codes=[stock.market_code for stock in a_stocks],
+                lookback=EVALUATION_CONFIG['lookback']
+            )
+            for factor, item in zip(factors_to_evaluate, parallel_results):
+                if item['error']:
+                    logger.error(f"因子评估失败: {factor['name']}, 错误: {item['error']}")
+                    evaluation_results[factor['id']] = {'error': item['error']}
+                    continue
+                evaluation_results[factor['id']] = self._queue_daily_result(factor, item['result'])
+
+            return self._flush_daily_results(evaluation_results)
+
+        if self.engine.kline_store is not None or self.factor_values is not None:
+            # 所有因子在一次DAG计算中完成，配置了K线存储时从存储读取行情；
+            # 该路径得到 日期×股票 因子矩阵，可直接保存到因子值存储
+            evaluations = self.engine.evaluate_expressions_shared(
+                {factor['id']: factor['expression'] for factor in factors_to_evaluate},
+                a_stocks, query
+            )
+            if self.factor_values is not None:
+                self._save_factor_values(factors_to_evaluate, evaluations, a_stocks, query)
+            for factor in factors_to_evaluate:
+                evaluation = evaluations.get(factor['id'], {'error': '评估结果缺失'})
+                if 'error' in evaluation:
+                    logger.error(f"因子评估失败: {factor['name']}, 错误: {evaluation['error']}")
+                    evaluation_results[factor['id']] = {'error': evaluation['error']}
+                    continue
+                evaluation_results[factor['id']] = self._queue_daily_result(
+                    factor, evaluation['evaluation_result']
+                )
+
+            return self._flush_daily_results(evaluation_results)
+
         for factor in factors_to_evaluate:
             try:
                 # 评估因子
                 result = self.engine.evaluate_single_factor(
                     factor['expression'], a_stocks, query
                 )
-                
-                # 保存绩效结果
-                performance_id = self.registry.save_performance_result(
-                    factor_id=factor['id'],
-                    evaluation_date=datetime.now().date(),
-                    ic_value=result['ic_mean'],
-                    icir_value=result['icir_mean']
-                )
-                
-                evaluation_results[factor['id']] = {
-                    'factor_name': factor['name'],
-                    'ic_value': result['ic_mean'],
-                    'icir_value': result['icir_mean'],
-                    'performance_id': performance_id
-                }
-                
-                logger.info(
-                    f"因子评估完成: {factor['name']} - "
-                    f"IC: {result['ic_mean']:.4f}, "
-                    f"ICIR: {result['icir_mean']:.4f}"
-                )
-                
-                # 根据IC值更新因子状态
-                if result['ic_mean'] > 0.05:  # IC大于5%，激活因子
-                    self.registry.update_factor(factor['id'], status='active')
-                    logger.info(f"因子激活: {factor['name']}")
-                elif result['ic_mean'] < 0.01:  # IC小于1%，标记为待观察
-                    self.registry.update_factor(factor['id'], status='testing')
-                    logger.info(f"因子标记为测试: {factor['name']}")
-                
+                evaluation_results[factor['id']] = self._queue_daily_result(factor, result)
+
             except Exception as e:
                 logger.error(f"因子评估失败: {factor['name']}, 错误: {e}")
                 evaluation_results[factor['id']] = {'error': str(e)}
         
-        logger.info("每日因子评估完成")
+        return self._flush_daily_results(evaluation_results)
+
+    def _queue_daily_result(self, factor: Dict[str, Any], result: Dict[str, Any]) -> Dict[str, Any]:
+        """缓存单个因子的每日评估结果和状态变更，由 _flush_daily_results 统一写入"""
+        try:
+            # 缓存绩效结果
+            self.registry.queue_performance_result(
+                factor_id=factor['id'],
+                evaluation_date=datetime.now().date(),
+                ic_value=result['ic_mean'],
+                icir_value=result['icir_mean']
+            )
+
+            logger.info(
+                f"因子评估完成: {factor['name']} - "
+                f"IC: {result['ic_mean']:.4f}, "
+                f"ICIR: {result['icir_mean']:.4f}"
+            )
+
+            # 根据IC值更新因子状态
+            if result['ic_mean'] > 0.05 and factor['id'] in self.redundant_factors:
+                # 冗余剔除的因子在其簇代表因子活跃期间保持测试状态
+                logger.info(
+                    f"冗余因子不激活: {factor['name']}, "
+                    f"簇代表因子ID {self.redundant_factors[factor['id']]} 仍活跃"
+                )
+            elif result['ic_mean'] > 0.05:  # IC大于5%，激活因子
+                self.registry.queue_status_update(factor['id'], 'active')
+                logger.info(f"因子激活: {factor['name']}")
+            elif result['ic_mean'] < 0.01:  # IC小于1%，标记为待观察
+                self.registry.queue_status_update(factor['id'], 'testing')
+                logger.info(f"因子标记为测试: {factor['name']}")
+
+            return {
+                'factor_name': factor['name'],
+                'ic_value': result['ic_mean'],
+                'icir_value': result['icir_mean']
+            }
+
+        except Exception as e:
+            logger.error(f"因子评估失败: {factor['name']}, 错误: {e}")
+            return {'error': str(e)}
+
+    def _flush_daily_results(self, evaluation_results: Dict[int, Dict[str, Any]]) -> Dict[int, Dict[str, Any]]:
+        """批量写入缓存的评估结果，写入失败的因子在结果中标记错误"""
+        summary = self.registry.flush_pending()
+        for failure in summary['failures']:
+            entry = evaluation_results.get(failure['factor_id'])
+            if entry is not None and 'error' not in entry:
+                entry['error'] = f"{failure['operation']} 保存失败: {failure['error']}"
         return evaluation_results
     
+    def _save_factor_values(self, factors: List[Dict[str, Any]],
+                            evaluations: Dict[int, Dict[str, Any]],
+                            stock_list: List[Stock], query: Query) -> None:
+        """
+        把评估得到的因子矩阵保存到因子值存储，保存失败不影响评估结果
+
+        评估结果带有 value_dates 时（增量评估）按其中的交易日保存，否则为 query 的全部交易日
+        """
+        dates = None
+        stocks = [stock.market_code for stock in stock_list]
+        for factor in factors:
+            result = evaluations.get(factor['id'], {}).get('evaluation_result')
+            if result is None:
+                continue
+            if 'value_dates' not in result and dates is None:
+                dates = self.engine._query_dates(stock_list, query)
+            try:
+                self.factor_values.write(factor['id'], factor['expression'],
+                                         result.get('value_dates', dates), stocks,
+                                         result['factor_values'])
+            except Exception as e:
+                logger.error(f"因子值保存失败: {factor['name']}, 错误: {e}")
+
+    def run_daily_quantile_analysis(self) -> Dict[int, Dict[str, Any]]:
+        """
+        运行每日分位数分析，结果按因子和持有期保存到 factor_quantile_stats
+
+        Returns:
+            Dict: 因子ID到分位数分析结果或错误信息的映射
+        """
+        logger.info("开始每日分位数分析")
+
+        factors = self.registry.get_testing_factors() + self.registry.get_active_factors()
+        results = self.engine.batch_quantile_analysis(
+            {factor['id']: factor['expression'] for factor in factors},
+            stock_list=self._get_a_stocks(), query=Query(-100)
+        )
+
+        analysis_results = {}
+        for factor in factors:
+            result = results.get(factor['id'], {'error': '分析结果缺失'})
+            if 'error' in result:
+                logger.error(f"分位数分析失败: {factor['name']}, 错误: {result['error']}")
+                analysis_results[factor['id']] = {'error': result['error']}
+            else:
+                analysis_results[factor['id']] = result['quantile_result']
+
+        completed = {factor_id: result for factor_id, result in analysis_results.items()
+                     if 'error' not in result}
+        for failure in self.registry.save_quantile_results(completed, datetime.now().date()):
+            analysis_results[failure['factor_id']] = {'error': failure['error']}
+
+        logger.info("每日分位数分析完成")
+        return analysis_results
+
+    def run_redundancy_pruning(self, stock_list: List[Stock] = None, query: Query = None,
+                               threshold: float = None) -> Dict[str, Any]:
+        """
+        按因子值相关性剔除冗余的活跃因子
+
+        计算所有活跃因子两两之间的平均截面秩相关，相关系数绝对值不低于阈值的因子聚为一簇，
+        每簇只保留IC最高的因子，其余因子转为测试状态，仍参与每日评估。
+        因子按 correlation_block_size 分块评估，因子值写入因子值存储（未配置时为临时目录），
+        相关性计算时再按块读取，不同时持有所有因子的矩阵。
+        剔除结果记录在 factor_redundancy 中，簇代表因子活跃期间每日评估不会重新激活被剔除的因子。
+
+        Args:
+            stock_list: 股票列表，如果为None则使用所有A股
+            query: 查询条件，如果为None则使用最近100条数据
+            threshold: 相关系数绝对值阈值，None时读取配置
+
+        Returns:
+            Dict: clusters（代表因子ID到簇内因子ID列表的映射）和 deactivated（转为测试的因子ID）
+        """
+        logger.info("开始冗余因子剔除")
+        threshold = EVALUATION_CONFIG['correlation_threshold'] if threshold is None else threshold
+
+        factors = self.registry.get_active_factors()
+        if len(factors) < 2:
+            logger.info("活跃因子少于2个，无需剔除")
+            return {'clusters': {}, 'deactivated': []}
+
+        stock_list = stock_list or self._get_a_stocks()
+        query = query or Query(-100)
+        block_size = EVALUATION_CONFIG['correlation_block_size']
+        dates = self.engine._query_dates(stock_list, query)
+        stocks = [stock.market_code for stock in stock_list]
+
+        with tempfile.TemporaryDirectory(prefix='factor_pruning_') as scratch_dir:
+            store = self.factor_values or FactorValueStore(scratch_dir)
+            evaluated, scores = [], []
+            for start in range(0, len(factors), block_size):
+                block = factors[start:start + block_size]
+                evaluations = self.engine.evaluate_expressions_shared(
+                    {factor['id']: factor['expression'] for factor in block}, stock_list, query
+                )
+                for factor in block:
+                    result = evaluations.get(factor['id'], {}).get('evaluation_result')
+                    if result is None:
+                        continue
+                    try:
+                        store.write(factor['id'], factor['expression'], dates, stocks,
+                                    result['factor_values'])
+                    except Exception as e:
+                        logger.error(f"因子值保存失败，不参与冗余剔除: {factor['name']}, 错误: {e}")
+                        continue
+                    evaluated.append(factor)
+                    scores.append(result['ic_mean'])
+                del evaluations
+
+            correlation = rank_correlation_matrix(
+                StoredFactorMatrices(store, [(factor['id'], factor['expression'])
+                                             for factor in evaluated], dates, stocks),
+                block_size=block_size
+            )
+        clusters = cluster_by_correlation(correlation, scores, threshold)
+
+        cluster_ids, deactivated, records = {}, [], []
+        for leader, members in clusters.items():
+            member_ids = [evaluated[i]['id'] for i in members]
+            cluster_ids[member_ids[0]] = member_ids
+            for i in members[1:]:
+                self.registry.queue_status_update(evaluated[i]['id'], 'testing')
+                deactivated.append(evaluated[i]['id'])
+                records.append((evaluated[i]['id'], member_ids[0], correlation[leader, i]))
+                logger.info(
+                    f"冗余因子转为测试: {evaluated[i]['name']}, "
+                    f"与 {evaluated[leader]['name']} 相关系数 {correlation[leader, i]:.3f}"
+                )
+        self.registry.flush_pending()
+        self.registry.save_redundancy(records, list(cluster_ids), datetime.now().date())
+
+        logger.info(
+            f"冗余因子剔除完成: {len(evaluated)} 个活跃因子聚为 {len(clusters)} 簇, "
+            f"{len(deactivated)} 个因子转为测试"
+        )
+        return {'clusters': cluster_ids, 'deactivated': deactivated}
+
+    def run_factor_mining(self, generations: int = None, max_workers: int = None) -> Dict[str, Any]:
+        """
+        运行遗传因子挖掘，以已有的测试和活跃因子为初始种群，最优候选注册为测试因子
+
+        Args:
+            generations: 进化代数，None时读取配置
+            max_workers: 并行评估的进程数，None时读取配置，1表示串行评估
+
+        Returns:
+            Dict: candidates（所有成功评估的候选）和 registered（新注册的因子ID）
+        """
+        logger.info("开始遗传因子挖掘")
+        seeds = [factor['expression'] for factor in
+                 self.registry.get_testing_factors() + self.registry.get_active_factors()]
+        a_stocks = self._get_a_stocks()
+
+        max_workers = max_workers or EVALUATION_CONFIG['max_workers']
+        if max_workers > 1:
+            # 常驻进程池在各代之间复用，工作进程只加载一次hikyuu
+            with ParallelFactorEvaluator(max_workers=max_workers).start(
+                    [stock.market_code for stock in a_stocks]) as evaluator:
+                miner = FactorMiner(self.engine, self.registry, evaluator=evaluator,
+                                    stock_list=a_stocks, generations=generations)
+                return miner.run(seeds)
+
+        miner = FactorMiner(self.engine, self.registry, stock_list=a_stocks,
+                            generations=generations)
+        return miner.run(seeds)
+
+    def run_daily_kline_update(self) -> int:
+        """
+        更新列式K线存储
+
+        存储不存在时按配置的历史长度全量构建，否则只追加最新交易日。
+        无论是否配置存储，都清空引擎的远期收益率缓存，常驻进程不会继续使用收盘前行情计算的结果。
+
+        Returns:
+            int: 新增的交易日数量
+        """
+        # 缓存键不含行情版本，收盘后行情更新（含除权等对历史数据的修正）时整体失效
+        self.engine.forward_returns.clear()
+
+        store_dir = EVALUATION_CONFIG['kline_store_dir']
+        if not store_dir:
+            logger.info("未配置K线存储目录，跳过K线存储更新")
+            return 0
+
+        a_stocks = self._get_a_stocks()
+        try:
+            store = open_kline_store(store_dir, mode='r+')
+            if store is None:
+                store = build_kline_store(
+                    store_dir, a_stocks, Query(-EVALUATION_CONFIG['kline_store_history'])
+                )
+                appended = store.size
+            else:
+                appended = append_daily_klines(store, a_stocks)
+        except Exception as e:
+            logger.error(f"K线存储更新失败: {e}")
+            return 0
+
+        # 重新只读映射，使引擎看到新增的日期和股票
+        self.engine.kline_store = open_kline_store(store_dir)
+        return appended
+
     def run_weekly_backtest(self):
         """运行每周回测"""
         logger.info("开始每周回测")
@@ -95,44 +454,50 @@ class EvaluationPipeline:
         query = Query(-252)
         
         backtest_results = {}
+
+        # 所有活跃因子在一次向量化组合回测中完成
+        results = self.engine.run_portfolio_backtests(
+            {factor['id']: factor['expression'] for factor in active_factors},
+            stock_list=self._get_a_stocks(), query=query, initial_cash=1000000
+        )
         
+        backtest_date = datetime.now().date()
+        rows = []
         for factor in active_factors:
-            try:
-                # 运行回测
-                result = self.engine.run_backtest_for_factor(
-                    factor['id'], initial_cash=1000000, query=query
-                )
-                
-                # 保存回测结果
-                backtest_id = self.registry.save_backtest_result(
-                    factor_id=factor['id'],
-                    backtest_date=datetime.now().date(),
-                    total_return=result['performance'].get('总收益率', 0),
-                    annual_return=result['performance'].get('年化收益率', 0),
-                    volatility=result['performance'].get('年化波动率', 0),
-                    sharpe_ratio=result['performance'].get('夏普比率', 0),
-                    max_drawdown=result['performance'].get('最大回撤', 0),
-                    trade_count=result['trade_count'],
-                    win_rate=result['performance'].get('胜率', 0)
-                )
-                
-                backtest_results[factor['id']] = {
-                    'factor_name': factor['name'],
-                    'annual_return': result['performance'].get('年化收益率', 0),
-                    'sharpe_ratio': result['performance'].get('夏普比率', 0),
-                    'max_drawdown': result['performance'].get('最大回撤', 0),
-                    'backtest_id': backtest_id
-                }
-                
-                logger.info(
-                    f"回测完成: {factor['name']} - "
-                    f"年化收益: {result['performance'].get('年化收益率', 0):.2%}, "
-                    f"夏普比率: {result['performance'].get('夏普比率', 0):.2f}"
-                )
-                
-            except Exception as e:
-                logger.error(f"回测失败: {factor['name']}, 错误: {e}")
-                backtest_results[factor['id']] = {'error': str(e)}
+            result = results.get(factor['id'], {'error': '回测结果缺失'})
+            if 'error' in result:
+                logger.error(f"回测失败: {factor['name']}, 错误: {result['error']}")
+                backtest_results[factor['id']] = {'error': result['error']}
+                continue
+
+            performance = result['performance']
+            rows.append((
+                factor['id'], backtest_date,
+                performance.get('总收益率', 0), performance.get('年化收益率', 0),
+                performance.get('年化波动率', 0), performance.get('夏普比率', 0),
+                performance.get('最大回撤', 0), result['trade_count'], performance.get('胜率', 0)
+            ))
+            backtest_results[factor['id']] = {
+                'factor_name': factor['name'],
+                'annual_return': performance.get('年化收益率', 0),
+                'sharpe_ratio': performance.get('夏普比率', 0),
+                'max_drawdown': performance.get('最大回撤', 0),
+                'turnover': result['turnover'],
+                'total_cost': result['total_cost'],
+                'quantile_returns': result['quantile_returns']
+            }
+            
+            logger.info(
+                f"回测完成: {factor['name']} - "
+                f"年化收益: {performance.get('年化收益率', 0):.2%}, "
+                f"夏普比率: {performance.get('夏普比率', 0):.2f}, "
+                f"换手率: {result['turnover']:.2%}"
+            )
+
+        # 所有回测结果一次批量写入，同一天重复运行时覆盖已有记录
+        for failure in self.registry.save_backtest_results(rows):
+            logger.error(f"回测结果保存失败: 因子ID {failure['factor_id']}, 错误: {failure['error']}")
+            backtest_results[failure['factor_id']] = {'error': failure['error']}
         
         logger.info("每周回测完成")
         return backtest_results
@@ -147,35 +512,29 @@ class EvaluationPipeline:
             'performance_summary': {}
         }
         
-        # 获取因子统计
-        total_factors = self.registry.get_all_factors()
-        active_factors = self.registry.get_active_factors()
-        testing_factors = self.registry.get_testing_factors()
+        # 按状态统计因子数量
+        status_counts = self.db.get_factor_status_counts()
+        total = sum(status_counts.values())
+        active = status_counts.get('active', 0)
+        testing = status_counts.get('testing', 0)
         
         report['factor_stats'] = {
-            'total': len(total_factors),
-            'active': len(active_factors),
-            'testing': len(testing_factors),
-            'inactive': len(total_factors) - len(active_factors) - len(testing_factors)
+            'total': total,
+            'active': active,
+            'testing': testing,
+            'inactive': total - active - testing
         }
         
-        # 计算平均绩效指标
-        active_factor_ids = [f['id'] for f in active_factors]
-        if active_factor_ids:
-            performance_stats = []
-            for factor_id in active_factor_ids:
-                stats = self.db.get_factor_performance_stats(factor_id)
-                if stats and stats['evaluation_count'] > 0:
-                    performance_stats.append(stats)
-            
-            if performance_stats:
-                report['performance_summary'] = {
-                    'avg_ic': sum(s['avg_ic'] or 0 for s in performance_stats) / len(performance_stats),
-                    'avg_icir': sum(s['avg_icir'] or 0 for s in performance_stats) / len(performance_stats),
-                    'avg_annual_return': sum(s['avg_annual_return'] or 0 for s in performance_stats) / len(performance_stats),
-                    'avg_sharpe_ratio': sum(s['avg_sharpe_ratio'] or 0 for s in performance_stats) / len(performance_stats),
-                    'total_evaluations': sum(s['evaluation_count'] or 0 for s in performance_stats)
-                }
+        # 计算活跃因子的平均绩效指标，一次分组聚合完成
+        summary = self.db.get_performance_summary('active')
+        if summary:
+            report['performance_summary'] = {
+                'avg_ic': summary['avg_ic'],
+                'avg_icir': summary['avg_icir'],
+                'avg_annual_return': summary['avg_annual_return'],
+                'avg_sharpe_ratio': summary['avg_sharpe_ratio'],
+                'total_evaluations': summary['total_evaluations']
+            }
         
         logger.info("绩效报告生成完成")
         return report
@@ -184,16 +543,32 @@ class EvaluationPipeline:
         """启动定时任务"""
         logger.info("启动定时任务调度器")
         
+        # 每日下午3点半更新K线存储
+        schedule.every().day.at("15:30").do(self.run_daily_kline_update)
+
         # 每日下午4点运行因子评估
         schedule.every().day.at("16:00").do(self.run_daily_evaluation)
+
+        # 每日下午4点半运行分位数分析
+        schedule.every().day.at("16:30").do(self.run_daily_quantile_analysis)
+
+        # 每日下午4点45分剔除冗余的活跃因子
+        schedule.every().day.at("16:45").do(self.run_redundancy_pruning)
+        
+        # 分区模式下每日预建未来月份的分区
+        if self.partitions is not None:
+            schedule.every().day.at("15:00").do(self.run_partition_maintenance)
         
         # 每周五下午5点运行回测
         schedule.every().friday.at("17:00").do(self.run_weekly_backtest)
+
+        # 每周六上午10点运行遗传因子挖掘
+        schedule.every().saturday.at("10:00").do(self.run_factor_mining)
         
         # 每月第一天生成绩效报告
         schedule.every().month.at("09:00").do(self.generate_performance_report)
         
-        logger.info("定时任务已安排: 每日16:00评估, 每周五17:00回测, 每月1日9:00报告")
+        logger.info("定时任务已安排: 每日15:30更新K线, 每日16:00评估, 每日16:30分位数分析, 每日16:45冗余剔除, 每周五17:00回测, 每周六10:00因子挖掘, 每月1日9:00报告")
         
         # 运行调度器
         try:
@@ -204,19 +579,22 @@ class EvaluationPipeline:
             logger.info("定时任务调度器已停止")
     
     def _get_a_stocks(self) -> List[Stock]:
-        """获取所有A股股票"""
-        a_stocks = []
-        for i in range(len(self.sm)):
-            stock = self.sm[i]
-            if stock.valid and stock.type == 1:  # A股
-                a_stocks.append(stock)
-        return a_stocks
+        """获取所有A股股票，与评估引擎共用同一个按交易日缓存的股票池"""
+        return self.engine._get_a_stocks()
     
     def cleanup_old_data(self, days_to_keep: int = 90):
         """清理旧数据"""
         logger.info(f"开始清理 {days_to_keep} 天前的数据")
         
         cutoff_date = (datetime.now() - timedelta(days=days_to_keep)).date()
+
+        try:
+            self.checkpoints.purge_before(cutoff_date)
+        except Exception as e:
+            logger.error(f"评估运行检查点清理失败: {e}")
+
+        if self.partitions is not None:
+            return self._drop_old_partitions(cutoff_date)
         
         try:
             # 清理绩效数据
@@ -243,6 +621,39 @@ class EvaluationPipeline:
             return {'error': str(e)}
 
 
+    def _drop_old_partitions(self, cutoff_date) -> Dict[str, Any]:
+        """分区模式下删除过期分区，截止日期所在月份的少量旧记录逐行删除"""
+        try:
+            performance = self.partitions.drop_before('factor_performance', cutoff_date)
+            backtest = self.partitions.drop_before('backtest_results', cutoff_date)
+            
+            result = {
+                'performance_deleted': performance['rows_dropped'] + performance['rows_deleted'],
+                'backtest_deleted': backtest['rows_dropped'] + backtest['rows_deleted'],
+                'partitions_dropped': performance['partitions_dropped'] + backtest['partitions_dropped']
+            }
+            logger.info(
+                f"数据清理完成: 删除 {result['partitions_dropped']} 个分区, "
+                f"约 {result['performance_deleted']} 条绩效记录, "
+                f"约 {result['backtest_deleted']} 条回测记录"
+            )
+            return result
+            
+        except Exception as e:
+            logger.error(f"数据清理失败: {e}")
+            return {'error': str(e)}
+
+    def run_partition_maintenance(self) -> Dict[str, int]:
+        """预建未来月份的分区，返回每张表新建的分区数"""
+        created = {}
+        for table_name in PARTITIONED_TABLES_SQL:
+            try:
+                created[table_name] = self.partitions.ensure_future_partitions(table_name)
+            except Exception as e:
+                logger.error(f"表 {table_name} 分区维护失败: {e}")
+        return created
+
+
 # 全局评估流水线实例
 evaluation_pipeline = None
 
@@ -0,0 +1,241 @@
+"""
+因子表达式编译器
+
+把表达式解析为带类型检查的表达式树并生成执行计划，
+执行计划按表达式文本缓存，重复使用同一表达式时无需再次解析和校验。
+执行计划可直接构建hikyuu指标，也可按节点逐个执行，供DAG和向量化后端遍历。
+"""
+
+from typing import Any, Callable, Dict, List
+import logging
+import operator
+from functools import lru_cache
+from .expression_parser import ExpressionParser, ExprNode, FIELD_FUNCTIONS, iter_postorder
+
+logger = logging.getLogger(__name__)
+
+# 表达式最大长度
+MAX_EXPRESSION_LENGTH = 1000
+
+# 函数签名: 函数名 -> (最少参数个数, 各位置参数类型)
+# 参数类型: series 序列或数值, window 正整数窗口常量, number 数值常量
+FUNCTION_SIGNATURES = {
+    'MA': (1, ('series', 'window')),
+    'EMA': (1, ('series', 'window')),
+    'SMA': (1, ('series', 'window', 'number')),
+    'WMA': (1, ('series', 'window')),
+    'RSI': (1, ('series', 'window')),
+    'MACD': (1, ('series', 'window', 'window', 'window')),
+    'ATR': (1, ('series', 'window')),
+    'TA_BBANDS': (1, ('series', 'window', 'number', 'number', 'window')),
+    'HHV': (1, ('series', 'window')),
+    'LLV': (1, ('series', 'window')),
+    'REF': (2, ('series', 'window')),
+    'STD': (1, ('series', 'window')),
+    'CROSS': (2, ('series', 'series')),
+    'IF': (3, ('series', 'series', 'series')),
+    'ABS': (1, ('series',)),
+    'LOG': (1, ('series',)),
+    'SQRT': (1, ('series',)),
+    # 截面函数，在 日期×股票 矩阵上逐日计算，只能用于批量评估
+    'RANK': (1, ('series',)),
+    'ZSCORE': (1, ('series',)),
+    'DEMEAN': (1, ('series',)),
+    'WINSORIZE': (1, ('series', 'number')),
+    'INDNEUTRALIZE': (1, ('series',)),
+    'NEUTRALIZE': (2, ('series', 'series')),
+}
+
+# 截面函数：需要同一日期全部股票的值，不能逐只股票构建hikyuu指标
+CROSS_SECTION_FUNCTIONS = ('RANK', 'ZSCORE', 'DEMEAN', 'WINSORIZE', 'INDNEUTRALIZE', 'NEUTRALIZE')
+
+# 有 日期×股票 矩阵实现（rolling_primitives）的时序函数，截面函数的结果只能作为这些函数的输入
+MATRIX_FUNCTIONS = ('MA', 'STD', 'EMA', 'REF', 'HHV', 'LLV', 'ABS', 'LOG', 'SQRT')
+
+# 需要历史窗口的函数，窗口取第一个窗口参数
+_WINDOW_FUNCTIONS = ('MA', 'EMA', 'SMA', 'WMA', 'RSI', 'ATR', 'TA_BBANDS', 'HHV', 'LLV', 'STD')
+
+OPERATOR_FUNCTIONS = {
+    '+': operator.add, '-': operator.sub, '*': operator.mul, '/': operator.truediv,
+    '&': operator.and_, '|': operator.or_,
+    '>': operator.gt, '>=': operator.ge, '<': operator.lt, '<=': operator.le,
+    '==': operator.eq, '!=': operator.ne
+}
+
+
+def execute_node(node: ExprNode, args: List[Any],
+                 leaf_loader: Callable[[str], Any],
+                 functions: Dict[str, Callable]) -> Any:
+    """
+    执行单个节点
+
+    Args:
+        node: 表达式节点
+        args: 子节点的计算结果，顺序与 node.args 一致
+        leaf_loader: 行情字段加载函数，参数为字段名（如 'CLOSE'）
+        functions: 函数名到实现的映射
+
+    Returns:
+        节点计算结果
+    """
+    if node.kind == 'const':
+        return node.value
+    if node.kind == 'field':
+        return leaf_loader(node.op)
+    if node.kind == 'call':
+        func = functions.get(node.op)
+        if func is None:
+            raise ValueError(f"未定义的函数: {node.op}")
+        return func(*args)
+    if node.kind == 'neg':
+        return -args[0]
+    return OPERATOR_FUNCTIONS[node.op](args[0], args[1])
+
+
+class CompiledExpression:
+    """编译后的表达式执行计划"""
+
+    def __init__(self, root: ExprNode):
+        self.root = root
+        self.expression = root.key
+        # 拓扑序节点列表，子节点总在父节点之前
+        self.nodes: List[ExprNode] = iter_postorder(root)
+        self.functions = sorted({node.op for node in self.nodes if node.kind == 'call'})
+        self.fields = sorted({node.op for node in self.nodes if node.kind == 'field'})
+        # 是否包含截面函数
+        self.cross_sectional = any(op in CROSS_SECTION_FUNCTIONS for op in self.functions)
+        self.lookback = self._calculate_lookback()
+
+    def _calculate_lookback(self) -> int:
+        """估算计算最后一个值所需的历史K线数量"""
+        lookbacks = {}
+        for node in self.nodes:
+            child = max((lookbacks[arg.key] for arg in node.args), default=0)
+            windows = [arg.value for arg in node.args[1:] if arg.kind == 'const']
+            if node.kind == 'call' and node.op == 'REF':
+                child += windows[0]
+            elif node.kind == 'call' and node.op == 'MACD':
+                child += max(windows, default=26)
+            elif node.kind == 'call' and node.op in _WINDOW_FUNCTIONS:
+                child += max(int(windows[0]) - 1, 0) if windows else 22
+            lookbacks[node.key] = child
+        return lookbacks[self.root.key]
+
+    def execute(self, leaf_loader: Callable[[str], Any],
+                functions: Dict[str, Callable]) -> Any:
+        """
+        按拓扑序执行计划，每个唯一节点只计算一次
+
+        Args:
+            leaf_loader: 行情字段加载函数
+            functions: 函数名到实现的映射
+
+        Returns:
+            根节点计算结果
+        """
+        values = {}
+        for node in self.nodes:
+            args = [values[arg.key] for arg in node.args]
+            values[node.key] = execute_node(node, args, leaf_loader, functions)
+        return values[self.root.key]
+
+    def build_indicator(self, functions: Dict[str, Callable]) -> Any:
+        """
+        构建未绑定数据的hikyuu指标
+
+        Args:
+            functions: 函数名到hikyuu实现的映射，行情字段以无参数方式调用
+
+        Returns:
+            Indicator: hikyuu指标对象
+
+        Raises:
+            ValueError: 表达式包含截面函数
+        """
+        if self.cross_sectional:
+            raise ValueError(f"表达式包含截面函数，只能在批量评估中计算: {self.expression}")
+        return self.execute(lambda field: functions[field](), functions)
+
+    def __repr__(self) -> str:
+        return f"CompiledExpression({self.expression})"
+
+
+def _check_node(node: ExprNode) -> None:
+    """按函数签名检查调用节点的参数个数和类型"""
+    if node.kind != 'call':
+        return
+
+    if node.op in FIELD_FUNCTIONS:
+        raise ValueError(f"行情函数 {node.op} 不接受参数")
+
+    signature = FUNCTION_SIGNATURES.get(node.op)
+    if signature is None:
+        raise ValueError(f"未定义的函数: {node.op}")
+
+    min_args, arg_types = signature
+    if not min_args <= len(node.args) <= len(arg_types):
+        raise ValueError(
+            f"函数 {node.op} 参数个数错误: 需要 {min_args}-{len(arg_types)} 个, "
+            f"实际 {len(node.args)} 个"
+        )
+
+    for position, (arg, arg_type) in enumerate(zip(node.args, arg_types), start=1):
+        if arg_type == 'window':
+            if arg.kind != 'const' or not isinstance(arg.value, int) or arg.value <= 0:
+                raise ValueError(f"函数 {node.op} 第{position}个参数必须为正整数常量")
+        elif arg_type == 'number' and arg.kind != 'const':
+            raise ValueError(f"函数 {node.op} 第{position}个参数必须为数值常量")
+
+
+def _check_cross_section_consumers(nodes: List[ExprNode]) -> None:
+    """截面函数之上的节点在矩阵上计算，只能使用运算符、截面函数和 MATRIX_FUNCTIONS"""
+    dependent = set()
+    for node in nodes:
+        upstream = any(arg.key in dependent for arg in node.args)
+        if upstream and node.kind == 'call' \
+                and node.op not in MATRIX_FUNCTIONS + CROSS_SECTION_FUNCTIONS:
+            raise ValueError(
+                f"函数 {node.op} 不支持截面函数的结果作为参数，"
+                f"截面函数之上只能使用运算符和 {', '.join(MATRIX_FUNCTIONS)}"
+            )
+        if upstream or (node.kind == 'call' and node.op in CROSS_SECTION_FUNCTIONS):
+            dependent.add(node.key)
+
+
+@lru_cache(maxsize=4096)
+def _compile_cached(expression: str) -> CompiledExpression:
+    """编译表达式，结果按表达式文本缓存"""
+    root = ExpressionParser().parse(expression)
+    nodes = iter_postorder(root)
+    for node in nodes:
+        _check_node(node)
+    _check_cross_section_consumers(nodes)
+    return CompiledExpression(root)
+
+
+def compile_expression(expression: str) -> CompiledExpression:
+    """
+    编译因子表达式
+
+    执行计划的 expression 属性为规范化文本，空白不同的等价表达式规范化文本相同。
+
+    Args:
+        expression: 因子表达式，如 "MA(CLOSE(), 5) - MA(CLOSE(), 20)"
+
+    Returns:
+        CompiledExpression: 执行计划
+
+    Raises:
+        ValueError: 表达式为空、过长、语法错误或不符合函数签名
+    """
+    if not expression or not isinstance(expression, str):
+        raise ValueError("表达式不能为空且必须为字符串")
+    if len(expression.strip()) > MAX_EXPRESSION_LENGTH:
+        raise ValueError(f"表达式过长，请保持在{MAX_EXPRESSION_LENGTH}字符以内")
+
+    return _compile_cached(expression.strip())
+
+
+def clear_compile_cache() -> None:
+    """清空编译缓存"""
+    _compile_cached.cache_clear()
@@ -0,0 +1,106 @@
+"""
+公共子表达式DAG
+
+把一批因子表达式合并为一张有向无环图，相同的子表达式只保留一个节点。
+对每只股票按拓扑序计算每个唯一节点一次，再把结果分发给引用它的因子。
+"""
+
+from typing import Any, Callable, Dict, Hashable, List, Tuple
+import logging
+from .expression_parser import ExprNode, iter_postorder, count_tree_nodes
+from .expression_compiler import compile_expression, execute_node
+
+logger = logging.getLogger(__name__)
+
+
+class ExpressionDAG:
+    """因子表达式公共子表达式DAG"""
+
+    def __init__(self, expressions: Dict[Hashable, str]):
+        """
+        Args:
+            expressions: 因子键到表达式的映射，如 {factor_id: expression}
+        """
+        self.roots: Dict[Hashable, ExprNode] = {}
+        self.parse_errors: Dict[Hashable, str] = {}
+
+        # 不同执行计划中的等价节点规范化文本相同，按文本去重即得到共享节点
+        for factor_key, expression in expressions.items():
+            try:
+                self.roots[factor_key] = compile_expression(expression).root
+            except ValueError as e:
+                logger.error(f"表达式解析失败: {expression}, 错误: {e}")
+                self.parse_errors[factor_key] = str(e)
+
+        visited = set()
+        self.order: List[ExprNode] = []
+        for root in self.roots.values():
+            self.order.extend(iter_postorder(root, visited))
+
+    @property
+    def node_count(self) -> int:
+        """DAG中唯一节点数量"""
+        return len(self.order)
+
+    @property
+    def tree_node_count(self) -> int:
+        """各表达式独立计算时的节点总数"""
+        return sum(count_tree_nodes(root) for root in self.roots.values())
+
+    def evaluate(self, leaf_loader: Callable[[str], Any],
+                 functions: Dict[str, Callable],
+                 precomputed: Dict[str, Any] = None,
+                 ) -> Tuple[Dict[Hashable, Any], Dict[Hashable, str]]:
+        """
+        按拓扑序计算所有唯一节点，每个节点只计算一次
+
+        Args:
+            leaf_loader: 行情字段加载函数，参数为字段名（如 'CLOSE'），返回已计算的指标
+            functions: 函数名到实现的映射
+            precomputed: 节点规范化文本到已计算结果的映射，这些节点及只被它们引用的子节点不再计算
+
+        Returns:
+            Tuple[Dict, Dict]: (因子键到计算结果的映射, 因子键到错误信息的映射)
+        """
+        values: Dict[str, Any] = {}
+        errors: Dict[str, Exception] = {}
+        needed = self._needed_nodes(precomputed) if precomputed else None
+
+        for node in self.order:
+            if needed is not None:
+                if node.key not in needed:
+                    continue
+                if node.key in precomputed:
+                    values[node.key] = precomputed[node.key]
+                    continue
+            failed = next((errors[arg.key] for arg in node.args if arg.key in errors), None)
+            if failed is not None:
+                errors[node.key] = failed
+                continue
+            try:
+                args = [values[arg.key] for arg in node.args]
+                values[node.key] = execute_node(node, args, leaf_loader, functions)
+            except Exception as e:
+                errors[node.key] = e
+
+        results = {}
+        result_errors = {}
+        for factor_key, root in self.roots.items():
+            if root.key in errors:
+                result_errors[factor_key] = str(errors[root.key])
+            else:
+                results[factor_key] = values[root.key]
+        return results, result_errors
+
+    def _needed_nodes(self, precomputed: Dict[str, Any]) -> set:
+        """从根节点向下遍历，遇到已计算的节点即停止，返回需要的节点"""
+        needed = set()
+        stack = list(self.roots.values())
+        while stack:
+            node = stack.pop()
+            if node.key in needed:
+                continue
+            needed.add(node.key)
+            if node.key not in precomputed:
+                stack.extend(node.args)
+        return needed
@@ -0,0 +1,192 @@
+"""
+因子表达式解析器
+
+将 "MA(CLOSE(), 5) - MA(CLOSE(), 20)" 这类表达式解析为表达式树。
+相同的子表达式会被归一化为同一个节点（hash-consing），
+便于批量评估时识别和复用公共子表达式。
+"""
+
+import ast
+from typing import Dict, List, Optional, Union
+import logging
+
+logger = logging.getLogger(__name__)
+
+# 无参数的行情字段函数，如 CLOSE()
+FIELD_FUNCTIONS = ('CLOSE', 'OPEN', 'HIGH', 'LOW', 'VOL', 'AMO')
+
+_BINARY_OPERATORS = {
+    ast.Add: '+', ast.Sub: '-', ast.Mult: '*', ast.Div: '/',
+    ast.BitAnd: '&', ast.BitOr: '|'
+}
+
+_COMPARE_OPERATORS = {
+    ast.Gt: '>', ast.GtE: '>=', ast.Lt: '<', ast.LtE: '<=',
+    ast.Eq: '==', ast.NotEq: '!='
+}
+
+
+class ExprNode:
+    """表达式树节点
+
+    kind 取值:
+        const   - 数值常量，value 为数值
+        field   - 行情字段，op 为字段函数名
+        call    - 函数调用，op 为函数名，args 为参数节点
+        binop   - 二元运算，op 为运算符
+        compare - 比较运算，op 为比较符
+        neg     - 取负
+    """
+
+    __slots__ = ('kind', 'op', 'args', 'value', 'key')
+
+    def __init__(self, kind: str, op: Optional[str] = None,
+                 args: tuple = (), value: Union[int, float, None] = None):
+        self.kind = kind
+        self.op = op
+        self.args = args
+        self.value = value
+        self.key = self._build_key()
+
+    def _build_key(self) -> str:
+        """生成节点的规范化文本，作为公共子表达式的识别键"""
+        if self.kind == 'const':
+            return repr(self.value)
+        if self.kind == 'field':
+            return f"{self.op}()"
+        if self.kind == 'call':
+            return f"{self.op}({','.join(arg.key for arg in self.args)})"
+        if self.kind == 'neg':
+            return f"(-{self.args[0].key})"
+        return f"({self.args[0].key}{self.op}{self.args[1].key})"
+
+    def __repr__(self) -> str:
+        return f"ExprNode({self.key})"
+
+
+class ExpressionParser:
+    """表达式解析器，维护节点表以实现公共子表达式共享"""
+
+    def __init__(self, allowed_functions: Optional[List[str]] = None):
+        self.allowed_functions = set(allowed_functions) if allowed_functions else None
+        self.nodes: Dict[str, ExprNode] = {}
+
+    def parse(self, expression: str) -> ExprNode:
+        """
+        解析表达式
+
+        Args:
+            expression: 因子表达式
+
+        Returns:
+            ExprNode: 表达式根节点
+
+        Raises:
+            ValueError: 表达式为空、语法错误或包含不支持的语法
+        """
+        if not expression or not isinstance(expression, str):
+            raise ValueError("表达式不能为空且必须为字符串")
+        if '#' in expression:
+            # ast.parse 会忽略 # 之后的内容，表达式中不允许出现注释
+            raise ValueError("表达式不支持注释: #")
+
+        try:
+            tree = ast.parse(expression.strip(), mode='eval')
+        except SyntaxError as e:
+            raise ValueError(f"表达式语法错误: {e}")
+
+        return self._convert(tree.body)
+
+    def _intern(self, node: ExprNode) -> ExprNode:
+        """返回节点表中等价的已有节点，不存在则登记新节点"""
+        existing = self.nodes.get(node.key)
+        if existing is not None:
+            return existing
+        self.nodes[node.key] = node
+        return node
+
+    def _convert(self, node: ast.AST) -> ExprNode:
+        """将Python语法树节点转换为表达式节点"""
+        if isinstance(node, ast.Constant):
+            if isinstance(node.value, bool) or not isinstance(node.value, (int, float)):
+                raise ValueError(f"不支持的常量: {node.value!r}")
+            return self._intern(ExprNode('const', value=node.value))
+
+        if isinstance(node, ast.UnaryOp):
+            operand = self._convert(node.operand)
+            if isinstance(node.op, ast.UAdd):
+                return operand
+            if isinstance(node.op, ast.USub):
+                if operand.kind == 'const':
+                    return self._intern(ExprNode('const', value=-operand.value))
+                return self._intern(ExprNode('neg', args=(operand,)))
+            raise ValueError(f"不支持的一元运算: {type(node.op).__name__}")
+
+        if isinstance(node, ast.BinOp):
+            op = _BINARY_OPERATORS.get(type(node.op))
+            if op is None:
+                raise ValueError(f"不支持的运算符: {type(node.op).__name__}")
+            left = self._convert(node.left)
+            right = self._convert(node.right)
+            return self._intern(ExprNode('binop', op=op, args=(left, right)))
+
+        if isinstance(node, ast.Compare):
+            if len(node.ops) != 1:
+                raise ValueError("不支持连续比较，请拆分为多个比较")
+            op = _COMPARE_OPERATORS.get(type(node.ops[0]))
+            if op is None:
+                raise ValueError(f"不支持的比较运算: {type(node.ops[0]).__name__}")
+            left = self._convert(node.left)
+            right = self._convert(node.comparators[0])
+            return self._intern(ExprNode('compare', op=op, args=(left, right)))
+
+        if isinstance(node, ast.Call):
+            if not isinstance(node.func, ast.Name) or node.keywords:
+                raise ValueError("只支持形如 FUNC(arg, ...) 的函数调用")
+            name = node.func.id
+            if self.allowed_functions is not None and name not in self.allowed_functions:
+                raise ValueError(f"未定义的函数: {name}")
+            args = tuple(self._convert(arg) for arg in node.args)
+            if name in FIELD_FUNCTIONS and not args:
+                return self._intern(ExprNode('field', op=name))
+            return self._intern(ExprNode('call', op=name, args=args))
+
+        raise ValueError(f"不支持的表达式语法: {type(node).__name__}")
+
+
+def iter_postorder(root: ExprNode, visited: Optional[set] = None) -> List[ExprNode]:
+    """
+    后序遍历表达式树，每个节点只出现一次
+
+    后序保证子节点总在父节点之前，即拓扑序。
+
+    Args:
+        root: 根节点
+        visited: 已访问的节点键集合，跨多棵树共享时传入
+
+    Returns:
+        List[ExprNode]: 节点列表
+    """
+    if visited is None:
+        visited = set()
+
+    order = []
+    stack = [(root, False)]
+    while stack:
+        node, expanded = stack.pop()
+        if node.key in visited:
+            continue
+        if expanded:
+            visited.add(node.key)
+            order.append(node)
+            continue
+        stack.append((node, True))
+        for arg in reversed(node.args):
+            if arg.key not in visited:
+                stack.append((arg, False))
+    return order
+
+
+def count_tree_nodes(root: ExprNode) -> int:
+    """统计表达式树展开后的节点总数（不做共享）"""
+    return 1 + sum(count_tree_nodes(arg) for arg in root.args)
@@ -0,0 +1,118 @@
+"""
+因子相关性与冗余剔除
+
+因子之间的相关性按日期计算截面Spearman秩相关，再对日期取平均。
+每个因子的截面排名先中心化并归一化为单位向量，按日期展开后，
+平均秩相关矩阵就是单位向量矩阵的内积除以两因子同时有效的日期数，
+因此可以按因子分块用矩阵乘法计算。因子矩阵按块读取，每块用到时才排名和归一化，
+配合按需加载因子值的序列（如 StoredFactorMatrices）时内存只与分块大小有关。
+高度相关的因子聚为一簇，每簇只保留得分最高的因子。
+"""
+
+from typing import Dict, List, Sequence, Tuple
+import logging
+import numpy as np
+from .ic_evaluator import cross_sectional_rank
+
+logger = logging.getLogger(__name__)
+
+
+def _unit_ranks(factors: Sequence[np.ndarray], min_stocks: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    把一块因子的截面排名中心化并归一化
+
+    Args:
+        factors: 因子矩阵序列，每个形状为 (日期, 股票)
+
+    Returns:
+        Tuple: (单位化排名 (因子, 日期×股票) float32, 有效日期标记 (因子, 日期) float32)
+    """
+    ranks = cross_sectional_rank(np.stack([np.asarray(f, dtype=float) for f in factors]))
+    valid = np.isfinite(ranks)
+    count = valid.sum(axis=-1, keepdims=True)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        # 缺失值按截面均值处理，中心化后为0
+        centered = np.where(valid, ranks - np.nansum(ranks, axis=-1, keepdims=True) / count, 0.0)
+        norm = np.sqrt((centered ** 2).sum(axis=-1, keepdims=True))
+        usable = (count >= min_stocks) & (norm > 0)
+        unit = np.where(usable, centered / norm, 0.0)
+    return (unit.reshape(len(unit), -1).astype(np.float32),
+            usable[..., 0].astype(np.float32))
+
+
+def rank_correlation_matrix(factors: Sequence[np.ndarray], block_size: int = 256,
+                            min_stocks: int = 10) -> np.ndarray:
+    """
+    计算因子两两之间的平均截面秩相关
+
+    相关矩阵按 block_size×block_size 的块计算，每个块只读取并排名两块因子：
+    行块在外层循环中处理一次，列块在用到时重新读取和排名，不保留所有因子的排名。
+    除输入和 (因子, 因子) 结果外，峰值内存约为两块 float32 单位化排名加一个结果块；
+    factors 按下标访问时才加载因子值的话，输入也只占两块。
+
+    每个因子在自身有效的股票上排名和中心化，缺失值记为0，不按两因子共同有效的股票逐对重新排名。
+    两因子有效股票相同时结果与逐日Spearman秩相关的平均值一致；
+    有效股票不同时为按各自有效股票标准化后的近似值，通常略低于共同股票上的秩相关。
+
+    Args:
+        factors: 因子矩阵序列或 (因子, 日期, 股票) 堆叠，日期和股票需对齐
+        block_size: 每块的因子数
+        min_stocks: 当日有效股票少于此数时该日不参与平均
+
+    Returns:
+        np.ndarray: (因子, 因子) 平均秩相关矩阵，两因子没有共同有效日期时为NaN
+    """
+    n_factors = len(factors)
+    bounds = [(start, min(start + block_size, n_factors))
+              for start in range(0, n_factors, block_size)]
+
+    def load(start, stop):
+        return _unit_ranks([factors[i] for i in range(start, stop)], min_stocks)
+
+    correlation = np.full((n_factors, n_factors), np.nan)
+    for i, (row_start, row_stop) in enumerate(bounds):
+        row_unit, row_valid = load(row_start, row_stop)
+        for col_start, col_stop in bounds[i:]:
+            if col_start == row_start:
+                col_unit, col_valid = row_unit, row_valid
+            else:
+                col_unit, col_valid = load(col_start, col_stop)
+            total = row_unit @ col_unit.T
+            days = row_valid @ col_valid.T
+            with np.errstate(invalid='ignore', divide='ignore'):
+                block = np.where(days > 0, total / days, np.nan)
+            correlation[row_start:row_stop, col_start:col_stop] = block
+            correlation[col_start:col_stop, row_start:row_stop] = block.T
+    return correlation
+
+
+def cluster_by_correlation(correlation: np.ndarray, scores: Sequence[float],
+                           threshold: float = 0.7) -> Dict[int, List[int]]:
+    """
+    按相关性聚类，每簇以得分最高的因子为代表
+
+    按得分从高到低遍历，尚未归类的因子成为新簇的代表，
+    与其相关系数绝对值不低于阈值且尚未归类的因子并入该簇。
+
+    Args:
+        correlation: (因子, 因子) 相关矩阵
+        scores: 因子得分，越高越好，NaN视为最低
+        threshold: 相关系数绝对值阈值
+
+    Returns:
+        Dict: 代表因子下标到簇内所有因子下标（代表在首位）的映射
+    """
+    scores = np.asarray(scores, dtype=float)
+    order = np.argsort(-np.nan_to_num(scores, nan=-np.inf), kind='stable')
+    similar = np.abs(np.nan_to_num(correlation, nan=0.0)) >= threshold
+    assigned = np.zeros(len(scores), dtype=bool)
+
+    clusters = {}
+    for leader in order:
+        if assigned[leader]:
+            continue
+        members = np.flatnonzero(similar[leader] & ~assigned)
+        assigned[members] = True
+        assigned[leader] = True
+        clusters[int(leader)] = [int(leader)] + [int(m) for m in members if m != leader]
+    return clusters
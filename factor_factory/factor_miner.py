@@ -0,0 +1,366 @@
+"""
+遗传因子挖掘
+
+在表达式语法上随机生成候选因子：叶子为行情字段，内部节点为编译器允许的函数
+（窗口参数取自配置的窗口集合）和四则运算。每一代候选整体提交评估——
+串行时合并为一张公共子表达式DAG，并行时由常驻进程池按分片评估，分片内同样共享子表达式。
+适应度为IC绝对值减去复杂度惩罚，通过锦标赛选择、子树交叉和变异产生下一代，
+最终把IC达标的最优候选注册为测试因子，IC为负的候选取负后注册。
+"""
+
+from typing import Any, Dict, List, Optional, Sequence
+import logging
+import math
+import random
+from .expression_parser import ExprNode, FIELD_FUNCTIONS, iter_postorder, count_tree_nodes
+from .expression_compiler import (
+    compile_expression, FUNCTION_SIGNATURES, MAX_EXPRESSION_LENGTH, CROSS_SECTION_FUNCTIONS
+)
+from .factor_value_store import content_hash
+from .config.evaluation_config import EVALUATION_CONFIG, MINING_CONFIG
+
+logger = logging.getLogger(__name__)
+
+# 输出多列或布尔序列的函数不参与挖掘；截面函数逐日保序，不改变单个因子的Rank IC
+_EXCLUDED_FUNCTIONS = ('CROSS', 'IF', 'MACD', 'TA_BBANDS') + CROSS_SECTION_FUNCTIONS
+
+BINARY_OPERATORS = ('+', '-', '*', '/')
+
+
+def mining_functions() -> Dict[str, tuple]:
+    """
+    挖掘使用的函数及参数模板
+
+    参数模板取函数签名中必需的参数，带窗口参数的函数总是显式给出第一个窗口。
+
+    Returns:
+        Dict: 函数名到参数类型元组的映射，如 {'MA': ('series', 'window')}
+    """
+    functions = {}
+    for name, (min_args, arg_types) in FUNCTION_SIGNATURES.items():
+        if name in _EXCLUDED_FUNCTIONS:
+            continue
+        count = min_args
+        if 'window' in arg_types:
+            count = max(count, arg_types.index('window') + 1)
+        functions[name] = arg_types[:count]
+    return functions
+
+
+def tree_depth(node: ExprNode) -> int:
+    """表达式树的深度，叶子为1"""
+    return 1 + max((tree_depth(arg) for arg in node.args), default=0)
+
+
+def replace_subtree(root: ExprNode, target_key: str, replacement: ExprNode) -> ExprNode:
+    """把树中所有键为 target_key 的子树替换为 replacement，返回新树"""
+    if root.key == target_key:
+        return replacement
+    if not root.args:
+        return root
+    args = tuple(replace_subtree(arg, target_key, replacement) for arg in root.args)
+    if all(new is old for new, old in zip(args, root.args)):
+        return root
+    return ExprNode(root.kind, root.op, args, root.value)
+
+
+def series_nodes(root: ExprNode) -> List[ExprNode]:
+    """树中所有序列节点（常量参数除外），按拓扑序"""
+    return [node for node in iter_postorder(root) if node.kind != 'const']
+
+
+class ExpressionGenerator:
+    """随机生成、变异和交叉表达式树"""
+
+    def __init__(self, rng: random.Random, windows: Sequence[int] = None,
+                 max_depth: int = None, functions: Dict[str, tuple] = None):
+        """
+        Args:
+            rng: 随机数生成器
+            windows: 可选的窗口参数，默认读取 MINING_CONFIG['windows']
+            max_depth: 表达式树的最大深度，默认读取 MINING_CONFIG['max_depth']
+            functions: 函数参数模板，默认为 mining_functions()
+        """
+        self.rng = rng
+        self.windows = list(windows or MINING_CONFIG['windows'])
+        self.max_depth = max_depth or MINING_CONFIG['max_depth']
+        self.functions = functions or mining_functions()
+        self._function_names = sorted(self.functions)
+
+    def random_field(self) -> ExprNode:
+        return ExprNode('field', self.rng.choice(FIELD_FUNCTIONS))
+
+    def random_tree(self, depth: int = None) -> ExprNode:
+        """生成深度不超过 depth 的随机表达式树"""
+        depth = self.max_depth if depth is None else depth
+        if depth <= 1 or self.rng.random() < 0.2:
+            return self.random_field()
+
+        if self.rng.random() < 0.6:
+            name = self.rng.choice(self._function_names)
+            args = []
+            for arg_type in self.functions[name]:
+                if arg_type == 'series':
+                    args.append(self.random_tree(depth - 1))
+                elif arg_type == 'window':
+                    args.append(ExprNode('const', value=self.rng.choice(self.windows)))
+                else:
+                    args.append(ExprNode('const', value=round(self.rng.uniform(0.5, 3.0), 2)))
+            return ExprNode('call', name, tuple(args))
+
+        return ExprNode('binop', self.rng.choice(BINARY_OPERATORS),
+                        (self.random_tree(depth - 1), self.random_tree(depth - 1)))
+
+    def mutate(self, root: ExprNode) -> ExprNode:
+        """
+        变异：随机选择子树替换、窗口参数替换或提升子树为根
+        """
+        choice = self.rng.random()
+        if choice < 0.3:
+            windowed = [node for node in iter_postorder(root)
+                        if node.kind == 'call' and any(arg.kind == 'const' for arg in node.args)]
+            if windowed:
+                node = self.rng.choice(windowed)
+                position = self.rng.choice(
+                    [i for i, arg in enumerate(node.args) if arg.kind == 'const']
+                )
+                args = list(node.args)
+                args[position] = ExprNode('const', value=self.rng.choice(self.windows))
+                return replace_subtree(root, node.key, ExprNode(node.kind, node.op, tuple(args)))
+        if choice < 0.4 and root.args:
+            return self.rng.choice(series_nodes(root))
+
+        target = self.rng.choice(series_nodes(root))
+        return replace_subtree(root, target.key, self.random_tree(self.rng.randint(1, 3)))
+
+    def crossover(self, first: ExprNode, second: ExprNode) -> ExprNode:
+        """交叉：用第二个父代的随机子树替换第一个父代的随机子树"""
+        target = self.rng.choice(series_nodes(first))
+        donor = self.rng.choice(series_nodes(second))
+        return replace_subtree(first, target.key, donor)
+
+
+class FactorMiner:
+    """基于遗传算法的因子挖掘器"""
+
+    def __init__(self, engine=None, registry=None, evaluator=None,
+                 stock_list: List[Any] = None, lookback: int = None, query=None,
+                 population_size: int = None, generations: int = None,
+                 seed: Optional[int] = None, **generator_options):
+        """
+        Args:
+            engine: MultiFactorEngine，串行评估和获取股票池时使用
+            registry: FactorRegistry，注册挖掘结果时使用
+            evaluator: ParallelFactorEvaluator，提供时每一代并行评估
+            stock_list: 评估使用的股票列表，默认所有A股
+            lookback: 评估使用的K线数量，默认读取 EVALUATION_CONFIG['lookback']
+            query: 串行评估的查询条件，默认为最近 lookback 条K线
+            population_size: 每代候选数量，默认读取 MINING_CONFIG['population_size']
+            generations: 进化代数，默认读取 MINING_CONFIG['generations']
+            seed: 随机种子
+            generator_options: 传给 ExpressionGenerator 的 windows、max_depth 等参数
+        """
+        self.engine = engine
+        self.registry = registry
+        self.evaluator = evaluator
+        self.stock_list = stock_list
+        self.lookback = lookback or EVALUATION_CONFIG['lookback']
+        self.query = query
+        self.population_size = population_size or MINING_CONFIG['population_size']
+        self.generations = generations or MINING_CONFIG['generations']
+        self.rng = random.Random(seed)
+        self.generator = ExpressionGenerator(self.rng, **generator_options)
+        # 表达式规范化文本到评估结果，跨代复用，同一表达式只评估一次
+        self.scores: Dict[str, Dict[str, Any]] = {}
+
+    def _accept(self, node: ExprNode) -> Optional[str]:
+        """检查候选是否合法，合法时返回规范化表达式"""
+        if tree_depth(node) > self.generator.max_depth or len(node.key) > MAX_EXPRESSION_LENGTH:
+            return None
+        try:
+            plan = compile_expression(node.key)
+        except ValueError:
+            return None
+        # 需要的历史超过评估窗口一半的候选有效数据太少
+        if not plan.fields or plan.lookback > self.lookback // 2:
+            return None
+        return plan.expression
+
+    def _fitness(self, expression: str, ic_mean: float) -> float:
+        if not math.isfinite(ic_mean):
+            return -math.inf
+        size = count_tree_nodes(compile_expression(expression).root)
+        return abs(ic_mean) - MINING_CONFIG['parsimony'] * size
+
+    def evaluate_candidates(self, expressions: List[str]) -> Dict[str, Dict[str, Any]]:
+        """
+        评估一代候选，结果记录到 self.scores
+
+        Returns:
+            Dict: 表达式到 {'ic_mean', 'icir_mean', 'fitness'} 或 {'error', 'fitness'} 的映射
+        """
+        if self.evaluator is not None:
+            items = self.evaluator.evaluate(
+                [{'id': index, 'expression': expr} for index, expr in enumerate(expressions)],
+                stock_codes=[stock.market_code for stock in self.stock_list],
+                lookback=self.lookback
+            )
+            evaluations = {
+                expr: ({'error': item['error']} if item['error']
+                       else {'evaluation_result': item['result']})
+                for expr, item in zip(expressions, items)
+            }
+        else:
+            if self.query is None:
+                from hikyuu import Query
+                self.query = Query(-self.lookback)
+            evaluations = self.engine.evaluate_expressions_shared(
+                {expr: expr for expr in expressions}, self.stock_list, self.query
+            )
+
+        scored = {}
+        for expr in expressions:
+            result = evaluations.get(expr, {}).get('evaluation_result')
+            if result is None:
+                error = evaluations.get(expr, {}).get('error', '评估结果缺失')
+                scored[expr] = {'error': error, 'fitness': -math.inf}
+                continue
+            scored[expr] = {
+                'ic_mean': result['ic_mean'],
+                'icir_mean': result['icir_mean'],
+                'fitness': self._fitness(expr, result['ic_mean'])
+            }
+        self.scores.update(scored)
+        return scored
+
+    def _tournament(self, population: List[str], size: int = 3) -> str:
+        contenders = self.rng.sample(population, min(size, len(population)))
+        return max(contenders, key=lambda expr: self.scores[expr]['fitness'])
+
+    def _fill(self, population: Dict[str, ExprNode], make, target: int) -> None:
+        """用 make() 生成的新候选补足种群，跳过非法和重复的候选"""
+        attempts = 0
+        while len(population) < target and attempts < target * 20:
+            attempts += 1
+            node = make()
+            expression = self._accept(node)
+            if expression is not None and expression not in population:
+                population[expression] = compile_expression(expression).root
+
+    def evolve(self, seed_expressions: Sequence[str] = ()) -> List[Dict[str, Any]]:
+        """
+        进化候选因子
+
+        Args:
+            seed_expressions: 初始种群中包含的表达式，如已注册的因子
+
+        Returns:
+            List[Dict]: 所有评估成功的候选，按适应度从高到低排列，
+                每项包含 expression、ic_mean、icir_mean 和 fitness
+        """
+        if self.stock_list is None:
+            self.stock_list = self.engine._get_a_stocks()
+
+        population: Dict[str, ExprNode] = {}
+        for expression in seed_expressions:
+            try:
+                plan = compile_expression(expression)
+            except ValueError:
+                continue
+            population[plan.expression] = plan.root
+        self._fill(population, self.generator.random_tree, self.population_size)
+        if not population:
+            return []
+
+        elite_size = MINING_CONFIG['elite_size']
+        for generation in range(1, self.generations + 1):
+            pending = [expr for expr in population if expr not in self.scores]
+            if pending:
+                self.evaluate_candidates(pending)
+            ranked = sorted(population, key=lambda expr: self.scores[expr]['fitness'], reverse=True)
+            best = self.scores[ranked[0]]
+            logger.info(
+                f"第 {generation} 代: {len(pending)} 个新候选, "
+                f"最优 {ranked[0]} IC {best.get('ic_mean', float('nan')):.4f}"
+            )
+            if generation == self.generations:
+                break
+
+            parents = list(population)
+            next_population = {expr: population[expr] for expr in ranked[:elite_size]}
+
+            def offspring():
+                first = population[self._tournament(parents)]
+                if self.rng.random() < MINING_CONFIG['crossover_rate']:
+                    return self.generator.crossover(first, population[self._tournament(parents)])
+                return self.generator.mutate(first)
+
+            self._fill(next_population, offspring, self.population_size)
+            population = next_population
+
+        candidates = [
+            {'expression': expr, 'ic_mean': score['ic_mean'],
+             'icir_mean': score['icir_mean'], 'fitness': score['fitness']}
+            for expr, score in self.scores.items() if 'error' not in score
+        ]
+        candidates.sort(key=lambda item: item['fitness'], reverse=True)
+        logger.info(f"因子挖掘完成: 共评估 {len(self.scores)} 个候选, {len(candidates)} 个成功")
+        return candidates
+
+    def register_survivors(self, candidates: List[Dict[str, Any]],
+                           top_n: int = None, min_ic: float = None) -> List[int]:
+        """
+        把最优候选注册为测试因子
+
+        IC为负的候选取负后注册，使注册的因子IC为正；名称由表达式内容哈希生成，
+        已注册过的表达式跳过。
+
+        Args:
+            candidates: evolve 返回的候选列表
+            top_n: 最多注册的因子数，默认读取 MINING_CONFIG['register_top']
+            min_ic: 最小IC绝对值，默认读取 MINING_CONFIG['min_ic']
+
+        Returns:
+            List[int]: 新注册的因子ID
+        """
+        top_n = top_n or MINING_CONFIG['register_top']
+        min_ic = MINING_CONFIG['min_ic'] if min_ic is None else min_ic
+
+        registered = []
+        for candidate in candidates:
+            if len(registered) >= top_n:
+                break
+            if abs(candidate['ic_mean']) < min_ic:
+                continue
+
+            expression = candidate['expression']
+            if candidate['ic_mean'] < 0:
+                expression = ExprNode('neg', args=(compile_expression(expression).root,)).key
+            name = f"mined_{content_hash(expression)}"
+            if self.registry.get_factor_by_name(name):
+                continue
+
+            try:
+                factor_id = self.registry.register_factor(
+                    name=name, expression=expression, category='mined',
+                    description=(f"遗传挖掘因子, IC: {abs(candidate['ic_mean']):.4f}, "
+                                 f"ICIR: {abs(candidate['icir_mean']):.4f}"),
+                    status='testing'
+                )
+            except Exception as e:
+                logger.error(f"挖掘因子注册失败: {expression}, 错误: {e}")
+                continue
+            registered.append(factor_id)
+
+        logger.info(f"注册挖掘因子 {len(registered)} 个")
+        return registered
+
+    def run(self, seed_expressions: Sequence[str] = ()) -> Dict[str, Any]:
+        """
+        进化并注册最优候选
+
+        Returns:
+            Dict: candidates（所有成功评估的候选）和 registered（新注册的因子ID）
+        """
+        candidates = self.evolve(seed_expressions)
+        return {'candidates': candidates, 'registered': self.register_survivors(candidates)}
@@ -1,15 +1,214 @@
-from typing import List, Dict, Optional, Any
+from typing import List, Dict, Optional, Any, Tuple, Iterator
+from collections import OrderedDict
+import json
 import logging
+import time
 from datetime import datetime
 from .mysql_manager import get_db_manager
+from .config.evaluation_config import EVALUATION_CONFIG
+from .config.database_config import SCHEMA_MODE, PARTITIONED_TABLES_SQL, UPSERT_RESULTS
 
 logger = logging.getLogger(__name__)
 
+PERFORMANCE_INSERT_SQL = """
+INSERT INTO factor_performance 
+(factor_id, evaluation_date, ic_value, icir_value, annual_return, 
+ sharpe_ratio, max_drawdown, information_ratio)
+VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+"""
+
+# (factor_id, evaluation_date) 唯一，重复评估覆盖已有记录并返回其ID
+PERFORMANCE_UPSERT_SQL = PERFORMANCE_INSERT_SQL.rstrip() + """
+ON DUPLICATE KEY UPDATE id = LAST_INSERT_ID(id),
+ ic_value = VALUES(ic_value), icir_value = VALUES(icir_value),
+ annual_return = VALUES(annual_return), sharpe_ratio = VALUES(sharpe_ratio),
+ max_drawdown = VALUES(max_drawdown), information_ratio = VALUES(information_ratio)
+"""
+
+BACKTEST_INSERT_SQL = """
+INSERT INTO backtest_results 
+(factor_id, backtest_date, total_return, annual_return, volatility,
+ sharpe_ratio, max_drawdown, trade_count, win_rate)
+VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
+"""
+
+BACKTEST_UPSERT_SQL = BACKTEST_INSERT_SQL.rstrip() + """
+ON DUPLICATE KEY UPDATE id = LAST_INSERT_ID(id),
+ total_return = VALUES(total_return), annual_return = VALUES(annual_return),
+ volatility = VALUES(volatility), sharpe_ratio = VALUES(sharpe_ratio),
+ max_drawdown = VALUES(max_drawdown), trade_count = VALUES(trade_count),
+ win_rate = VALUES(win_rate)
+"""
+
+
+STATUS_UPDATE_SQL = "UPDATE factors SET status = %s WHERE id = %s"
+
+# 每日IC记录的列，累计和列用于增量推导窗口统计量
+IC_DAILY_COLUMNS = (
+    'factor_id', 'trade_date', 'seq', 'ic_value', 'rolling_icir',
+    'ic_count', 'ic_sum', 'ic_sq_sum', 'icir_count', 'icir_sum'
+)
+
+QUANTILE_STATS_INSERT_SQL = """
+INSERT INTO factor_quantile_stats
+(factor_id, evaluation_date, horizon, n_quantiles, spread_return, monotonicity,
+ autocorrelation, top_turnover, quantile_returns)
+VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
+"""
+
+# (factor_id, evaluation_date, horizon) 唯一，同日重复分析覆盖已有记录
+QUANTILE_STATS_UPSERT_SQL = QUANTILE_STATS_INSERT_SQL.rstrip() + """
+ON DUPLICATE KEY UPDATE id = LAST_INSERT_ID(id),
+ n_quantiles = VALUES(n_quantiles), spread_return = VALUES(spread_return),
+ monotonicity = VALUES(monotonicity), autocorrelation = VALUES(autocorrelation),
+ top_turnover = VALUES(top_turnover), quantile_returns = VALUES(quantile_returns)
+"""
+
+# 冗余因子记录：被剔除的因子到其所在簇代表因子的映射
+REDUNDANCY_UPSERT_SQL = """
+INSERT INTO factor_redundancy (factor_id, leader_id, correlation, pruned_date)
+VALUES (%s, %s, %s, %s)
+ON DUPLICATE KEY UPDATE leader_id = VALUES(leader_id),
+ correlation = VALUES(correlation), pruned_date = VALUES(pruned_date)
+"""
+
+REDUNDANCY_DELETE_SQL = "DELETE FROM factor_redundancy WHERE factor_id = %s"
+
+# 绩效历史导出的列和记录数组类型，NULL转换为NaN
+PERFORMANCE_HISTORY_DTYPE = [
+    ('factor_id', 'i8'), ('evaluation_date', 'datetime64[D]'),
+    ('ic_value', 'f8'), ('icir_value', 'f8'), ('annual_return', 'f8'),
+    ('sharpe_ratio', 'f8'), ('max_drawdown', 'f8'), ('information_ratio', 'f8')
+]
+
+IC_DAILY_INSERT_SQL = f"""
+INSERT INTO factor_ic_daily ({', '.join(IC_DAILY_COLUMNS)})
+VALUES ({', '.join(['%s'] * len(IC_DAILY_COLUMNS))})
+"""
+
+
+def performance_write_sql(upsert: bool = None) -> str:
+    """绩效写入语句，upsert 为None时读取 UPSERT_RESULTS"""
+    return PERFORMANCE_UPSERT_SQL if (UPSERT_RESULTS if upsert is None else upsert) \
+        else PERFORMANCE_INSERT_SQL
+
+
+def backtest_write_sql(upsert: bool = None) -> str:
+    """回测结果写入语句，upsert 为None时读取 UPSERT_RESULTS"""
+    return BACKTEST_UPSERT_SQL if (UPSERT_RESULTS if upsert is None else upsert) \
+        else BACKTEST_INSERT_SQL
+
+
+def quantile_stats_write_sql(upsert: bool = None) -> str:
+    """分位数分析结果写入语句，upsert 为None时读取 UPSERT_RESULTS"""
+    return QUANTILE_STATS_UPSERT_SQL if (UPSERT_RESULTS if upsert is None else upsert) \
+        else QUANTILE_STATS_INSERT_SQL
+
+
+def format_factor_row(row: tuple) -> Dict[str, Any]:
+    """将 factors 表的一行转换为因子信息字典"""
+    return {
+        'id': row[0],
+        'name': row[1],
+        'expression': row[2],
+        'category': row[3],
+        'created_date': row[4],
+        'status': row[5],
+        'description': row[6]
+    }
+
+
+class _FactorCache:
+    """
+    因子信息的进程内读穿透缓存
+
+    按因子ID缓存单个因子，按 (状态, 类别) 缓存列表查询结果。
+    单个因子按LRU淘汰；ttl 大于0时条目过期后重新查询，
+    多进程部署时其他进程的修改最多延迟 ttl 秒可见。
+    """
+
+    def __init__(self, max_size: int, ttl: float):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._factors: 'OrderedDict[int, Tuple[float, Dict[str, Any]]]' = OrderedDict()
+        self._lists: Dict[tuple, Tuple[float, List[int]]] = {}
+
+    def _fresh(self, stored_at: float) -> bool:
+        return self.ttl <= 0 or time.monotonic() - stored_at < self.ttl
+
+    def get(self, factor_id: int) -> Optional[Dict[str, Any]]:
+        entry = self._factors.get(factor_id)
+        if entry is None:
+            return None
+        if not self._fresh(entry[0]):
+            del self._factors[factor_id]
+            return None
+        self._factors.move_to_end(factor_id)
+        return dict(entry[1])
+
+    def put(self, factor: Dict[str, Any]) -> None:
+        if self.max_size <= 0:
+            return
+        self._factors[factor['id']] = (time.monotonic(), dict(factor))
+        self._factors.move_to_end(factor['id'])
+        while len(self._factors) > self.max_size:
+            self._factors.popitem(last=False)
+
+    def get_list(self, key: tuple) -> Optional[List[Dict[str, Any]]]:
+        """列表查询结果，任一因子已被淘汰时视为未命中"""
+        entry = self._lists.get(key)
+        if entry is None or not self._fresh(entry[0]):
+            self._lists.pop(key, None)
+            return None
+        factors = [self.get(factor_id) for factor_id in entry[1]]
+        if any(factor is None for factor in factors):
+            del self._lists[key]
+            return None
+        return factors
+
+    def put_list(self, key: tuple, factors: List[Dict[str, Any]]) -> None:
+        if self.max_size <= 0 or len(factors) > self.max_size:
+            return
+        for factor in factors:
+            self.put(factor)
+        self._lists[key] = (time.monotonic(), [factor['id'] for factor in factors])
+
+    def invalidate(self, factor_id: int = None) -> None:
+        """使单个因子失效；列表查询可能包含任意因子，一并清空"""
+        if factor_id is None:
+            self._factors.clear()
+        else:
+            self._factors.pop(factor_id, None)
+        self._lists.clear()
+
+
 class FactorRegistry:
     """因子注册器，管理因子的增删改查"""
     
-    def __init__(self):
+    def __init__(self, cache_size: int = None, cache_ttl: float = None):
+        """
+        Args:
+            cache_size: 因子信息缓存的最大条目数，0表示不缓存，
+                默认读取 EVALUATION_CONFIG['registry_cache_size']
+            cache_ttl: 缓存有效期（秒），0表示不过期，默认读取 EVALUATION_CONFIG['registry_cache_ttl']
+        """
         self.db = get_db_manager()
+        # 待批量写入的绩效记录参数和状态变更（因子ID -> 状态）
+        self._pending_performance: List[tuple] = []
+        self._pending_status: Dict[int, str] = {}
+        self._cache = _FactorCache(
+            EVALUATION_CONFIG['registry_cache_size'] if cache_size is None else cache_size,
+            EVALUATION_CONFIG['registry_cache_ttl'] if cache_ttl is None else cache_ttl
+        )
+
+    def invalidate_cache(self, factor_id: int = None) -> None:
+        """
+        使缓存的因子信息失效，其他进程修改了因子时调用
+
+        Args:
+            factor_id: 因子ID，None表示清空全部缓存
+        """
+        self._cache.invalidate(factor_id)
     
     def register_factor(self, name: str, expression: str, category: str = None, 
                        description: str = None, status: str = 'testing') -> int:
@@ -35,6 +234,7 @@ class FactorRegistry:
             factor_id = self.db.execute_insert(
                 query, (name, expression, category, status, description)
             )
+            self._cache.invalidate(factor_id)
             logger.info(f"因子注册成功: {name} (ID: {factor_id})")
             return factor_id
         except Exception as e:
@@ -61,6 +261,7 @@ class FactorRegistry:
         
         try:
             affected_rows = self.db.execute_update(query, tuple(params))
+            self._cache.invalidate(factor_id)
             success = affected_rows > 0
             if success:
                 logger.info(f"因子更新成功: ID {factor_id}")
@@ -84,7 +285,12 @@ class FactorRegistry:
         query = "DELETE FROM factors WHERE id = %s"
         
         try:
+            if SCHEMA_MODE == 'partitioned':
+                # 分区表没有外键级联，先删除关联的绩效和回测记录
+                for table_name in PARTITIONED_TABLES_SQL:
+                    self.db.execute_update(f"DELETE FROM {table_name} WHERE factor_id = %s", (factor_id,))
             affected_rows = self.db.execute_update(query, (factor_id,))
+            self._cache.invalidate(factor_id)
             success = affected_rows > 0
             if success:
                 logger.info(f"因子删除成功: ID {factor_id}")
@@ -105,16 +311,56 @@ class FactorRegistry:
         Returns:
             Optional[Dict]: 因子信息字典
         """
+        cached = self._cache.get(factor_id)
+        if cached is not None:
+            return cached
+
         query = "SELECT * FROM factors WHERE id = %s"
         
         try:
             result = self.db.execute_query(query, (factor_id,))
             if result:
-                return self._format_factor_result(result[0])
+                factor = self._format_factor_result(result[0])
+                self._cache.put(factor)
+                return factor
             return None
         except Exception as e:
             logger.error(f"获取因子失败: {e}")
             return None
+
+    def get_factors(self, factor_ids: List[int]) -> Dict[int, Dict[str, Any]]:
+        """
+        批量获取因子信息，未缓存的因子用一次 IN 查询获取
+
+        Args:
+            factor_ids: 因子ID列表
+
+        Returns:
+            Dict: 因子ID到因子信息的映射，不存在的因子不在结果中
+        """
+        factors = {}
+        missing = []
+        for factor_id in dict.fromkeys(factor_ids):
+            cached = self._cache.get(factor_id)
+            if cached is not None:
+                factors[factor_id] = cached
+            else:
+                missing.append(factor_id)
+
+        chunk_size = EVALUATION_CONFIG['persist_chunk_size']
+        try:
+            for start in range(0, len(missing), chunk_size):
+                chunk = missing[start:start + chunk_size]
+                placeholders = ', '.join(['%s'] * len(chunk))
+                query = f"SELECT * FROM factors WHERE id IN ({placeholders})"
+                for row in self.db.execute_query(query, tuple(chunk)):
+                    factor = self._format_factor_result(row)
+                    self._cache.put(factor)
+                    factors[factor['id']] = factor
+        except Exception as e:
+            logger.error(f"批量获取因子失败: {e}")
+
+        return factors
     
     def get_factor_by_name(self, name: str) -> Optional[Dict[str, Any]]:
         """
@@ -148,6 +394,10 @@ class FactorRegistry:
         Returns:
             List[Dict]: 因子信息列表
         """
+        cached = self._cache.get_list((status, category))
+        if cached is not None:
+            return cached
+
         query = "SELECT * FROM factors WHERE 1=1"
         params = []
         
@@ -163,7 +413,9 @@ class FactorRegistry:
         
         try:
             results = self.db.execute_query(query, tuple(params) if params else None)
-            return [self._format_factor_result(row) for row in results]
+            factors = [self._format_factor_result(row) for row in results]
+            self._cache.put_list((status, category), factors)
+            return factors
         except Exception as e:
             logger.error(f"获取因子列表失败: {e}")
             return []
@@ -212,20 +464,13 @@ class FactorRegistry:
     
     def _format_factor_result(self, row: tuple) -> Dict[str, Any]:
         """格式化数据库查询结果"""
-        return {
-            'id': row[0],
-            'name': row[1],
-            'expression': row[2],
-            'category': row[3],
-            'created_date': row[4],
-            'status': row[5],
-            'description': row[6]
-        }
+        return format_factor_row(row)
     
     def save_performance_result(self, factor_id: int, evaluation_date: datetime,
                               ic_value: float = None, icir_value: float = None,
                               annual_return: float = None, sharpe_ratio: float = None,
-                              max_drawdown: float = None, information_ratio: float = None) -> int:
+                              max_drawdown: float = None, information_ratio: float = None,
+                              upsert: bool = None) -> int:
         """
         保存因子绩效结果
         
@@ -238,35 +483,299 @@ class FactorRegistry:
             sharpe_ratio: 夏普比率
             max_drawdown: 最大回撤
             information_ratio: 信息比率
+            upsert: 是否覆盖同一因子同一日期的已有记录，默认读取 UPSERT_RESULTS
             
         Returns:
-            int: 绩效记录ID
-        """
-        query = """
-        INSERT INTO factor_performance 
-        (factor_id, evaluation_date, ic_value, icir_value, annual_return, 
-         sharpe_ratio, max_drawdown, information_ratio)
-        VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+            int: 绩效记录ID，覆盖写入时为已有记录的ID
         """
-        
         params = (
             factor_id, evaluation_date, ic_value, icir_value, 
             annual_return, sharpe_ratio, max_drawdown, information_ratio
         )
         
         try:
-            performance_id = self.db.execute_insert(query, params)
+            performance_id = self.db.execute_insert(performance_write_sql(upsert), params)
             logger.info(f"因子绩效保存成功: 因子ID {factor_id}, 记录ID {performance_id}")
             return performance_id
         except Exception as e:
             logger.error(f"因子绩效保存失败: {e}")
             raise
     
+    def queue_performance_result(self, factor_id: int, evaluation_date: datetime,
+                                 ic_value: float = None, icir_value: float = None,
+                                 annual_return: float = None, sharpe_ratio: float = None,
+                                 max_drawdown: float = None,
+                                 information_ratio: float = None) -> None:
+        """
+        缓存一条绩效结果，调用 flush_pending 时批量写入
+
+        参数同 save_performance_result。
+        """
+        self._pending_performance.append((
+            factor_id, evaluation_date, ic_value, icir_value,
+            annual_return, sharpe_ratio, max_drawdown, information_ratio
+        ))
+
+    def queue_status_update(self, factor_id: int, status: str) -> None:
+        """
+        缓存一次因子状态变更，同一因子多次变更以最后一次为准
+
+        Args:
+            factor_id: 因子ID
+            status: 新状态 (active/testing/inactive)
+        """
+        self._pending_status[factor_id] = status
+
+    def flush_pending(self, chunk_size: int = None, upsert: bool = None) -> Dict[str, Any]:
+        """
+        批量写入缓存的绩效结果和状态变更
+
+        每 chunk_size 行一个事务，单行失败不影响其他行，失败的行会被丢弃并在结果中报告。
+        覆盖写入时同一天重复运行评估只更新已有记录。
+
+        Args:
+            chunk_size: 每个事务的行数，默认读取 EVALUATION_CONFIG['persist_chunk_size']
+            upsert: 是否覆盖同一因子同一日期的已有绩效记录，默认读取 UPSERT_RESULTS
+
+        Returns:
+            Dict: performance_saved（写入的绩效记录数）、status_updated（执行的状态变更数）、
+                failures（失败列表，每项包含 factor_id、operation 和 error）
+        """
+        chunk_size = chunk_size or EVALUATION_CONFIG['persist_chunk_size']
+        performance_rows, self._pending_performance = self._pending_performance, []
+        status_rows = [(status, factor_id) for factor_id, status in self._pending_status.items()]
+        self._pending_status = {}
+
+        failures = []
+        if performance_rows:
+            for index, error in self.db.execute_batch(
+                    performance_write_sql(upsert), performance_rows, chunk_size):
+                failures.append({'factor_id': performance_rows[index][0],
+                                 'operation': 'performance', 'error': error})
+        if status_rows:
+            for _, factor_id in status_rows:
+                self._cache.invalidate(factor_id)
+            for index, error in self.db.execute_batch(STATUS_UPDATE_SQL, status_rows, chunk_size):
+                failures.append({'factor_id': status_rows[index][1],
+                                 'operation': 'status', 'error': error})
+
+        performance_failed = sum(1 for f in failures if f['operation'] == 'performance')
+        summary = {
+            'performance_saved': len(performance_rows) - performance_failed,
+            'status_updated': len(status_rows) - (len(failures) - performance_failed),
+            'failures': failures
+        }
+        logger.info(
+            f"批量保存完成: 绩效记录 {summary['performance_saved']} 条, "
+            f"状态变更 {summary['status_updated']} 条, 失败 {len(failures)} 条"
+        )
+        for failure in failures:
+            logger.error(
+                f"批量保存失败: 因子ID {failure['factor_id']} ({failure['operation']}), "
+                f"错误: {failure['error']}"
+            )
+        return summary
+    
+    def iter_performance_history(self, factor_ids: List[int] = None,
+                                 start_date: datetime = None, end_date: datetime = None,
+                                 batch_size: int = None) -> Iterator:
+        """
+        流式导出绩效历史，按因子ID和评估日期排序
+
+        Args:
+            factor_ids: 因子ID列表，None表示所有因子
+            start_date: 起始评估日期（含）
+            end_date: 结束评估日期（含）
+            batch_size: 每批行数，默认读取 STREAM_BATCH_SIZE
+
+        Yields:
+            np.recarray: 一批绩效记录，字段见 PERFORMANCE_HISTORY_DTYPE
+        """
+        columns = ', '.join(name for name, _ in PERFORMANCE_HISTORY_DTYPE)
+        query = f"SELECT {columns} FROM factor_performance WHERE 1=1"
+        params = []
+
+        if factor_ids:
+            query += f" AND factor_id IN ({', '.join(['%s'] * len(factor_ids))})"
+            params.extend(factor_ids)
+
+        if start_date:
+            query += " AND evaluation_date >= %s"
+            params.append(start_date)
+
+        if end_date:
+            query += " AND evaluation_date <= %s"
+            params.append(end_date)
+
+        query += " ORDER BY factor_id, evaluation_date"
+
+        yield from self.db.stream_query(query, tuple(params), batch_size=batch_size,
+                                        as_numpy=True, dtype=PERFORMANCE_HISTORY_DTYPE)
+
+    def save_quantile_results(self, results: Dict[int, Dict[str, Any]],
+                              evaluation_date: datetime,
+                              upsert: bool = None) -> List[Dict[str, Any]]:
+        """
+        批量保存多个因子各持有期的分位数分析结果，每个因子每个持有期一行
+
+        Args:
+            results: 因子ID到分位数分析结果的映射，结果包含 n_quantiles、autocorrelation、
+                top_turnover 和 horizons（{持有期: {'spread', 'monotonicity', 'quantile_returns'}}）
+            evaluation_date: 评估日期
+            upsert: 是否覆盖同一因子同一日期同一持有期的已有记录，默认读取 UPSERT_RESULTS
+
+        Returns:
+            List[Dict]: 失败列表，每项包含 factor_id、horizon 和 error
+        """
+        keys, params_list = [], []
+        for factor_id, result in results.items():
+            for horizon, stats in result['horizons'].items():
+                keys.append((factor_id, horizon))
+                params_list.append((
+                    factor_id, evaluation_date, horizon, result['n_quantiles'],
+                    stats['spread'], stats['monotonicity'], result['autocorrelation'],
+                    result['top_turnover'], json.dumps(stats['quantile_returns'])
+                ))
+
+        failures = [
+            {'factor_id': keys[index][0], 'horizon': keys[index][1], 'error': error}
+            for index, error in self.db.execute_batch(
+                quantile_stats_write_sql(upsert), params_list, EVALUATION_CONFIG['persist_chunk_size'])
+        ] if params_list else []
+        logger.info(f"分位数分析结果保存完成: {len(params_list) - len(failures)} 条, 失败 {len(failures)} 条")
+        return failures
+
+    def save_redundancy(self, records: List[Tuple[int, int, float]], cleared: List[int],
+                        pruned_date: datetime) -> List[Dict[str, Any]]:
+        """
+        保存冗余剔除结果
+
+        Args:
+            records: (被剔除的因子ID, 簇代表因子ID, 相关系数) 列表
+            cleared: 本次保留为代表或不再冗余的因子ID，删除其冗余记录
+            pruned_date: 剔除日期
+
+        Returns:
+            List[Dict]: 失败列表，每项包含 factor_id 和 error
+        """
+        chunk_size = EVALUATION_CONFIG['persist_chunk_size']
+        failures = []
+        if cleared:
+            failures.extend(
+                {'factor_id': cleared[index], 'error': error}
+                for index, error in self.db.execute_batch(
+                    REDUNDANCY_DELETE_SQL, [(factor_id,) for factor_id in cleared], chunk_size)
+            )
+        if records:
+            params_list = [(factor_id, leader_id, float(correlation), pruned_date)
+                           for factor_id, leader_id, correlation in records]
+            failures.extend(
+                {'factor_id': records[index][0], 'error': error}
+                for index, error in self.db.execute_batch(REDUNDANCY_UPSERT_SQL, params_list, chunk_size)
+            )
+        logger.info(f"冗余记录保存完成: 剔除 {len(records)} 个, 清除 {len(cleared)} 个, 失败 {len(failures)} 个")
+        return failures
+
+    def get_redundancy_leaders(self) -> Dict[int, int]:
+        """
+        获取被剔除的冗余因子及其簇代表因子
+
+        Returns:
+            Dict: 被剔除的因子ID到簇代表因子ID的映射
+        """
+        try:
+            rows = self.db.execute_query("SELECT factor_id, leader_id FROM factor_redundancy")
+            return {factor_id: leader_id for factor_id, leader_id in rows}
+        except Exception as e:
+            logger.error(f"获取冗余因子记录失败: {e}")
+            return {}
+
+    def get_latest_ic_rows(self, factor_ids: List[int]) -> Dict[int, Dict[str, Any]]:
+        """
+        获取因子最新一条每日IC记录
+
+        Args:
+            factor_ids: 因子ID列表
+
+        Returns:
+            Dict: 因子ID到IC记录的映射，没有记录的因子不在结果中
+        """
+        if not factor_ids:
+            return {}
+
+        columns = ', '.join(f"d.{column}" for column in IC_DAILY_COLUMNS)
+        placeholders = ', '.join(['%s'] * len(factor_ids))
+        query = f"""
+        SELECT {columns} FROM factor_ic_daily d
+        JOIN (
+            SELECT factor_id, MAX(seq) AS seq FROM factor_ic_daily
+            WHERE factor_id IN ({placeholders}) GROUP BY factor_id
+        ) latest ON d.factor_id = latest.factor_id AND d.seq = latest.seq
+        """
+
+        try:
+            results = self.db.execute_query(query, tuple(factor_ids))
+            return {row[0]: dict(zip(IC_DAILY_COLUMNS, row)) for row in results}
+        except Exception as e:
+            logger.error(f"获取每日IC记录失败: {e}")
+            raise
+
+    def get_ic_rows(self, keys: List[tuple]) -> Dict[tuple, Dict[str, Any]]:
+        """
+        按 (因子ID, 序号) 批量获取每日IC记录
+
+        Args:
+            keys: [(因子ID, 序号), ...]
+
+        Returns:
+            Dict: (因子ID, 序号) 到IC记录的映射
+        """
+        columns = ', '.join(IC_DAILY_COLUMNS)
+        chunk_size = EVALUATION_CONFIG['persist_chunk_size']
+        rows = {}
+
+        try:
+            for start in range(0, len(keys), chunk_size):
+                chunk = keys[start:start + chunk_size]
+                placeholders = ', '.join(['(%s, %s)'] * len(chunk))
+                query = f"SELECT {columns} FROM factor_ic_daily WHERE (factor_id, seq) IN ({placeholders})"
+                params = tuple(value for key in chunk for value in key)
+                for row in self.db.execute_query(query, params):
+                    rows[(row[0], row[2])] = dict(zip(IC_DAILY_COLUMNS, row))
+            return rows
+        except Exception as e:
+            logger.error(f"获取每日IC记录失败: {e}")
+            raise
+
+    def save_ic_rows(self, rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        批量保存每日IC记录
+
+        Args:
+            rows: IC记录列表，每项包含 IC_DAILY_COLUMNS 中的所有列，NaN按NULL保存
+
+        Returns:
+            List[Dict]: 失败列表，每项包含 factor_id、trade_date 和 error
+        """
+        params_list = [
+            tuple(None if isinstance(row[column], float) and row[column] != row[column]
+                  else row[column] for column in IC_DAILY_COLUMNS)
+            for row in rows
+        ]
+        failures = [
+            {'factor_id': rows[index]['factor_id'], 'trade_date': rows[index]['trade_date'],
+             'error': error}
+            for index, error in self.db.execute_batch(
+                IC_DAILY_INSERT_SQL, params_list, EVALUATION_CONFIG['persist_chunk_size'])
+        ]
+        logger.info(f"每日IC记录保存完成: {len(rows) - len(failures)} 条, 失败 {len(failures)} 条")
+        return failures
+    
     def save_backtest_result(self, factor_id: int, backtest_date: datetime,
                            total_return: float = None, annual_return: float = None,
                            volatility: float = None, sharpe_ratio: float = None,
                            max_drawdown: float = None, trade_count: int = None,
-                           win_rate: float = None) -> int:
+                           win_rate: float = None, upsert: bool = None) -> int:
         """
         保存回测结果
         
@@ -280,30 +789,43 @@ class FactorRegistry:
             max_drawdown: 最大回撤
             trade_count: 交易次数
             win_rate: 胜率
+            upsert: 是否覆盖同一因子同一日期的已有记录，默认读取 UPSERT_RESULTS
             
         Returns:
-            int: 回测记录ID
+            int: 回测记录ID，覆盖写入时为已有记录的ID
         """
-        query = """
-        INSERT INTO backtest_results 
-        (factor_id, backtest_date, total_return, annual_return, volatility,
-         sharpe_ratio, max_drawdown, trade_count, win_rate)
-        VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
-        """
-        
         params = (
             factor_id, backtest_date, total_return, annual_return, volatility,
             sharpe_ratio, max_drawdown, trade_count, win_rate
         )
         
         try:
-            backtest_id = self.db.execute_insert(query, params)
+            backtest_id = self.db.execute_insert(backtest_write_sql(upsert), params)
             logger.info(f"回测结果保存成功: 因子ID {factor_id}, 记录ID {backtest_id}")
             return backtest_id
         except Exception as e:
             logger.error(f"回测结果保存失败: {e}")
             raise
 
+    def save_backtest_results(self, rows: List[tuple], upsert: bool = None) -> List[Dict[str, Any]]:
+        """
+        批量保存回测结果
+
+        Args:
+            rows: 参数元组列表，列顺序同 save_backtest_result
+            upsert: 是否覆盖同一因子同一日期的已有记录，默认读取 UPSERT_RESULTS
+
+        Returns:
+            List[Dict]: 失败列表，每项包含 factor_id 和 error
+        """
+        failures = [
+            {'factor_id': rows[index][0], 'error': error}
+            for index, error in self.db.execute_batch(
+                backtest_write_sql(upsert), rows, EVALUATION_CONFIG['persist_chunk_size'])
+        ] if rows else []
+        logger.info(f"回测结果保存完成: {len(rows) - len(failures)} 条, 失败 {len(failures)} 条")
+        return failures
+
 
 # 全局因子注册器实例
 factor_registry = None
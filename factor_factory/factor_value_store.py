@@ -0,0 +1,293 @@
+"""
+因子值存储
+
+按 因子ID/表达式内容哈希 保存完整的 日期×股票 因子值矩阵，
+每个版本按日期切分为若干分区，每个分区为一个压缩的npz文件（float32），
+分区内同时保存日期和股票代码，不同分区的股票集合可以不同。
+按日期区间读取时只解压覆盖该区间的分区，再按股票子集取列。
+表达式变化后内容哈希随之变化，旧版本的因子值不会被误用。
+"""
+
+from collections.abc import Sequence
+from typing import Dict, List, Optional, Tuple
+import hashlib
+import json
+import logging
+import os
+import numpy as np
+from .expression_compiler import compile_expression
+from .config.evaluation_config import EVALUATION_CONFIG
+
+logger = logging.getLogger(__name__)
+
+_META_FILE = 'meta.json'
+_DTYPE = np.float32
+
+
+def content_hash(expression: str) -> str:
+    """
+    计算表达式的内容哈希，空白不同的等价表达式哈希相同
+
+    Args:
+        expression: 因子表达式
+
+    Returns:
+        str: 16位十六进制哈希
+    """
+    try:
+        normalized = compile_expression(expression).expression
+    except ValueError:
+        normalized = expression.strip()
+    return hashlib.sha1(normalized.encode('utf-8')).hexdigest()[:16]
+
+
+class FactorValueStore:
+    """分区压缩的因子值存储"""
+
+    def __init__(self, root_dir: str, partition_rows: int = None):
+        """
+        Args:
+            root_dir: 存储根目录
+            partition_rows: 每个分区的最大交易日数，默认读取 EVALUATION_CONFIG['factor_value_partition_rows']
+        """
+        self.root_dir = root_dir
+        self.partition_rows = partition_rows or EVALUATION_CONFIG['factor_value_partition_rows']
+        os.makedirs(root_dir, exist_ok=True)
+
+    def _version_dir(self, factor_id: int, version: str) -> str:
+        return os.path.join(self.root_dir, str(factor_id), version)
+
+    def _load_meta(self, version_dir: str) -> Dict:
+        path = os.path.join(version_dir, _META_FILE)
+        if not os.path.exists(path):
+            return {'partitions': []}
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    @staticmethod
+    def _write_meta(version_dir: str, meta: Dict) -> None:
+        """原子写入元数据，避免读进程看到写了一半的文件"""
+        tmp_path = os.path.join(version_dir, _META_FILE + '.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(meta, f)
+        os.replace(tmp_path, os.path.join(version_dir, _META_FILE))
+
+    @staticmethod
+    def _load_partition(version_dir: str, partition: Dict):
+        with np.load(os.path.join(version_dir, partition['file']), allow_pickle=False) as data:
+            return data['dates'], [str(code) for code in data['stocks']], data['values']
+
+    @staticmethod
+    def _save_partition(version_dir: str, dates: np.ndarray, stocks: List[str],
+                        values: np.ndarray) -> Dict:
+        """写入一个分区文件，返回分区元数据"""
+        name = f"part-{int(dates[0])}-{int(dates[-1])}.npz"
+        tmp_path = os.path.join(version_dir, name + '.tmp')
+        with open(tmp_path, 'wb') as f:
+            np.savez_compressed(f, dates=dates.astype(np.int32),
+                                stocks=np.asarray(stocks, dtype=str),
+                                values=values.astype(_DTYPE))
+        os.replace(tmp_path, os.path.join(version_dir, name))
+        return {'file': name, 'start_date': int(dates[0]), 'end_date': int(dates[-1]),
+                'rows': int(len(dates))}
+
+    @staticmethod
+    def _merge_blocks(blocks: List[Tuple[np.ndarray, List[str], np.ndarray]]):
+        """合并多个 (日期, 股票, 因子值) 数据块，同一日期整行以靠后的数据块为准，结果按日期排序"""
+        stocks = list(dict.fromkeys(code for _, block_stocks, _ in blocks for code in block_stocks))
+        column = {code: i for i, code in enumerate(stocks)}
+        dates = np.unique(np.concatenate([block_dates for block_dates, _, _ in blocks]))
+        values = np.full((len(dates), len(stocks)), np.nan, dtype=_DTYPE)
+        for block_dates, block_stocks, block_values in blocks:
+            rows = np.searchsorted(dates, block_dates)
+            values[rows] = np.nan
+            values[np.ix_(rows, [column[code] for code in block_stocks])] = block_values
+        return dates, stocks, values
+
+    def versions(self, factor_id: int) -> List[str]:
+        """因子已保存的内容哈希版本"""
+        factor_dir = os.path.join(self.root_dir, str(factor_id))
+        if not os.path.isdir(factor_dir):
+            return []
+        return sorted(name for name in os.listdir(factor_dir)
+                      if os.path.exists(os.path.join(factor_dir, name, _META_FILE)))
+
+    def write(self, factor_id: int, expression: str, dates: List[int],
+              stocks: List[str], values: np.ndarray) -> str:
+        """
+        保存因子值矩阵
+
+        与已有分区日期重叠的部分以新数据为准；最后一个分区未满时新数据先并入该分区，
+        因此每日追加一行不会产生大量小文件。
+
+        Args:
+            factor_id: 因子ID
+            expression: 因子表达式，用于计算内容哈希
+            dates: 交易日列表（YYYYMMDD，升序）
+            stocks: 股票代码列表
+            values: 日期×股票 因子值矩阵
+
+        Returns:
+            str: 内容哈希版本
+        """
+        dates = np.asarray(dates, dtype=np.int64)
+        values = np.asarray(values, dtype=_DTYPE)
+        if values.shape != (len(dates), len(stocks)):
+            raise ValueError(f"因子值形状 {values.shape} 与日期数 {len(dates)}、股票数 {len(stocks)} 不一致")
+        if len(dates) == 0:
+            raise ValueError("因子值为空")
+
+        version = content_hash(expression)
+        version_dir = self._version_dir(factor_id, version)
+        os.makedirs(version_dir, exist_ok=True)
+        meta = self._load_meta(version_dir)
+        meta['expression'] = expression
+
+        # 日期区间与新数据重叠的分区，以及未满的最后一个分区，与新数据合并后重新切分；
+        # 旧分区文件在元数据更新后再删除
+        start, end = int(dates[0]), int(dates[-1])
+        partitions, affected = [], []
+        for partition in meta['partitions']:
+            if partition['end_date'] < start or partition['start_date'] > end:
+                partitions.append(partition)
+            else:
+                affected.append(partition)
+        partitions.sort(key=lambda p: p['start_date'])
+        if partitions and partitions[-1]['end_date'] < start \
+                and partitions[-1]['rows'] < self.partition_rows:
+            affected.append(partitions.pop())
+
+        if affected:
+            blocks = [self._load_partition(version_dir, partition) for partition in affected]
+            dates, stocks, values = self._merge_blocks(blocks + [(dates, list(stocks), values)])
+        obsolete = [partition['file'] for partition in affected]
+
+        for offset in range(0, len(dates), self.partition_rows):
+            chunk = slice(offset, offset + self.partition_rows)
+            partitions.append(self._save_partition(version_dir, dates[chunk], stocks, values[chunk]))
+
+        meta['partitions'] = sorted(partitions, key=lambda p: p['start_date'])
+        self._write_meta(version_dir, meta)
+        current = {p['file'] for p in partitions}
+        for name in set(obsolete) - current:
+            os.remove(os.path.join(version_dir, name))
+        logger.info(f"因子值保存成功: 因子ID {factor_id}, 版本 {version}, {len(dates)} 个交易日")
+        return version
+
+    def read(self, factor_id: int, expression: str = None, version: str = None,
+             start_date: int = None, end_date: int = None,
+             stocks: List[str] = None) -> Tuple[List[int], List[str], np.ndarray]:
+        """
+        按日期区间和股票子集读取因子值
+
+        Args:
+            factor_id: 因子ID
+            expression: 因子表达式，用于定位版本
+            version: 内容哈希版本，与 expression 二选一，都不指定时使用唯一的已有版本
+            start_date: 起始日期（含），YYYYMMDD
+            end_date: 结束日期（含），YYYYMMDD
+            stocks: 股票代码子集，默认所有分区中出现过的股票
+
+        Returns:
+            Tuple: (交易日列表, 股票代码列表, 日期×股票 矩阵)，缺失值为NaN
+        """
+        if version is None and expression is not None:
+            version = content_hash(expression)
+        if version is None:
+            versions = self.versions(factor_id)
+            if len(versions) != 1:
+                raise ValueError(f"因子 {factor_id} 有 {len(versions)} 个版本，请指定表达式或版本")
+            version = versions[0]
+
+        version_dir = self._version_dir(factor_id, version)
+        meta = self._load_meta(version_dir)
+        if not meta['partitions']:
+            raise KeyError(f"因子值不存在: 因子ID {factor_id}, 版本 {version}")
+
+        loaded = []
+        for partition in meta['partitions']:
+            if start_date is not None and partition['end_date'] < start_date:
+                continue
+            if end_date is not None and partition['start_date'] > end_date:
+                continue
+            part_dates, part_stocks, part_values = self._load_partition(version_dir, partition)
+            rows = np.ones(len(part_dates), dtype=bool)
+            if start_date is not None:
+                rows &= part_dates >= start_date
+            if end_date is not None:
+                rows &= part_dates <= end_date
+            loaded.append((part_dates[rows], part_stocks, part_values[rows]))
+
+        if stocks is None:
+            stocks = list(dict.fromkeys(code for _, part_stocks, _ in loaded for code in part_stocks))
+
+        dates = [int(d) for part_dates, _, _ in loaded for d in part_dates]
+        result = np.full((len(dates), len(stocks)), np.nan, dtype=_DTYPE)
+        row = 0
+        for part_dates, part_stocks, part_values in loaded:
+            column = {code: i for i, code in enumerate(part_stocks)}
+            target = [i for i, code in enumerate(stocks) if code in column]
+            source = [column[stocks[i]] for i in target]
+            result[row:row + len(part_dates), target] = part_values[:, source]
+            row += len(part_dates)
+        return dates, list(stocks), result
+
+
+class StoredFactorMatrices(Sequence):
+    """
+    按下标读取因子值矩阵的只读序列
+
+    每次访问才从存储读取一个因子，并对齐到给定的交易日和股票，缺失值为NaN，
+    供 rank_correlation_matrix 等按块处理的计算使用，不需要同时持有所有因子的矩阵。
+    """
+
+    def __init__(self, store: FactorValueStore, factors: List[Tuple[int, str]],
+                 dates: List[int], stocks: List[str]):
+        """
+        Args:
+            store: 因子值存储
+            factors: (因子ID, 表达式) 列表
+            dates: 对齐的交易日列表（YYYYMMDD，升序）
+            stocks: 对齐的股票代码列表
+        """
+        self.store = store
+        self.factors = list(factors)
+        self.dates = np.asarray(dates, dtype=np.int64)
+        self.stocks = list(stocks)
+
+    def __len__(self) -> int:
+        return len(self.factors)
+
+    def __getitem__(self, index: int) -> np.ndarray:
+        factor_id, expression = self.factors[index]
+        result = np.full((len(self.dates), len(self.stocks)), np.nan, dtype=_DTYPE)
+        if len(self.dates) == 0:
+            return result
+        dates, _, values = self.store.read(factor_id, expression,
+                                           start_date=int(self.dates[0]),
+                                           end_date=int(self.dates[-1]), stocks=self.stocks)
+        dates = np.asarray(dates, dtype=np.int64)
+        rows = np.minimum(np.searchsorted(self.dates, dates), len(self.dates) - 1)
+        matched = self.dates[rows] == dates
+        result[rows[matched]] = values[matched]
+        return result
+
+
+def open_factor_value_store(root_dir: str = None) -> Optional[FactorValueStore]:
+    """
+    打开配置的因子值存储
+
+    Args:
+        root_dir: 存储目录，默认读取 EVALUATION_CONFIG['factor_value_store_dir']
+
+    Returns:
+        Optional[FactorValueStore]: 未配置时返回None
+    """
+    root_dir = root_dir or EVALUATION_CONFIG['factor_value_store_dir']
+    if not root_dir:
+        return None
+    try:
+        return FactorValueStore(root_dir)
+    except Exception as e:
+        logger.error(f"打开因子值存储失败: {root_dir}, 错误: {e}")
+        return None
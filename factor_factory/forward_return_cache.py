@@ -0,0 +1,138 @@
+"""
+远期收益率缓存
+
+同一次运行中，所有因子的IC、分位数分析和组合回测使用的是同一股票池、
+同一评估窗口的远期收益率。缓存以 (股票池快照, 窗口日期, 持有期) 为键，
+每个键只由收盘价矩阵计算一次 日期×股票 的稠密矩阵，之后所有因子和阶段直接复用。
+缓存按最近最少使用的顺序淘汰，总占用不超过配置的内存预算。
+缓存键不含行情版本，每日行情更新后由 EvaluationPipeline.run_daily_kline_update 清空。
+"""
+
+from typing import Dict, Optional, Sequence, Tuple
+from collections import OrderedDict
+import hashlib
+import logging
+import threading
+import numpy as np
+from .ic_evaluator import forward_returns_from_close
+from .config.evaluation_config import EVALUATION_CONFIG
+
+logger = logging.getLogger(__name__)
+
+
+def universe_key(stock_codes: Sequence[str]) -> str:
+    """
+    计算股票池快照的键，股票集合或顺序不同时键不同
+
+    Args:
+        stock_codes: 股票代码列表，顺序与矩阵列一致
+
+    Returns:
+        str: 16位十六进制哈希
+    """
+    return hashlib.sha1('\n'.join(stock_codes).encode('utf-8')).hexdigest()[:16]
+
+
+class ForwardReturnCache:
+    """按内存预算LRU淘汰的远期收益率缓存"""
+
+    def __init__(self, max_bytes: int = None):
+        """
+        Args:
+            max_bytes: 缓存的最大字节数，默认读取 EVALUATION_CONFIG['forward_return_cache_mb']
+        """
+        if max_bytes is None:
+            max_bytes = EVALUATION_CONFIG['forward_return_cache_mb'] * 1024 * 1024
+        self.max_bytes = max_bytes
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries: 'OrderedDict[Tuple, np.ndarray]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @staticmethod
+    def make_key(stock_codes: Sequence[str], dates: Sequence[int], horizon: int) -> Tuple:
+        """缓存键：(股票池快照, 起始日期, 结束日期, 交易日数, 持有期)"""
+        if len(dates) == 0:
+            return (universe_key(stock_codes), 0, 0, 0, horizon)
+        return (universe_key(stock_codes), int(dates[0]), int(dates[-1]), len(dates), horizon)
+
+    def get(self, stock_codes: Sequence[str], dates: Sequence[int],
+            close: np.ndarray, horizon: int = 1) -> np.ndarray:
+        """
+        获取远期收益率，未命中时由收盘价矩阵计算并缓存
+
+        Args:
+            stock_codes: 股票代码列表，与收盘价矩阵的列一致
+            dates: 交易日列表（YYYYMMDD），与收盘价矩阵的行一致
+            close: 收盘价矩阵 (日期, 股票)
+            horizon: 持有期（交易日数）
+
+        Returns:
+            np.ndarray: 只读的远期收益率矩阵，第t行为 close[t+horizon]/close[t]-1
+        """
+        key = self.make_key(stock_codes, dates, horizon)
+        with self._lock:
+            returns = self._entries.get(key)
+            if returns is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return returns
+            self.misses += 1
+
+        returns = forward_returns_from_close(close, horizon)
+        # 所有因子共享同一矩阵，禁止调用方原地修改
+        returns.setflags(write=False)
+        self._put(key, returns)
+        return returns
+
+    def get_horizons(self, stock_codes: Sequence[str], dates: Sequence[int],
+                     close: np.ndarray,
+                     horizons: Optional[Sequence[int]] = None) -> Dict[int, np.ndarray]:
+        """
+        获取多个持有期的远期收益率
+
+        Args:
+            horizons: 持有期列表，默认读取 EVALUATION_CONFIG['forward_return_horizons']
+
+        Returns:
+            Dict: 持有期到远期收益率矩阵的映射
+        """
+        if horizons is None:
+            horizons = EVALUATION_CONFIG['forward_return_horizons']
+        return {horizon: self.get(stock_codes, dates, close, horizon) for horizon in horizons}
+
+    def _put(self, key: Tuple, returns: np.ndarray) -> None:
+        """写入缓存并按LRU淘汰，超过内存预算的单个矩阵不缓存"""
+        size = returns.nbytes
+        if size > self.max_bytes:
+            logger.warning(f"远期收益率矩阵 {size} 字节超过缓存预算 {self.max_bytes} 字节，不缓存")
+            return
+
+        with self._lock:
+            if key in self._entries:
+                return
+            while self._entries and self.current_bytes + size > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self.current_bytes -= evicted.nbytes
+            self._entries[key] = returns
+            self.current_bytes += size
+
+    def clear(self) -> None:
+        """清空缓存"""
+        with self._lock:
+            self._entries.clear()
+            self.current_bytes = 0
+
+    def stats(self) -> Dict[str, int]:
+        """缓存统计：条目数、占用字节数、命中和未命中次数"""
+        return {
+            'entries': len(self._entries),
+            'bytes': self.current_bytes,
+            'hits': self.hits,
+            'misses': self.misses
+        }
+
@@ -0,0 +1,235 @@
+"""
+向量化IC评估
+
+基于NumPy的截面IC计算。输入为 日期×股票 的因子矩阵和远期收益率矩阵，
+也可以是 因子×日期×股票 的三维因子堆叠，一次计算所有因子。
+停牌等缺失数据以NaN表示，计算时按日期逐截面联合屏蔽。
+"""
+
+from typing import Dict
+import logging
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# 截面上计算IC所需的最少有效股票数
+MIN_CROSS_SECTION_STOCKS = 3
+
+
+def cross_sectional_rank(values: np.ndarray) -> np.ndarray:
+    """
+    沿最后一个轴（股票）计算截面排名，相同值取平均排名，NaN保持为NaN
+
+    Args:
+        values: 任意维度数组，最后一个轴为股票
+
+    Returns:
+        np.ndarray: 从1开始的排名，形状与输入相同
+    """
+    values = np.asarray(values, dtype=float)
+    n = values.shape[-1]
+    if n == 0:
+        return values.copy()
+
+    # NaN 排在末尾
+    order = np.argsort(values, axis=-1, kind='mergesort')
+    sorted_values = np.take_along_axis(values, order, axis=-1)
+    positions = np.broadcast_to(np.arange(n), values.shape)
+
+    # 标记每组相同值的起止位置，组内取平均排名
+    group_start = np.ones(values.shape, dtype=bool)
+    group_start[..., 1:] = sorted_values[..., 1:] != sorted_values[..., :-1]
+    group_end = np.ones(values.shape, dtype=bool)
+    group_end[..., :-1] = group_start[..., 1:]
+
+    first = np.maximum.accumulate(np.where(group_start, positions, 0), axis=-1)
+    last = np.flip(np.minimum.accumulate(
+        np.flip(np.where(group_end, positions, n - 1), axis=-1), axis=-1), axis=-1)
+
+    ranks = np.empty(values.shape, dtype=float)
+    np.put_along_axis(ranks, order, (first + last) / 2.0 + 1.0, axis=-1)
+    ranks[np.isnan(values)] = np.nan
+    return ranks
+
+
+def _joint_mask(factor: np.ndarray, returns: np.ndarray):
+    """广播因子与收益率，并将任一方缺失的位置同时置为NaN"""
+    factor, returns = np.broadcast_arrays(
+        np.asarray(factor, dtype=float), np.asarray(returns, dtype=float)
+    )
+    valid = np.isfinite(factor) & np.isfinite(returns)
+    return np.where(valid, factor, np.nan), np.where(valid, returns, np.nan), valid
+
+
+def _masked_correlation(x: np.ndarray, y: np.ndarray, valid: np.ndarray,
+                        min_stocks: int) -> np.ndarray:
+    """沿最后一个轴计算已屏蔽数据的皮尔逊相关系数"""
+    count = valid.sum(axis=-1)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        x_mean = np.nansum(x, axis=-1) / count
+        y_mean = np.nansum(y, axis=-1) / count
+        x_dev = np.where(valid, x - x_mean[..., None], 0.0)
+        y_dev = np.where(valid, y - y_mean[..., None], 0.0)
+        cov = (x_dev * y_dev).sum(axis=-1)
+        denom = np.sqrt((x_dev ** 2).sum(axis=-1) * (y_dev ** 2).sum(axis=-1))
+        ic = cov / denom
+    ic[(count < min_stocks) | ~(denom > 0)] = np.nan
+    return ic
+
+
+def pearson_ic(factor: np.ndarray, returns: np.ndarray,
+               min_stocks: int = MIN_CROSS_SECTION_STOCKS) -> np.ndarray:
+    """
+    逐日计算截面皮尔逊IC
+
+    Args:
+        factor: 因子值，形状 (..., 日期, 股票)
+        returns: 远期收益率，形状需可与factor广播，通常为 (日期, 股票)
+        min_stocks: 截面最少有效股票数，不足的日期IC为NaN
+
+    Returns:
+        np.ndarray: IC序列，形状 (..., 日期)
+    """
+    x, y, valid = _joint_mask(factor, returns)
+    return _masked_correlation(x, y, valid, min_stocks)
+
+
+def rank_ic(factor: np.ndarray, returns: np.ndarray,
+            min_stocks: int = MIN_CROSS_SECTION_STOCKS) -> np.ndarray:
+    """
+    逐日计算截面Rank IC（Spearman相关系数）
+
+    排名只在因子和收益率同时有效的股票上进行。
+
+    Args:
+        factor: 因子值，形状 (..., 日期, 股票)
+        returns: 远期收益率，形状需可与factor广播，通常为 (日期, 股票)
+        min_stocks: 截面最少有效股票数，不足的日期IC为NaN
+
+    Returns:
+        np.ndarray: Rank IC序列，形状 (..., 日期)
+    """
+    x, y, valid = _joint_mask(factor, returns)
+    return _masked_correlation(cross_sectional_rank(x), cross_sectional_rank(y),
+                               valid, min_stocks)
+
+
+def rolling_icir(ic: np.ndarray, window: int, min_periods: int = None) -> np.ndarray:
+    """
+    沿最后一个轴计算滚动ICIR（窗口内IC均值/IC标准差），忽略NaN
+
+    Args:
+        ic: IC序列，形状 (..., 日期)
+        window: 滚动窗口长度
+        min_periods: 窗口内最少有效IC个数，默认等于window
+
+    Returns:
+        np.ndarray: 滚动ICIR，形状与输入相同，窗口不足处为NaN
+    """
+    ic = np.asarray(ic, dtype=float)
+    min_periods = window if min_periods is None else min_periods
+    valid = np.isfinite(ic)
+    values = np.where(valid, ic, 0.0)
+
+    def window_sum(data):
+        cumsum = np.cumsum(data, axis=-1)
+        shifted = np.zeros_like(cumsum)
+        shifted[..., window:] = cumsum[..., :-window]
+        return cumsum - shifted
+
+    count = window_sum(valid.astype(float))
+    total = window_sum(values)
+    total_sq = window_sum(values ** 2)
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = total / count
+        variance = np.maximum(total_sq / count - mean ** 2, 0.0)
+        icir = mean / np.sqrt(variance)
+    icir[(count < min_periods) | ~(variance > 0)] = np.nan
+    return icir
+
+
+def summarize_ic(ic: np.ndarray) -> Dict[str, np.ndarray]:
+    """
+    汇总IC序列统计量，忽略NaN
+
+    Args:
+        ic: IC序列，形状 (..., 日期)
+
+    Returns:
+        Dict: ic_mean、ic_std（总体标准差）、icir、t_stat、hit_rate（IC>0的比例）、count，
+            每项形状为 (...)
+    """
+    ic = np.asarray(ic, dtype=float)
+    valid = np.isfinite(ic)
+    count = valid.sum(axis=-1)
+    values = np.where(valid, ic, 0.0)
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = values.sum(axis=-1) / count
+        deviations = np.where(valid, ic - mean[..., None], 0.0)
+        sum_sq = (deviations ** 2).sum(axis=-1)
+        std = np.sqrt(sum_sq / count)
+        sample_std = np.sqrt(sum_sq / (count - 1))
+        icir = np.where(std > 0, mean / std, np.nan)
+        t_stat = np.where(sample_std > 0, mean / sample_std * np.sqrt(count), np.nan)
+        hit_rate = (valid & (ic > 0)).sum(axis=-1) / count
+
+    return {
+        'ic_mean': mean,
+        'ic_std': std,
+        'icir': icir,
+        't_stat': t_stat,
+        'hit_rate': hit_rate,
+        'count': count
+    }
+
+
+def evaluate_ic(factor: np.ndarray, forward_returns: np.ndarray,
+                method: str = 'rank', icir_window: int = 20,
+                min_stocks: int = MIN_CROSS_SECTION_STOCKS) -> Dict[str, np.ndarray]:
+    """
+    批量计算因子IC指标
+
+    Args:
+        factor: 因子矩阵 (日期, 股票) 或因子堆叠 (因子, 日期, 股票)
+        forward_returns: 远期收益率矩阵 (日期, 股票)
+        method: 'rank' 计算Rank IC，'pearson' 计算皮尔逊IC
+        icir_window: 滚动ICIR窗口
+        min_stocks: 截面最少有效股票数
+
+    Returns:
+        Dict: ic（逐日IC）、rolling_icir（滚动ICIR）、icir_mean（滚动ICIR均值），
+            以及 summarize_ic 的各项统计量
+    """
+    if method == 'rank':
+        ic = rank_ic(factor, forward_returns, min_stocks)
+    elif method == 'pearson':
+        ic = pearson_ic(factor, forward_returns, min_stocks)
+    else:
+        raise ValueError(f"不支持的IC计算方法: {method}")
+
+    icir_series = rolling_icir(ic, icir_window)
+    result = summarize_ic(ic)
+    result['ic'] = ic
+    result['rolling_icir'] = icir_series
+    result['icir_mean'] = summarize_ic(icir_series)['ic_mean']
+    return result
+
+
+def forward_returns_from_close(close: np.ndarray, horizon: int = 1) -> np.ndarray:
+    """
+    根据收盘价矩阵计算远期收益率
+
+    Args:
+        close: 收盘价矩阵 (日期, 股票)
+        horizon: 持有期（交易日数）
+
+    Returns:
+        np.ndarray: 第t行为 close[t+horizon]/close[t]-1，末尾horizon行为NaN
+    """
+    close = np.asarray(close, dtype=float)
+    returns = np.full(close.shape, np.nan)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        returns[:-horizon] = close[horizon:] / close[:-horizon] - 1
+    return returns
@@ -0,0 +1,255 @@
+"""
+增量IC评估
+
+每个因子按日保存截面IC及其累计和（有效个数、IC之和、IC平方和、滚动ICIR之和），
+任意窗口的均值、标准差和ICIR均值都可以由窗口首尾两条记录的累计和之差得到。
+每日评估只需计算上次记录之后的截面IC（通常只有最新一个，漏跑时逐日补齐），
+再读取少量历史记录即可更新所有窗口统计量。
+首次评估的因子没有历史记录，按完整窗口计算一次IC序列作为起点。
+"""
+
+from typing import List, Dict, Any, Optional, Tuple
+import logging
+from datetime import date, datetime
+import numpy as np
+from .config.evaluation_config import EVALUATION_CONFIG
+
+logger = logging.getLogger(__name__)
+
+# 累计和字段
+_CUMULATIVE_KEYS = ('ic_count', 'ic_sum', 'ic_sq_sum', 'icir_count', 'icir_sum')
+
+
+def int_to_date(value: int) -> date:
+    """将YYYYMMDD整数转换为date"""
+    return date(value // 10000, value // 100 % 100, value % 100)
+
+
+def date_to_int(value: date) -> int:
+    """将date转换为YYYYMMDD整数"""
+    return value.year * 10000 + value.month * 100 + value.day
+
+
+def _window_sums(latest: Dict[str, Any], base: Optional[Dict[str, Any]], prefix: str):
+    """计算 (base, latest] 区间内的有效个数和累计和之差"""
+    keys = (f'{prefix}_count', f'{prefix}_sum')
+    if prefix == 'ic':
+        keys += ('ic_sq_sum',)
+    return tuple(latest[key] - (base[key] if base else 0) for key in keys)
+
+
+def next_ic_row(factor_id: int, trade_date: date, ic_value: float,
+                previous: Optional[Dict[str, Any]],
+                icir_base: Optional[Dict[str, Any]],
+                icir_window: int) -> Dict[str, Any]:
+    """
+    在上一条记录之后追加一个交易日的IC记录
+
+    Args:
+        factor_id: 因子ID
+        trade_date: 截面日期
+        ic_value: 当日IC，NaN表示无效
+        previous: 上一条记录，None表示第一条
+        icir_base: 序号为 新序号-icir_window 的记录，不存在时为None
+        icir_window: 滚动ICIR窗口，与 ic_evaluator.rolling_icir 相同，窗口内IC必须全部有效
+
+    Returns:
+        Dict: 新记录，包含 IC_DAILY_COLUMNS 中的所有列
+    """
+    finite = bool(np.isfinite(ic_value))
+    value = float(ic_value) if finite else 0.0
+    row = {
+        'factor_id': factor_id,
+        'trade_date': trade_date,
+        'seq': (previous['seq'] if previous else 0) + 1,
+        'ic_value': float(ic_value) if finite else float('nan'),
+        'ic_count': (previous['ic_count'] if previous else 0) + int(finite),
+        'ic_sum': (previous['ic_sum'] if previous else 0.0) + value,
+        'ic_sq_sum': (previous['ic_sq_sum'] if previous else 0.0) + value ** 2,
+    }
+
+    count, total, total_sq = _window_sums(row, icir_base, 'ic')
+    rolling_icir = float('nan')
+    if count >= icir_window:
+        mean = total / count
+        variance = total_sq / count - mean ** 2
+        if variance > 0:
+            rolling_icir = mean / np.sqrt(variance)
+    icir_finite = bool(np.isfinite(rolling_icir))
+
+    row['rolling_icir'] = rolling_icir
+    row['icir_count'] = (previous['icir_count'] if previous else 0) + int(icir_finite)
+    row['icir_sum'] = (previous['icir_sum'] if previous else 0.0) + (rolling_icir if icir_finite else 0.0)
+    return row
+
+
+def window_summary(latest: Dict[str, Any], base: Optional[Dict[str, Any]]) -> Dict[str, float]:
+    """
+    由累计和计算窗口统计量
+
+    Args:
+        latest: 窗口最后一条记录
+        base: 窗口开始前一条记录，窗口覆盖全部历史时为None
+
+    Returns:
+        Dict: ic_mean、ic_std（总体标准差）、icir_mean、count，无有效数据时为0
+    """
+    count, total, total_sq = _window_sums(latest, base, 'ic')
+    icir_count, icir_total = _window_sums(latest, base, 'icir')
+
+    ic_mean = total / count if count else 0.0
+    ic_std = float(np.sqrt(max(total_sq / count - ic_mean ** 2, 0.0))) if count else 0.0
+    return {
+        'ic_mean': float(ic_mean),
+        'ic_std': ic_std,
+        'icir_mean': float(icir_total / icir_count) if icir_count else 0.0,
+        'count': int(count)
+    }
+
+
+class IncrementalICEvaluator:
+    """增量IC评估器"""
+
+    def __init__(self, engine, registry, window: int = None, icir_window: int = 20):
+        """
+        Args:
+            engine: MultiFactorEngine，用于计算截面IC
+            registry: FactorRegistry，用于读写每日IC记录
+            window: 统计IC均值、标准差和ICIR均值的窗口（截面数），默认为
+                EVALUATION_CONFIG['lookback'] - 1，与完整评估加载 lookback 根K线得到的IC个数一致
+            icir_window: 滚动ICIR窗口
+        """
+        self.engine = engine
+        self.registry = registry
+        self.window = EVALUATION_CONFIG['lookback'] - 1 if window is None else window
+        self.icir_window = icir_window
+
+    def evaluate(self, factors: List[Dict[str, Any]],
+                 stock_list: List[Any]) -> Dict[int, Dict[str, Any]]:
+        """
+        增量评估因子
+
+        Args:
+            factors: 因子信息列表，至少包含 id 和 expression
+            stock_list: 股票列表
+
+        Returns:
+            Dict: 因子ID到 {'evaluation_result': {...}} 或 {'error': ...} 的映射，
+                evaluation_result 包含 ic_mean、ic_std、icir_mean、stock_count、evaluation_date，
+                以及本次计算的因子值 value_dates 和 factor_values（日期×股票 矩阵）
+        """
+        expressions = {factor['id']: factor['expression'] for factor in factors}
+        latest_rows = self.registry.get_latest_ic_rows(list(expressions))
+
+        new_factors = {key: expr for key, expr in expressions.items() if key not in latest_rows}
+        known_factors = {key: expr for key, expr in expressions.items() if key in latest_rows}
+        logger.info(f"增量IC评估: {len(known_factors)} 个因子增量更新, {len(new_factors)} 个因子首次评估")
+
+        results: Dict[int, Dict[str, Any]] = {}
+        new_rows: List[Dict[str, Any]] = []
+        summaries: Dict[int, Tuple[Dict[str, Any], Optional[Dict[str, Any]]]] = {}
+        values: Dict[int, Tuple[List[int], np.ndarray]] = {}
+
+        if new_factors:
+            self._bootstrap(new_factors, stock_list, results, new_rows, summaries, values)
+        if known_factors:
+            self._advance(known_factors, latest_rows, stock_list, results, new_rows,
+                          summaries, values)
+
+        failed = {failure['factor_id']: failure['error']
+                  for failure in self.registry.save_ic_rows(new_rows)} if new_rows else {}
+
+        for factor_id, (latest, base) in summaries.items():
+            if factor_id in failed:
+                results[factor_id] = {'error': f"IC记录保存失败: {failed[factor_id]}"}
+                continue
+            result = window_summary(latest, base)
+            result.update({'stock_count': len(stock_list), 'evaluation_date': datetime.now()})
+            if factor_id in values:
+                result['value_dates'], result['factor_values'] = values[factor_id]
+            results[factor_id] = {'evaluation_result': result}
+        return results
+
+    def _bootstrap(self, expressions: Dict[int, str], stock_list: List[Any],
+                   results: Dict, new_rows: List, summaries: Dict, values: Dict) -> None:
+        """首次评估：按完整窗口计算IC序列并逐日生成累计和记录"""
+        from hikyuu import Query
+
+        # 最后一根K线没有远期收益率，window 个截面需要 window + 1 根K线
+        query = Query(-(self.window + 1))
+        evaluations = self.engine.evaluate_expressions_shared(expressions, stock_list, query)
+        dates = self.engine._query_dates(stock_list, query)
+
+        for factor_id, evaluation in evaluations.items():
+            if 'error' in evaluation:
+                results[factor_id] = evaluation
+                continue
+
+            # 最后一个交易日没有远期收益率，不保存
+            ic_series = evaluation['evaluation_result']['ic_series']
+            rows: List[Dict[str, Any]] = []
+            for trade_date, ic_value in zip(dates[:-1], ic_series[:-1]):
+                seq = len(rows) + 1
+                icir_base = rows[seq - self.icir_window - 1] if seq > self.icir_window else None
+                rows.append(next_ic_row(factor_id, int_to_date(trade_date), ic_value,
+                                        rows[-1] if rows else None, icir_base, self.icir_window))
+
+            if not rows:
+                results[factor_id] = {'error': 'K线数量不足，无法计算IC'}
+                continue
+            new_rows.extend(rows)
+            values[factor_id] = ([int(d) for d in dates],
+                                 evaluation['evaluation_result']['factor_values'])
+            base_seq = rows[-1]['seq'] - self.window
+            summaries[factor_id] = (rows[-1], rows[base_seq - 1] if base_seq > 0 else None)
+
+    def _advance(self, expressions: Dict[int, str], latest_rows: Dict[int, Dict[str, Any]],
+                 stock_list: List[Any], results: Dict, new_rows: List, summaries: Dict,
+                 values: Dict) -> None:
+        """增量更新：计算上次记录之后各截面的IC，并读取窗口起点记录推导统计量"""
+        # 按上次记录日期分组，每组从该日期之后开始补算，漏跑的交易日也会逐日写入；
+        # 个别长期未更新的因子不会让其他因子重新加载更长的历史
+        groups: Dict[date, Dict[int, str]] = {}
+        for factor_id, expression in expressions.items():
+            groups.setdefault(latest_rows[factor_id]['trade_date'], {})[factor_id] = expression
+
+        latest_ics = {}
+        for since, group in sorted(groups.items()):
+            latest_ics.update(self.engine.evaluate_latest_ic(group, stock_list,
+                                                             since=date_to_int(since)))
+
+        pending = {}
+        for factor_id, latest_ic in latest_ics.items():
+            if 'error' in latest_ic:
+                results[factor_id] = latest_ic
+                continue
+
+            previous = latest_rows[factor_id]
+            values[factor_id] = (latest_ic['value_dates'], latest_ic['factor_values'])
+            sections = zip(latest_ic['trade_dates'], latest_ic['ic_values'])
+            # 已保存的截面直接使用已有记录
+            pending[factor_id] = (previous, [(int_to_date(trade_date), ic_value)
+                                             for trade_date, ic_value in sections
+                                             if int_to_date(trade_date) > previous['trade_date']])
+
+        # 新记录序号依次为 previous.seq + 1 ...，需要各自滚动ICIR窗口起点和统计窗口起点的记录，
+        # 其中序号不超过 previous.seq 的从数据库读取，其余为本次新生成的记录
+        keys = set()
+        for factor_id, (previous, updates) in pending.items():
+            last_seq = previous['seq'] + len(updates)
+            wanted = [seq - self.icir_window for seq in range(previous['seq'] + 1, last_seq + 1)]
+            wanted.append(last_seq - self.window)
+            keys.update((factor_id, seq) for seq in wanted if 0 < seq <= previous['seq'])
+        history = self.registry.get_ic_rows(sorted(keys))
+
+        rows = dict(history)
+        for factor_id, (previous, updates) in pending.items():
+            latest = previous
+            for trade_date, ic_value in updates:
+                seq = latest['seq'] + 1
+                latest = next_ic_row(factor_id, trade_date, ic_value, latest,
+                                     rows.get((factor_id, seq - self.icir_window)),
+                                     self.icir_window)
+                rows[(factor_id, seq)] = latest
+                new_rows.append(latest)
+            summaries[factor_id] = (latest, rows.get((factor_id, latest['seq'] - self.window)))
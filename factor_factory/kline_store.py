@@ -0,0 +1,420 @@
+"""
+列式K线存储
+
+把全市场的OHLCV和成交额按字段保存为连续的 float64 数组文件，
+每个字段一个 日期×股票 的矩阵，通过 numpy.memmap 映射读取。
+多个进程以只读方式打开同一存储时共享操作系统的页缓存，不必各自加载KData。
+写进程追加数据后，读进程需要重新打开存储才能看到新增的日期和股票。
+扩容（增加日期容量或股票列）时写入新版本的字段文件，再原子替换元数据切换到新版本，
+读进程在任何时刻打开存储看到的元数据与字段文件布局一致。
+"""
+
+from typing import Dict, List, Optional
+import json
+import logging
+import os
+from bisect import bisect_left
+import numpy as np
+from .expression_parser import FIELD_FUNCTIONS
+from .config.evaluation_config import EVALUATION_CONFIG
+
+logger = logging.getLogger(__name__)
+
+# 存储的字段，与表达式中的行情函数同名
+KLINE_FIELDS = FIELD_FUNCTIONS
+
+_META_FILE = 'meta.json'
+_DTYPE = np.float64
+
+
+def datetime_to_int(dt) -> int:
+    """将hikyuu Datetime或datetime转换为YYYYMMDD整数"""
+    return dt.year * 10000 + dt.month * 100 + dt.day
+
+
+class KLineStore:
+    """基于内存映射的列式K线存储"""
+
+    def __init__(self, root_dir: str, mode: str = 'r'):
+        """
+        打开已有存储
+
+        Args:
+            root_dir: 存储目录
+            mode: 'r' 只读，'r+' 读写
+        """
+        self.root_dir = root_dir
+        self.mode = mode
+        try:
+            self._load_meta()
+        except FileNotFoundError:
+            # 打开期间写进程完成扩容并删除了旧版本文件，重新读取元数据
+            self._load_meta()
+
+    def _load_meta(self) -> None:
+        with open(os.path.join(self.root_dir, _META_FILE), 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+
+        self.fields: List[str] = meta['fields']
+        self.stocks: List[str] = meta['stocks']
+        self.dates: List[int] = meta['dates']
+        self.capacity: int = meta['capacity']
+        # 字段文件的版本和已分配的列数，旧版本存储没有这两项
+        self.version: int = meta.get('version', 0)
+        self.columns: int = meta.get('columns', len(self.stocks))
+        self.stock_index: Dict[str, int] = {code: i for i, code in enumerate(self.stocks)}
+        self._arrays: Dict[str, np.memmap] = {}
+        self._open_arrays(self.capacity, self.columns)
+
+    @classmethod
+    def create(cls, root_dir: str, stocks: List[str], dates: List[int],
+               capacity: int = None, fields: List[str] = None) -> 'KLineStore':
+        """
+        创建空存储，所有值初始化为NaN
+
+        Args:
+            root_dir: 存储目录
+            stocks: 股票代码列表，如 ['sh600000', 'sz000001']
+            dates: 交易日列表（YYYYMMDD整数，升序）
+            capacity: 预分配的日期行数，默认为日期数的2倍，便于每日追加
+            fields: 字段列表，默认全部行情字段
+
+        Returns:
+            KLineStore: 读写模式打开的存储
+        """
+        os.makedirs(root_dir, exist_ok=True)
+        fields = list(fields or KLINE_FIELDS)
+        capacity = max(capacity or len(dates) * 2, len(dates), 1)
+
+        for field in fields:
+            array = np.memmap(cls._field_path(root_dir, field), dtype=_DTYPE,
+                              mode='w+', shape=(capacity, max(len(stocks), 1)))
+            array[:] = np.nan
+            array.flush()
+            del array
+
+        cls._write_meta(root_dir, {
+            'fields': fields, 'stocks': list(stocks),
+            'dates': [int(d) for d in dates], 'capacity': capacity,
+            'version': 0, 'columns': len(stocks)
+        })
+        logger.info(f"K线存储创建成功: {root_dir} ({len(dates)} 个交易日, {len(stocks)} 只股票)")
+        return cls(root_dir, mode='r+')
+
+    @staticmethod
+    def _field_path(root_dir: str, field: str, version: int = 0) -> str:
+        """字段文件路径，版本0沿用不带版本号的文件名"""
+        suffix = f".v{version}" if version else ''
+        return os.path.join(root_dir, f"{field.lower()}{suffix}.dat")
+
+    @staticmethod
+    def _write_meta(root_dir: str, meta: Dict) -> None:
+        """原子写入元数据，避免读进程看到写了一半的文件"""
+        tmp_path = os.path.join(root_dir, _META_FILE + '.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(meta, f)
+        os.replace(tmp_path, os.path.join(root_dir, _META_FILE))
+
+    def _open_arrays(self, capacity: int, n_stocks: int) -> None:
+        self._arrays = {
+            field: np.memmap(self._field_path(self.root_dir, field, self.version), dtype=_DTYPE,
+                             mode=self.mode, shape=(capacity, max(n_stocks, 1)))
+            for field in self.fields
+        }
+
+    def _meta(self) -> Dict:
+        return {
+            'fields': self.fields, 'stocks': self.stocks,
+            'dates': self.dates, 'capacity': self.capacity,
+            'version': self.version, 'columns': self.columns
+        }
+
+    @property
+    def size(self) -> int:
+        """已存储的交易日数量"""
+        return len(self.dates)
+
+    def get_field(self, field: str, rows: slice = None, stocks: List[str] = None) -> np.ndarray:
+        """
+        读取字段矩阵
+
+        Args:
+            field: 字段名，如 'CLOSE'
+            rows: 日期行切片，默认全部已存储日期
+            stocks: 股票代码子集，默认全部股票
+
+        Returns:
+            np.ndarray: 日期×股票 矩阵。不指定股票子集时为内存映射的视图（零拷贝），
+                指定子集时为按列选取的副本
+        """
+        if field not in self._arrays:
+            raise ValueError(f"存储中不存在字段: {field}")
+        view = self._arrays[field][:self.size, :len(self.stocks)]
+        if rows is not None:
+            view = view[rows]
+        if stocks is not None:
+            view = view[:, [self.stock_index[code] for code in stocks]]
+        return view
+
+    def rows_between(self, start_date: int = None, end_date: int = None) -> slice:
+        """
+        返回日期区间对应的行切片
+
+        Args:
+            start_date: 起始日期（含），YYYYMMDD
+            end_date: 结束日期（不含），YYYYMMDD
+
+        Returns:
+            slice: 行切片
+        """
+        start = 0 if start_date is None else bisect_left(self.dates, start_date)
+        end = self.size if end_date is None else bisect_left(self.dates, end_date)
+        return slice(start, end)
+
+    def rows_for_query(self, query) -> slice:
+        """
+        将hikyuu查询条件转换为行切片
+
+        支持按索引查询（如 Query(-100) 表示最近100个交易日）和按日期查询。
+
+        Args:
+            query: hikyuu Query
+
+        Returns:
+            slice: 行切片
+        """
+        from hikyuu import Query
+
+        if query.query_type == Query.INDEX:
+            start, end = query.start, query.end
+            return slice(*slice(start, end).indices(self.size))
+
+        start_date = datetime_to_int(query.start_datetime)
+        end_date = datetime_to_int(query.end_datetime) if query.end_datetime.year < 9999 else None
+        return self.rows_between(start_date, end_date)
+
+    def write_column(self, field: str, code: str, dates: List[int], values: np.ndarray) -> int:
+        """
+        写入单只股票的字段数据，不在存储日期内的数据被忽略
+
+        Args:
+            field: 字段名
+            code: 股票代码
+            dates: 数据对应的日期（YYYYMMDD）
+            values: 数据
+
+        Returns:
+            int: 写入的数据条数
+        """
+        col = self.stock_index[code]
+        rows = []
+        positions = []
+        for position, date in enumerate(dates):
+            row = bisect_left(self.dates, date)
+            if row < self.size and self.dates[row] == date:
+                rows.append(row)
+                positions.append(position)
+        if rows:
+            self._arrays[field][rows, col] = np.asarray(values, dtype=_DTYPE)[positions]
+        return len(rows)
+
+    def append_dates(self, new_dates: List[int]) -> slice:
+        """
+        追加交易日，容量不足时扩展文件
+
+        Args:
+            new_dates: 新交易日（升序，且晚于已有日期）
+
+        Returns:
+            slice: 新日期对应的行切片
+        """
+        new_dates = [int(d) for d in new_dates if not self.dates or d > self.dates[-1]]
+        start = self.size
+        if not new_dates:
+            return slice(start, start)
+
+        required = self.size + len(new_dates)
+        if required > self.capacity:
+            self._resize(max(required, self.capacity * 2), len(self.stocks))
+
+        self.dates.extend(new_dates)
+        return slice(start, self.size)
+
+    def add_stocks(self, codes: List[str]) -> List[str]:
+        """
+        增加股票列（如新上市股票），需要重写字段文件
+
+        Args:
+            codes: 股票代码列表
+
+        Returns:
+            List[str]: 实际新增的股票代码
+        """
+        new_codes = [code for code in codes if code not in self.stock_index]
+        if not new_codes:
+            return []
+
+        self._resize(self.capacity, len(self.stocks) + len(new_codes))
+        for code in new_codes:
+            self.stock_index[code] = len(self.stocks)
+            self.stocks.append(code)
+        logger.info(f"K线存储新增 {len(new_codes)} 只股票")
+        return new_codes
+
+    def _resize(self, capacity: int, n_stocks: int) -> None:
+        """
+        按新的容量和股票数重写字段文件，已有数据保持不变
+
+        新布局写入下一版本的字段文件，写完后原子替换元数据切换到新版本，
+        再删除旧版本文件；已打开旧版本的读进程继续使用其映射，不受影响。
+        """
+        if self.mode == 'r':
+            raise PermissionError("只读模式下不能修改K线存储")
+
+        old_rows, old_cols = self.capacity, max(self.columns, 1)
+        old_version, version = self.version, self.version + 1
+        for field in self.fields:
+            old = self._arrays[field]
+            new = np.memmap(self._field_path(self.root_dir, field, version), dtype=_DTYPE,
+                            mode='w+', shape=(capacity, max(n_stocks, 1)))
+            new[:] = np.nan
+            new[:old_rows, :old_cols] = old[:, :old_cols]
+            new.flush()
+            del new
+        self._arrays = {}
+
+        self.capacity, self.columns, self.version = capacity, n_stocks, version
+        self._write_meta(self.root_dir, self._meta())
+        self._open_arrays(capacity, n_stocks)
+
+        for field in self.fields:
+            try:
+                os.remove(self._field_path(self.root_dir, field, old_version))
+            except OSError as e:
+                logger.warning(f"旧版本字段文件删除失败: {field}, 错误: {e}")
+
+    def flush(self) -> None:
+        """将数据和元数据写回磁盘"""
+        if self.mode == 'r':
+            return
+        for array in self._arrays.values():
+            array.flush()
+        self._write_meta(self.root_dir, self._meta())
+
+    def load_stock_kdata(self, stock, query) -> int:
+        """
+        从hikyuu加载单只股票的K线并写入所有字段
+
+        Args:
+            stock: hikyuu Stock
+            query: hikyuu Query
+
+        Returns:
+            int: 写入的K线条数
+        """
+        from hikyuu import CLOSE, OPEN, HIGH, LOW, VOL, AMO
+
+        field_functions = {'CLOSE': CLOSE, 'OPEN': OPEN, 'HIGH': HIGH,
+                           'LOW': LOW, 'VOL': VOL, 'AMO': AMO}
+        kdata = stock.get_kdata(query)
+        if kdata.empty():
+            return 0
+
+        dates = [datetime_to_int(d) for d in kdata.get_datetime_list()]
+        written = 0
+        for field in self.fields:
+            written = self.write_column(field, stock.market_code, dates,
+                                        field_functions[field](kdata).to_np())
+        return written
+
+
+def build_kline_store(root_dir: str, stock_list: List, query,
+                      stock_manager=None) -> KLineStore:
+    """
+    从hikyuu构建全市场列式K线存储
+
+    Args:
+        root_dir: 存储目录
+        stock_list: hikyuu Stock 列表
+        query: 查询条件，决定存储的日期范围
+        stock_manager: StockManager，默认使用全局实例
+
+    Returns:
+        KLineStore: 读写模式打开的存储
+    """
+    from hikyuu import StockManager
+
+    sm = stock_manager or StockManager.instance()
+    dates = [datetime_to_int(d) for d in sm.get_trading_calendar(query)]
+    store = KLineStore.create(root_dir, [stock.market_code for stock in stock_list], dates)
+
+    for stock in stock_list:
+        try:
+            store.load_stock_kdata(stock, query)
+        except Exception as e:
+            logger.warning(f"股票 {stock.market_code} K线写入失败: {e}")
+
+    store.flush()
+    logger.info(f"K线存储构建完成: {len(dates)} 个交易日, {len(stock_list)} 只股票")
+    return store
+
+
+def append_daily_klines(store: KLineStore, stock_list: List,
+                        stock_manager=None) -> int:
+    """
+    增量追加最新交易日的K线
+
+    只查询存储最后日期之后的数据；新上市的股票会新增列。
+
+    Args:
+        store: 读写模式打开的存储
+        stock_list: hikyuu Stock 列表
+        stock_manager: StockManager，默认使用全局实例
+
+    Returns:
+        int: 新增的交易日数量
+    """
+    from hikyuu import StockManager, Query, Datetime, TimeDelta
+
+    sm = stock_manager or StockManager.instance()
+    last = store.dates[-1] if store.dates else 19900101
+    start = Datetime(last // 10000, last // 100 % 100, last % 100) + TimeDelta(1)
+    query = Query(start)
+
+    new_dates = [datetime_to_int(d) for d in sm.get_trading_calendar(query)]
+    if not new_dates:
+        logger.info("K线存储已是最新")
+        return 0
+
+    store.add_stocks([stock.market_code for stock in stock_list])
+    store.append_dates(new_dates)
+    for stock in stock_list:
+        try:
+            store.load_stock_kdata(stock, query)
+        except Exception as e:
+            logger.warning(f"股票 {stock.market_code} K线追加失败: {e}")
+
+    store.flush()
+    logger.info(f"K线存储追加完成: {len(new_dates)} 个交易日")
+    return len(new_dates)
+
+
+def open_kline_store(root_dir: str = None, mode: str = 'r') -> Optional[KLineStore]:
+    """
+    打开配置的K线存储
+
+    Args:
+        root_dir: 存储目录，默认读取 EVALUATION_CONFIG['kline_store_dir']
+        mode: 打开模式
+
+    Returns:
+        Optional[KLineStore]: 未配置或尚未构建时返回None
+    """
+    root_dir = root_dir or EVALUATION_CONFIG['kline_store_dir']
+    if not root_dir or not os.path.exists(os.path.join(root_dir, _META_FILE)):
+        return None
+    try:
+        return KLineStore(root_dir, mode=mode)
+    except Exception as e:
+        logger.error(f"打开K线存储失败: {root_dir}, 错误: {e}")
+        return None
@@ -1,19 +1,74 @@
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Sequence
+import itertools
 import logging
 from datetime import datetime
+import numpy as np
 from hikyuu import *
 from .mysql_manager import get_db_manager
 from .factor_registry import get_factor_registry
+from .expression_compiler import compile_expression, CROSS_SECTION_FUNCTIONS
+from .expression_parser import iter_postorder
+from .expression_dag import ExpressionDAG
+from .rolling_primitives import RollingPrimitives
+from .cross_section import cross_section_functions
+from .kline_store import open_kline_store, datetime_to_int
+from .stock_universe import StockUniverse
+from .ic_evaluator import evaluate_ic, forward_returns_from_close, rank_ic
+from .forward_return_cache import ForwardReturnCache
+from .evaluation_cache import open_evaluation_cache, evaluation_key
+from .portfolio_backtest import portfolio_backtest
+from .quantile_analysis import analyze_quantiles
+from .parallel_evaluator import ParallelFactorEvaluator
+from .config.evaluation_config import EVALUATION_CONFIG
 
 logger = logging.getLogger(__name__)
 
+# 表达式允许使用的函数映射，使用hikyuu中正确的函数名称
+EXPRESSION_FUNCTIONS = {
+    'MA': MA, 'EMA': EMA, 'SMA': SMA, 'WMA': WMA,
+    'CLOSE': CLOSE, 'OPEN': OPEN, 'HIGH': HIGH, 'LOW': LOW,
+    'VOL': VOL, 'AMO': AMO,
+    'RSI': RSI, 'MACD': MACD, 'ATR': ATR, 'TA_BBANDS': TA_BBANDS,
+    'HHV': HHV, 'LLV': LLV, 'REF': REF, 'STD': STD,
+    'CROSS': CROSS, 'IF': IF, 'ABS': ABS, 'LOG': LOG, 'SQRT': SQRT
+}
+
+
+def _finite_or_zero(value) -> float:
+    """将NaN等无效统计值转换为0"""
+    value = float(value)
+    return value if np.isfinite(value) else 0.0
+
+
+def _vectorizable(dag: ExpressionDAG) -> bool:
+    """DAG中的函数是否都有向量化内核或截面实现"""
+    functions = set(RollingPrimitives().functions) | set(CROSS_SECTION_FUNCTIONS)
+    return all(node.kind != 'call' or node.op in functions for node in dag.order)
+
+
+def _is_cross_section(node) -> bool:
+    return node.kind == 'call' and node.op in CROSS_SECTION_FUNCTIONS
+
+
 class MultiFactorEngine:
     """MultiFactor引擎，用于批量因子计算和评估"""
     
-    def __init__(self):
-        self.db = get_db_manager()
-        self.registry = get_factor_registry()
+    def __init__(self, connect_db: bool = True):
+        """
+        Args:
+            connect_db: 是否连接数据库，并行评估的工作进程只做计算，无需连接
+        """
+        self.db = get_db_manager() if connect_db else None
+        self.registry = get_factor_registry() if connect_db else None
         self.sm = StockManager.instance()
+        # A股股票池，每个交易日构建一次
+        self.universe = StockUniverse(self.sm)
+        # 配置了列式K线存储时，批量评估直接从存储读取行情
+        self.kline_store = open_kline_store()
+        # 远期收益率按 股票池×窗口×持有期 缓存，所有因子和评估阶段共享
+        self.forward_returns = ForwardReturnCache()
+        # 配置了评估结果缓存时，相同表达式在相同股票池和行情窗口上只评估一次
+        self.evaluation_cache = open_evaluation_cache()
     
     def create_factor_indicator(self, expression: str) -> Indicator:
         """
@@ -26,35 +81,15 @@ class MultiFactorEngine:
             Indicator: hikyuu指标对象
         """
         try:
-            # 安全检查：验证表达式
-            self._validate_expression(expression)
-
-            # 构建安全的函数映射，使用正确的函数名称
-            safe_context = {
-                'MA': MA, 'EMA': EMA, 'SMA': SMA, 'WMA': WMA,
-                'CLOSE': CLOSE, 'OPEN': OPEN, 'HIGH': HIGH, 'LOW': LOW,
-                'VOL': VOL, 'AMO': AMO,
-                'RSI': RSI, 'MACD': MACD, 'ATR': ATR, 'TA_BBANDS': TA_BBANDS,
-                'HHV': HHV, 'LLV': LLV, 'REF': REF, 'STD': STD,
-                'CROSS': CROSS, 'IF': IF, 'ABS': ABS, 'LOG': LOG, 'SQRT': SQRT
-            }
-
-            # 执行表达式
-            indicator = eval(expression, {"__builtins__": {}}, safe_context)
-            return indicator
+            # 编译表达式：解析和签名检查替代了正则校验与eval，
+            # 执行计划按表达式文本缓存，重复调用不再重新解析
+            plan = compile_expression(expression)
+            return plan.build_indicator(EXPRESSION_FUNCTIONS)
 
         except ValueError as e:
             # 表达式验证失败
             logger.error(f"表达式验证失败: {e}")
             raise
-        except NameError as e:
-            # 处理未定义的函数名
-            missing_function = str(e).split("'")[1] if "'" in str(e) else "unknown"
-            logger.error(f"函数未定义: {missing_function}，请检查函数名称是否正确")
-            raise ValueError(f"未定义的函数: {missing_function}")
-        except SyntaxError as e:
-            logger.error(f"表达式语法错误: {expression}, 错误: {e}")
-            raise ValueError(f"表达式语法错误: {e}")
         except TypeError as e:
             logger.error(f"表达式类型错误: {expression}, 错误: {e}")
             raise ValueError(f"表达式类型错误: {e}")
@@ -62,109 +97,70 @@ class MultiFactorEngine:
             logger.error(f"创建因子指标失败: {expression}, 未知错误: {e}")
             raise RuntimeError(f"创建因子指标失败: {e}")
 
-    def _validate_expression(self, expression: str) -> None:
-        """
-        验证因子表达式的安全性
-
-        Args:
-            expression: 待验证的表达式
-
-        Raises:
-            ValueError: 表达式不安全时抛出异常
-        """
-        if not expression or not isinstance(expression, str):
-            raise ValueError("表达式不能为空且必须为字符串")
-
-        # 清理表达式
-        expression = expression.strip()
-        if len(expression) > 1000:  # 限制表达式长度
-            raise ValueError("表达式过长，请保持在1000字符以内")
-
-        # 危险关键词检查
-        dangerous_keywords = [
-            'import', 'exec', 'eval', '__', 'open', 'file', 'input',
-            'raw_input', 'compile', 'globals', 'locals', 'dir', 'vars',
-            'getattr', 'setattr', 'delattr', 'hasattr', 'callable',
-            'exit', 'quit', 'help', 'copyright', 'credits', 'license'
-        ]
-
-        expression_lower = expression.lower()
-        for keyword in dangerous_keywords:
-            if keyword in expression_lower:
-                raise ValueError(f"表达式包含不安全的关键词: {keyword}")
-
-        # 检查是否包含危险字符组合
-        dangerous_patterns = ['..', '//', '\\\\', '${', '#{']
-        for pattern in dangerous_patterns:
-            if pattern in expression:
-                raise ValueError(f"表达式包含不安全的字符模式: {pattern}")
-
-        # 允许的字符集检查（字母、数字、运算符、括号、逗号、空格）
-        import re
-        allowed_pattern = r'^[a-zA-Z0-9_+\-*/().,\s<>=!&|]+$'
-        if not re.match(allowed_pattern, expression):
-            raise ValueError("表达式包含不允许的字符")
-
-        logger.debug(f"表达式验证通过: {expression}")
-    
     def create_factor_safely(self, expression_parts: List[str]) -> Indicator:
         """
         安全地创建因子指标（推荐使用）
         避免使用eval，通过编程方式构建表达式
-        
+
         Args:
-            expression_parts: 表达式组成部分，如 ["MA", "CLOSE", "5", "-", "MA", "CLOSE", "20"]
-            
+            expression_parts: 表达式组成部分，如 ["MA", "CLOSE", "5", "-", "MA", "CLOSE", "20"]，
+                或按词法切分的完整表达式，如 ["MA", "(", "CLOSE", "(", ")", ",", "5", ")"]
+
         Returns:
             Indicator: hikyuu指标对象
         """
-        # 这里可以实现一个安全的表达式解析器
-        # 由于时间关系，暂时使用简化版本
-        
-        # 示例：解析简单的MA交叉表达式
-        if len(expression_parts) >= 7 and expression_parts[0] == "MA" and expression_parts[3] == "-" and expression_parts[4] == "MA":
+        # 兼容简写的MA交叉格式: MA CLOSE n1 - MA CLOSE n2
+        if (len(expression_parts) == 7 and expression_parts[0] == "MA"
+                and expression_parts[3] == "-" and expression_parts[4] == "MA"):
             try:
-                # 解析 MA(CLOSE(), 5) - MA(CLOSE(), 20)
                 ma1_period = int(expression_parts[2].strip('()'))
                 ma2_period = int(expression_parts[6].strip('()'))
-                
-                ma1 = MA(CLOSE(), ma1_period)
-                ma2 = MA(CLOSE(), ma2_period)
-                return ma1 - ma2
-                
-            except (ValueError, IndexError):
+            except ValueError:
                 logger.error("无法解析表达式格式")
                 raise
-        
-        # 可以继续添加其他表达式的解析逻辑
-        logger.error("不支持的表达式格式")
-        raise ValueError("不支持的表达式格式")
-    
-    def batch_evaluate_factors(self, factor_ids: List[int], 
+            expression = f"MA(CLOSE(), {ma1_period}) - MA(CLOSE(), {ma2_period})"
+        else:
+            expression = " ".join(expression_parts)
+
+        try:
+            plan = compile_expression(expression)
+        except ValueError:
+            logger.error("不支持的表达式格式")
+            raise
+        return plan.build_indicator(EXPRESSION_FUNCTIONS)
+
+    def batch_evaluate_factors(self, factor_ids: List[int],
                               stock_list: List[Stock] = None,
-                              query: Query = None) -> Dict[int, Dict[str, Any]]:
+                              query: Query = None,
+                              shared_subexpressions: bool = False) -> Dict[int, Dict[str, Any]]:
         """
         批量评估多个因子
-        
+
         Args:
             factor_ids: 因子ID列表
             stock_list: 股票列表，如果为None则使用所有A股
             query: 查询条件，如果为None则使用最近100条数据
-            
+            shared_subexpressions: 是否将所有表达式合并为公共子表达式DAG，
+                每只股票上每个唯一子表达式只计算一次
+
         Returns:
             Dict: 每个因子的评估结果
         """
         if stock_list is None:
             stock_list = self._get_a_stocks()
-        
+
         if query is None:
             query = Query(-100)  # 最近100条数据
-        
+
+        if shared_subexpressions:
+            return self._batch_evaluate_shared(factor_ids, stock_list, query)
+
         results = {}
+        factor_infos = self.registry.get_factors(factor_ids)
         
         for factor_id in factor_ids:
             try:
-                factor_info = self.registry.get_factor(factor_id)
+                factor_info = factor_infos.get(factor_id)
                 if not factor_info:
                     logger.warning(f"因子不存在: {factor_id}")
                     continue
@@ -185,8 +181,666 @@ class MultiFactorEngine:
                 results[factor_id] = {'error': str(e)}
         
         return results
-    
-    def evaluate_single_factor(self, expression: str, 
+
+    def _batch_evaluate_shared(self, factor_ids: List[int],
+                               stock_list: List[Stock],
+                               query: Query) -> Dict[int, Dict[str, Any]]:
+        """
+        基于公共子表达式DAG批量评估已注册的因子
+
+        Args:
+            factor_ids: 因子ID列表
+            stock_list: 股票列表
+            query: 查询条件
+
+        Returns:
+            Dict: 每个因子的评估结果，格式与逐个评估一致
+        """
+        factor_infos = self.registry.get_factors(factor_ids)
+        for factor_id in factor_ids:
+            if factor_id not in factor_infos:
+                logger.warning(f"因子不存在: {factor_id}")
+
+        evaluations = self.evaluate_expressions_shared(
+            {factor_id: info['expression'] for factor_id, info in factor_infos.items()},
+            stock_list, query
+        )
+
+        results = {}
+        for factor_id, evaluation in evaluations.items():
+            if 'error' in evaluation:
+                results[factor_id] = evaluation
+                continue
+            results[factor_id] = {
+                'factor_info': factor_infos[factor_id],
+                'evaluation_result': evaluation['evaluation_result']
+            }
+            logger.info(f"因子评估完成: {factor_infos[factor_id]['name']}")
+        return results
+
+    def evaluate_expressions_shared(self, expressions: Dict[Any, str],
+                                    stock_list: List[Stock],
+                                    query: Query) -> Dict[Any, Dict[str, Any]]:
+        """
+        基于公共子表达式DAG批量评估表达式
+
+        所有表达式合并为一张DAG，逐只股票按拓扑序计算唯一节点，
+        再按日期对齐为 日期×股票 的因子矩阵，一次计算所有因子的截面Rank IC。
+        配置了K线存储时，行情数据直接从内存映射的存储读取。
+        配置了评估结果缓存时，已缓存的表达式直接返回缓存结果，不参与计算。
+
+        Args:
+            expressions: 键到表达式的映射，如 {factor_id: expression}
+            stock_list: 股票列表
+            query: 查询条件
+
+        Returns:
+            Dict: 每个键对应 {'evaluation_result': {...}} 或 {'error': ...}
+        """
+        results = {}
+        cache_keys = {}
+        if self.evaluation_cache is not None and expressions:
+            codes = [stock.market_code for stock in stock_list]
+            dates = self._query_dates(stock_list, query)
+            for key, expression in expressions.items():
+                cache_key = evaluation_key(expression, codes, dates)
+                cached = self.evaluation_cache.get(cache_key)
+                if cached is not None:
+                    results[key] = {'evaluation_result': cached}
+                else:
+                    cache_keys[key] = cache_key
+            if results:
+                logger.info(f"评估结果缓存命中 {len(results)} 个, 需要计算 {len(cache_keys)} 个")
+            expressions = {key: expressions[key] for key in cache_keys}
+
+        dag = ExpressionDAG(expressions)
+        for key, error in dag.parse_errors.items():
+            results[key] = {'error': error}
+
+        if not dag.roots:
+            return results
+
+        logger.info(
+            f"公共子表达式DAG构建完成: {len(dag.roots)} 个因子, "
+            f"{dag.tree_node_count} 个节点合并为 {dag.node_count} 个"
+        )
+
+        factor_matrices, close_matrix, failed_counts = self._compute_factor_matrices(
+            dag, stock_list, query
+        )
+        forward_returns = self._forward_returns(stock_list, query, close_matrix)
+
+        evaluated_keys = []
+        for key in factor_matrices:
+            if failed_counts.get(key, 0) >= len(stock_list):
+                logger.error(f"因子评估失败: {expressions[key]}, 所有股票计算均失败")
+                results[key] = {'error': '所有股票计算均失败'}
+            else:
+                evaluated_keys.append(key)
+
+        if not evaluated_keys:
+            return results
+
+        # 所有因子堆叠为 因子×日期×股票 一次计算IC
+        ic_stats = evaluate_ic(
+            np.stack([factor_matrices[key] for key in evaluated_keys]),
+            forward_returns, method='rank', icir_window=20
+        )
+
+        for position, key in enumerate(evaluated_keys):
+            results[key] = {
+                'evaluation_result': {
+                    'ic_mean': _finite_or_zero(ic_stats['ic_mean'][position]),
+                    'ic_std': _finite_or_zero(ic_stats['ic_std'][position]),
+                    'icir_mean': _finite_or_zero(ic_stats['icir_mean'][position]),
+                    'ic_series': ic_stats['ic'][position],
+                    'factor_values': factor_matrices[key],
+                    'stock_count': len(stock_list),
+                    'evaluation_date': datetime.now()
+                }
+            }
+
+        stored = set()
+        for key in evaluated_keys:
+            cache_key = cache_keys.get(key)
+            if cache_key is not None and cache_key not in stored:
+                self.evaluation_cache.put(cache_key, results[key]['evaluation_result'])
+                stored.add(cache_key)
+
+        return results
+
+    def evaluate_latest_ic(self, expressions: Dict[Any, str],
+                           stock_list: List[Stock],
+                           warmup: int = None,
+                           since: int = None,
+                           max_sections: int = None) -> Dict[Any, Dict[str, Any]]:
+        """
+        只计算最新可计算截面的Rank IC
+
+        远期收益率截至最新交易日，因此最新可计算的截面为倒数第二个交易日。
+        只加载表达式所需的历史K线加预热长度，而不是整个评估窗口。
+        给定 since 时补算 since 之后所有可计算截面的IC，用于补齐漏跑的交易日；
+        补算的截面数不超过 max_sections，超出时只计算最近的截面并记录警告。
+
+        Args:
+            expressions: 键到表达式的映射，如 {factor_id: expression}
+            stock_list: 股票列表
+            warmup: 额外加载的K线数量，默认读取 EVALUATION_CONFIG['incremental_warmup']
+            since: 已保存的最后一个截面日期（YYYYMMDD），None表示只计算最新截面
+            max_sections: 最多补算的截面数，默认读取 EVALUATION_CONFIG['incremental_max_catchup']
+
+        Returns:
+            Dict: 每个键对应 {'trade_dates': [YYYYMMDD, ...], 'ic_values': [IC, ...],
+                'trade_date': 最新截面日期, 'ic_value': 最新截面IC,
+                'value_dates': 因子值对应的交易日, 'factor_values': 日期×股票 因子值矩阵}，
+                日期升序，IC可能为NaN；因子值只包含预热期之后的计算截面和最新交易日；
+                或 {'error': ...}
+        """
+        results = {}
+        dag = ExpressionDAG(expressions)
+        for key, error in dag.parse_errors.items():
+            results[key] = {'error': error}
+
+        if not dag.roots:
+            return results
+
+        warmup = EVALUATION_CONFIG['incremental_warmup'] if warmup is None else warmup
+        lookback = max(compile_expression(expressions[key]).lookback for key in dag.roots)
+        sections = 1
+        if since is not None:
+            start = Datetime(since // 10000, since // 100 % 100, since % 100) + TimeDelta(1)
+            # since 之后的交易日中，除最新一日没有远期收益率外都需要计算
+            sections = max(len(self.sm.get_trading_calendar(Query(start))) - 1, 1)
+            max_sections = EVALUATION_CONFIG['incremental_max_catchup'] if max_sections is None \
+                else max_sections
+            if sections > max_sections:
+                logger.warning(
+                    f"距上次增量评估 {since} 已有 {sections} 个截面未计算，"
+                    f"超过补算上限 {max_sections}，只补算最近 {max_sections} 个截面"
+                )
+                sections = max_sections
+        query = Query(-(lookback + warmup + sections + 1))
+
+        factor_matrices, close_matrix, failed_counts = self._compute_factor_matrices(
+            dag, stock_list, query
+        )
+        dates = self._query_dates(stock_list, query)
+        if len(dates) < 2:
+            for key in dag.roots:
+                results[key] = {'error': 'K线数量不足，无法计算远期收益率'}
+            return results
+
+        evaluated_keys = []
+        for key in factor_matrices:
+            if failed_counts.get(key, 0) >= len(stock_list):
+                results[key] = {'error': '所有股票计算均失败'}
+            else:
+                evaluated_keys.append(key)
+
+        if not evaluated_keys:
+            return results
+
+        sections = min(sections, len(dates) - 1)
+        forward_returns = forward_returns_from_close(close_matrix[-sections - 1:])[:-1]
+        ic = rank_ic(np.stack([factor_matrices[key][-sections - 1:-1] for key in evaluated_keys]),
+                     forward_returns)
+        value_dates = [int(d) for d in dates[-sections - 1:]]
+        trade_dates = value_dates[:-1]
+        for position, key in enumerate(evaluated_keys):
+            ic_values = [float(value) for value in ic[position]]
+            results[key] = {'trade_dates': trade_dates, 'ic_values': ic_values,
+                            'trade_date': trade_dates[-1], 'ic_value': ic_values[-1],
+                            'value_dates': value_dates,
+                            'factor_values': factor_matrices[key][-sections - 1:]}
+        return results
+
+    def batch_quantile_analysis(self, expressions: Dict[Any, str],
+                                stock_list: List[Stock] = None,
+                                query: Query = None,
+                                horizons: tuple = (1, 5, 10),
+                                n_quantiles: int = 10) -> Dict[Any, Dict[str, Any]]:
+        """
+        批量分位数分析
+
+        所有表达式通过公共子表达式DAG一次计算出因子矩阵，堆叠后一次完成
+        各持有期的分位收益、多空价差、单调性、排名自相关和最高分位换手率计算。
+
+        Args:
+            expressions: 键到表达式的映射，如 {factor_id: expression}
+            stock_list: 股票列表，如果为None则使用所有A股
+            query: 查询条件，如果为None则使用最近100条数据
+            horizons: 远期收益持有期（交易日数）
+            n_quantiles: 分位数个数
+
+        Returns:
+            Dict: 每个键对应 {'quantile_result': {...}} 或 {'error': ...}，
+                quantile_result 包含 n_quantiles、autocorrelation、top_turnover
+                和 horizons（{持有期: {'spread', 'monotonicity', 'quantile_returns'}}）
+        """
+        if stock_list is None:
+            stock_list = self._get_a_stocks()
+
+        if query is None:
+            query = Query(-100)  # 最近100条数据
+
+        results = {}
+        dag = ExpressionDAG(expressions)
+        for key, error in dag.parse_errors.items():
+            results[key] = {'error': error}
+
+        if not dag.roots:
+            return results
+
+        factor_matrices, close_matrix, failed_counts = self._compute_factor_matrices(
+            dag, stock_list, query
+        )
+
+        evaluated_keys = []
+        for key in factor_matrices:
+            if failed_counts.get(key, 0) >= len(stock_list):
+                results[key] = {'error': '所有股票计算均失败'}
+            else:
+                evaluated_keys.append(key)
+
+        if not evaluated_keys:
+            return results
+
+        stats = analyze_quantiles(
+            np.stack([factor_matrices[key] for key in evaluated_keys]), close_matrix,
+            horizons=horizons, n_quantiles=n_quantiles,
+            forward_returns=self._forward_returns(stock_list, query, close_matrix, horizons)
+        )
+
+        for position, key in enumerate(evaluated_keys):
+            results[key] = {
+                'quantile_result': {
+                    'n_quantiles': n_quantiles,
+                    'autocorrelation': _finite_or_zero(stats['autocorrelation'][position]),
+                    'top_turnover': _finite_or_zero(stats['top_turnover'][position]),
+                    'horizons': {
+                        horizon: {
+                            'spread': _finite_or_zero(stats['spread'][horizon][position]),
+                            'monotonicity': _finite_or_zero(stats['monotonicity'][horizon][position]),
+                            'quantile_returns': [
+                                _finite_or_zero(value)
+                                for value in stats['quantile_returns'][horizon][position]
+                            ]
+                        }
+                        for horizon in horizons
+                    }
+                }
+            }
+
+        return results
+
+    def sweep_template(self, template: str, grid: Dict[str, Sequence],
+                       stock_list: List[Stock] = None,
+                       query: Query = None,
+                       icir_window: int = 20) -> Dict[str, Any]:
+        """
+        参数化因子模板的超参数扫描
+
+        网格中每组参数代入模板得到一个表达式，所有表达式合并为一张DAG，
+        相同窗口的子表达式只计算一次。模板只使用 MA/STD/EMA/REF/HHV/LLV/ABS/LOG/SQRT 时，
+        行情字段一次读取为 日期×股票 矩阵，指标在矩阵上向量化计算，
+        MA/STD 由缓存的前缀和得到，任意窗口只需一次矩阵相减；
+        否则退回逐只股票的DAG计算。最后所有参数组合堆叠后一次计算IC。
+
+        Args:
+            template: 带命名占位符的表达式模板，如 "MA(CLOSE(), {a}) - MA(CLOSE(), {b})"
+            grid: 参数名到取值列表的映射，如 {'a': [5, 10], 'b': [20, 30, 60]}
+            stock_list: 股票列表，如果为None则使用所有A股
+            query: 查询条件，如果为None则使用最近100条数据
+            icir_window: 滚动ICIR窗口
+
+        Returns:
+            Dict: params（参数名列表）、values（各参数取值）、
+                ic_mean/ic_std/icir_mean（形状为各参数取值个数的IC曲面，失败的组合为NaN）、
+                expressions（参数组合到表达式的映射）、errors（失败的参数组合到错误信息的映射）、
+                best（IC均值最高的参数组合、表达式和IC）
+        """
+        if stock_list is None:
+            stock_list = self._get_a_stocks()
+
+        if query is None:
+            query = Query(-100)  # 最近100条数据
+
+        names = list(grid)
+        values = [list(grid[name]) for name in names]
+        shape = tuple(len(v) for v in values)
+        expressions = {
+            combo: template.format(**dict(zip(names, combo)))
+            for combo in itertools.product(*values)
+        }
+
+        dag = ExpressionDAG(expressions)
+        errors = dict(dag.parse_errors)
+        logger.info(
+            f"参数扫描: {len(expressions)} 个参数组合, "
+            f"{dag.tree_node_count} 个节点合并为 {dag.node_count} 个"
+        )
+
+        if _vectorizable(dag):
+            factor_matrices, close_matrix, failed_counts = self._compute_dag_matrices_vectorized(
+                dag, stock_list, query
+            )
+        else:
+            factor_matrices, close_matrix, failed_counts = self._compute_factor_matrices(
+                dag, stock_list, query
+            )
+        for combo in list(factor_matrices):
+            if failed_counts.get(combo, 0) >= len(stock_list):
+                errors[combo] = '所有股票计算均失败'
+                del factor_matrices[combo]
+
+        surfaces = {name: np.full(shape, np.nan) for name in ('ic_mean', 'ic_std', 'icir_mean')}
+        evaluated = list(factor_matrices)
+        if evaluated:
+            ic_stats = evaluate_ic(
+                np.stack([factor_matrices[combo] for combo in evaluated]),
+                self._forward_returns(stock_list, query, close_matrix),
+                method='rank', icir_window=icir_window
+            )
+            for position, combo in enumerate(evaluated):
+                index = tuple(v.index(p) for v, p in zip(values, combo))
+                for name, surface in surfaces.items():
+                    surface[index] = ic_stats[name][position]
+
+        best = None
+        if np.isfinite(surfaces['ic_mean']).any():
+            index = np.unravel_index(np.nanargmax(surfaces['ic_mean']), shape)
+            combo = tuple(v[i] for v, i in zip(values, index))
+            best = {'params': dict(zip(names, combo)), 'expression': expressions[combo],
+                    'ic_mean': float(surfaces['ic_mean'][index]),
+                    'icir_mean': float(surfaces['icir_mean'][index])}
+
+        return dict(surfaces, params=names, values=values, expressions=expressions,
+                    errors=errors, best=best)
+
+    def _field_matrices(self, fields, stock_list: List[Stock], query: Query) -> Dict[str, np.ndarray]:
+        """
+        读取行情字段的 日期×股票 矩阵，行与 _query_dates 一致
+
+        配置了K线存储时直接从存储取列，否则逐只股票加载KData并按日期对齐。
+        """
+        if self.kline_store is not None:
+            store = self.kline_store
+            rows = store.rows_for_query(query)
+            columns = [store.stock_index.get(stock.market_code) for stock in stock_list]
+            present = [col for col in columns if col is not None]
+            targets = [i for i, col in enumerate(columns) if col is not None]
+            matrices = {}
+            for field in fields:
+                data = store.get_field(field, rows)
+                matrix = np.full((data.shape[0], len(stock_list)), np.nan)
+                matrix[:, targets] = data[:, present]
+                matrices[field] = matrix
+            return matrices
+
+        ref_stk = stock_list[0] if stock_list else self.sm['sh000001']
+        ref_dates = ref_stk.get_datetime_list(query)
+        matrices = {field: np.full((len(ref_dates), len(stock_list)), np.nan) for field in fields}
+        for col, stock in enumerate(stock_list):
+            try:
+                kdata = stock.get_kdata(query)
+                if kdata.empty():
+                    continue
+                for field in fields:
+                    matrices[field][:, col] = ALIGN(EXPRESSION_FUNCTIONS[field](kdata), ref_dates).to_np()
+            except Exception as e:
+                logger.warning(f"股票 {stock.market_code} 行情读取失败: {e}")
+        return matrices
+
+    def _compute_factor_matrices(self, dag: ExpressionDAG,
+                                 stock_list: List[Stock],
+                                 query: Query):
+        """
+        启用向量化内核（或包含截面函数）且DAG只含支持的函数时在整个矩阵上计算；
+        包含截面函数但有其他函数不支持向量化时，逐只股票计算截面函数的输入后再做截面计算；
+        否则配置了K线存储时从存储计算DAG，再否则从hikyuu加载KData计算
+        """
+        cross_sectional = any(_is_cross_section(node) for node in dag.order)
+        if (EVALUATION_CONFIG['vectorized_kernels'] or cross_sectional) and _vectorizable(dag):
+            return self._compute_dag_matrices_vectorized(dag, stock_list, query)
+        if cross_sectional:
+            return self._compute_cross_section_matrices(dag, stock_list, query)
+        if self.kline_store is not None:
+            return self._compute_dag_matrices_from_store(dag, stock_list, query)
+        return self._compute_dag_matrices(dag, stock_list, query)
+
+    def _forward_returns(self, stock_list: List[Stock], query: Query,
+                         close_matrix: np.ndarray, horizons=None):
+        """
+        从缓存获取与因子矩阵对齐的远期收益率
+
+        Args:
+            horizons: None时返回1日远期收益率矩阵，否则返回 {持有期: 矩阵}
+        """
+        codes = [stock.market_code for stock in stock_list]
+        dates = self._query_dates(stock_list, query)
+        if horizons is None:
+            return self.forward_returns.get(codes, dates, close_matrix)
+        return self.forward_returns.get_horizons(codes, dates, close_matrix, horizons)
+
+    def _query_dates(self, stock_list: List[Stock], query: Query) -> List[int]:
+        """返回因子矩阵各行对应的交易日（YYYYMMDD），与 _compute_factor_matrices 的行一致"""
+        if self.kline_store is not None:
+            return self.kline_store.dates[self.kline_store.rows_for_query(query)]
+        ref_stk = stock_list[0] if stock_list else self.sm['sh000001']
+        return [datetime_to_int(dt) for dt in ref_stk.get_datetime_list(query)]
+
+    def _compute_dag_matrices(self, dag: ExpressionDAG,
+                              stock_list: List[Stock],
+                              query: Query):
+        """
+        逐只股票计算DAG，并对齐为 日期×股票 矩阵
+
+        Returns:
+            Tuple: (因子键到因子矩阵的映射, 收盘价矩阵, 因子键到失败股票数的映射)
+        """
+        ref_stk = stock_list[0] if stock_list else self.sm['sh000001']
+        ref_dates = ref_stk.get_datetime_list(query)
+        shape = (len(ref_dates), len(stock_list))
+
+        factor_matrices = {key: np.full(shape, np.nan) for key in dag.roots}
+        close_matrix = np.full(shape, np.nan)
+        failed_counts = {}
+
+        for col, stock in enumerate(stock_list):
+            try:
+                kdata = stock.get_kdata(query)
+                if kdata.empty():
+                    continue
+
+                values, errors = dag.evaluate(
+                    lambda field: EXPRESSION_FUNCTIONS[field](kdata), EXPRESSION_FUNCTIONS
+                )
+                close_matrix[:, col] = ALIGN(CLOSE(kdata), ref_dates).to_np()
+
+                for key, value in values.items():
+                    if isinstance(value, (int, float)):
+                        factor_matrices[key][:, col] = value
+                    else:
+                        factor_matrices[key][:, col] = ALIGN(value, ref_dates).to_np()
+                for key in errors:
+                    failed_counts[key] = failed_counts.get(key, 0) + 1
+
+            except Exception as e:
+                logger.warning(f"股票 {stock.market_code} 因子计算失败: {e}")
+                for key in dag.roots:
+                    failed_counts[key] = failed_counts.get(key, 0) + 1
+
+        return factor_matrices, close_matrix, failed_counts
+
+    def _compute_dag_matrices_vectorized(self, dag: ExpressionDAG,
+                                         stock_list: List[Stock],
+                                         query: Query):
+        """
+        在 日期×股票 矩阵上一次计算整个DAG
+
+        行情字段一次读取为矩阵，指标由向量化内核计算。窗口按每只股票的交易日
+        （收盘价有效的行）滚动，跳过停牌日，停牌日的因子值为NaN，
+        与逐只股票计算的结果对齐。
+
+        Returns:
+            Tuple: (因子键到因子矩阵的映射, 收盘价矩阵, 因子键到失败股票数的映射)
+        """
+        fields = self._field_matrices(
+            {node.op for node in dag.order if node.kind == 'field'} | {'CLOSE'},
+            stock_list, query
+        )
+        close_matrix = fields['CLOSE']
+        valid = np.isfinite(close_matrix)
+        functions = dict(RollingPrimitives(valid).functions,
+                         **self._cross_section_functions(dag, stock_list, valid))
+
+        values, errors = dag.evaluate(fields.__getitem__, functions)
+        factor_matrices = {}
+        for key, value in values.items():
+            matrix = np.array(np.broadcast_to(np.asarray(value, dtype=float), close_matrix.shape))
+            matrix[~valid] = np.nan
+            factor_matrices[key] = matrix
+        failed_counts = {}
+        for key, error in errors.items():
+            logger.error(f"因子向量化计算失败: {dag.roots[key].key}, {error}")
+            factor_matrices[key] = np.full(close_matrix.shape, np.nan)
+            failed_counts[key] = len(stock_list)
+
+        return factor_matrices, close_matrix, failed_counts
+
+    def _compute_cross_section_matrices(self, dag: ExpressionDAG,
+                                        stock_list: List[Stock],
+                                        query: Query):
+        """
+        计算包含截面函数且有函数不支持向量化的DAG
+
+        不依赖截面函数的最大子表达式（截面函数的输入和不含截面函数的因子）
+        合并为一张DAG逐只股票计算，得到的矩阵作为已计算节点，
+        再在矩阵上按拓扑序计算截面函数及其上层节点；上层的时序函数使用向量化内核，
+        编译时已保证上层节点只使用有矩阵实现的函数。
+
+        Returns:
+            Tuple: (因子键到因子矩阵的映射, 收盘价矩阵, 因子键到失败股票数的映射)
+        """
+        cross_keys = set()
+        for node in dag.order:
+            if _is_cross_section(node) or any(arg.key in cross_keys for arg in node.args):
+                cross_keys.add(node.key)
+
+        boundary = {root.key: root for root in dag.roots.values() if root.key not in cross_keys}
+        for node in dag.order:
+            if node.key in cross_keys:
+                boundary.update((arg.key, arg) for arg in node.args
+                                if arg.key not in cross_keys and arg.kind != 'const')
+
+        inner = ExpressionDAG({key: key for key in boundary})
+        inner_matrices, close_matrix, inner_failed = self._compute_factor_matrices(
+            inner, stock_list, query
+        )
+
+        valid = np.isfinite(close_matrix)
+        functions = dict(RollingPrimitives(valid).functions,
+                         **self._cross_section_functions(dag, stock_list, valid))
+        values, errors = dag.evaluate(
+            lambda field: inner_matrices[f"{field}()"], functions, precomputed=inner_matrices
+        )
+
+        factor_matrices = {}
+        failed_counts = {}
+        for key, root in dag.roots.items():
+            if key in errors:
+                logger.error(f"因子截面计算失败: {root.key}, {errors[key]}")
+                factor_matrices[key] = np.full(close_matrix.shape, np.nan)
+                failed_counts[key] = len(stock_list)
+                continue
+            matrix = np.array(np.broadcast_to(np.asarray(values[key], dtype=float), close_matrix.shape))
+            matrix[~valid] = np.nan
+            factor_matrices[key] = matrix
+            failed = [inner_failed.get(node.key, 0) for node in iter_postorder(root)
+                      if node.key in boundary]
+            if max(failed, default=0):
+                failed_counts[key] = max(failed)
+
+        return factor_matrices, close_matrix, failed_counts
+
+    def _cross_section_functions(self, dag: ExpressionDAG,
+                                 stock_list: List[Stock],
+                                 valid: np.ndarray) -> Dict[str, Any]:
+        """截面函数实现，DAG使用行业中性化时加载行业分类"""
+        groups = None
+        if any(node.kind == 'call' and node.op == 'INDNEUTRALIZE' for node in dag.order):
+            groups = self._industry_groups(stock_list)
+        return cross_section_functions(valid, groups)
+
+    def _industry_groups(self, stock_list: List[Stock]) -> np.ndarray:
+        """
+        从hikyuu行业板块得到每只股票的行业编号
+
+        Returns:
+            np.ndarray: 形状 (股票,) 的行业编号，不属于任何行业板块的股票为-1
+        """
+        columns = {stock.market_code: col for col, stock in enumerate(stock_list)}
+        groups = np.full(len(stock_list), -1)
+        category = EVALUATION_CONFIG['industry_block_category']
+        for index, block in enumerate(self.sm.get_block_list(category)):
+            for stock in block:
+                col = columns.get(stock.market_code)
+                if col is not None and groups[col] < 0:
+                    groups[col] = index
+        unclassified = int((groups < 0).sum())
+        if unclassified:
+            logger.warning(f"{unclassified} 只股票不属于任何{category}，行业中性化时视为同一组")
+        return groups
+
+    def _compute_dag_matrices_from_store(self, dag: ExpressionDAG,
+                                         stock_list: List[Stock],
+                                         query: Query):
+        """
+        从列式K线存储读取行情，逐只股票计算DAG
+
+        字段矩阵为内存映射视图，每只股票只取有K线的日期（跳过停牌）作为指标输入，
+        计算结果再写回对应日期。
+
+        Returns:
+            Tuple: (因子键到因子矩阵的映射, 收盘价矩阵, 因子键到失败股票数的映射)
+        """
+        store = self.kline_store
+        rows = store.rows_for_query(query)
+        fields = {field: store.get_field(field, rows) for field in store.fields}
+        shape = (fields['CLOSE'].shape[0], len(stock_list))
+
+        factor_matrices = {key: np.full(shape, np.nan) for key in dag.roots}
+        close_matrix = np.full(shape, np.nan)
+        failed_counts = {}
+
+        for col, stock in enumerate(stock_list):
+            store_col = store.stock_index.get(stock.market_code)
+            if store_col is None:
+                logger.warning(f"K线存储中没有股票 {stock.market_code}")
+                for key in dag.roots:
+                    failed_counts[key] = failed_counts.get(key, 0) + 1
+                continue
+
+            close = fields['CLOSE'][:, store_col]
+            valid = np.isfinite(close)
+            if not valid.any():
+                continue
+            close_matrix[:, col] = close
+
+            values, errors = dag.evaluate(
+                lambda field: PRICELIST(fields[field][valid, store_col]), EXPRESSION_FUNCTIONS
+            )
+            for key, value in values.items():
+                if isinstance(value, (int, float)):
+                    factor_matrices[key][valid, col] = value
+                else:
+                    factor_matrices[key][valid, col] = value.to_np()
+            for key in errors:
+                failed_counts[key] = failed_counts.get(key, 0) + 1
+
+        return factor_matrices, close_matrix, failed_counts
+
+    def evaluate_single_factor(self, expression: str,
                              stock_list: List[Stock],
                              query: Query) -> Dict[str, Any]:
         """
@@ -200,44 +854,18 @@ class MultiFactorEngine:
         Returns:
             Dict: 评估结果
         """
-        try:
-            # 创建因子指标
-            factor_indicator = self.create_factor_indicator(expression)
-            
-            # 创建MultiFactor
-            src_inds = [factor_indicator]  # IndicatorList就是普通的Python列表
-            ref_stk = stock_list[0] if stock_list else self.sm['sh000001']
-            
-            multifactor = MF_EqualWeight(src_inds, stock_list, query, ref_stk, save_all_factors=True)
-            
-            # 计算因子值
-            all_factors = multifactor.get_all_factors()
-            
-            # 获取IC和ICIR
-            ic_series = multifactor.get_ic()
-            icir_series = multifactor.get_icir(20)  # 20日窗口
-            
-            # 计算统计指标
-            ic_values = [float(ic) for ic in ic_series if ic is not None]
-            icir_values = [float(icir) for icir in icir_series if icir is not None]
-            
-            # 返回评估结果
-            return {
-                'ic_mean': sum(ic_values) / len(ic_values) if ic_values else 0,
-                'ic_std': self._calculate_std(ic_values) if ic_values else 0,
-                'icir_mean': sum(icir_values) / len(icir_values) if icir_values else 0,
-                'factor_values': all_factors,
-                'stock_count': len(stock_list),
-                'evaluation_date': datetime.now()
-            }
-            
-        except Exception as e:
-            logger.error(f"单因子评估失败: {expression}, 错误: {e}")
-            raise
+        # 单个表达式也走DAG路径，远期收益率由缓存提供，多次调用之间不重复计算
+        result = self.evaluate_expressions_shared({expression: expression}, stock_list, query)
+        evaluation = result[expression]
+        if 'error' in evaluation:
+            logger.error(f"单因子评估失败: {expression}, 错误: {evaluation['error']}")
+            raise ValueError(evaluation['error'])
+        return evaluation['evaluation_result']
     
     def run_backtest_for_factor(self, factor_id: int, 
                                initial_cash: float = 1000000,
-                               query: Query = None) -> Dict[str, Any]:
+                               query: Query = None,
+                               **kwargs) -> Dict[str, Any]:
         """
         运行因子回测
         
@@ -245,6 +873,7 @@ class MultiFactorEngine:
             factor_id: 因子ID
             initial_cash: 初始资金
             query: 查询条件
+            **kwargs: 传给 run_portfolio_backtests 的组合参数（n_quantiles、long_short等）
             
         Returns:
             Dict: 回测结果
@@ -252,120 +881,171 @@ class MultiFactorEngine:
         factor_info = self.registry.get_factor(factor_id)
         if not factor_info:
             raise ValueError(f"因子不存在: {factor_id}")
-        
+
+        results = self.run_portfolio_backtests(
+            {factor_id: factor_info['expression']}, query=query,
+            initial_cash=initial_cash, **kwargs
+        )
+        result = results[factor_id]
+        if 'error' in result:
+            logger.error(f"因子回测失败: {factor_id}, 错误: {result['error']}")
+            raise RuntimeError(result['error'])
+        return result
+
+    def run_portfolio_backtests(self, expressions: Dict[Any, str],
+                                stock_list: List[Stock] = None,
+                                query: Query = None,
+                                n_quantiles: int = 5,
+                                long_short: bool = False,
+                                rebalance_period: int = 5,
+                                cost_rate: float = 0.0015,
+                                initial_cash: float = 1000000) -> Dict[Any, Dict[str, Any]]:
+        """
+        批量运行全市场分位数组合回测
+
+        所有表达式通过公共子表达式DAG一次计算出因子矩阵，
+        再堆叠为 因子×日期×股票 一次完成所有因子的向量化回测。
+
+        Args:
+            expressions: 键到表达式的映射，如 {factor_id: expression}
+            stock_list: 股票列表，如果为None则使用所有A股
+            query: 查询条件，如果为None则使用最近252条数据
+            n_quantiles: 分位数个数
+            long_short: 是否做多最高分位同时做空最低分位
+            rebalance_period: 调仓间隔（交易日）
+            cost_rate: 单边交易成本率
+            initial_cash: 初始资金
+
+        Returns:
+            Dict: 每个键对应回测结果或 {'error': ...}
+        """
+        if stock_list is None:
+            stock_list = self._get_a_stocks()
+
         if query is None:
             query = Query(-252)  # 最近一年数据
-        
-        try:
-            # 创建交易账户
-            tm = crtTM(init_cash=initial_cash, name=f"factor_{factor_id}")
-            
-            # 创建因子指标
-            factor_indicator = self.create_factor_indicator(factor_info['expression'])
-            
-            # 创建信号指示器（基于因子值的简单策略）
-            # 这里使用因子值排名前10%的股票
-            sg = self._create_factor_signal(factor_indicator)
-            
-            # 创建交易系统
-            mm = MM_FixedPercent(0.1)  # 每次投入10%资金
-            st = ST_FixedPercent(0.05)  # 5%止损
-            
-            sys = SYS_Simple(tm=tm, sg=sg, mm=mm, st=st)
-            
-            # 运行回测（使用第一个股票作为示例）
-            sample_stock = self.sm['sz000001']
-            sys.run(sample_stock, query)
-            
-            # 获取绩效结果
-            performance = tm.get_performance(Datetime.now(), Query.DAY)
-            trade_list = tm.get_trade_list()
-            
-            # 提取关键指标
-            performance_dict = {}
-            if hasattr(performance, 'names') and hasattr(performance, 'values'):
-                names = performance.names()
-                values = performance.values()
-                performance_dict = dict(zip(names, values))
-            
-            return {
-                'factor_id': factor_id,
-                'performance': performance_dict,
-                'trade_count': len(trade_list),
-                'final_cash': tm.currentCash,
+
+        results = {}
+        dag = ExpressionDAG(expressions)
+        for key, error in dag.parse_errors.items():
+            results[key] = {'error': error}
+
+        if not dag.roots:
+            return results
+
+        factor_matrices, close_matrix, failed_counts = self._compute_factor_matrices(
+            dag, stock_list, query
+        )
+
+        evaluated_keys = []
+        for key in factor_matrices:
+            if failed_counts.get(key, 0) >= len(stock_list):
+                results[key] = {'error': '所有股票计算均失败'}
+            else:
+                evaluated_keys.append(key)
+
+        if not evaluated_keys:
+            return results
+
+        stats = portfolio_backtest(
+            np.stack([factor_matrices[key] for key in evaluated_keys]),
+            self._forward_returns(stock_list, query, close_matrix),
+            n_quantiles=n_quantiles, long_short=long_short,
+            rebalance_period=rebalance_period, cost_rate=cost_rate
+        )
+
+        for position, key in enumerate(evaluated_keys):
+            total_return = _finite_or_zero(stats['total_return'][position])
+            results[key] = {
+                'factor_id': key,
+                'performance': {
+                    '总收益率': total_return,
+                    '年化收益率': _finite_or_zero(stats['annual_return'][position]),
+                    '年化波动率': _finite_or_zero(stats['volatility'][position]),
+                    '夏普比率': _finite_or_zero(stats['sharpe_ratio'][position]),
+                    '最大回撤': _finite_or_zero(stats['max_drawdown'][position]),
+                    '胜率': _finite_or_zero(stats['win_rate'][position])
+                },
+                'trade_count': int(stats['trade_count'][position]),
+                'turnover': _finite_or_zero(stats['turnover'][position]),
+                'total_cost': _finite_or_zero(stats['total_cost'][position]),
+                'quantile_returns': [
+                    _finite_or_zero(value) for value in stats['quantile_annual_returns'][position]
+                ],
+                'final_cash': initial_cash * (1 + total_return),
                 'backtest_date': datetime.now()
             }
-            
-        except Exception as e:
-            logger.error(f"因子回测失败: {factor_id}, 错误: {e}")
-            raise
-    
-    def _create_factor_signal(self, factor_indicator: Indicator) -> SignalBase:
-        """创建基于因子值的信号指示器"""
-        # 简化的信号生成：因子值大于0时买入
-        condition = factor_indicator > 0
-        return SG_Bool(condition)
+
+        return results
     
     def _get_a_stocks(self) -> List[Stock]:
-        """获取所有A股股票"""
-        from hikyuu import constant
-        
-        a_stocks = []
-        
-        # 直接迭代StockManager实例来获取所有股票
-        for stock in self.sm:
-            # 检查股票是否为Null对象
-            if stock.is_null():
-                continue
-                
-            # 检查股票是否有效且为A股
-            if stock.valid and stock.type in (constant.STOCKTYPE_A, constant.STOCKTYPE_A_BJ):
-                a_stocks.append(stock)
-        
-        return a_stocks
+        """获取所有有效A股股票（含北交所），结果按交易日缓存"""
+        return self.universe.get_stocks()
     
     def _calculate_std(self, values: List[float]) -> float:
         """计算标准差"""
-        if not values:
+        if len(values) == 0:
             return 0
-        mean = sum(values) / len(values)
-        variance = sum((x - mean) ** 2 for x in values) / len(values)
-        return variance ** 0.5
+        return float(np.std(values))
     
-    def auto_evaluate_all_factors(self):
-        """自动评估所有测试中的因子"""
+    def auto_evaluate_all_factors(self, max_workers: int = None):
+        """
+        自动评估所有测试中的因子
+
+        Args:
+            max_workers: 并行评估的进程数，None时读取配置，1表示串行评估
+        """
         testing_factors = self.registry.get_testing_factors()
         logger.info(f"开始自动评估 {len(testing_factors)} 个测试因子")
-        
+
+        max_workers = max_workers or EVALUATION_CONFIG['max_workers']
+        if max_workers > 1:
+            evaluator = ParallelFactorEvaluator(max_workers=max_workers)
+            for factor, item in zip(testing_factors, evaluator.evaluate(testing_factors)):
+                if item['error']:
+                    logger.error(f"自动评估失败: {factor['name']}, 错误: {item['error']}")
+                    continue
+                self._apply_auto_evaluation(factor, item['result'])
+            self.registry.flush_pending()
+            logger.info("自动评估完成")
+            return
+
+        a_stocks = self._get_a_stocks()
         for factor in testing_factors:
             try:
                 # 评估因子
                 evaluation_result = self.evaluate_single_factor(
-                    factor['expression'], self._get_a_stocks(), Query(-100)
-                )
-                
-                # 保存绩效结果
-                self.registry.save_performance_result(
-                    factor_id=factor['id'],
-                    evaluation_date=datetime.now(),
-                    ic_value=evaluation_result['ic_mean'],
-                    icir_value=evaluation_result['icir_mean']
+                    factor['expression'], a_stocks, Query(-100)
                 )
-                
-                # 如果IC均值显著大于0，激活因子
-                if evaluation_result['ic_mean'] > 0.05:  # IC大于5%
-                    self.registry.update_factor(
-                        factor['id'], status='active'
-                    )
-                    logger.info(f"因子激活: {factor['name']} (IC: {evaluation_result['ic_mean']:.3f})")
-                else:
-                    logger.info(f"因子保持测试状态: {factor['name']} (IC: {evaluation_result['ic_mean']:.3f})")
-                    
+                self._apply_auto_evaluation(factor, evaluation_result)
+
             except Exception as e:
                 logger.error(f"自动评估失败: {factor['name']}, 错误: {e}")
-        
+
+        self.registry.flush_pending()
         logger.info("自动评估完成")
 
+    def _apply_auto_evaluation(self, factor: Dict[str, Any], evaluation_result: Dict[str, Any]):
+        """缓存自动评估结果，并根据IC均值决定是否激活因子，由调用方统一批量写入"""
+        try:
+            # 缓存绩效结果
+            self.registry.queue_performance_result(
+                factor_id=factor['id'],
+                evaluation_date=datetime.now(),
+                ic_value=evaluation_result['ic_mean'],
+                icir_value=evaluation_result['icir_mean']
+            )
+
+            # 如果IC均值显著大于0，激活因子
+            if evaluation_result['ic_mean'] > 0.05:  # IC大于5%
+                self.registry.queue_status_update(factor['id'], 'active')
+                logger.info(f"因子激活: {factor['name']} (IC: {evaluation_result['ic_mean']:.3f})")
+            else:
+                logger.info(f"因子保持测试状态: {factor['name']} (IC: {evaluation_result['ic_mean']:.3f})")
+
+        except Exception as e:
+            logger.error(f"自动评估失败: {factor['name']}, 错误: {e}")
+
 
 # 全局MultiFactor引擎实例
 multi_factor_engine = None
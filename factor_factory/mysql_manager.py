@@ -1,8 +1,13 @@
 import mysql.connector
 from mysql.connector import Error, pooling, errors as mysql_errors
-from typing import List, Tuple, Optional, Dict, Any
+from typing import List, Tuple, Optional, Dict, Any, Iterator, Union
 import logging
-from .config.database_config import DATABASE_CONFIG, CREATE_TABLES_SQL
+import numpy as np
+from .config.database_config import (
+    DATABASE_CONFIG, CREATE_TABLES_SQL, PARTITIONED_TABLES_SQL, STREAM_BATCH_SIZE, SCHEMA_MODE,
+    UPSERT_RESULTS, RESULT_UNIQUE_KEYS
+)
+from .partition_manager import PartitionManager, create_table_sql
 
 # 配置日志
 logging.basicConfig(level=logging.INFO)
@@ -95,6 +100,8 @@ class MySQLManager:
             cursor = connection.cursor()
             
             for table_name, create_sql in CREATE_TABLES_SQL.items():
+                if SCHEMA_MODE == 'partitioned' and table_name in PARTITIONED_TABLES_SQL:
+                    create_sql = create_table_sql(table_name)
                 try:
                     cursor.execute(create_sql)
                     logger.info(f"表 {table_name} 初始化成功")
@@ -108,6 +115,78 @@ class MySQLManager:
         except Error as e:
             logger.error(f"数据库表初始化失败: {e}")
             raise
+
+        if SCHEMA_MODE == 'partitioned':
+            self._check_partitioned_tables()
+        elif UPSERT_RESULTS:
+            try:
+                self._check_result_unique_keys()
+            except Error as e:
+                logger.error(f"结果表唯一键检查失败: {e}")
+
+    def find_missing_result_keys(self) -> List[str]:
+        """
+        只读检查结果表是否缺少覆盖写入依赖的唯一键
+
+        Returns:
+            List[str]: 缺少唯一键的表名
+        """
+        missing = []
+        for table_name, (key_name, _) in RESULT_UNIQUE_KEYS.items():
+            result = self.execute_query(
+                "SELECT COUNT(*) FROM information_schema.STATISTICS "
+                "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND INDEX_NAME = %s",
+                (table_name, key_name)
+            )
+            if not (result and result[0][0]):
+                missing.append(table_name)
+        return missing
+
+    def _check_result_unique_keys(self):
+        """启动时检查旧版本创建的结果表，缺少唯一键时只提示迁移，不修改表结构"""
+        for table_name in self.find_missing_result_keys():
+            logger.warning(
+                f"表 {table_name} 缺少唯一键，覆盖写入退化为普通插入，重复评估会产生重复记录；"
+                f"请停止流水线后执行 get_db_manager().migrate_result_unique_keys() 迁移"
+            )
+
+    def migrate_result_unique_keys(self) -> Dict[str, int]:
+        """
+        为旧版本创建的结果表补建唯一键，覆盖写入依赖该键
+
+        添加唯一键前先删除重复记录，每组保留ID最大（最晚写入）的一条。
+        会删除数据并修改表结构，应在流水线停止时手动执行。
+
+        Returns:
+            Dict: 表名到删除的重复记录数的映射，只包含本次补建唯一键的表
+        """
+        removed = {}
+        for table_name in self.find_missing_result_keys():
+            key_name, columns = RESULT_UNIQUE_KEYS[table_name]
+            join = ' AND '.join(f"a.{column} = b.{column}" for column in columns)
+            removed[table_name] = self.execute_update(
+                f"DELETE a FROM {table_name} a JOIN {table_name} b ON {join} AND a.id < b.id"
+            )
+            self.execute_update(
+                f"ALTER TABLE {table_name} ADD UNIQUE KEY {key_name} ({', '.join(columns)})"
+            )
+            logger.info(f"表 {table_name} 添加唯一键 {key_name}，删除 {removed[table_name]} 条重复记录")
+        return removed
+
+    def _check_partitioned_tables(self):
+        """分区模式下检查已有表是否已迁移，并预建未来月份的分区"""
+        partitions = PartitionManager(self)
+        for table_name in PARTITIONED_TABLES_SQL:
+            try:
+                if not partitions.is_partitioned(table_name):
+                    logger.warning(
+                        f"表 {table_name} 仍为普通表，请停止流水线后执行 "
+                        f"PartitionManager(db).migrate('{table_name}') 迁移为分区表"
+                    )
+                    continue
+                partitions.ensure_future_partitions(table_name)
+            except Error as e:
+                logger.error(f"表 {table_name} 分区维护失败: {e}")
     
     def execute_query(self, query: str, params: Optional[Tuple] = None) -> List[Tuple]:
         """执行查询语句"""
@@ -131,6 +210,61 @@ class MySQLManager:
             if connection:
                 connection.close()
     
+    def stream_query(self, query: str, params: Optional[Tuple] = None,
+                     batch_size: int = None, as_numpy: bool = False,
+                     dtype=None) -> Iterator[Union[Tuple, np.recarray]]:
+        """
+        流式执行查询语句，适用于导出大量历史记录
+
+        使用非缓冲游标，结果由服务端分批传输，每次 fetchmany 读取 batch_size 行，
+        内存占用与结果集大小无关。连接只在迭代期间从连接池借出，
+        迭代结束、异常或生成器被提前关闭时归还。
+
+        Args:
+            query: 查询语句
+            params: 查询参数
+            batch_size: 每批读取的行数，默认读取 STREAM_BATCH_SIZE
+            as_numpy: True 时每批产出一个以列名为字段的NumPy记录数组，否则逐行产出元组
+            dtype: as_numpy 时记录数组的dtype，默认按数据推断
+
+        Yields:
+            Tuple 或 np.recarray: 单行数据或一批数据
+        """
+        batch_size = batch_size or STREAM_BATCH_SIZE
+        connection = None
+        cursor = None
+        exhausted = False
+        try:
+            connection = self.get_connection()
+            cursor = connection.cursor(buffered=False)
+            cursor.execute(query, params or ())
+            names = list(cursor.column_names)
+
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    exhausted = True
+                    break
+                if as_numpy:
+                    yield np.rec.fromrecords(rows, names=names, dtype=dtype)
+                else:
+                    yield from rows
+
+        except Error as e:
+            logger.error(f"流式查询执行失败: {e}")
+            raise
+        finally:
+            if connection:
+                if not exhausted:
+                    # 提前结束时服务端仍在发送结果，归还连接前需读完剩余数据
+                    try:
+                        connection.consume_results()
+                    except Error as e:
+                        logger.warning(f"丢弃未读取的查询结果失败: {e}")
+                if cursor:
+                    cursor.close()
+                connection.close()
+
     def execute_insert(self, query: str, params: Optional[Tuple] = None) -> int:
         """执行插入语句，返回插入的ID"""
         connection = None
@@ -203,6 +337,64 @@ class MySQLManager:
             if connection:
                 connection.close()
     
+    def execute_batch(self, query: str, params_list: List[Tuple],
+                      chunk_size: int = 500) -> List[Tuple[int, str]]:
+        """
+        分块批量执行插入或更新，每块一个事务
+
+        某块整体执行失败时回滚该块，并在同一事务内逐行重试，
+        跳过失败的行，其余行照常提交，不中断整个批次。
+
+        Args:
+            query: 带占位符的SQL语句
+            params_list: 参数列表
+            chunk_size: 每个事务包含的行数
+
+        Returns:
+            List[Tuple[int, str]]: 失败行在 params_list 中的下标及错误信息
+        """
+        failures = []
+        for start in range(0, len(params_list), chunk_size):
+            chunk = params_list[start:start + chunk_size]
+            connection = None
+            cursor = None
+            try:
+                connection = self.get_connection()
+                cursor = connection.cursor()
+
+                try:
+                    connection.start_transaction()
+                    cursor.executemany(query, chunk)
+                    connection.commit()
+                    continue
+                except Error as e:
+                    connection.rollback()
+                    logger.warning(f"批量执行失败，逐行重试 {len(chunk)} 行: {e}")
+
+                # 单条语句失败只回滚该语句，事务中的其他行仍可提交
+                connection.start_transaction()
+                for offset, params in enumerate(chunk):
+                    try:
+                        cursor.execute(query, params)
+                    except Error as e:
+                        failures.append((start + offset, str(e)))
+                connection.commit()
+
+            except Error as e:
+                logger.error(f"批量执行失败: {e}")
+                if connection:
+                    connection.rollback()
+                failed = {index for index, _ in failures}
+                failures.extend((start + offset, str(e)) for offset in range(len(chunk))
+                                if start + offset not in failed)
+            finally:
+                if cursor:
+                    cursor.close()
+                if connection:
+                    connection.close()
+
+        return failures
+
     def check_connection(self) -> bool:
         """检查数据库连接是否正常"""
         try:
@@ -246,6 +438,61 @@ class MySQLManager:
             }
         return {}
 
+    def get_factor_status_counts(self) -> Dict[str, int]:
+        """按状态统计因子数量，一次 GROUP BY 查询"""
+        result = self.execute_query("SELECT status, COUNT(*) FROM factors GROUP BY status")
+        return {row[0]: row[1] for row in result}
+
+    def get_performance_summary(self, status: str = 'active') -> Dict[str, Any]:
+        """
+        汇总指定状态因子的绩效：先按因子求平均，再对因子取平均
+
+        一次分组聚合完成，代替逐个因子调用 get_factor_performance_stats。
+        因子的平均指标为NULL时按0计。
+
+        Args:
+            status: 因子状态
+
+        Returns:
+            Dict: avg_ic、avg_icir、avg_annual_return、avg_sharpe_ratio、
+                total_evaluations、factor_count，没有任何绩效记录时为空字典
+        """
+        query = """
+        SELECT
+            AVG(COALESCE(s.avg_ic, 0)),
+            AVG(COALESCE(s.avg_icir, 0)),
+            AVG(COALESCE(s.avg_annual_return, 0)),
+            AVG(COALESCE(s.avg_sharpe_ratio, 0)),
+            SUM(s.evaluation_count),
+            COUNT(*)
+        FROM (
+            SELECT
+                p.factor_id,
+                AVG(p.ic_value) as avg_ic,
+                AVG(p.icir_value) as avg_icir,
+                AVG(p.annual_return) as avg_annual_return,
+                AVG(p.sharpe_ratio) as avg_sharpe_ratio,
+                COUNT(*) as evaluation_count
+            FROM factor_performance p
+            JOIN factors f ON f.id = p.factor_id
+            WHERE f.status = %s
+            GROUP BY p.factor_id
+        ) s
+        """
+        result = self.execute_query(query, (status,))
+
+        if result and result[0] and result[0][5]:
+            row = result[0]
+            return {
+                'avg_ic': float(row[0]),
+                'avg_icir': float(row[1]),
+                'avg_annual_return': float(row[2]),
+                'avg_sharpe_ratio': float(row[3]),
+                'total_evaluations': int(row[4]),
+                'factor_count': int(row[5])
+            }
+        return {}
+
 
 # 全局数据库管理器实例
 db_manager = None
@@ -0,0 +1,199 @@
+"""
+多进程并行因子评估
+
+把因子列表切分为若干分片，提交到进程池中并行评估。
+每个工作进程在初始化时独立加载hikyuu，持有自己的StockManager和KData上下文；
+配置了列式K线存储时，各工作进程只读映射同一份存储文件，共享页缓存。
+评估结果按输入顺序合并，由主进程统一持久化；因子值矩阵体积较大，
+配置了因子值存储时由工作进程直接写入存储，不传回主进程。
+"""
+
+from typing import List, Dict, Any, Optional
+import logging
+import math
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from .factor_value_store import open_factor_value_store
+from .config.evaluation_config import EVALUATION_CONFIG
+
+logger = logging.getLogger(__name__)
+
+# 工作进程内的评估引擎，由 _init_worker 创建
+_worker_engine = None
+_worker_stocks = None
+# 工作进程内的因子值存储，未配置时为None
+_worker_values = None
+
+
+def _init_worker(hikyuu_options: Dict[str, Any], stock_codes: Optional[List[str]],
+                 factor_value_dir: Optional[str] = None):
+    """工作进程初始化：加载hikyuu并创建不连接数据库的评估引擎，打开因子值存储"""
+    global _worker_engine, _worker_stocks, _worker_values
+
+    from hikyuu import load_hikyuu
+    from .multi_factor_engine import MultiFactorEngine
+
+    load_hikyuu(**hikyuu_options)
+    _worker_engine = MultiFactorEngine(connect_db=False)
+
+    if stock_codes is None:
+        _worker_stocks = _worker_engine._get_a_stocks()
+    else:
+        _worker_stocks = [_worker_engine.sm[code] for code in stock_codes]
+        _worker_stocks = [stock for stock in _worker_stocks if not stock.is_null()]
+
+    _worker_values = open_factor_value_store(factor_value_dir) if factor_value_dir else None
+
+
+def _evaluate_shard(shard: List[tuple], lookback: int) -> List[tuple]:
+    """
+    在工作进程中评估一个分片
+
+    Args:
+        shard: [(序号, 因子ID, 表达式), ...]
+        lookback: K线数量
+
+    Returns:
+        List[tuple]: [(序号, 因子ID, 评估结果或None, 错误信息或None), ...]
+    """
+    from hikyuu import Query
+
+    query = Query(-lookback)
+    results = []
+
+    # 分片内的表达式合并为一张DAG，共享公共子表达式；
+    # 配置了K线存储时工作进程以只读方式映射同一份存储
+    evaluations = _worker_engine.evaluate_expressions_shared(
+        {index: expression for index, _, expression in shard}, _worker_stocks, query
+    )
+    if _worker_values is not None:
+        dates = _worker_engine._query_dates(_worker_stocks, query)
+        stocks = [stock.market_code for stock in _worker_stocks]
+
+    for index, factor_id, expression in shard:
+        evaluation = evaluations.get(index, {'error': '评估结果缺失'})
+        result = evaluation.get('evaluation_result')
+        if result is not None and _worker_values is not None:
+            try:
+                _worker_values.write(factor_id, expression, dates, stocks, result['factor_values'])
+            except Exception as e:
+                logger.error(f"因子值保存失败: 因子ID {factor_id}, 错误: {e}")
+        if result is not None:
+            # 因子矩阵和IC序列体积较大，不传回主进程
+            result = {k: v for k, v in result.items()
+                      if k not in ('factor_values', 'ic_series')}
+        results.append((index, factor_id, result, evaluation.get('error')))
+    return results
+
+
+class ParallelFactorEvaluator:
+    """多进程因子评估器"""
+
+    def __init__(self, max_workers: int = None, chunk_size: int = None,
+                 hikyuu_options: Dict[str, Any] = None,
+                 factor_value_dir: Optional[str] = None):
+        """
+        Args:
+            max_workers: 进程数，默认读取 EVALUATION_CONFIG['max_workers']
+            chunk_size: 每个分片的因子数，默认按进程数自动划分
+            hikyuu_options: 传给工作进程中 load_hikyuu 的参数
+            factor_value_dir: 因子值存储目录，指定时工作进程把评估得到的因子值矩阵写入存储
+        """
+        self.max_workers = max_workers or EVALUATION_CONFIG['max_workers']
+        self.chunk_size = chunk_size or EVALUATION_CONFIG['chunk_size']
+        self.hikyuu_options = hikyuu_options or {}
+        self.factor_value_dir = factor_value_dir
+        # start 创建的常驻进程池及其股票列表，多次评估之间复用已加载hikyuu的工作进程
+        self._executor = None
+        self._executor_stocks = None
+
+    def start(self, stock_codes: Optional[List[str]] = None) -> 'ParallelFactorEvaluator':
+        """
+        创建常驻进程池，之后使用相同股票列表的 evaluate 调用都复用该进程池
+
+        Args:
+            stock_codes: 股票代码列表，None表示所有A股
+        """
+        self.shutdown()
+        self._executor = self._create_executor(stock_codes)
+        self._executor_stocks = stock_codes
+        return self
+
+    def shutdown(self) -> None:
+        """关闭常驻进程池"""
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+            self._executor_stocks = None
+
+    def __enter__(self) -> 'ParallelFactorEvaluator':
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.shutdown()
+
+    def _create_executor(self, stock_codes: Optional[List[str]]) -> ProcessPoolExecutor:
+        # 使用spawn启动方式，避免fork继承主进程中hikyuu的C++状态
+        context = multiprocessing.get_context('spawn')
+        return ProcessPoolExecutor(max_workers=self.max_workers, mp_context=context,
+                                   initializer=_init_worker,
+                                   initargs=(self.hikyuu_options, stock_codes,
+                                             self.factor_value_dir))
+
+    def _make_shards(self, factors: List[Dict[str, Any]]) -> List[List[tuple]]:
+        """按因子顺序切分分片，每个进程约分到4个分片以平衡负载"""
+        tasks = [(index, factor['id'], factor['expression'])
+                 for index, factor in enumerate(factors)]
+        chunk_size = self.chunk_size or max(1, math.ceil(len(tasks) / (self.max_workers * 4)))
+        return [tasks[i:i + chunk_size] for i in range(0, len(tasks), chunk_size)]
+
+    def evaluate(self, factors: List[Dict[str, Any]],
+                 stock_codes: Optional[List[str]] = None,
+                 lookback: int = None) -> List[Dict[str, Any]]:
+        """
+        并行评估因子
+
+        Args:
+            factors: 因子信息列表，至少包含 id 和 expression
+            stock_codes: 股票代码列表（如 'sz000001'），None表示所有A股
+            lookback: K线数量，默认读取 EVALUATION_CONFIG['lookback']
+
+        Returns:
+            List[Dict]: 与输入顺序一致的结果列表，每项包含
+                factor_id、result（评估结果）和 error（错误信息）
+        """
+        if not factors:
+            return []
+
+        lookback = lookback or EVALUATION_CONFIG['lookback']
+        shards = self._make_shards(factors)
+        logger.info(
+            f"开始并行评估: {len(factors)} 个因子, "
+            f"{len(shards)} 个分片, {self.max_workers} 个进程"
+        )
+
+        merged = [None] * len(factors)
+        if self._executor is not None and self._executor_stocks == stock_codes:
+            self._collect(self._executor, shards, lookback, merged)
+        else:
+            with self._create_executor(stock_codes) as executor:
+                self._collect(executor, shards, lookback, merged)
+
+        logger.info("并行评估完成")
+        return merged
+
+    @staticmethod
+    def _collect(executor: ProcessPoolExecutor, shards: List[List[tuple]],
+                 lookback: int, merged: List[Optional[Dict[str, Any]]]) -> None:
+        """提交所有分片并按输入顺序合并结果"""
+        futures = [executor.submit(_evaluate_shard, shard, lookback) for shard in shards]
+        for future, shard in zip(futures, shards):
+            try:
+                shard_results = future.result()
+            except Exception as e:
+                logger.error(f"评估分片失败: {e}")
+                shard_results = [(index, factor_id, None, str(e))
+                                 for index, factor_id, _ in shard]
+
+            for index, factor_id, result, error in shard_results:
+                merged[index] = {'factor_id': factor_id, 'result': result, 'error': error}
@@ -0,0 +1,229 @@
+"""
+按月分区的时序表维护
+
+factor_performance 和 backtest_results 在 partitioned 模式下按日期RANGE COLUMNS分区，
+每个月一个分区 pYYYYMM，另有保存更早数据的 p_history 和兜底的 p_future。
+过期数据通过删除整个分区清理，不再逐行DELETE；
+未来月份的分区由 ensure_future_partitions 从 p_future 中拆分出来。
+"""
+
+from typing import List, Dict, Any, Optional
+import logging
+from datetime import date, datetime
+from .config.database_config import (
+    PARTITIONED_TABLES_SQL, PARTITION_COLUMNS, PARTITION_MONTHS_AHEAD
+)
+
+logger = logging.getLogger(__name__)
+
+HISTORY_PARTITION = 'p_history'
+FUTURE_PARTITION = 'p_future'
+
+# 迁移时重复的 (factor_id, 日期) 以较晚写入的记录为准，覆盖这些列
+VALUE_COLUMNS = {
+    'factor_performance': ('ic_value', 'icir_value', 'annual_return', 'sharpe_ratio',
+                           'max_drawdown', 'information_ratio', 'created_date'),
+    'backtest_results': ('total_return', 'annual_return', 'volatility', 'sharpe_ratio',
+                         'max_drawdown', 'trade_count', 'win_rate', 'created_date')
+}
+
+
+def month_start(value: date) -> date:
+    """所在月份的第一天"""
+    return date(value.year, value.month, 1)
+
+
+def add_months(value: date, months: int) -> date:
+    """所在月份之后第 months 个月的第一天"""
+    index = value.year * 12 + value.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month: date) -> str:
+    """月份分区名，如 p202401"""
+    return f"p{month.year:04d}{month.month:02d}"
+
+
+def partition_definitions(first_month: date, last_month: date) -> List[str]:
+    """first_month 到 last_month（含）每月一个分区的定义"""
+    definitions = []
+    month = month_start(first_month)
+    while month <= last_month:
+        definitions.append(
+            f"PARTITION {partition_name(month)} VALUES LESS THAN ('{add_months(month, 1)}')"
+        )
+        month = add_months(month, 1)
+    return definitions
+
+
+def create_table_sql(table: str, name: str = None, first_month: date = None,
+                     months_ahead: int = None) -> str:
+    """
+    生成分区表的建表语句
+
+    Args:
+        table: 表结构名（factor_performance 或 backtest_results）
+        name: 实际创建的表名，默认与 table 相同，迁移时用于创建临时表
+        first_month: 第一个月份分区，更早的数据进入 p_history，默认当前月份
+        months_ahead: 当前月份之后预先创建的分区数，默认读取 PARTITION_MONTHS_AHEAD
+
+    Returns:
+        str: CREATE TABLE 语句
+    """
+    months_ahead = PARTITION_MONTHS_AHEAD if months_ahead is None else months_ahead
+    current = month_start(datetime.now().date())
+    first_month = month_start(first_month or current)
+    definitions = (
+        [f"PARTITION {HISTORY_PARTITION} VALUES LESS THAN ('{first_month}')"]
+        + partition_definitions(first_month, add_months(current, months_ahead))
+        + [f"PARTITION {FUTURE_PARTITION} VALUES LESS THAN (MAXVALUE)"]
+    )
+    return PARTITIONED_TABLES_SQL[table].format(
+        table=name or table, partitions=',\n            '.join(definitions)
+    )
+
+
+def _parse_bound(description: Optional[str]) -> Optional[date]:
+    """解析 information_schema 中的分区上界，MAXVALUE 返回None"""
+    if description is None or description.upper() == 'MAXVALUE':
+        return None
+    return datetime.strptime(description.strip("'"), '%Y-%m-%d').date()
+
+
+class PartitionManager:
+    """分区表维护：预建分区、按分区清理和从普通表迁移"""
+
+    def __init__(self, db, months_ahead: int = None):
+        """
+        Args:
+            db: MySQLManager
+            months_ahead: 当前月份之后保持的分区数，默认读取 PARTITION_MONTHS_AHEAD
+        """
+        self.db = db
+        self.months_ahead = PARTITION_MONTHS_AHEAD if months_ahead is None else months_ahead
+
+    def list_partitions(self, table: str) -> List[Dict[str, Any]]:
+        """
+        按顺序列出表的分区
+
+        Returns:
+            List[Dict]: 每项包含 name、upper（上界日期，MAXVALUE为None）和 rows（估计行数）
+        """
+        query = """
+        SELECT PARTITION_NAME, PARTITION_DESCRIPTION, TABLE_ROWS
+        FROM information_schema.PARTITIONS
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND PARTITION_NAME IS NOT NULL
+        ORDER BY PARTITION_ORDINAL_POSITION
+        """
+        return [
+            {'name': row[0], 'upper': _parse_bound(row[1]), 'rows': row[2] or 0}
+            for row in self.db.execute_query(query, (table,))
+        ]
+
+    def is_partitioned(self, table: str) -> bool:
+        """表是否已经是分区表"""
+        return bool(self.list_partitions(table))
+
+    def ensure_future_partitions(self, table: str, today: date = None) -> int:
+        """
+        从 p_future 中拆分出直到 当前月份+months_ahead 的月份分区
+
+        Returns:
+            int: 新建的分区数
+        """
+        partitions = self.list_partitions(table)
+        bounds = [p['upper'] for p in partitions if p['upper'] is not None]
+        if not bounds:
+            logger.warning(f"表 {table} 不是按月分区表，跳过分区维护")
+            return 0
+
+        last_month = add_months(month_start(today or datetime.now().date()), self.months_ahead)
+        definitions = partition_definitions(max(bounds), last_month)
+        if not definitions:
+            return 0
+
+        definitions.append(f"PARTITION {FUTURE_PARTITION} VALUES LESS THAN (MAXVALUE)")
+        self.db.execute_update(
+            f"ALTER TABLE {table} REORGANIZE PARTITION {FUTURE_PARTITION} INTO "
+            f"({', '.join(definitions)})"
+        )
+        logger.info(f"表 {table} 新建 {len(definitions) - 1} 个月份分区")
+        return len(definitions) - 1
+
+    def drop_before(self, table: str, cutoff_date: date) -> Dict[str, int]:
+        """
+        删除早于 cutoff_date 的数据
+
+        完全早于截止日期的分区直接删除；截止日期所在月份的分区内剩余的旧记录用DELETE删除，
+        分区裁剪保证只扫描这一个分区。
+
+        Returns:
+            Dict: partitions_dropped（删除的分区数）、rows_dropped（删除分区的估计行数）、
+                rows_deleted（DELETE删除的行数）
+        """
+        expired = [p for p in self.list_partitions(table)
+                   if p['upper'] is not None and p['upper'] <= cutoff_date]
+        if expired:
+            self.db.execute_update(
+                f"ALTER TABLE {table} DROP PARTITION {', '.join(p['name'] for p in expired)}"
+            )
+            logger.info(f"表 {table} 删除 {len(expired)} 个过期分区")
+
+        rows_deleted = self.db.execute_update(
+            f"DELETE FROM {table} WHERE {PARTITION_COLUMNS[table]} < %s", (cutoff_date,)
+        )
+        return {
+            'partitions_dropped': len(expired),
+            'rows_dropped': sum(p['rows'] for p in expired),
+            'rows_deleted': rows_deleted
+        }
+
+    def migrate(self, table: str, chunk_rows: int = 100000) -> int:
+        """
+        将普通表迁移为按月分区表
+
+        新建分区表后按ID分块复制数据，重复的 (factor_id, 日期) 保留较晚写入的值，
+        最后原子地重命名：原表改名为 {table}_legacy 保留以便回滚，分区表改名为原表名。
+        复制期间写入原表的数据不会被迁移，应在流水线停止时执行。
+
+        Args:
+            table: factor_performance 或 backtest_results
+            chunk_rows: 每次复制的ID区间长度
+
+        Returns:
+            int: 分区表中的行数（重复记录已合并）
+        """
+        if self.is_partitioned(table):
+            logger.info(f"表 {table} 已经是分区表，无需迁移")
+            return 0
+
+        column = PARTITION_COLUMNS[table]
+        new_table, legacy_table = f"{table}_partitioned", f"{table}_legacy"
+        first_date, min_id, max_id = self.db.execute_query(
+            f"SELECT MIN({column}), MIN(id), MAX(id) FROM {table}"
+        )[0]
+
+        # 上次迁移中断时残留的临时表重新创建
+        self.db.execute_update(f"DROP TABLE IF EXISTS {new_table}")
+        self.db.execute_update(create_table_sql(table, name=new_table, first_month=first_date,
+                                                months_ahead=self.months_ahead))
+
+        values = VALUE_COLUMNS[table]
+        columns = ('id', 'factor_id', column) + values
+        updates = ', '.join(f"{name} = VALUES({name})" for name in values)
+        copy_sql = (
+            f"INSERT INTO {new_table} ({', '.join(columns)}) "
+            f"SELECT {', '.join(columns)} FROM {table} WHERE id BETWEEN %s AND %s ORDER BY id "
+            f"ON DUPLICATE KEY UPDATE {updates}"
+        )
+
+        if min_id is not None:
+            for start in range(min_id, max_id + 1, chunk_rows):
+                self.db.execute_update(copy_sql, (start, start + chunk_rows - 1))
+        copied = self.db.execute_query(f"SELECT COUNT(*) FROM {new_table}")[0][0]
+
+        self.db.execute_update(
+            f"RENAME TABLE {table} TO {legacy_table}, {new_table} TO {table}"
+        )
+        logger.info(f"表 {table} 迁移为分区表完成，原表保留为 {legacy_table}")
+        return copied
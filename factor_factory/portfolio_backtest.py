@@ -0,0 +1,109 @@
+"""
+向量化组合回测
+
+根据因子的截面排名，在全市场按分位数构建组合：做多最高分位（或同时做空最低分位），
+每隔固定交易日调仓。整个回测在 日期×股票 矩阵上用NumPy计算，
+也可以一次输入 因子×日期×股票 的堆叠，同时回测多个因子。
+"""
+
+from typing import Dict
+import logging
+import numpy as np
+from .quantile_analysis import quantile_buckets, quantile_mean_returns
+
+logger = logging.getLogger(__name__)
+
+# 每年交易日数
+TRADING_DAYS_PER_YEAR = 252
+
+
+def _leg_weights(buckets: np.ndarray, quantile: int) -> np.ndarray:
+    """分位内等权，权重之和为1，分位为空时权重全为0"""
+    members = (buckets == quantile).astype(float)
+    count = members.sum(axis=-1, keepdims=True)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.where(count > 0, members / count, 0.0)
+
+
+def _max_drawdown(nav: np.ndarray) -> np.ndarray:
+    """沿最后一个轴计算最大回撤（正数）"""
+    peak = np.maximum.accumulate(nav, axis=-1)
+    return np.max(1 - nav / peak, axis=-1)
+
+
+def portfolio_backtest(factor: np.ndarray, returns: np.ndarray,
+                       n_quantiles: int = 5, long_short: bool = False,
+                       rebalance_period: int = 5, cost_rate: float = 0.0015) -> Dict[str, np.ndarray]:
+    """
+    分位数组合回测
+
+    在调仓日按因子值构建目标权重并持有到下一个调仓日，持有期内权重不随价格漂移。
+    停牌等收益率缺失的股票当日收益按0计。
+
+    Args:
+        factor: 因子值，形状 (..., 日期, 股票)，第t行为t日收盘后可得的因子值
+        returns: 远期收益率 (日期, 股票)，第t行为t日收盘到t+1日收盘的收益率
+        n_quantiles: 分位数个数
+        long_short: True 时做多最高分位、做空最低分位（各占100%资金），否则只做多最高分位
+        rebalance_period: 调仓间隔（交易日）
+        cost_rate: 单边交易成本率，按换手率扣除
+
+    Returns:
+        Dict: daily_returns（扣费后日收益, (..., 日期)）、nav（净值）、
+            total_return、annual_return、volatility、sharpe_ratio、max_drawdown、win_rate、
+            turnover（平均单次调仓换手率）、total_cost（累计成本）、trade_count（买卖次数）、
+            quantile_returns（各分位日均收益, (..., 分位)）、quantile_annual_returns（各分位年化收益）
+    """
+    factor = np.asarray(factor, dtype=float)
+    returns = np.asarray(returns, dtype=float)
+    n_dates = factor.shape[-2]
+    buckets = quantile_buckets(factor, n_quantiles)
+
+    target = _leg_weights(buckets, n_quantiles - 1)
+    if long_short:
+        target = target - _leg_weights(buckets, 0)
+
+    # 调仓日的目标权重向后填充到持有期
+    rebalance_rows = np.arange(0, n_dates, rebalance_period)
+    held = target[..., (np.arange(n_dates) // rebalance_period) * rebalance_period, :]
+
+    # 调仓换手率：相对上一期目标权重的变化，首次建仓相对空仓
+    rebalance_weights = target[..., rebalance_rows, :]
+    previous = np.concatenate(
+        [np.zeros_like(rebalance_weights[..., :1, :]), rebalance_weights[..., :-1, :]], axis=-2
+    )
+    changes = np.abs(rebalance_weights - previous)
+    turnover = changes.sum(axis=-1)
+    costs = np.zeros(factor.shape[:-1])
+    costs[..., rebalance_rows] = turnover * cost_rate
+
+    safe_returns = np.nan_to_num(returns, nan=0.0)
+    daily_returns = (held * safe_returns).sum(axis=-1) - costs
+    nav = np.cumprod(1 + daily_returns, axis=-1)
+
+    total_return = nav[..., -1] - 1
+    years = n_dates / TRADING_DAYS_PER_YEAR
+    with np.errstate(invalid='ignore', divide='ignore'):
+        annual_return = np.where(nav[..., -1] > 0, nav[..., -1] ** (1 / years) - 1, -1.0)
+        volatility = daily_returns.std(axis=-1) * np.sqrt(TRADING_DAYS_PER_YEAR)
+        sharpe_ratio = np.where(volatility > 0,
+                                daily_returns.mean(axis=-1) * TRADING_DAYS_PER_YEAR / volatility, 0.0)
+
+    # 各分位等权日收益，分位按当日因子值划分
+    quantile_returns = quantile_mean_returns(buckets, returns, n_quantiles)
+
+    return {
+        'daily_returns': daily_returns,
+        'nav': nav,
+        'total_return': total_return,
+        'annual_return': annual_return,
+        'volatility': volatility,
+        'sharpe_ratio': sharpe_ratio,
+        'max_drawdown': _max_drawdown(nav),
+        'win_rate': (daily_returns > 0).sum(axis=-1) / n_dates,
+        'turnover': turnover.mean(axis=-1),
+        'total_cost': costs.sum(axis=-1),
+        'trade_count': (changes > 1e-12).sum(axis=(-2, -1)),
+        'quantile_returns': quantile_returns,
+        'quantile_annual_returns': (1 + quantile_returns) ** TRADING_DAYS_PER_YEAR - 1
+    }
@@ -0,0 +1,158 @@
+"""
+分位数收益分析
+
+对 因子×日期×股票 的因子堆叠一次性计算：
+各持有期下每个分位的平均远期收益、多空价差、分位收益单调性、
+因子截面排名的一阶自相关以及最高分位的换手率。
+"""
+
+from typing import Dict, Optional, Sequence
+import logging
+import numpy as np
+from .ic_evaluator import cross_sectional_rank, rank_ic, forward_returns_from_close
+
+logger = logging.getLogger(__name__)
+
+
+def quantile_buckets(factor: np.ndarray, n_quantiles: int) -> np.ndarray:
+    """
+    按截面排名划分分位数
+
+    Args:
+        factor: 因子值，形状 (..., 日期, 股票)
+        n_quantiles: 分位数个数
+
+    Returns:
+        np.ndarray: 分位编号（0为因子值最小的分位），缺失值为-1
+    """
+    ranks = cross_sectional_rank(factor)
+    count = np.isfinite(ranks).sum(axis=-1, keepdims=True)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        buckets = np.floor((ranks - 1) * n_quantiles / count)
+    buckets = np.clip(np.nan_to_num(buckets, nan=-1), -1, n_quantiles - 1)
+    return buckets.astype(int)
+
+
+def quantile_mean_returns(buckets: np.ndarray, returns: np.ndarray,
+                          n_quantiles: int) -> np.ndarray:
+    """
+    计算各分位的等权平均收益（先按日期求截面均值，再按日期平均）
+
+    Args:
+        buckets: 分位编号 (..., 日期, 股票)，-1表示缺失
+        returns: 远期收益率 (日期, 股票)
+        n_quantiles: 分位数个数
+
+    Returns:
+        np.ndarray: 各分位平均收益，形状 (..., 分位)，没有有效数据的分位为NaN
+    """
+    valid = np.isfinite(returns)
+    safe_returns = np.where(valid, returns, 0.0)
+    means = []
+    for quantile in range(n_quantiles):
+        members = (buckets == quantile) & valid
+        count = members.sum(axis=-1)
+        total = np.where(members, safe_returns, 0.0).sum(axis=-1)
+        days = (count > 0).sum(axis=-1)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            daily = np.where(count > 0, total / np.maximum(count, 1), 0.0)
+            means.append(np.where(days > 0, daily.sum(axis=-1) / days, np.nan))
+    return np.stack(means, axis=-1)
+
+
+def monotonicity(quantile_returns: np.ndarray) -> np.ndarray:
+    """
+    分位编号与分位收益的Spearman相关系数，1表示收益随分位严格递增
+
+    Args:
+        quantile_returns: 各分位平均收益 (..., 分位)
+
+    Returns:
+        np.ndarray: 单调性，形状 (...)，有效分位少于2个时为NaN
+    """
+    quantile_returns = np.asarray(quantile_returns, dtype=float)
+    quantiles = np.arange(quantile_returns.shape[-1], dtype=float)
+    # 增加一个日期轴，使单个因子的结果也是数组
+    return rank_ic(quantiles, quantile_returns[..., None, :], min_stocks=2)[..., 0]
+
+
+def rank_autocorrelation(factor: np.ndarray) -> np.ndarray:
+    """
+    因子截面排名的一阶自相关（相邻两日Rank IC的均值）
+
+    Args:
+        factor: 因子值 (..., 日期, 股票)
+
+    Returns:
+        np.ndarray: 自相关，形状 (...)
+    """
+    factor = np.asarray(factor, dtype=float)
+    if factor.shape[-2] < 2:
+        return np.full(factor.shape[:-2], np.nan)
+    with np.errstate(invalid='ignore'):
+        return np.nanmean(rank_ic(factor[..., 1:, :], factor[..., :-1, :]), axis=-1)
+
+
+def top_quantile_turnover(buckets: np.ndarray, n_quantiles: int) -> np.ndarray:
+    """
+    最高分位的平均换手率：当日最高分位中前一日不在最高分位的股票占比
+
+    Args:
+        buckets: 分位编号 (..., 日期, 股票)
+        n_quantiles: 分位数个数
+
+    Returns:
+        np.ndarray: 换手率，形状 (...)
+    """
+    top = buckets == n_quantiles - 1
+    if top.shape[-2] < 2:
+        return np.full(top.shape[:-2], np.nan)
+    current, previous = top[..., 1:, :], top[..., :-1, :]
+    count = current.sum(axis=-1)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        daily = (current & ~previous).sum(axis=-1) / count
+    daily[count == 0] = np.nan
+    with np.errstate(invalid='ignore'):
+        return np.nanmean(daily, axis=-1)
+
+
+def analyze_quantiles(factor: np.ndarray, close: np.ndarray,
+                      horizons: Sequence[int] = (1, 5, 10),
+                      n_quantiles: int = 10,
+                      forward_returns: Optional[Dict[int, np.ndarray]] = None) -> Dict[str, np.ndarray]:
+    """
+    批量分位数分析
+
+    Args:
+        factor: 因子矩阵 (日期, 股票) 或因子堆叠 (因子, 日期, 股票)
+        close: 收盘价矩阵 (日期, 股票)
+        horizons: 远期收益持有期（交易日数）
+        n_quantiles: 分位数个数
+        forward_returns: 已计算的 {持有期: 远期收益率矩阵}，缺少的持有期由收盘价计算
+
+    Returns:
+        Dict: quantile_returns（{持有期: (..., 分位)}）、spread（{持有期: 最高分位减最低分位}）、
+            monotonicity（{持有期: 单调性}）、autocorrelation、top_turnover
+    """
+    factor = np.asarray(factor, dtype=float)
+    buckets = quantile_buckets(factor, n_quantiles)
+
+    forward_returns = forward_returns or {}
+
+    quantile_returns, spread, monotonic = {}, {}, {}
+    for horizon in horizons:
+        horizon_returns = forward_returns.get(horizon)
+        if horizon_returns is None:
+            horizon_returns = forward_returns_from_close(close, horizon)
+        returns = quantile_mean_returns(buckets, horizon_returns, n_quantiles)
+        quantile_returns[horizon] = returns
+        spread[horizon] = returns[..., -1] - returns[..., 0]
+        monotonic[horizon] = monotonicity(returns)
+
+    return {
+        'quantile_returns': quantile_returns,
+        'spread': spread,
+        'monotonicity': monotonic,
+        'autocorrelation': rank_autocorrelation(factor),
+        'top_turnover': top_quantile_turnover(buckets, n_quantiles)
+    }
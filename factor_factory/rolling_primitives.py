@@ -0,0 +1,245 @@
+"""
+向量化滚动指标内核
+
+在 日期×股票 矩阵上一次计算所有股票的 MA/STD/HHV/LLV/REF/EMA，
+替代逐只股票创建hikyuu指标对象：
+
+- MA/STD 基于前缀和，每个元素O(1)；同一输入的前缀和只计算一次，
+  参数扫描中不同窗口的同类指标只需两次矩阵相减。
+- HHV/LLV 采用分块前缀/后缀极值（van Herk/Gil-Werman）算法，
+  与单调队列同为每个元素O(1)，但可在整个矩阵上向量化。
+- 序列开头的处理与hikyuu一致：前导缺失值视为预热期；
+  MA/HHV/LLV 在不足一个窗口时按已有数据计算，STD 需要完整窗口，REF 前 n 行为NaN。
+- 传入交易日标记时，每只股票先按交易日压缩再计算，窗口跳过停牌日，
+  结果写回交易日所在的行，停牌日为NaN，与hikyuu按股票K线计算的结果对齐。
+
+预热期之后窗口内出现缺失值时结果为NaN。
+"""
+
+from typing import Callable, Dict, Optional, Tuple
+import logging
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+def _as_matrix(values) -> np.ndarray:
+    return np.asarray(values, dtype=float)
+
+
+def first_valid_rows(values: np.ndarray) -> np.ndarray:
+    """每列第一个有效值所在的行，全部缺失时为行数"""
+    finite = np.isfinite(values)
+    return np.where(finite.any(axis=0), finite.argmax(axis=0), values.shape[0])
+
+
+def prefix_sums(values: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """
+    沿日期轴的前缀和，首行补0，使区间 [a, b) 的和为 s[b] - s[a]
+
+    Returns:
+        Tuple: (前缀和, 平方前缀和, 有效值计数前缀和, 每列第一个有效值所在的行)
+    """
+    values = _as_matrix(values)
+    valid = np.isfinite(values)
+    safe = np.where(valid, values, 0.0)
+    zeros = np.zeros((1,) + values.shape[1:])
+    return (
+        np.concatenate([zeros, np.cumsum(safe, axis=0)]),
+        np.concatenate([zeros, np.cumsum(safe * safe, axis=0)]),
+        np.concatenate([zeros, np.cumsum(valid, axis=0)]),
+        first_valid_rows(values)
+    )
+
+
+def _window_bounds(rows: int, window: int, start: np.ndarray, partial: bool):
+    """
+    每行窗口的起始行（含）和窗口是否可计算
+
+    partial 为True时窗口在第一个有效值处截断，否则需要完整窗口
+    """
+    end = np.arange(rows)[:, None]
+    lower = end - window + 1
+    if partial:
+        lower = np.maximum(lower, start[None, :])
+        usable = end >= start[None, :]
+    else:
+        usable = lower >= start[None, :]
+    return np.clip(lower, 0, rows), usable
+
+
+def rolling_mean(values: np.ndarray, window: int, prefix=None) -> np.ndarray:
+    """
+    滚动均值，开头不足一个窗口时按已有数据计算
+
+    Args:
+        values: 日期×股票 矩阵
+        window: 窗口长度
+        prefix: 已计算的 prefix_sums(values)，用于多个窗口复用
+    """
+    total, _, counts, start = prefix if prefix is not None else prefix_sums(values)
+    rows = total.shape[0] - 1
+    window = int(window)
+    lower, usable = _window_bounds(rows, window, start, partial=True)
+    upper = np.arange(1, rows + 1)[:, None]
+    width = upper - lower
+    window_total = total[1:] - np.take_along_axis(total, lower, axis=0)
+    window_count = counts[1:] - np.take_along_axis(counts, lower, axis=0)
+    complete = usable & (window_count == width)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.where(complete, window_total / np.maximum(width, 1), np.nan)
+
+
+def rolling_std(values: np.ndarray, window: int, prefix=None) -> np.ndarray:
+    """滚动样本标准差，需要完整窗口"""
+    total, squares, counts, start = prefix if prefix is not None else prefix_sums(values)
+    rows = total.shape[0] - 1
+    window = int(window)
+    if window < 2:
+        return np.full((rows,) + total.shape[1:], np.nan)
+    lower, usable = _window_bounds(rows, window, start, partial=False)
+    window_total = total[1:] - np.take_along_axis(total, lower, axis=0)
+    window_squares = squares[1:] - np.take_along_axis(squares, lower, axis=0)
+    window_count = counts[1:] - np.take_along_axis(counts, lower, axis=0)
+    complete = usable & (window_count == window)
+    with np.errstate(invalid='ignore'):
+        variance = (window_squares - window_total ** 2 / window) / (window - 1)
+    return np.where(complete, np.sqrt(np.maximum(variance, 0.0)), np.nan)
+
+
+def _rolling_extreme(values: np.ndarray, window: int, ufunc, fill: float) -> np.ndarray:
+    """
+    分块前缀/后缀极值算法
+
+    序列前补 window-1 行并按 window 分块，块内分别计算前缀极值 g 和后缀极值 h，
+    以第 j 行结尾的窗口跨越至多两个块，极值为 ufunc(h[j-window+1], g[j])。
+    前导缺失值和补齐行取 fill（对极大值为-inf），使开头的窗口按已有数据计算；
+    其余缺失值经 ufunc 传播，窗口内有缺失值时结果为NaN。
+    """
+    values = _as_matrix(values)
+    rows = values.shape[0]
+    window = max(int(window), 1)
+    start = first_valid_rows(values)
+    leading = np.arange(rows)[:, None] < start[None, :]
+
+    blocks = -(-(rows + window - 1) // window)
+    padded = np.full((blocks * window,) + values.shape[1:], fill)
+    padded[window - 1:window - 1 + rows] = np.where(leading, fill, values)
+
+    shaped = padded.reshape((blocks, window) + values.shape[1:])
+    prefix = ufunc.accumulate(shaped, axis=1).reshape(padded.shape)
+    suffix = np.flip(ufunc.accumulate(np.flip(shaped, axis=1), axis=1), axis=1).reshape(padded.shape)
+
+    result = ufunc(suffix[:rows], prefix[window - 1:window - 1 + rows])
+    return np.where(leading, np.nan, result)
+
+
+def rolling_max(values: np.ndarray, window: int) -> np.ndarray:
+    """窗口最高值（HHV），开头不足一个窗口时按已有数据计算"""
+    return _rolling_extreme(values, window, np.maximum, -np.inf)
+
+
+def rolling_min(values: np.ndarray, window: int) -> np.ndarray:
+    """窗口最低值（LLV），开头不足一个窗口时按已有数据计算"""
+    return _rolling_extreme(values, window, np.minimum, np.inf)
+
+
+def shift(values: np.ndarray, periods: int) -> np.ndarray:
+    """向前引用 periods 行的值（REF）"""
+    values = _as_matrix(values)
+    result = np.full(values.shape, np.nan)
+    periods = int(periods)
+    if periods < values.shape[0]:
+        result[periods:] = values[:values.shape[0] - periods]
+    return result
+
+
+def ema(values: np.ndarray, window: int = 22) -> np.ndarray:
+    """指数移动平均，每只股票从第一个有效值开始递推"""
+    values = _as_matrix(values)
+    alpha = 2.0 / (window + 1)
+    result = np.full(values.shape, np.nan)
+    previous = np.full(values.shape[1:], np.nan)
+    for row in range(values.shape[0]):
+        current = values[row]
+        previous = np.where(np.isnan(previous), current,
+                            alpha * current + (1 - alpha) * previous)
+        result[row] = previous
+    return result
+
+
+def _log(values: np.ndarray) -> np.ndarray:
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.log(values)
+
+
+def _sqrt(values: np.ndarray) -> np.ndarray:
+    with np.errstate(invalid='ignore'):
+        return np.sqrt(values)
+
+
+class RollingPrimitives:
+    """
+    表达式执行使用的向量化函数集
+
+    缓存每个输入矩阵的前缀和；给定交易日标记时按股票压缩交易日后计算。
+    """
+
+    def __init__(self, valid: Optional[np.ndarray] = None):
+        """
+        Args:
+            valid: 日期×股票 的交易日标记（通常为收盘价有效），None表示按日历行计算
+        """
+        self.valid = None if valid is None else np.asarray(valid, dtype=bool)
+        # 稳定排序把每列的交易日移到前部，保持原有先后顺序
+        self._order = None if valid is None else np.argsort(~self.valid, axis=0, kind='stable')
+        # 输入矩阵的 id 到 (输入矩阵, 前缀和)，同时持有输入矩阵的引用，避免 id 被复用后误用缓存
+        self._prefix: Dict[int, tuple] = {}
+
+    @property
+    def functions(self) -> Dict[str, Callable]:
+        """函数名到向量化实现的映射"""
+        return {
+            'MA': self.ma, 'STD': self.std, 'EMA': self.ema, 'REF': self.ref,
+            'HHV': self.hhv, 'LLV': self.llv,
+            'ABS': np.abs, 'LOG': _log, 'SQRT': _sqrt
+        }
+
+    def _compact(self, values) -> np.ndarray:
+        values = _as_matrix(values)
+        if self._order is None:
+            return values
+        return np.take_along_axis(np.broadcast_to(values, self.valid.shape), self._order, axis=0)
+
+    def _expand(self, result: np.ndarray) -> np.ndarray:
+        if self._order is None:
+            return result
+        expanded = np.empty(result.shape)
+        np.put_along_axis(expanded, self._order, result, axis=0)
+        expanded[~self.valid] = np.nan
+        return expanded
+
+    def _prefix_sums(self, values):
+        entry = self._prefix.get(id(values))
+        if entry is None or entry[0] is not values:
+            entry = (values, prefix_sums(self._compact(values)))
+            self._prefix[id(values)] = entry
+        return entry[1]
+
+    def ma(self, values: np.ndarray, window: int = 22) -> np.ndarray:
+        return self._expand(rolling_mean(None, window, self._prefix_sums(values)))
+
+    def std(self, values: np.ndarray, window: int = 10) -> np.ndarray:
+        return self._expand(rolling_std(None, window, self._prefix_sums(values)))
+
+    def hhv(self, values: np.ndarray, window: int = 20) -> np.ndarray:
+        return self._expand(rolling_max(self._compact(values), window))
+
+    def llv(self, values: np.ndarray, window: int = 20) -> np.ndarray:
+        return self._expand(rolling_min(self._compact(values), window))
+
+    def ref(self, values: np.ndarray, periods: int) -> np.ndarray:
+        return self._expand(shift(self._compact(values), periods))
+
+    def ema(self, values: np.ndarray, window: int = 22) -> np.ndarray:
+        return self._expand(ema(self._compact(values), window))
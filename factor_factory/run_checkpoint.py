@@ -0,0 +1,110 @@
+"""
+评估运行检查点
+
+每次评估运行有一个运行ID，记录在 evaluation_runs 表中；
+每批因子的结果保存后，把这些因子ID写入 evaluation_run_factors。
+运行中断后（进程崩溃、内存不足或数据库故障），同一天再次运行时
+找到未完成的运行并跳过已记录的因子，只评估剩余部分。
+"""
+
+from typing import Iterable, Set, Tuple
+import logging
+import uuid
+from datetime import date
+from .config.evaluation_config import EVALUATION_CONFIG
+
+logger = logging.getLogger(__name__)
+
+
+class RunCheckpoint:
+    """基于数据库的评估运行检查点"""
+
+    def __init__(self, db):
+        """
+        Args:
+            db: MySQLManager
+        """
+        self.db = db
+
+    def start(self, run_type: str, run_date: date, total_factors: int = 0) -> Tuple[str, Set[int]]:
+        """
+        开始或恢复一次运行
+
+        同一类型同一日期存在未完成的运行时恢复该运行，否则新建运行；
+        更早日期遗留的未完成运行标记为 abandoned，不再恢复。
+
+        Args:
+            run_type: 运行类型，如 daily_evaluation
+            run_date: 运行日期
+            total_factors: 本次需要评估的因子总数
+
+        Returns:
+            Tuple: (运行ID, 已完成的因子ID集合)
+        """
+        self.db.execute_update(
+            "UPDATE evaluation_runs SET status = 'abandoned' "
+            "WHERE run_type = %s AND run_date < %s AND status = 'running'",
+            (run_type, run_date)
+        )
+
+        rows = self.db.execute_query(
+            "SELECT run_id FROM evaluation_runs "
+            "WHERE run_type = %s AND run_date = %s AND status = 'running' "
+            "ORDER BY started_at DESC LIMIT 1",
+            (run_type, run_date)
+        )
+        if rows:
+            run_id = rows[0][0]
+            completed = self.completed_factors(run_id)
+            logger.info(f"恢复评估运行 {run_id}: 已完成 {len(completed)} 个因子")
+            return run_id, completed
+
+        run_id = f"{run_type}-{run_date:%Y%m%d}-{uuid.uuid4().hex[:8]}"
+        self.db.execute_update(
+            "INSERT INTO evaluation_runs (run_id, run_type, run_date, total_factors) "
+            "VALUES (%s, %s, %s, %s)",
+            (run_id, run_type, run_date, total_factors)
+        )
+        logger.info(f"开始评估运行 {run_id}: {total_factors} 个因子")
+        return run_id, set()
+
+    def completed_factors(self, run_id: str) -> Set[int]:
+        """运行中已记录完成的因子ID"""
+        rows = self.db.execute_query(
+            "SELECT factor_id FROM evaluation_run_factors WHERE run_id = %s", (run_id,)
+        )
+        return {row[0] for row in rows}
+
+    def mark_completed(self, run_id: str, factor_ids: Iterable[int],
+                       chunk_size: int = None) -> int:
+        """
+        记录已完成的因子，重复记录会被忽略
+
+        Returns:
+            int: 成功记录的因子数
+        """
+        rows = [(run_id, factor_id) for factor_id in factor_ids]
+        if not rows:
+            return 0
+        chunk_size = chunk_size or EVALUATION_CONFIG['persist_chunk_size']
+        failures = self.db.execute_batch(
+            "INSERT IGNORE INTO evaluation_run_factors (run_id, factor_id) VALUES (%s, %s)",
+            rows, chunk_size
+        )
+        for index, error in failures:
+            logger.warning(f"检查点记录失败: 运行 {run_id}, 因子ID {rows[index][1]}, 错误: {error}")
+        return len(rows) - len(failures)
+
+    def finish(self, run_id: str) -> None:
+        """标记运行完成，之后同一天再次运行会新建运行"""
+        self.db.execute_update(
+            "UPDATE evaluation_runs SET status = 'completed', finished_at = NOW() WHERE run_id = %s",
+            (run_id,)
+        )
+        logger.info(f"评估运行完成: {run_id}")
+
+    def purge_before(self, cutoff_date: date) -> int:
+        """删除早于截止日期的运行记录，因子完成记录随外键级联删除"""
+        return self.db.execute_update(
+            "DELETE FROM evaluation_runs WHERE run_date < %s", (cutoff_date,)
+        )
@@ -0,0 +1,178 @@
+"""
+A股股票池
+
+每个交易日只遍历一次StockManager构建A股列表，并预先建立按市场、板块、
+上市日期和有效性的索引。同一天内的筛选请求直接读取索引或缓存结果，
+日期变化后自动重建。
+"""
+
+from typing import List, Dict, Optional, Tuple, Any
+import bisect
+import logging
+from datetime import date
+from .kline_store import datetime_to_int
+
+logger = logging.getLogger(__name__)
+
+# 板块名称
+BOARD_MAIN = 'main'        # 沪深主板
+BOARD_CHINEXT = 'chinext'  # 创业板
+BOARD_STAR = 'star'        # 科创板
+BOARD_BSE = 'bse'          # 北交所
+
+# 代码前缀到板块的映射，按市场区分
+_BOARD_PREFIXES = {
+    'SH': ((('688', '689'), BOARD_STAR), (('60',), BOARD_MAIN)),
+    'SZ': ((('300', '301'), BOARD_CHINEXT), (('00',), BOARD_MAIN)),
+}
+
+
+def classify_board(market: str, code: str) -> Optional[str]:
+    """
+    根据市场和股票代码判断所属板块
+
+    Args:
+        market: 市场简称，如 'SH'、'SZ'、'BJ'
+        code: 股票代码，如 '600000'
+
+    Returns:
+        Optional[str]: 板块名称，无法识别时为None
+    """
+    market = market.upper()
+    if market == 'BJ':
+        return BOARD_BSE
+    for prefixes, board in _BOARD_PREFIXES.get(market, ()):
+        if code.startswith(prefixes):
+            return board
+    return None
+
+
+class StockUniverse:
+    """按交易日缓存的A股股票池"""
+
+    def __init__(self, stock_manager=None):
+        """
+        Args:
+            stock_manager: hikyuu StockManager，默认使用 StockManager.instance()
+        """
+        self._sm = stock_manager
+        self._build_date: Optional[date] = None
+        self._stocks: List[Any] = []
+        self._by_code: Dict[str, Any] = {}
+        self._by_market: Dict[str, List[Any]] = {}
+        self._by_board: Dict[str, List[Any]] = {}
+        self._valid: List[Any] = []
+        # 按上市日期升序排列的 (YYYYMMDD, 股票)，用于二分查找
+        self._listing_dates: List[int] = []
+        self._by_listing: List[Any] = []
+        self._query_cache: Dict[Tuple, List[Any]] = {}
+
+    def _is_a_share(self, stock) -> bool:
+        """判断是否为A股（含北交所）"""
+        from hikyuu import constant
+
+        return stock.type in (constant.STOCKTYPE_A, constant.STOCKTYPE_A_BJ)
+
+    def refresh(self, force: bool = False) -> None:
+        """
+        当日尚未构建或 force 为True时重建股票池和索引
+
+        Args:
+            force: 是否强制重建
+        """
+        today = date.today()
+        if not force and self._build_date == today:
+            return
+
+        if self._sm is None:
+            from hikyuu import StockManager
+            self._sm = StockManager.instance()
+
+        stocks = [stock for stock in self._sm
+                  if not stock.is_null() and self._is_a_share(stock)]
+
+        by_market: Dict[str, List[Any]] = {}
+        by_board: Dict[str, List[Any]] = {}
+        listed = []
+        for stock in stocks:
+            market = stock.market.upper()
+            by_market.setdefault(market, []).append(stock)
+            board = classify_board(market, stock.code)
+            if board is not None:
+                by_board.setdefault(board, []).append(stock)
+            try:
+                listed.append((datetime_to_int(stock.start_datetime), len(listed), stock))
+            except Exception:
+                # 上市日期未知的股票不参与按上市日期筛选
+                continue
+        listed.sort(key=lambda item: item[:2])
+
+        self._stocks = stocks
+        self._by_code = {stock.market_code.lower(): stock for stock in stocks}
+        self._by_market = by_market
+        self._by_board = by_board
+        self._valid = [stock for stock in stocks if stock.valid]
+        self._listing_dates = [item[0] for item in listed]
+        self._by_listing = [item[2] for item in listed]
+        self._query_cache = {}
+        self._build_date = today
+        logger.info(f"A股股票池构建完成: {len(stocks)} 只, 有效 {len(self._valid)} 只")
+
+    def get_stocks(self, market: str = None, board: str = None,
+                   listed_before: int = None, valid_only: bool = True) -> List[Any]:
+        """
+        获取筛选后的A股列表
+
+        相同筛选条件的结果在当日内缓存，无筛选条件时直接返回预建索引。
+        返回的列表为共享缓存，调用方不应修改。
+
+        Args:
+            market: 市场简称，如 'SH'、'SZ'、'BJ'
+            board: 板块名称，见 BOARD_* 常量
+            listed_before: 只保留在该日期（YYYYMMDD整数，含当日）及之前上市的股票
+            valid_only: 是否只返回有效（未退市）股票
+
+        Returns:
+            List[Stock]: 股票列表，顺序与StockManager遍历顺序一致
+        """
+        self.refresh()
+
+        if market is None and board is None and listed_before is None:
+            return self._valid if valid_only else self._stocks
+
+        key = (market.upper() if market else None, board, listed_before, valid_only)
+        cached = self._query_cache.get(key)
+        if cached is not None:
+            return cached
+
+        # 从最小的候选集合出发，再用其他条件过滤
+        candidates = [self._valid if valid_only else self._stocks]
+        if key[0] is not None:
+            candidates.append(self._by_market.get(key[0], []))
+        if board is not None:
+            candidates.append(self._by_board.get(board, []))
+        if listed_before is not None:
+            end = bisect.bisect_right(self._listing_dates, listed_before)
+            candidates.append(self._by_listing[:end])
+
+        smallest = min(candidates, key=len)
+        others = [{id(stock) for stock in candidate}
+                  for candidate in candidates if candidate is not smallest]
+        order = {id(stock): index for index, stock in enumerate(self._stocks)}
+        result = sorted(
+            (stock for stock in smallest if all(id(stock) in ids for ids in others)),
+            key=lambda stock: order[id(stock)]
+        )
+        self._query_cache[key] = result
+        return result
+
+    def get_stock(self, market_code: str) -> Optional[Any]:
+        """
+        按市场代码（如 'sz000001'）查找A股，不存在时返回None
+        """
+        self.refresh()
+        return self._by_code.get(market_code.lower())
+
+    def __len__(self) -> int:
+        self.refresh()
+        return len(self._valid)
@@ -0,0 +1,279 @@
+#!/usr/bin/env python3
+"""
+异步MySQL管理器单元测试
+
+使用基于sqlite3的连接池替身，接口与aiomysql连接池一致，SQL占位符 %s 转换为 ?。
+"""
+
+import unittest
+from unittest.mock import patch
+import asyncio
+import sqlite3
+import sys
+import os
+from datetime import date
+
+# 添加项目根目录到路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from factor_factory.async_mysql_manager import AsyncMySQLManager
+from factor_factory.async_factor_registry import AsyncFactorRegistry
+
+
+class FakeCursor:
+    """aiomysql游标替身"""
+
+    def __init__(self, connection):
+        self._cursor = connection.cursor()
+        self.lastrowid = None
+        self.rowcount = -1
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        self._cursor.close()
+
+    async def execute(self, query, params=()):
+        self._cursor.execute(query.replace('%s', '?'), params)
+        self.lastrowid, self.rowcount = self._cursor.lastrowid, self._cursor.rowcount
+
+    async def executemany(self, query, params_list):
+        self._cursor.executemany(query.replace('%s', '?'), params_list)
+        self.rowcount = self._cursor.rowcount
+
+    async def fetchall(self):
+        return self._cursor.fetchall()
+
+
+class FakeConnection:
+    """aiomysql连接替身"""
+
+    def __init__(self, connection):
+        self._connection = connection
+
+    def cursor(self):
+        return FakeCursor(self._connection)
+
+    async def begin(self):
+        self._connection.execute('BEGIN')
+
+    async def commit(self):
+        self._connection.commit()
+
+    async def rollback(self):
+        self._connection.rollback()
+
+
+class FakePool:
+    """aiomysql连接池替身，所有连接共享同一个sqlite内存数据库"""
+
+    def __init__(self):
+        self._connection = sqlite3.connect(':memory:', isolation_level=None)
+        self._connection.executescript("""
+            CREATE TABLE factors (
+                id INTEGER PRIMARY KEY AUTOINCREMENT, name TEXT UNIQUE, expression TEXT,
+                category TEXT, created_date TEXT DEFAULT CURRENT_TIMESTAMP,
+                status TEXT DEFAULT 'testing', description TEXT
+            );
+            CREATE TABLE factor_performance (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                factor_id INTEGER NOT NULL REFERENCES factors(id),
+                evaluation_date TEXT, ic_value REAL, icir_value REAL, annual_return REAL,
+                sharpe_ratio REAL, max_drawdown REAL, information_ratio REAL,
+                UNIQUE (factor_id, evaluation_date)
+            );
+        """)
+        self.closed = False
+
+    def acquire(self):
+        pool = self
+
+        class _Acquire:
+            async def __aenter__(self):
+                return FakeConnection(pool._connection)
+
+            async def __aexit__(self, *exc):
+                return False
+
+        return _Acquire()
+
+    def close(self):
+        self.closed = True
+
+    async def wait_closed(self):
+        self._connection.close()
+
+
+def patch_error(test_case):
+    """替身抛出sqlite3异常，让管理器按数据库错误处理"""
+    patcher = patch('factor_factory.async_mysql_manager.Error', sqlite3.Error)
+    patcher.start()
+    test_case.addCleanup(patcher.stop)
+
+
+def run(coroutine):
+    """运行协程"""
+    return asyncio.run(coroutine)
+
+
+class TestAsyncMySQLManager(unittest.TestCase):
+    """异步MySQL管理器测试类"""
+
+    def setUp(self):
+        """测试前准备"""
+        patch_error(self)
+        self.pool = FakePool()
+        self.manager = AsyncMySQLManager(pool=self.pool)
+
+    def test_insert_and_query(self):
+        """测试插入、查询和更新"""
+        async def scenario():
+            factor_id = await self.manager.execute_insert(
+                "INSERT INTO factors (name, expression) VALUES (%s, %s)", ('ma', 'MA(CLOSE(), 5)')
+            )
+            updated = await self.manager.execute_update(
+                "UPDATE factors SET status = %s WHERE id = %s", ('active', factor_id)
+            )
+            rows = await self.manager.execute_query("SELECT name, status FROM factors")
+            return factor_id, updated, rows, await self.manager.get_factor_count()
+
+        factor_id, updated, rows, count = run(scenario())
+
+        self.assertEqual(factor_id, 1)
+        self.assertEqual(updated, 1)
+        self.assertEqual(rows, [('ma', 'active')])
+        self.assertEqual(count, 1)
+
+    def test_concurrent_queries(self):
+        """测试并发查询共享连接池"""
+        async def scenario():
+            await self.manager.execute_many(
+                "INSERT INTO factors (name, expression) VALUES (%s, %s)",
+                [(f'f{i}', 'CLOSE()') for i in range(5)]
+            )
+            return await asyncio.gather(*[
+                self.manager.execute_query("SELECT name FROM factors WHERE id = %s", (i,))
+                for i in range(1, 6)
+            ])
+
+        results = run(scenario())
+        self.assertEqual([rows[0][0] for rows in results], [f'f{i}' for i in range(5)])
+
+    def test_execute_batch_reports_failed_rows(self):
+        """测试批量执行时失败行被跳过并报告"""
+        async def scenario():
+            await self.manager.execute_insert(
+                "INSERT INTO factors (name, expression) VALUES (%s, %s)", ('dup', 'CLOSE()')
+            )
+            failures = await self.manager.execute_batch(
+                "INSERT INTO factors (name, expression) VALUES (%s, %s)",
+                [('a', 'CLOSE()'), ('dup', 'CLOSE()'), ('b', 'CLOSE()')], chunk_size=2
+            )
+            return failures, await self.manager.get_factor_count()
+
+        failures, count = run(scenario())
+
+        self.assertEqual([index for index, _ in failures], [1])
+        self.assertEqual(count, 3)
+
+    def test_report_aggregations(self):
+        """测试状态计数和绩效汇总各一次查询完成"""
+        async def scenario():
+            await self.manager.execute_many(
+                "INSERT INTO factors (name, expression, status) VALUES (%s, %s, %s)",
+                [('a', 'CLOSE()', 'active'), ('b', 'OPEN()', 'active'),
+                 ('c', 'VOL()', 'testing'), ('d', 'AMO()', 'active')]
+            )
+            await self.manager.execute_many(
+                "INSERT INTO factor_performance (factor_id, evaluation_date, ic_value, icir_value) "
+                "VALUES (%s, %s, %s, %s)",
+                [(1, '2024-01-02', 0.02, 0.2), (1, '2024-01-03', 0.04, None),
+                 (2, '2024-01-02', 0.06, 0.4), (3, '2024-01-02', 0.50, 5.0)]
+            )
+            return (await self.manager.get_factor_status_counts(),
+                    await self.manager.get_performance_summary('active'),
+                    await self.manager.get_performance_summary('inactive'))
+
+        counts, summary, empty = run(scenario())
+
+        self.assertEqual(counts, {'active': 3, 'testing': 1})
+        # 因子1平均IC 0.03，因子2为0.06；没有绩效记录的因子4不参与平均
+        self.assertAlmostEqual(summary['avg_ic'], 0.045)
+        self.assertAlmostEqual(summary['avg_icir'], 0.3)
+        # 年化收益全部为NULL，按0计
+        self.assertEqual(summary['avg_annual_return'], 0.0)
+        self.assertEqual(summary['total_evaluations'], 3)
+        self.assertEqual(summary['factor_count'], 2)
+        self.assertEqual(empty, {})
+
+    def test_close(self):
+        """测试关闭连接池"""
+        run(self.manager.close())
+        self.assertTrue(self.pool.closed)
+        self.assertIsNone(self.manager.pool)
+
+
+class TestAsyncFactorRegistry(unittest.TestCase):
+    """异步因子注册器测试类"""
+
+    def setUp(self):
+        """测试前准备"""
+        patch_error(self)
+        self.registry = AsyncFactorRegistry(AsyncMySQLManager(pool=FakePool()))
+
+    def test_factor_lookup_and_performance(self):
+        """测试因子查询和绩效保存"""
+        async def scenario():
+            db = self.registry.db
+            await db.execute_many(
+                "INSERT INTO factors (name, expression, status) VALUES (%s, %s, %s)",
+                [('a', 'CLOSE()', 'testing'), ('b', 'OPEN()', 'active')]
+            )
+            factors = await self.registry.get_factors_to_evaluate()
+            by_id = await self.registry.get_factors([1, 2, 99])
+            # sqlite替身不支持 ON DUPLICATE KEY UPDATE，使用普通插入验证重复记录的失败处理
+            performance_id = await self.registry.save_performance_result(
+                1, date(2024, 1, 2), 0.05, 0.8, upsert=False
+            )
+            failures = await self.registry.save_performance_results([
+                (2, date(2024, 1, 2), 0.01, 0.1, None, None, None, None),
+                (1, date(2024, 1, 2), 0.02, 0.2, None, None, None, None),
+            ], upsert=False)
+            activated = await self.registry.update_factor_status(1, 'active')
+            return factors, by_id, performance_id, failures, activated
+
+        factors, by_id, performance_id, failures, activated = run(scenario())
+
+        self.assertEqual([factor['name'] for factor in factors], ['a', 'b'])
+        self.assertEqual(sorted(by_id), [1, 2])
+        self.assertEqual(performance_id, 1)
+        self.assertEqual([failure['factor_id'] for failure in failures], [1])
+        self.assertTrue(activated)
+
+    def test_get_factors_in_chunks(self):
+        """测试批量获取因子按与同步注册器相同的分批大小查询"""
+        async def scenario():
+            await self.registry.db.execute_many(
+                "INSERT INTO factors (name, expression, status) VALUES (%s, %s, %s)",
+                [(f"f{i}", 'CLOSE()', 'testing') for i in range(5)]
+            )
+            with patch.object(self.registry.db, 'execute_query',
+                              wraps=self.registry.db.execute_query) as query, \
+                 patch.dict('factor_factory.async_factor_registry.EVALUATION_CONFIG',
+                            {'persist_chunk_size': 2}):
+                factors = await self.registry.get_factors([1, 2, 3, 2, 4, 5, 99])
+            return factors, [call[0][1] for call in query.call_args_list]
+
+        factors, params = run(scenario())
+
+        self.assertEqual(sorted(factors), [1, 2, 3, 4, 5])
+        self.assertEqual(params, [(1, 2), (3, 4), (5, 99)])
+
+
+if __name__ == '__main__':
+    # 设置日志级别避免测试时的日志干扰
+    import logging
+    logging.getLogger().setLevel(logging.CRITICAL)
+
+    unittest.main(verbosity=2)
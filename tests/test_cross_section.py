@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+截面算子单元测试
+"""
+
+import unittest
+import sys
+import os
+import numpy as np
+
+# 添加项目根目录到路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from factor_factory.cross_section import (
+    cs_rank, cs_zscore, cs_demean, cs_winsorize, group_demean, cs_neutralize,
+    cross_section_functions
+)
+
+
+class TestCrossSection(unittest.TestCase):
+    """截面算子测试类"""
+
+    def setUp(self):
+        """测试前准备"""
+        rng = np.random.default_rng(4)
+        self.values = rng.normal(size=(6, 12))
+        self.values[1, [2, 5]] = np.nan
+        self.values[3, :] = np.nan
+
+    def test_rank_zscore_demean(self):
+        """测试排名、标准分和去均值逐日计算，缺失值保持NaN"""
+        rank = cs_rank(self.values)
+        zscore = cs_zscore(self.values)
+        demean = cs_demean(self.values)
+
+        for row in (0, 1):
+            valid = np.isfinite(self.values[row])
+            x = self.values[row, valid]
+            expected_rank = (np.argsort(np.argsort(x)) + 1) / valid.sum()
+            np.testing.assert_allclose(rank[row, valid], expected_rank)
+            np.testing.assert_allclose(zscore[row, valid], (x - x.mean()) / x.std())
+            np.testing.assert_allclose(demean[row, valid], x - x.mean())
+            self.assertTrue(np.isnan(rank[row, ~valid]).all())
+        self.assertTrue(np.isnan(zscore[3]).all())
+
+        constant = np.ones((2, 4))
+        np.testing.assert_array_equal(cs_zscore(constant), np.zeros((2, 4)))
+        np.testing.assert_array_equal(cs_rank(constant), np.full((2, 4), 2.5 / 4))
+
+    def test_winsorize(self):
+        """测试缩尾截断到均值 ± n 倍标准差"""
+        values = np.array([[0.0] * 9 + [100.0]])
+        result = cs_winsorize(values, 2)
+        mean, std = values.mean(), values.std()
+
+        self.assertAlmostEqual(result[0, -1], mean + 2 * std)
+        np.testing.assert_array_equal(result[0, :-1], values[0, :-1])
+
+    def test_group_demean(self):
+        """测试行业中性化减去同日同行业均值，未分类股票视为同一组"""
+        groups = np.array([0, 0, 0, 1, 1, 1, 2, 2, 2, -1, -1, -1])
+        result = group_demean(self.values, groups)
+
+        for row in (0, 1):
+            for group in (0, 1, 2, -1):
+                members = (groups == group) & np.isfinite(self.values[row])
+                x = self.values[row, members]
+                np.testing.assert_allclose(result[row, members], x - x.mean())
+        self.assertTrue(np.isnan(result[1, [2, 5]]).all())
+        self.assertTrue(np.isnan(result[3]).all())
+
+    def test_neutralize_matches_least_squares(self):
+        """测试回归中性化的残差与逐日最小二乘一致，且与暴露不相关"""
+        rng = np.random.default_rng(8)
+        exposure = rng.normal(size=self.values.shape)
+        result = cs_neutralize(self.values, exposure)
+
+        for row in (0, 1, 2):
+            valid = np.isfinite(self.values[row])
+            design = np.column_stack([np.ones(valid.sum()), exposure[row, valid]])
+            coef = np.linalg.lstsq(design, self.values[row, valid], rcond=None)[0]
+            np.testing.assert_allclose(result[row, valid],
+                                       self.values[row, valid] - design @ coef, atol=1e-12)
+            self.assertAlmostEqual(float(np.dot(result[row, valid], exposure[row, valid])), 0.0)
+        self.assertTrue(np.isnan(result[3]).all())
+
+    def test_functions_mask_non_trading_rows(self):
+        """测试非交易日不参与截面统计，缺少行业分类时行业中性化报错"""
+        valid = np.isfinite(self.values)
+        filled = np.where(valid, self.values, 1e6)
+        functions = cross_section_functions(valid)
+
+        np.testing.assert_allclose(functions['DEMEAN'](filled), cs_demean(self.values))
+        self.assertEqual(functions['RANK'](5.0).shape, valid.shape)
+        with self.assertRaises(ValueError):
+            functions['INDNEUTRALIZE'](filled)
+
+        groups = np.arange(12) % 3
+        functions = cross_section_functions(valid, groups)
+        np.testing.assert_allclose(functions['INDNEUTRALIZE'](filled),
+                                   group_demean(self.values, groups))
+
+
+if __name__ == '__main__':
+    unittest.main()
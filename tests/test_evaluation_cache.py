@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+评估结果缓存单元测试
+"""
+
+import unittest
+import sys
+import os
+import tempfile
+import shutil
+from datetime import datetime
+import numpy as np
+
+# 添加项目根目录到路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from factor_factory.evaluation_cache import EvaluationCache, evaluation_key
+
+
+def make_result(seed: int = 0, shape=(20, 8)):
+    """构造一个评估结果"""
+    rng = np.random.default_rng(seed)
+    return {
+        'ic_mean': 0.05 + seed,
+        'ic_std': 0.1,
+        'icir_mean': 0.5,
+        'ic_series': rng.normal(size=shape[0]),
+        'factor_values': rng.normal(size=shape),
+        'stock_count': shape[1],
+        'evaluation_date': datetime(2024, 3, 5, 16, 0, 0)
+    }
+
+
+class TestEvaluationCache(unittest.TestCase):
+    """评估结果缓存测试类"""
+
+    def setUp(self):
+        """测试前准备"""
+        self.root_dir = tempfile.mkdtemp()
+        self.codes = ['sh600000', 'sz000001']
+        self.dates = [20240301, 20240304, 20240305]
+
+    def tearDown(self):
+        """测试后清理"""
+        shutil.rmtree(self.root_dir, ignore_errors=True)
+
+    def test_key_components(self):
+        """测试缓存键忽略空白，但随股票池和最新数据日期变化"""
+        key = evaluation_key('MA(CLOSE(), 5)', self.codes, self.dates)
+
+        self.assertEqual(key, evaluation_key('MA( CLOSE() ,5 )', self.codes, self.dates))
+        self.assertNotEqual(key, evaluation_key('MA(CLOSE(), 10)', self.codes, self.dates))
+        self.assertNotEqual(key, evaluation_key('MA(CLOSE(), 5)', self.codes[:1], self.dates))
+        self.assertNotEqual(key, evaluation_key('MA(CLOSE(), 5)', self.codes,
+                                                self.dates[1:] + [20240306]))
+
+    def test_round_trip(self):
+        """测试写入后读取得到相同的结果，并跨实例保留"""
+        cache = EvaluationCache(self.root_dir, max_bytes=10 * 1024 * 1024)
+        key = evaluation_key('MA(CLOSE(), 5)', self.codes, self.dates)
+        result = make_result()
+
+        self.assertIsNone(cache.get(key))
+        cache.put(key, result)
+
+        cached = EvaluationCache(self.root_dir).get(key)
+        self.assertAlmostEqual(cached['ic_mean'], result['ic_mean'])
+        self.assertEqual(cached['stock_count'], 8)
+        self.assertEqual(cached['evaluation_date'], result['evaluation_date'])
+        np.testing.assert_array_equal(cached['factor_values'], result['factor_values'])
+        np.testing.assert_array_equal(cached['ic_series'], result['ic_series'])
+        self.assertEqual(cache.stats()['misses'], 1)
+
+    def test_lru_eviction(self):
+        """测试超出磁盘预算时淘汰最久未使用的结果"""
+        cache = EvaluationCache(self.root_dir, max_bytes=10 * 1024 * 1024)
+        cache.put('a', make_result(0))
+        size = cache.current_bytes
+        cache.max_bytes = int(size * 2.5)
+
+        cache.put('b', make_result(1))
+        cache._index['a.npz'][1] += 10  # a 比 b 更近被使用
+        cache.put('c', make_result(2))
+
+        self.assertIsNotNone(cache.get('a'))
+        self.assertIsNone(cache.get('b'))
+        self.assertIsNotNone(cache.get('c'))
+        self.assertLessEqual(cache.current_bytes, cache.max_bytes)
+        self.assertEqual(len(os.listdir(self.root_dir)), 2)
+
+    def test_oversized_result_not_cached(self):
+        """测试超过预算的单个结果不缓存"""
+        cache = EvaluationCache(self.root_dir, max_bytes=100)
+        cache.put('a', make_result())
+
+        self.assertEqual(len(cache), 0)
+        self.assertEqual(os.listdir(self.root_dir), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
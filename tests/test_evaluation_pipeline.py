@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+"""
+评估流水线单元测试
+"""
+
+import unittest
+from unittest.mock import MagicMock, Mock, patch
+from concurrent.futures import Future
+import sys
+import os
+import shutil
+import tempfile
+import numpy as np
+
+# 添加项目根目录到路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+class TestRedundancyPruning(unittest.TestCase):
+    """冗余剔除与每日激活测试类"""
+
+    def setUp(self):
+        """测试前准备"""
+        from factor_factory.evaluation_pipeline import EvaluationPipeline
+
+        with patch.object(EvaluationPipeline, '__init__', lambda x: None):
+            self.pipeline = EvaluationPipeline()
+        self.pipeline.registry = Mock()
+        self.pipeline.engine = Mock()
+        self.pipeline.redundant_factors = {}
+
+    def test_pruning_records_cluster_leaders(self):
+        """测试剔除的因子记录簇代表因子，代表因子的旧记录被清除"""
+        rng = np.random.default_rng(0)
+        base = rng.normal(size=(30, 40))
+        values = {1: base, 2: base + rng.normal(scale=0.01, size=base.shape),
+                  3: rng.normal(size=base.shape)}
+        ics = {1: 0.08, 2: 0.06, 3: 0.07}
+        factors = [{'id': i, 'name': f"f{i}", 'expression': f"E{i}"} for i in (1, 2, 3)]
+        self.pipeline.registry.get_active_factors.return_value = factors
+        self.pipeline.engine.evaluate_expressions_shared.return_value = {
+            i: {'evaluation_result': {'factor_values': values[i], 'ic_mean': ics[i]}}
+            for i in values
+        }
+        self.pipeline.engine._query_dates.return_value = list(range(20240101, 20240131))
+        self.pipeline.factor_values = None
+        stocks = [Mock(market_code=f"sh{600000 + i}") for i in range(40)]
+
+        with patch.dict('factor_factory.evaluation_pipeline.EVALUATION_CONFIG',
+                        {'correlation_block_size': 2}):
+            result = self.pipeline.run_redundancy_pruning(stock_list=stocks, query=Mock(),
+                                                          threshold=0.7)
+
+        self.assertEqual(result['deactivated'], [2])
+        self.pipeline.registry.queue_status_update.assert_called_once_with(2, 'testing')
+        records, cleared, _ = self.pipeline.registry.save_redundancy.call_args[0]
+        self.assertEqual([(factor_id, leader) for factor_id, leader, _ in records], [(2, 1)])
+        self.assertEqual(sorted(cleared), [1, 3])
+        # 因子按块评估，每块只包含块内的表达式
+        blocks = [sorted(call[0][0]) for call in
+                  self.pipeline.engine.evaluate_expressions_shared.call_args_list]
+        self.assertEqual(blocks, [[1, 2], [3]])
+
+    def test_redundant_factor_not_reactivated(self):
+        """测试簇代表因子仍活跃时，冗余因子IC达标也不重新激活"""
+        self.pipeline.redundant_factors = {2: 1}
+        result = {'ic_mean': 0.08, 'icir_mean': 0.8}
+
+        self.pipeline._queue_daily_result({'id': 2, 'name': 'f2'}, result)
+        self.pipeline._queue_daily_result({'id': 3, 'name': 'f3'}, result)
+
+        self.pipeline.registry.queue_status_update.assert_called_once_with(3, 'active')
+        self.assertEqual(self.pipeline.registry.queue_performance_result.call_count, 2)
+
+    def test_daily_evaluation_only_suppresses_when_leader_active(self):
+        """测试只有代表因子仍活跃的冗余记录生效"""
+        self.pipeline.registry.get_active_factors.return_value = [{'id': 1}]
+        self.pipeline.registry.get_testing_factors.return_value = []
+        self.pipeline.registry.get_redundancy_leaders.return_value = {2: 1, 4: 5}
+        self.pipeline._get_a_stocks = Mock(return_value=[])
+        self.pipeline._evaluate_factor_batch = Mock(return_value={})
+
+        self.pipeline.run_daily_evaluation(checkpoint=False)
+
+        self.assertEqual(self.pipeline.redundant_factors, {2: 1})
+
+
+class TestDailyKlineUpdate(unittest.TestCase):
+    """每日K线更新测试类"""
+
+    def test_clears_forward_return_cache(self):
+        """测试行情更新后清空远期收益率缓存，未配置K线存储时也清空"""
+        from factor_factory.evaluation_pipeline import EvaluationPipeline
+        from factor_factory.forward_return_cache import ForwardReturnCache
+
+        with patch.object(EvaluationPipeline, '__init__', lambda x: None):
+            pipeline = EvaluationPipeline()
+        pipeline.engine = Mock()
+        pipeline.engine.forward_returns = ForwardReturnCache(max_bytes=1024 * 1024)
+        close = np.arange(1.0, 11.0).reshape(5, 2)
+        pipeline.engine.forward_returns.get(['sh600000', 'sz000001'], list(range(5)), close)
+
+        with patch.dict('factor_factory.evaluation_pipeline.EVALUATION_CONFIG', {'kline_store_dir': ''}):
+            self.assertEqual(pipeline.run_daily_kline_update(), 0)
+
+        self.assertEqual(len(pipeline.engine.forward_returns), 0)
+
+
+class InitializingExecutor:
+    """在当前进程中同步执行任务并运行初始化函数的执行器"""
+
+    def __init__(self, max_workers=None, mp_context=None, initializer=None, initargs=()):
+        if initializer is not None:
+            initializer(*initargs)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        return False
+
+    def submit(self, func, *args):
+        future = Future()
+        future.set_result(func(*args))
+        return future
+
+
+class TestFactorValuePersistence(unittest.TestCase):
+    """每日评估各路径保存因子值测试类"""
+
+    def setUp(self):
+        """测试前准备"""
+        from factor_factory.evaluation_pipeline import EvaluationPipeline
+        from factor_factory.factor_value_store import FactorValueStore
+
+        self.temp_dir = tempfile.mkdtemp()
+        with patch.object(EvaluationPipeline, '__init__', lambda x: None):
+            self.pipeline = EvaluationPipeline()
+        self.pipeline.registry = Mock()
+        self.pipeline.registry.flush_pending.return_value = {'failures': []}
+        self.pipeline.engine = Mock()
+        self.pipeline.redundant_factors = {}
+        self.pipeline.factor_values = FactorValueStore(self.temp_dir, partition_rows=2)
+
+        self.stocks = []
+        for code in ('sh600000', 'sz000001'):
+            stock = Mock(market_code=code)
+            stock.is_null.return_value = False
+            self.stocks.append(stock)
+        self.factors = [{'id': i, 'name': f"f{i}", 'expression': f"MA(CLOSE(), {i + 1})"}
+                        for i in (1, 2)]
+        self.dates = [20240102, 20240103, 20240104]
+        self.values = {i: np.arange(6, dtype=float).reshape(3, 2) * i for i in (1, 2)}
+
+    def tearDown(self):
+        """测试后清理"""
+        shutil.rmtree(self.temp_dir)
+
+    def test_parallel_workers_write_factor_values(self):
+        """测试并行评估时工作进程把因子值写入存储"""
+        worker_engine = MagicMock()
+        worker_engine.sm.__getitem__.side_effect = \
+            lambda code: next(s for s in self.stocks if s.market_code == code)
+        worker_engine.evaluate_expressions_shared.side_effect = lambda expressions, *args: {
+            index: {'evaluation_result': {'ic_mean': 0.01, 'icir_mean': 0.1, 'ic_series': [],
+                                          'factor_values': self.values[index + 1]}}
+            for index in expressions
+        }
+        worker_engine._query_dates.return_value = self.dates
+
+        with patch('factor_factory.parallel_evaluator.ProcessPoolExecutor', InitializingExecutor), \
+             patch('hikyuu.load_hikyuu', create=True), \
+             patch('factor_factory.multi_factor_engine.MultiFactorEngine', return_value=worker_engine):
+            results = self.pipeline._evaluate_factor_batch(
+                self.factors, self.stocks, Mock(), max_workers=2, incremental=False
+            )
+
+        self.assertEqual(sorted(results), [1, 2])
+        for factor in self.factors:
+            dates, stocks, values = self.pipeline.factor_values.read(
+                factor['id'], factor['expression']
+            )
+            self.assertEqual(dates, self.dates)
+            self.assertEqual(stocks, ['sh600000', 'sz000001'])
+            np.testing.assert_array_equal(values, self.values[factor['id']])
+            version_dir = os.path.join(self.temp_dir, str(factor['id']),
+                                       self.pipeline.factor_values.versions(factor['id'])[0])
+            self.assertTrue(any(name.endswith('.npz') for name in os.listdir(version_dir)))
+
+    def test_incremental_writes_latest_factor_values(self):
+        """测试增量评估把本次计算的截面合并到因子值存储"""
+        evaluations = {
+            factor['id']: {'evaluation_result': {
+                'ic_mean': 0.01, 'icir_mean': 0.1,
+                'value_dates': self.dates[-2:], 'factor_values': self.values[factor['id']][-2:]
+            }} for factor in self.factors
+        }
+        with patch('factor_factory.evaluation_pipeline.IncrementalICEvaluator') as evaluator:
+            evaluator.return_value.evaluate.return_value = evaluations
+            self.pipeline._evaluate_factor_batch(self.factors, self.stocks, Mock(), incremental=True)
+
+        dates, _, values = self.pipeline.factor_values.read(2, self.factors[1]['expression'])
+        self.assertEqual(dates, self.dates[-2:])
+        np.testing.assert_array_equal(values, self.values[2][-2:])
+        self.pipeline.engine._query_dates.assert_not_called()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+表达式编译器单元测试
+"""
+
+import unittest
+import sys
+import os
+
+# 添加项目根目录到路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+class TestExpressionCompiler(unittest.TestCase):
+    """表达式编译器测试类"""
+
+    def test_compile_cached(self):
+        """测试相同表达式只编译一次"""
+        from factor_factory.expression_compiler import compile_expression, clear_compile_cache
+
+        clear_compile_cache()
+        plan1 = compile_expression("MA(CLOSE(), 5) - MA(CLOSE(), 20)")
+        plan2 = compile_expression("  MA(CLOSE(), 5) - MA(CLOSE(), 20)  ")
+        plan3 = compile_expression("MA(CLOSE(),5)-MA(CLOSE(),20)")
+
+        self.assertIs(plan1, plan2)
+        self.assertEqual(plan1.expression, plan3.expression)
+
+    def test_compile_plan_structure(self):
+        """测试执行计划的节点顺序和元信息"""
+        from factor_factory.expression_compiler import compile_expression
+
+        plan = compile_expression("(CLOSE() - REF(CLOSE(), 5)) / REF(CLOSE(), 5)")
+
+        self.assertEqual(plan.fields, ['CLOSE'])
+        self.assertEqual(plan.functions, ['REF'])
+        self.assertIs(plan.nodes[-1], plan.root)
+        keys = [node.key for node in plan.nodes]
+        self.assertEqual(len(keys), len(set(keys)))
+        self.assertLess(keys.index('REF(CLOSE(),5)'), keys.index(plan.root.key))
+
+    def test_lookback(self):
+        """测试历史窗口估算"""
+        from factor_factory.expression_compiler import compile_expression
+
+        self.assertEqual(compile_expression("CLOSE()").lookback, 0)
+        self.assertEqual(compile_expression("MA(CLOSE(), 20)").lookback, 19)
+        self.assertEqual(compile_expression("REF(MA(CLOSE(), 20), 5)").lookback, 24)
+        self.assertEqual(
+            compile_expression("STD(LOG(CLOSE()/REF(CLOSE(), 1)), 20)").lookback, 20
+        )
+
+    def test_signature_errors(self):
+        """测试不符合函数签名的表达式被拒绝"""
+        from factor_factory.expression_compiler import compile_expression
+
+        invalid_expressions = [
+            "MA(CLOSE(), 5.5)",
+            "MA(CLOSE(), 0)",
+            "MA(CLOSE(), VOL())",
+            "REF(CLOSE())",
+            "IF(CLOSE() > 1, 1)",
+            "CLOSE(5)",
+            "UNKNOWN(CLOSE())",
+            "__import__('os')",
+            "MA(CLOSE(), 5)" * 100
+        ]
+
+        for expr in invalid_expressions:
+            with self.assertRaises(ValueError, msg=f"表达式 '{expr[:30]}' 应该被拒绝"):
+                compile_expression(expr)
+
+    def test_execute(self):
+        """测试执行计划计算结果"""
+        from factor_factory.expression_compiler import compile_expression
+
+        plan = compile_expression("IF(CLOSE() > MA(CLOSE(), 5), 1, -1) * 2")
+        functions = {
+            'MA': lambda value, n: value - n,
+            'IF': lambda cond, a, b: a if cond else b
+        }
+
+        self.assertEqual(plan.execute(lambda field: 10.0, functions), 2)
+
+    def test_build_indicator(self):
+        """测试构建未绑定指标时行情字段以无参数方式调用"""
+        from factor_factory.expression_compiler import compile_expression
+
+        calls = []
+
+        def fake_close(*args):
+            calls.append(args)
+            return 8.0
+
+        plan = compile_expression("CLOSE() / 2")
+        result = plan.build_indicator({'CLOSE': fake_close})
+
+        self.assertEqual(result, 4.0)
+        self.assertEqual(calls, [()])
+
+    def test_cross_section_functions(self):
+        """测试截面函数可以与时间序列函数组合，但不能构建逐股票指标"""
+        from factor_factory.expression_compiler import compile_expression
+
+        plan = compile_expression("RANK(MA(CLOSE(), 5)) - NEUTRALIZE(ZSCORE(VOL()), LOG(AMO()))")
+        self.assertTrue(plan.cross_sectional)
+        self.assertEqual(plan.lookback, 4)
+        self.assertFalse(compile_expression("MA(CLOSE(), 5)").cross_sectional)
+
+        with self.assertRaises(ValueError):
+            compile_expression("NEUTRALIZE(CLOSE())")
+        with self.assertRaises(ValueError):
+            compile_expression("WINSORIZE(CLOSE(), VOL())")
+        with self.assertRaises(ValueError):
+            plan.build_indicator({})
+
+    def test_cross_section_consumers(self):
+        """测试截面函数之上只能使用有矩阵实现的函数"""
+        from factor_factory.expression_compiler import compile_expression, MATRIX_FUNCTIONS
+        from factor_factory.rolling_primitives import RollingPrimitives
+
+        self.assertEqual(set(MATRIX_FUNCTIONS), set(RollingPrimitives().functions))
+        compile_expression("MA(RANK(CLOSE()), 5) - REF(ZSCORE(VOL()), 1) * (RANK(CLOSE()) > 0.5)")
+        compile_expression("IF(CLOSE() > MA(CLOSE(), 5), 1, 0) + RANK(CLOSE())")
+
+        for expression in ("IF(RANK(CLOSE()) > 0.5, 1, 0)", "CROSS(RANK(CLOSE()), 0.5)",
+                           "RSI(ABS(ZSCORE(CLOSE())), 14)"):
+            with self.assertRaises(ValueError, msg=expression) as context:
+                compile_expression(expression)
+            self.assertIn("截面函数", str(context.exception))
+
+
+if __name__ == '__main__':
+    # 设置日志级别避免测试时的日志干扰
+    import logging
+    logging.getLogger().setLevel(logging.CRITICAL)
+
+    unittest.main(verbosity=2)
@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+表达式解析器与公共子表达式DAG单元测试
+"""
+
+import unittest
+import sys
+import os
+
+# 添加项目根目录到路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+class TestExpressionParser(unittest.TestCase):
+    """表达式解析器测试类"""
+
+    def test_parse_normalizes_whitespace(self):
+        """测试空白不影响规范化键"""
+        from factor_factory.expression_parser import ExpressionParser
+
+        parser = ExpressionParser()
+        node1 = parser.parse("MA(CLOSE(), 5) - MA(CLOSE(), 20)")
+        node2 = parser.parse("MA( CLOSE(),5 )-MA(CLOSE(),20)")
+
+        self.assertIs(node1, node2)
+        self.assertEqual(node1.key, "(MA(CLOSE(),5)-MA(CLOSE(),20))")
+
+    def test_parse_shares_subexpressions(self):
+        """测试相同子表达式共享同一节点"""
+        from factor_factory.expression_parser import ExpressionParser
+
+        parser = ExpressionParser()
+        node = parser.parse("(CLOSE() - REF(CLOSE(), 5)) / REF(CLOSE(), 5)")
+
+        self.assertIs(node.args[0].args[1], node.args[1])
+
+    def test_parse_rejects_unsupported_syntax(self):
+        """测试拒绝不支持的语法"""
+        from factor_factory.expression_parser import ExpressionParser
+
+        parser = ExpressionParser(allowed_functions=['MA', 'CLOSE'])
+        invalid_expressions = [
+            "",
+            "MA(CLOSE(), 5",
+            "CLOSE().attr",
+            "MA(CLOSE(), n=5)",
+            "'abc'",
+            "1 < CLOSE() < 2",
+            "EVIL(CLOSE())"
+        ]
+
+        for expr in invalid_expressions:
+            with self.assertRaises(ValueError, msg=f"表达式 '{expr}' 应该被拒绝"):
+                parser.parse(expr)
+
+
+class TestExpressionDAG(unittest.TestCase):
+    """公共子表达式DAG测试类"""
+
+    def setUp(self):
+        """测试前准备"""
+        self.expressions = {
+            1: "(CLOSE() - REF(CLOSE(), 5)) / REF(CLOSE(), 5)",
+            2: "MA(CLOSE(), 5) - MA(CLOSE(), 20)",
+            3: "CLOSE() / MA(CLOSE(), 20) - 1"
+        }
+
+    def test_node_sharing(self):
+        """测试DAG节点数少于独立表达式树节点总数"""
+        from factor_factory.expression_dag import ExpressionDAG
+
+        dag = ExpressionDAG(self.expressions)
+
+        self.assertEqual(len(dag.roots), 3)
+        self.assertLess(dag.node_count, dag.tree_node_count)
+        keys = [node.key for node in dag.order]
+        self.assertEqual(len(keys), len(set(keys)))
+
+    def test_evaluate_each_node_once(self):
+        """测试每个唯一节点只计算一次"""
+        from factor_factory.expression_dag import ExpressionDAG
+
+        calls = []
+
+        def fake_ref(value, n):
+            calls.append(('REF', n))
+            return value - n
+
+        def fake_ma(value, n):
+            calls.append(('MA', n))
+            return value / n
+
+        leaf_calls = []
+
+        def leaf_loader(field):
+            leaf_calls.append(field)
+            return 100.0
+
+        dag = ExpressionDAG(self.expressions)
+        values, errors = dag.evaluate(leaf_loader, {'REF': fake_ref, 'MA': fake_ma})
+
+        self.assertEqual(errors, {})
+        self.assertEqual(leaf_calls, ['CLOSE'])
+        self.assertEqual(sorted(calls), [('MA', 5), ('MA', 20), ('REF', 5)])
+        self.assertAlmostEqual(values[1], 5 / 95)
+        self.assertAlmostEqual(values[2], 20 - 5)
+        self.assertAlmostEqual(values[3], 19)
+
+    def test_evaluate_propagates_errors(self):
+        """测试节点失败只影响依赖它的因子"""
+        from factor_factory.expression_dag import ExpressionDAG
+
+        def broken_ref(value, n):
+            raise RuntimeError("计算失败")
+
+        dag = ExpressionDAG(self.expressions)
+        values, errors = dag.evaluate(lambda field: 100.0,
+                                      {'REF': broken_ref, 'MA': lambda v, n: v})
+
+        self.assertIn(1, errors)
+        self.assertIn(2, values)
+        self.assertIn(3, values)
+
+    def test_evaluate_precomputed(self):
+        """测试已计算的节点直接使用，只被它们引用的子节点不再计算"""
+        from factor_factory.expression_dag import ExpressionDAG
+
+        calls = []
+
+        def fake_ma(value, n):
+            calls.append(n)
+            return value / n
+
+        dag = ExpressionDAG(self.expressions)
+        values, errors = dag.evaluate(lambda field: 100.0, {'MA': fake_ma, 'REF': lambda v, n: v},
+                                      precomputed={'MA(CLOSE(),20)': 4.0})
+
+        self.assertEqual(errors, {})
+        self.assertEqual(calls, [5])
+        self.assertAlmostEqual(values[2], 20 - 4)
+        self.assertAlmostEqual(values[3], 24)
+
+    def test_parse_errors_collected(self):
+        """测试解析失败的表达式被单独记录"""
+        from factor_factory.expression_dag import ExpressionDAG
+
+        dag = ExpressionDAG({1: "MA(CLOSE(), 5)", 2: "MA(CLOSE(),"})
+
+        self.assertIn(1, dag.roots)
+        self.assertIn(2, dag.parse_errors)
+
+
+if __name__ == '__main__':
+    # 设置日志级别避免测试时的日志干扰
+    import logging
+    logging.getLogger().setLevel(logging.CRITICAL)
+
+    unittest.main(verbosity=2)
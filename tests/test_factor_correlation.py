@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+因子相关性与冗余剔除单元测试
+"""
+
+import unittest
+import sys
+import os
+import numpy as np
+
+# 添加项目根目录到路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from factor_factory.factor_correlation import rank_correlation_matrix, cluster_by_correlation
+from factor_factory.ic_evaluator import rank_ic
+
+
+class TestFactorCorrelation(unittest.TestCase):
+    """因子相关性测试类"""
+
+    def setUp(self):
+        """测试前准备"""
+        rng = np.random.default_rng(7)
+        base = rng.normal(size=(30, 50))
+        self.factors = np.stack([
+            base,
+            base * 2 + rng.normal(scale=0.1, size=base.shape),
+            -base,
+            rng.normal(size=base.shape),
+            rng.normal(size=base.shape)
+        ])
+
+    def test_matches_mean_daily_rank_ic(self):
+        """测试结果等于逐日截面秩相关的平均值"""
+        correlation = rank_correlation_matrix(self.factors)
+
+        for i in range(len(self.factors)):
+            for j in range(len(self.factors)):
+                expected = np.mean(rank_ic(self.factors[i], self.factors[j]))
+                self.assertAlmostEqual(correlation[i, j], expected, places=5)
+
+    def test_blocks_match_single_pass(self):
+        """测试分块计算与一次计算结果一致"""
+        np.testing.assert_allclose(
+            rank_correlation_matrix(self.factors, block_size=2),
+            rank_correlation_matrix(self.factors, block_size=256),
+            atol=1e-6
+        )
+
+    def test_blocks_loaded_on_demand(self):
+        """测试列块用到时才读取，不预先保留所有因子的排名"""
+        factors = self.factors
+        accessed = []
+
+        class Recording:
+            def __len__(self):
+                return len(factors)
+
+            def __getitem__(self, index):
+                accessed.append(index)
+                return factors[index]
+
+        rank_correlation_matrix(Recording(), block_size=2)
+
+        # 行块0读取因子0-1，再读取列块1和列块2；行块1读取因子2-3和列块2；行块2读取因子4
+        self.assertEqual(accessed, [0, 1, 2, 3, 4, 2, 3, 4, 4])
+
+    def test_missing_dates_excluded(self):
+        """测试有效股票不足的日期不参与平均"""
+        factors = self.factors.copy()
+        factors[0, :10] = np.nan
+
+        correlation = rank_correlation_matrix(factors)
+        expected = np.mean(rank_ic(factors[0, 10:], factors[3, 10:]))
+
+        self.assertAlmostEqual(correlation[0, 3], expected, places=5)
+        self.assertTrue(np.isnan(rank_correlation_matrix(np.full((2, 5, 20), np.nan))).all())
+
+    def test_cluster_keeps_best(self):
+        """测试高度相关的因子聚为一簇，保留得分最高的因子"""
+        correlation = rank_correlation_matrix(self.factors)
+        clusters = cluster_by_correlation(correlation, [0.02, 0.05, 0.01, 0.03, np.nan],
+                                          threshold=0.7)
+
+        self.assertEqual(clusters, {1: [1, 0, 2], 3: [3], 4: [4]})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+遗传因子挖掘单元测试
+"""
+
+import unittest
+from unittest.mock import Mock
+import sys
+import os
+import random
+
+# 添加项目根目录到路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from factor_factory.factor_miner import (
+    ExpressionGenerator, FactorMiner, mining_functions, tree_depth
+)
+from factor_factory.expression_compiler import compile_expression
+
+
+def fake_engine():
+    """按表达式是否包含 VOL 和窗口大小给出IC的评估引擎，同时记录每次评估的表达式"""
+    engine = Mock()
+    engine.batches = []
+
+    def evaluate(expressions, stock_list, query):
+        engine.batches.append(list(expressions))
+        results = {}
+        for key, expression in expressions.items():
+            if 'LOG' in expression:
+                results[key] = {'error': '计算失败'}
+                continue
+            ic = (0.05 if 'VOL' in expression else -0.04) + 0.001 * expression.count('20')
+            results[key] = {'evaluation_result': {'ic_mean': ic, 'icir_mean': ic * 10}}
+        return results
+
+    engine.evaluate_expressions_shared.side_effect = evaluate
+    return engine
+
+
+class TestExpressionGenerator(unittest.TestCase):
+    """表达式生成器测试类"""
+
+    def setUp(self):
+        """测试前准备"""
+        self.generator = ExpressionGenerator(random.Random(3), windows=[5, 10, 20], max_depth=4)
+
+    def test_mining_functions(self):
+        """测试挖掘函数集来自编译器签名，窗口函数带窗口参数"""
+        functions = mining_functions()
+
+        self.assertEqual(functions['MA'], ('series', 'window'))
+        self.assertEqual(functions['REF'], ('series', 'window'))
+        self.assertEqual(functions['ABS'], ('series',))
+        self.assertNotIn('CROSS', functions)
+        self.assertNotIn('MACD', functions)
+
+    def test_random_trees_compile(self):
+        """测试随机表达式可以编译且不超过最大深度"""
+        for _ in range(200):
+            tree = self.generator.random_tree()
+            self.assertLessEqual(tree_depth(tree), 4)
+            self.assertEqual(compile_expression(tree.key).expression, tree.key)
+
+    def test_mutation_and_crossover_compile(self):
+        """测试变异和交叉的后代可以编译"""
+        first = compile_expression('MA(CLOSE(), 5) - MA(VOL(), 20)').root
+        second = compile_expression('STD(HIGH() / LOW(), 10)').root
+        for _ in range(200):
+            compile_expression(self.generator.mutate(first).key)
+            child = self.generator.crossover(first, second)
+            compile_expression(child.key)
+
+
+class TestFactorMiner(unittest.TestCase):
+    """因子挖掘器测试类"""
+
+    def test_evolve_evaluates_each_expression_once(self):
+        """测试每代整体评估，同一表达式只评估一次"""
+        engine = fake_engine()
+        miner = FactorMiner(engine, stock_list=[], query=object(), population_size=30,
+                            generations=4, seed=1, windows=[5, 10, 20], max_depth=3)
+
+        candidates = miner.evolve(['MA(CLOSE(), 5)', 'MA( CLOSE(),5 )', 'BAD('])
+
+        self.assertEqual(len(engine.batches), 4)
+        evaluated = [expr for batch in engine.batches for expr in batch]
+        self.assertEqual(len(evaluated), len(set(evaluated)))
+        self.assertIn('MA(CLOSE(),5)', engine.batches[0])
+        self.assertLessEqual(len(engine.batches[0]), 30)
+        # 失败的候选不出现在结果中，结果按适应度降序
+        self.assertTrue(all('LOG' not in c['expression'] for c in candidates))
+        fitness = [c['fitness'] for c in candidates]
+        self.assertEqual(fitness, sorted(fitness, reverse=True))
+        self.assertIn('VOL', candidates[0]['expression'])
+
+    def test_register_survivors(self):
+        """测试注册达标候选，负IC取负，已注册的跳过"""
+        registry = Mock()
+        registry.get_factor_by_name.side_effect = lambda name: None
+        registry.register_factor.side_effect = [11, 12]
+        miner = FactorMiner(registry=registry)
+
+        candidates = [
+            {'expression': 'MA(VOL(),5)', 'ic_mean': 0.05, 'icir_mean': 0.5, 'fitness': 0.04},
+            {'expression': 'MA(CLOSE(),5)', 'ic_mean': -0.04, 'icir_mean': -0.4, 'fitness': 0.03},
+            {'expression': 'HIGH()', 'ic_mean': 0.01, 'icir_mean': 0.1, 'fitness': 0.01}
+        ]
+        registered = miner.register_survivors(candidates, top_n=5, min_ic=0.03)
+
+        self.assertEqual(registered, [11, 12])
+        expressions = [call.kwargs['expression'] for call in registry.register_factor.call_args_list]
+        self.assertEqual(expressions, ['MA(VOL(),5)', '(-MA(CLOSE(),5))'])
+        self.assertTrue(all(call.kwargs['status'] == 'testing'
+                            for call in registry.register_factor.call_args_list))
+
+        registry.get_factor_by_name.side_effect = lambda name: {'id': 11}
+        self.assertEqual(miner.register_survivors(candidates, min_ic=0.03), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -144,6 +144,214 @@ class TestFactorRegistry(unittest.TestCase):
 
         self.assertEqual(performance_id, 456)
 
+    @patch('factor_factory.factor_registry.get_db_manager')
+    def test_flush_pending_batches_rows(self, mock_get_db):
+        """测试批量写入缓存的绩效结果和状态变更"""
+        from factor_factory.factor_registry import FactorRegistry
+
+        mock_get_db.return_value = self.mock_db
+        self.mock_db.execute_batch.return_value = []
+
+        registry = FactorRegistry()
+        for factor_id in (1, 2, 3):
+            registry.queue_performance_result(factor_id, datetime(2024, 1, 2), ic_value=0.06)
+        registry.queue_status_update(1, 'testing')
+        registry.queue_status_update(1, 'active')
+
+        summary = registry.flush_pending(chunk_size=2)
+
+        self.assertEqual(summary['performance_saved'], 3)
+        self.assertEqual(summary['status_updated'], 1)
+        self.assertEqual(summary['failures'], [])
+        self.assertEqual(self.mock_db.execute_batch.call_count, 2)
+        performance_rows = self.mock_db.execute_batch.call_args_list[0][0][1]
+        self.assertEqual([row[0] for row in performance_rows], [1, 2, 3])
+        status_rows = self.mock_db.execute_batch.call_args_list[1][0][1]
+        self.assertEqual(status_rows, [('active', 1)])
+        self.mock_db.execute_insert.assert_not_called()
+
+        # 缓存已清空
+        self.mock_db.execute_batch.reset_mock()
+        registry.flush_pending()
+        self.mock_db.execute_batch.assert_not_called()
+
+    @patch('factor_factory.factor_registry.get_db_manager')
+    def test_flush_pending_reports_failures(self, mock_get_db):
+        """测试批量写入时报告失败的行"""
+        from factor_factory.factor_registry import FactorRegistry
+
+        mock_get_db.return_value = self.mock_db
+        self.mock_db.execute_batch.side_effect = [[(1, 'foreign key')], []]
+
+        registry = FactorRegistry()
+        registry.queue_performance_result(1, datetime(2024, 1, 2), ic_value=0.02)
+        registry.queue_performance_result(99, datetime(2024, 1, 2), ic_value=0.02)
+        registry.queue_status_update(1, 'testing')
+
+        summary = registry.flush_pending()
+
+        self.assertEqual(summary['performance_saved'], 1)
+        self.assertEqual(summary['status_updated'], 1)
+        self.assertEqual(summary['failures'],
+                         [{'factor_id': 99, 'operation': 'performance', 'error': 'foreign key'}])
+
+    @patch('factor_factory.factor_registry.get_db_manager')
+    def test_save_redundancy(self, mock_get_db):
+        """测试冗余记录先清除保留的因子再覆盖写入被剔除的因子"""
+        from factor_factory.factor_registry import (
+            FactorRegistry, REDUNDANCY_DELETE_SQL, REDUNDANCY_UPSERT_SQL
+        )
+
+        mock_get_db.return_value = self.mock_db
+        self.mock_db.execute_batch.side_effect = [[], [(0, 'foreign key')]]
+        self.mock_db.execute_query.return_value = [(2, 1)]
+
+        registry = FactorRegistry()
+        failures = registry.save_redundancy([(2, 1, 0.93)], [1, 3], datetime(2024, 1, 2))
+
+        calls = self.mock_db.execute_batch.call_args_list
+        self.assertEqual(calls[0][0][:2], (REDUNDANCY_DELETE_SQL, [(1,), (3,)]))
+        self.assertEqual(calls[1][0][:2], (REDUNDANCY_UPSERT_SQL, [(2, 1, 0.93, datetime(2024, 1, 2))]))
+        self.assertEqual(failures, [{'factor_id': 2, 'error': 'foreign key'}])
+        self.assertEqual(registry.get_redundancy_leaders(), {2: 1})
+
+    @patch('factor_factory.factor_registry.get_db_manager')
+    def test_get_factor_cached_until_update(self, mock_get_db):
+        """测试因子信息读穿透缓存，更新后失效"""
+        from factor_factory.factor_registry import FactorRegistry
+
+        mock_get_db.return_value = self.mock_db
+        row = (1, "test_factor", "MA(CLOSE(), 5)", "technical", datetime.now(), "testing", "测试因子")
+        self.mock_db.execute_query.return_value = [row]
+        self.mock_db.execute_update.return_value = 1
+
+        registry = FactorRegistry(cache_size=10, cache_ttl=0)
+        registry.get_factor(1)
+        factor = registry.get_factor(1)
+        self.assertEqual(self.mock_db.execute_query.call_count, 1)
+
+        # 修改返回的字典不影响缓存
+        factor['status'] = 'active'
+        self.assertEqual(registry.get_factor(1)['status'], 'testing')
+
+        registry.update_factor(1, status='active')
+        registry.get_factor(1)
+        self.assertEqual(self.mock_db.execute_query.call_count, 2)
+
+    @patch('factor_factory.factor_registry.get_db_manager')
+    def test_get_factors_single_query(self, mock_get_db):
+        """测试批量获取只查询未缓存的因子"""
+        from factor_factory.factor_registry import FactorRegistry
+
+        mock_get_db.return_value = self.mock_db
+        rows = [(i, f"factor_{i}", "CLOSE()", "technical", datetime.now(), "active", "")
+                for i in (1, 2, 3)]
+        self.mock_db.execute_query.side_effect = [[rows[0]], rows[1:]]
+
+        registry = FactorRegistry(cache_size=10, cache_ttl=0)
+        registry.get_factor(1)
+        factors = registry.get_factors([1, 2, 3, 4])
+
+        self.assertEqual(sorted(factors), [1, 2, 3])
+        query, params = self.mock_db.execute_query.call_args[0]
+        self.assertIn("IN (%s, %s, %s)", query)
+        self.assertEqual(params, (2, 3, 4))
+
+    @patch('factor_factory.factor_registry.get_db_manager')
+    def test_factor_list_cache_ttl_and_status_flush(self, mock_get_db):
+        """测试列表查询缓存的过期和状态变更失效"""
+        from factor_factory.factor_registry import FactorRegistry
+
+        mock_get_db.return_value = self.mock_db
+        row = (1, "test_factor", "CLOSE()", "technical", datetime.now(), "testing", "")
+        self.mock_db.execute_query.return_value = [row]
+        self.mock_db.execute_batch.return_value = []
+
+        registry = FactorRegistry(cache_size=10, cache_ttl=60)
+        registry.get_testing_factors()
+        registry.get_testing_factors()
+        self.assertEqual(self.mock_db.execute_query.call_count, 1)
+
+        with patch('factor_factory.factor_registry.time.monotonic', return_value=1e12):
+            registry.get_testing_factors()
+        self.assertEqual(self.mock_db.execute_query.call_count, 2)
+
+        registry.queue_status_update(1, 'active')
+        registry.flush_pending()
+        registry.get_testing_factors()
+        self.assertEqual(self.mock_db.execute_query.call_count, 3)
+
+    @patch('factor_factory.factor_registry.get_db_manager')
+    def test_iter_performance_history(self, mock_get_db):
+        """测试绩效历史流式导出的查询条件"""
+        from factor_factory.factor_registry import FactorRegistry
+
+        mock_get_db.return_value = self.mock_db
+        self.mock_db.stream_query.return_value = iter(['batch'])
+
+        registry = FactorRegistry()
+        batches = list(registry.iter_performance_history([1, 2], start_date=datetime(2024, 1, 1),
+                                                         batch_size=100))
+
+        self.assertEqual(batches, ['batch'])
+        query, params = self.mock_db.stream_query.call_args[0]
+        self.assertIn("factor_id IN (%s, %s)", query)
+        self.assertIn("ORDER BY factor_id, evaluation_date", query)
+        self.assertEqual(params, (1, 2, datetime(2024, 1, 1)))
+        self.assertTrue(self.mock_db.stream_query.call_args[1]['as_numpy'])
+
+    @patch('factor_factory.factor_registry.get_db_manager')
+    def test_upsert_mode(self, mock_get_db):
+        """测试覆盖写入模式选择的SQL"""
+        from factor_factory.factor_registry import FactorRegistry
+
+        mock_get_db.return_value = self.mock_db
+        self.mock_db.execute_batch.return_value = []
+
+        registry = FactorRegistry()
+        registry.queue_performance_result(1, datetime(2024, 1, 2), ic_value=0.05)
+        registry.flush_pending(upsert=True)
+        registry.save_performance_result(1, datetime(2024, 1, 2), ic_value=0.05, upsert=False)
+        failures = registry.save_backtest_results(
+            [(1, datetime(2024, 1, 5), 0.1, 0.2, 0.15, 1.2, 0.05, 10, 0.55)], upsert=True
+        )
+
+        flush_sql = self.mock_db.execute_batch.call_args_list[0][0][0]
+        self.assertIn("ON DUPLICATE KEY UPDATE id = LAST_INSERT_ID(id)", flush_sql)
+        self.assertIn("ic_value = VALUES(ic_value)", flush_sql)
+        insert_sql = self.mock_db.execute_insert.call_args[0][0]
+        self.assertNotIn("ON DUPLICATE KEY", insert_sql)
+        backtest_sql = self.mock_db.execute_batch.call_args_list[1][0][0]
+        self.assertIn("INSERT INTO backtest_results", backtest_sql)
+        self.assertIn("win_rate = VALUES(win_rate)", backtest_sql)
+        self.assertEqual(failures, [])
+
+    @patch('factor_factory.factor_registry.get_db_manager')
+    def test_save_quantile_results_upsert(self, mock_get_db):
+        """测试分位数分析结果按因子、日期和持有期覆盖写入"""
+        from factor_factory.factor_registry import FactorRegistry
+
+        mock_get_db.return_value = self.mock_db
+        self.mock_db.execute_batch.return_value = [(1, 'foreign key')]
+
+        registry = FactorRegistry()
+        result = {
+            'n_quantiles': 5, 'autocorrelation': 0.8, 'top_turnover': 0.2,
+            'horizons': {1: {'spread': 0.01, 'monotonicity': 0.9, 'quantile_returns': [0.1]},
+                         5: {'spread': 0.03, 'monotonicity': 0.7, 'quantile_returns': [0.2]}}
+        }
+        failures = registry.save_quantile_results({1: result}, datetime(2024, 1, 2), upsert=True)
+        registry.save_quantile_results({1: result}, datetime(2024, 1, 2), upsert=False)
+
+        upsert_sql, params_list = self.mock_db.execute_batch.call_args_list[0][0][:2]
+        self.assertIn("INSERT INTO factor_quantile_stats", upsert_sql)
+        self.assertIn("ON DUPLICATE KEY UPDATE id = LAST_INSERT_ID(id)", upsert_sql)
+        self.assertIn("quantile_returns = VALUES(quantile_returns)", upsert_sql)
+        self.assertEqual([params[2] for params in params_list], [1, 5])
+        self.assertEqual(failures, [{'factor_id': 1, 'horizon': 5, 'error': 'foreign key'}])
+        insert_sql = self.mock_db.execute_batch.call_args_list[1][0][0]
+        self.assertNotIn("ON DUPLICATE KEY", insert_sql)
+
     @patch('factor_factory.factor_registry.get_db_manager')
     def test_format_factor_result(self, mock_get_db):
         """测试格式化因子结果"""
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+因子值存储单元测试
+"""
+
+import unittest
+import sys
+import os
+import shutil
+import tempfile
+import numpy as np
+
+# 添加项目根目录到路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+class TestFactorValueStore(unittest.TestCase):
+    """因子值存储测试类"""
+
+    def setUp(self):
+        """测试前准备"""
+        from factor_factory.factor_value_store import FactorValueStore
+
+        self.root_dir = tempfile.mkdtemp()
+        self.store = FactorValueStore(self.root_dir, partition_rows=3)
+        self.expression = "MA(CLOSE(), 5) - MA(CLOSE(), 20)"
+        self.dates = [20240102, 20240103, 20240104, 20240105]
+        self.values = np.arange(8, dtype=float).reshape(4, 2)
+
+    def tearDown(self):
+        """测试后清理"""
+        shutil.rmtree(self.root_dir, ignore_errors=True)
+
+    def test_content_hash(self):
+        """测试内容哈希忽略空白差异"""
+        from factor_factory.factor_value_store import content_hash
+
+        self.assertEqual(content_hash("MA(CLOSE(),5)"), content_hash("MA( CLOSE(), 5 )"))
+        self.assertNotEqual(content_hash("MA(CLOSE(),5)"), content_hash("MA(CLOSE(),10)"))
+
+    def test_write_and_read_range(self):
+        """测试写入后按日期区间和股票子集读取"""
+        self.store.write(1, self.expression, self.dates, ['sh600000', 'sz000001'], self.values)
+
+        dates, stocks, values = self.store.read(
+            1, self.expression, start_date=20240103, end_date=20240104, stocks=['sz000001', 'bj830799']
+        )
+
+        self.assertEqual(dates, [20240103, 20240104])
+        self.assertEqual(stocks, ['sz000001', 'bj830799'])
+        np.testing.assert_array_equal(values[:, 0], [3.0, 5.0])
+        self.assertTrue(np.all(np.isnan(values[:, 1])))
+        self.assertEqual(values.dtype, np.float32)
+
+    def test_daily_append_merges_partitions(self):
+        """测试每日追加并入未满分区，新增股票和覆盖日期"""
+        from factor_factory.factor_value_store import content_hash
+
+        self.store.write(1, self.expression, self.dates, ['sh600000', 'sz000001'], self.values)
+        self.store.write(1, self.expression, [20240108], ['sz000001', 'bj830799'], np.array([[10.0, 11.0]]))
+        self.store.write(1, self.expression, [20240103], ['sh600000'], np.array([[-1.0]]))
+
+        version_dir = os.path.join(self.root_dir, '1', content_hash(self.expression))
+        partitions = sorted(name for name in os.listdir(version_dir) if name.endswith('.npz'))
+        self.assertEqual(partitions, ['part-20240102-20240104.npz', 'part-20240105-20240108.npz'])
+
+        dates, stocks, values = self.store.read(1)
+        self.assertEqual(dates, self.dates + [20240108])
+        self.assertEqual(stocks, ['sh600000', 'sz000001', 'bj830799'])
+        self.assertEqual(values[1, 0], -1.0)
+        # 覆盖写入的日期只保留新数据中的股票
+        self.assertTrue(np.isnan(values[1, 1]))
+        np.testing.assert_array_equal(values[4], [np.nan, 10.0, 11.0])
+
+    def test_versions_by_expression(self):
+        """测试表达式变化产生新版本"""
+        self.store.write(1, self.expression, self.dates, ['sh600000', 'sz000001'], self.values)
+        self.store.write(1, "MA(CLOSE(), 10)", self.dates[:1], ['sh600000'], np.array([[1.0]]))
+
+        self.assertEqual(len(self.store.versions(1)), 2)
+        with self.assertRaises(ValueError):
+            self.store.read(1)
+        dates, _, _ = self.store.read(1, "MA(CLOSE(),10)")
+        self.assertEqual(dates, self.dates[:1])
+
+    def test_stored_factor_matrices(self):
+        """测试按下标读取的因子值序列对齐到给定的日期和股票"""
+        from factor_factory.factor_value_store import StoredFactorMatrices
+
+        self.store.write(1, self.expression, self.dates[1:], ['sh600000', 'sz000001'], self.values[1:])
+        self.store.write(2, "MA(CLOSE(), 10)", self.dates, ['sz000001'], self.values[:, :1])
+
+        matrices = StoredFactorMatrices(
+            self.store, [(1, self.expression), (2, "MA(CLOSE(), 10)")],
+            self.dates, ['sz000001', 'sh600000']
+        )
+
+        self.assertEqual(len(matrices), 2)
+        first = matrices[0]
+        self.assertTrue(np.isnan(first[0]).all())
+        np.testing.assert_array_equal(first[1:], self.values[1:, ::-1])
+        np.testing.assert_array_equal(matrices[1][:, 0], self.values[:, 0])
+        self.assertTrue(np.isnan(matrices[1][:, 1]).all())
+
+    def test_shape_mismatch(self):
+        """测试因子值形状与日期、股票不一致"""
+        with self.assertRaises(ValueError):
+            self.store.write(1, self.expression, self.dates, ['sh600000'], self.values)
+
+    def test_open_unconfigured(self):
+        """测试未配置存储目录时返回None"""
+        from factor_factory.factor_value_store import open_factor_value_store
+
+        self.assertIsNone(open_factor_value_store(''))
+
+
+if __name__ == '__main__':
+    # 设置日志级别避免测试时的日志干扰
+    import logging
+    logging.getLogger().setLevel(logging.CRITICAL)
+
+    unittest.main(verbosity=2)
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+远期收益率缓存单元测试
+"""
+
+import unittest
+import sys
+import os
+import numpy as np
+
+# 添加项目根目录到路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from factor_factory.forward_return_cache import ForwardReturnCache, universe_key
+from factor_factory.ic_evaluator import forward_returns_from_close
+
+
+class TestForwardReturnCache(unittest.TestCase):
+    """远期收益率缓存测试类"""
+
+    def setUp(self):
+        """测试前准备"""
+        self.codes = ['sh600000', 'sz000001', 'sz300750']
+        self.dates = [20240102, 20240103, 20240104, 20240105, 20240108]
+        self.close = np.arange(1, 16, dtype=float).reshape(5, 3)
+
+    def test_hit_reuses_matrix(self):
+        """测试相同股票池和窗口只计算一次"""
+        cache = ForwardReturnCache(max_bytes=1024 * 1024)
+        first = cache.get(self.codes, self.dates, self.close, horizon=2)
+        second = cache.get(self.codes, self.dates, None, horizon=2)
+
+        self.assertIs(first, second)
+        np.testing.assert_allclose(first, forward_returns_from_close(self.close, 2))
+        self.assertEqual(cache.stats()['hits'], 1)
+        self.assertEqual(cache.stats()['misses'], 1)
+        self.assertFalse(first.flags.writeable)
+
+    def test_key_distinguishes_universe_and_window(self):
+        """测试股票池、窗口或持有期不同时分别缓存"""
+        cache = ForwardReturnCache(max_bytes=1024 * 1024)
+        cache.get(self.codes, self.dates, self.close)
+        cache.get(self.codes[::-1], self.dates, self.close[:, ::-1])
+        cache.get(self.codes, self.dates[1:], self.close[1:])
+        cache.get_horizons(self.codes, self.dates, self.close, horizons=(1, 5))
+
+        self.assertNotEqual(universe_key(self.codes), universe_key(self.codes[::-1]))
+        self.assertEqual(len(cache), 4)
+        self.assertEqual(cache.stats()['hits'], 1)
+
+    def test_lru_eviction_within_budget(self):
+        """测试超出内存预算时淘汰最久未使用的矩阵"""
+        cache = ForwardReturnCache(max_bytes=2 * self.close.nbytes)
+        cache.get(self.codes, self.dates, self.close, horizon=1)
+        cache.get(self.codes, self.dates, self.close, horizon=2)
+        # 访问1日收益率后，2日收益率成为最久未使用
+        cache.get(self.codes, self.dates, self.close, horizon=1)
+        cache.get(self.codes, self.dates, self.close, horizon=3)
+
+        self.assertEqual(len(cache), 2)
+        self.assertLessEqual(cache.current_bytes, cache.max_bytes)
+        cache.get(self.codes, self.dates, self.close, horizon=1)
+        self.assertEqual(cache.stats()['hits'], 2)
+        cache.get(self.codes, self.dates, self.close, horizon=2)
+        self.assertEqual(cache.stats()['misses'], 4)
+
+    def test_oversized_matrix_not_cached(self):
+        """测试超过预算的矩阵直接返回但不缓存"""
+        cache = ForwardReturnCache(max_bytes=self.close.nbytes - 1)
+        returns = cache.get(self.codes, self.dates, self.close)
+
+        self.assertEqual(returns.shape, self.close.shape)
+        self.assertEqual(len(cache), 0)
+        self.assertEqual(cache.current_bytes, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
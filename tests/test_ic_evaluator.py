@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+向量化IC评估单元测试
+"""
+
+import unittest
+import sys
+import os
+import numpy as np
+
+# 添加项目根目录到路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def _spearman(x, y):
+    """逐元素参考实现：在有效样本上计算Spearman相关系数"""
+    mask = np.isfinite(x) & np.isfinite(y)
+    x, y = x[mask], y[mask]
+
+    def rank(values):
+        ranks = np.empty(len(values))
+        for i, value in enumerate(values):
+            ranks[i] = (values < value).sum() + ((values == value).sum() + 1) / 2
+        return ranks
+
+    return np.corrcoef(rank(x), rank(y))[0, 1]
+
+
+class TestICEvaluator(unittest.TestCase):
+    """IC评估函数测试类"""
+
+    def setUp(self):
+        """测试前准备"""
+        rng = np.random.default_rng(42)
+        self.factor = rng.normal(size=(30, 12))
+        self.factor[:, :3] = np.round(self.factor[:, :3])  # 制造相同值
+        self.returns = 0.3 * self.factor + rng.normal(size=(30, 12))
+        self.factor[4, 5] = np.nan  # 停牌
+        self.returns[7, 1] = np.nan
+
+    def test_cross_sectional_rank_ties_and_nan(self):
+        """测试平均排名与NaN处理"""
+        from factor_factory.ic_evaluator import cross_sectional_rank
+
+        ranks = cross_sectional_rank(np.array([[3.0, 1.0, np.nan, 1.0, 2.0]]))
+
+        np.testing.assert_array_equal(ranks, [[4.0, 1.5, np.nan, 1.5, 3.0]])
+
+    def test_rank_ic_matches_reference(self):
+        """测试Rank IC与逐日参考实现一致"""
+        from factor_factory.ic_evaluator import rank_ic
+
+        ic = rank_ic(self.factor, self.returns)
+        expected = [_spearman(self.factor[t], self.returns[t]) for t in range(30)]
+
+        np.testing.assert_allclose(ic, expected, atol=1e-12)
+
+    def test_pearson_ic_matches_corrcoef(self):
+        """测试皮尔逊IC与np.corrcoef一致"""
+        from factor_factory.ic_evaluator import pearson_ic
+
+        ic = pearson_ic(self.factor, self.returns)
+
+        self.assertAlmostEqual(ic[0], np.corrcoef(self.factor[0], self.returns[0])[0, 1])
+        mask = np.isfinite(self.factor[4])
+        self.assertAlmostEqual(
+            ic[4], np.corrcoef(self.factor[4, mask], self.returns[4, mask])[0, 1]
+        )
+
+    def test_factor_stack(self):
+        """测试三维因子堆叠与逐个计算结果一致"""
+        from factor_factory.ic_evaluator import rank_ic
+
+        stack = np.stack([self.factor, -self.factor, self.factor * 2])
+        ic = rank_ic(stack, self.returns)
+
+        self.assertEqual(ic.shape, (3, 30))
+        np.testing.assert_allclose(ic[1], -ic[0])
+        np.testing.assert_allclose(ic[2], ic[0])
+
+    def test_insufficient_cross_section(self):
+        """测试有效股票不足时IC为NaN"""
+        from factor_factory.ic_evaluator import rank_ic
+
+        factor = np.array([[1.0, 2.0, np.nan, np.nan], [1.0, 2.0, 3.0, 4.0]])
+        returns = np.array([[1.0, 2.0, 3.0, 4.0], [1.0, 1.0, 1.0, 1.0]])
+
+        self.assertTrue(np.all(np.isnan(rank_ic(factor, returns))))
+
+    def test_rolling_icir(self):
+        """测试滚动ICIR"""
+        from factor_factory.ic_evaluator import rolling_icir
+
+        ic = np.array([0.1, 0.3, np.nan, 0.2, 0.4])
+        icir = rolling_icir(ic, window=3, min_periods=2)
+
+        self.assertTrue(np.isnan(icir[0]))
+        self.assertAlmostEqual(icir[1], 0.2 / 0.1)
+        self.assertAlmostEqual(icir[2], 0.2 / 0.1)
+        self.assertAlmostEqual(icir[4], 0.3 / 0.1)
+
+    def test_summarize_ic(self):
+        """测试IC汇总统计"""
+        from factor_factory.ic_evaluator import summarize_ic
+
+        ic = np.array([[0.1, -0.1, 0.3, np.nan], [np.nan] * 4])
+        stats = summarize_ic(ic)
+
+        self.assertAlmostEqual(stats['ic_mean'][0], 0.1)
+        self.assertAlmostEqual(stats['ic_std'][0], np.std([0.1, -0.1, 0.3]))
+        self.assertAlmostEqual(stats['hit_rate'][0], 2 / 3)
+        self.assertAlmostEqual(
+            stats['t_stat'][0], 0.1 / np.std([0.1, -0.1, 0.3], ddof=1) * np.sqrt(3)
+        )
+        self.assertEqual(stats['count'][1], 0)
+        self.assertTrue(np.isnan(stats['ic_mean'][1]))
+
+    def test_forward_returns_from_close(self):
+        """测试远期收益率计算"""
+        from factor_factory.ic_evaluator import forward_returns_from_close
+
+        close = np.array([[10.0], [11.0], [np.nan], [12.1]])
+        returns = forward_returns_from_close(close, horizon=1)
+
+        self.assertAlmostEqual(returns[0, 0], 0.1)
+        self.assertTrue(np.isnan(returns[1, 0]))
+        self.assertTrue(np.isnan(returns[3, 0]))
+        self.assertAlmostEqual(forward_returns_from_close(close, horizon=3)[0, 0], 0.21)
+
+
+if __name__ == '__main__':
+    # 设置日志级别避免测试时的日志干扰
+    import logging
+    logging.getLogger().setLevel(logging.CRITICAL)
+
+    unittest.main(verbosity=2)
@@ -0,0 +1,227 @@
+#!/usr/bin/env python3
+"""
+增量IC评估单元测试
+"""
+
+import unittest
+from unittest.mock import Mock, patch
+import sys
+import os
+from datetime import date
+import numpy as np
+
+# 添加项目根目录到路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from factor_factory.incremental_ic import (
+    next_ic_row, window_summary, int_to_date, IncrementalICEvaluator
+)
+from factor_factory.ic_evaluator import rolling_icir, summarize_ic
+
+
+def build_rows(values, icir_window=20, factor_id=1):
+    """按序生成累计和记录"""
+    rows = []
+    for ic_value in values:
+        seq = len(rows) + 1
+        base = rows[seq - icir_window - 1] if seq > icir_window else None
+        rows.append(next_ic_row(factor_id, date(2024, 1, 2), ic_value,
+                                rows[-1] if rows else None, base, icir_window))
+    return rows
+
+
+class TestIncrementalIC(unittest.TestCase):
+    """增量IC测试类"""
+
+    def setUp(self):
+        """测试前准备"""
+        rng = np.random.default_rng(7)
+        self.values = rng.normal(0.02, 0.1, 150)
+        self.values[[3, 40, 90]] = np.nan
+
+    def test_rolling_icir_matches_full_computation(self):
+        """测试累计和推导的滚动ICIR与完整计算一致"""
+        rows = build_rows(self.values)
+
+        expected = rolling_icir(self.values, 20)
+        actual = np.array([row['rolling_icir'] for row in rows])
+
+        np.testing.assert_allclose(actual, expected, equal_nan=True)
+        self.assertEqual(rows[-1]['seq'], 150)
+        self.assertEqual(rows[-1]['ic_count'], 147)
+
+    def test_window_summary_matches_full_computation(self):
+        """测试窗口统计量与完整计算一致"""
+        rows = build_rows(self.values)
+
+        summary = window_summary(rows[-1], rows[-101])
+        expected = summarize_ic(self.values[-100:])
+
+        self.assertAlmostEqual(summary['ic_mean'], float(expected['ic_mean']))
+        self.assertAlmostEqual(summary['ic_std'], float(expected['ic_std']))
+        self.assertAlmostEqual(summary['icir_mean'],
+                               float(np.nanmean(rolling_icir(self.values, 20)[-100:])))
+        self.assertEqual(summary['count'], 99)
+
+    def test_window_summary_without_data(self):
+        """测试没有有效IC时统计量为0"""
+        rows = build_rows([np.nan, np.nan])
+        summary = window_summary(rows[-1], None)
+
+        self.assertEqual(summary['ic_mean'], 0.0)
+        self.assertEqual(summary['icir_mean'], 0.0)
+        self.assertEqual(summary['count'], 0)
+
+    def test_int_to_date(self):
+        """测试整数日期转换"""
+        self.assertEqual(int_to_date(20240315), date(2024, 3, 15))
+
+    def test_advance_appends_one_row(self):
+        """测试增量更新只追加最新一天的记录"""
+        history = build_rows(self.values[:120])
+        for row in history:
+            row['trade_date'] = date(2024, 1, 1)
+        rows_by_seq = {(1, row['seq']): row for row in history}
+
+        engine = Mock()
+        engine.evaluate_latest_ic.return_value = {
+            1: {'trade_dates': [20240102], 'ic_values': [0.05],
+                'trade_date': 20240102, 'ic_value': 0.05,
+                'value_dates': [20240102, 20240103], 'factor_values': np.ones((2, 1))}
+        }
+        registry = Mock()
+        registry.get_latest_ic_rows.return_value = {1: history[-1]}
+        registry.get_ic_rows.side_effect = lambda keys: {key: rows_by_seq[key] for key in keys}
+        registry.save_ic_rows.return_value = []
+
+        evaluator = IncrementalICEvaluator(engine, registry, window=100, icir_window=20)
+        results = evaluator.evaluate([{'id': 1, 'expression': 'CLOSE()'}], ['stock'])
+
+        saved = registry.save_ic_rows.call_args[0][0]
+        self.assertEqual(len(saved), 1)
+        self.assertEqual(saved[0]['seq'], 121)
+        self.assertEqual(sorted(registry.get_ic_rows.call_args[0][0]), [(1, 21), (1, 101)])
+
+        expected_rows = build_rows(list(self.values[:120]) + [0.05])
+        expected = window_summary(expected_rows[-1], expected_rows[-101])
+        result = results[1]['evaluation_result']
+        self.assertAlmostEqual(result['ic_mean'], expected['ic_mean'])
+        self.assertAlmostEqual(result['icir_mean'], expected['icir_mean'])
+        self.assertEqual(result['stock_count'], 1)
+        self.assertEqual(result['value_dates'], [20240102, 20240103])
+        self.assertEqual(result['factor_values'].shape, (2, 1))
+
+    def test_advance_backfills_skipped_days(self):
+        """测试漏跑交易日后补齐所有缺失截面的记录"""
+        history = build_rows(self.values[:120])
+        for row in history:
+            row['trade_date'] = date(2024, 1, 1)
+        rows_by_seq = {(1, row['seq']): row for row in history}
+
+        engine = Mock()
+        # 上次记录为1月1日，1月2日漏跑，本次需要补算1月2日和1月3日两个截面
+        engine.evaluate_latest_ic.return_value = {
+            1: {'trade_dates': [20240101, 20240102, 20240103], 'ic_values': [0.9, 0.05, -0.02],
+                'trade_date': 20240103, 'ic_value': -0.02,
+                'value_dates': [20240101, 20240102, 20240103, 20240104],
+                'factor_values': np.ones((4, 1))}
+        }
+        registry = Mock()
+        registry.get_latest_ic_rows.return_value = {1: history[-1]}
+        registry.get_ic_rows.side_effect = lambda keys: {key: rows_by_seq[key] for key in keys}
+        registry.save_ic_rows.return_value = []
+
+        evaluator = IncrementalICEvaluator(engine, registry, window=100, icir_window=20)
+        results = evaluator.evaluate([{'id': 1, 'expression': 'CLOSE()'}], ['stock'])
+
+        self.assertEqual(engine.evaluate_latest_ic.call_args[1]['since'], 20240101)
+        saved = registry.save_ic_rows.call_args[0][0]
+        self.assertEqual([row['seq'] for row in saved], [121, 122])
+        self.assertEqual([row['trade_date'] for row in saved], [date(2024, 1, 2), date(2024, 1, 3)])
+        self.assertEqual(sorted(registry.get_ic_rows.call_args[0][0]), [(1, 22), (1, 101), (1, 102)])
+
+        expected_rows = build_rows(list(self.values[:120]) + [0.05, -0.02])
+        for row, expected_row in zip(saved, expected_rows[-2:]):
+            self.assertAlmostEqual(row['ic_sum'], expected_row['ic_sum'])
+            self.assertAlmostEqual(row['icir_sum'], expected_row['icir_sum'])
+        expected = window_summary(expected_rows[-1], expected_rows[-101])
+        result = results[1]['evaluation_result']
+        self.assertAlmostEqual(result['ic_mean'], expected['ic_mean'])
+        self.assertAlmostEqual(result['icir_mean'], expected['icir_mean'])
+
+    def test_advance_groups_by_last_date(self):
+        """测试按上次记录日期分组补算，长期未更新的因子不影响其他因子"""
+        history = build_rows(self.values[:5])
+        latest_rows = {
+            1: dict(history[-1], trade_date=date(2024, 1, 1)),
+            2: dict(history[-1], factor_id=2, trade_date=date(2023, 12, 1)),
+            3: dict(history[-1], factor_id=3, trade_date=date(2024, 1, 1))
+        }
+
+        def evaluate_latest_ic(expressions, stock_list, since):
+            trade_dates = [20240102] if since == 20240101 else [20231204, 20240102]
+            return {key: {'trade_dates': trade_dates, 'ic_values': [0.01] * len(trade_dates),
+                          'trade_date': trade_dates[-1], 'ic_value': 0.01,
+                          'value_dates': trade_dates, 'factor_values': np.ones((len(trade_dates), 1))}
+                    for key in expressions}
+
+        engine = Mock()
+        engine.evaluate_latest_ic.side_effect = evaluate_latest_ic
+        registry = Mock()
+        registry.get_latest_ic_rows.return_value = latest_rows
+        registry.get_ic_rows.return_value = {}
+        registry.save_ic_rows.return_value = []
+
+        evaluator = IncrementalICEvaluator(engine, registry, window=100, icir_window=20)
+        evaluator.evaluate([{'id': i, 'expression': f"MA(CLOSE(), {i})"} for i in (1, 2, 3)], [])
+
+        calls = [(sorted(call[0][0]), call[1]['since'])
+                 for call in engine.evaluate_latest_ic.call_args_list]
+        self.assertEqual(calls, [([2], 20231201), ([1, 3], 20240101)])
+        saved = registry.save_ic_rows.call_args[0][0]
+        self.assertEqual(sorted((row['factor_id'], row['seq']) for row in saved),
+                         [(1, 6), (2, 6), (2, 7), (3, 6)])
+
+    def test_default_window_matches_full_evaluation(self):
+        """测试默认窗口与完整评估加载 lookback 根K线得到的IC个数一致"""
+        from factor_factory.config.evaluation_config import EVALUATION_CONFIG
+
+        with patch.dict(EVALUATION_CONFIG, {'lookback': 60}):
+            evaluator = IncrementalICEvaluator(Mock(), Mock())
+        self.assertEqual(evaluator.window, 59)
+
+    def test_advance_reports_errors(self):
+        """测试截面计算或保存失败时报告错误"""
+        history = build_rows(self.values[:5])
+        history[-1]['trade_date'] = date(2024, 1, 1)
+        engine = Mock()
+        engine.evaluate_latest_ic.return_value = {
+            1: {'error': '所有股票计算均失败'},
+            2: {'trade_dates': [20240102], 'ic_values': [0.01],
+                'trade_date': 20240102, 'ic_value': 0.01,
+                'value_dates': [20240102, 20240103], 'factor_values': np.ones((2, 1))}
+        }
+        registry = Mock()
+        registry.get_latest_ic_rows.return_value = {
+            1: history[-1], 2: dict(history[-1], factor_id=2)
+        }
+        registry.get_ic_rows.return_value = {}
+        registry.save_ic_rows.return_value = [
+            {'factor_id': 2, 'trade_date': date(2024, 1, 2), 'error': 'duplicate'}
+        ]
+
+        evaluator = IncrementalICEvaluator(engine, registry)
+        results = evaluator.evaluate(
+            [{'id': 1, 'expression': 'CLOSE()'}, {'id': 2, 'expression': 'OPEN()'}], []
+        )
+
+        self.assertEqual(results[1], {'error': '所有股票计算均失败'})
+        self.assertIn('duplicate', results[2]['error'])
+
+
+if __name__ == '__main__':
+    # 设置日志级别避免测试时的日志干扰
+    import logging
+    logging.getLogger().setLevel(logging.CRITICAL)
+
+    unittest.main(verbosity=2)
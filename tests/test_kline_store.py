@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+列式K线存储单元测试
+"""
+
+import unittest
+import sys
+import os
+import shutil
+import tempfile
+import numpy as np
+
+# 添加项目根目录到路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+class TestKLineStore(unittest.TestCase):
+    """列式K线存储测试类"""
+
+    def setUp(self):
+        """测试前准备"""
+        self.root_dir = tempfile.mkdtemp()
+        self.dates = [20240102, 20240103, 20240104]
+
+    def tearDown(self):
+        """测试后清理"""
+        shutil.rmtree(self.root_dir, ignore_errors=True)
+
+    def _create_store(self, capacity=None):
+        from factor_factory.kline_store import KLineStore
+
+        store = KLineStore.create(self.root_dir, ['sh600000', 'sz000001'],
+                                  self.dates, capacity=capacity)
+        store.write_column('CLOSE', 'sh600000', [20240102, 20240104], np.array([10.0, 11.0]))
+        store.write_column('CLOSE', 'sz000001', self.dates, np.array([5.0, 5.5, 6.0]))
+        store.flush()
+        return store
+
+    def test_create_and_read(self):
+        """测试写入后只读打开，缺失日期为NaN"""
+        from factor_factory.kline_store import KLineStore
+
+        self._create_store()
+        store = KLineStore(self.root_dir)
+        close = store.get_field('CLOSE')
+
+        self.assertIsInstance(close, np.memmap)
+        self.assertEqual(close.shape, (3, 2))
+        self.assertTrue(np.isnan(close[1, 0]))
+        np.testing.assert_array_equal(close[:, 1], [5.0, 5.5, 6.0])
+        self.assertTrue(np.all(np.isnan(store.get_field('VOL'))))
+
+    def test_write_ignores_unknown_dates(self):
+        """测试不在存储日期内的数据被忽略"""
+        store = self._create_store()
+
+        written = store.write_column('OPEN', 'sh600000', [20231229, 20240103], np.array([1.0, 2.0]))
+
+        self.assertEqual(written, 1)
+        self.assertEqual(store.get_field('OPEN')[1, 0], 2.0)
+
+    def test_stock_subset_and_rows(self):
+        """测试按日期区间和股票子集读取"""
+        store = self._create_store()
+
+        rows = store.rows_between(20240103, 20240105)
+        subset = store.get_field('CLOSE', rows, stocks=['sz000001', 'sh600000'])
+
+        self.assertEqual(rows, slice(1, 3))
+        np.testing.assert_array_equal(subset[:, 0], [5.5, 6.0])
+        self.assertEqual(subset[1, 1], 11.0)
+
+    def test_append_dates_and_stocks(self):
+        """测试追加交易日和新增股票后数据保持不变"""
+        from factor_factory.kline_store import KLineStore
+
+        store = self._create_store(capacity=3)
+        new_rows = store.append_dates([20240104, 20240105, 20240108])
+        store.add_stocks(['bj830799', 'sz000001'])
+        store.write_column('CLOSE', 'bj830799', [20240108], np.array([7.0]))
+        store.flush()
+
+        self.assertEqual(new_rows, slice(3, 5))
+        reopened = KLineStore(self.root_dir)
+        close = reopened.get_field('CLOSE')
+        self.assertEqual(reopened.stocks, ['sh600000', 'sz000001', 'bj830799'])
+        self.assertEqual(close.shape, (5, 3))
+        np.testing.assert_array_equal(close[:3, 1], [5.0, 5.5, 6.0])
+        self.assertEqual(close[4, 2], 7.0)
+        self.assertGreaterEqual(reopened.capacity, 5)
+
+    def test_reopen_between_resize_and_flush(self):
+        """测试扩容后、flush 前打开存储，元数据与字段文件布局一致"""
+        from factor_factory.kline_store import KLineStore
+
+        store = self._create_store(capacity=3)
+        reader = KLineStore(self.root_dir)
+        store.add_stocks(['bj830799'])
+        store.append_dates([20240105])
+
+        reopened = KLineStore(self.root_dir)
+        close = reopened.get_field('CLOSE')
+        self.assertEqual(reopened.stocks[:2], ['sh600000', 'sz000001'])
+        self.assertEqual(close.shape, (3, len(reopened.stocks)))
+        np.testing.assert_array_equal(close[:, 1], [5.0, 5.5, 6.0])
+        np.testing.assert_array_equal(close[[0, 2], 0], [10.0, 11.0])
+        self.assertTrue(np.isnan(close[:, 2:]).all())
+        # 扩容前打开的读进程继续使用旧版本文件
+        np.testing.assert_array_equal(reader.get_field('CLOSE')[:, 1], [5.0, 5.5, 6.0])
+
+        store.flush()
+        reopened = KLineStore(self.root_dir)
+        self.assertEqual(reopened.get_field('CLOSE').shape, (4, 3))
+        self.assertEqual(sorted(os.listdir(self.root_dir)).count('close.dat'), 0)
+
+    def test_read_only_cannot_resize(self):
+        """测试只读模式不能修改存储"""
+        from factor_factory.kline_store import KLineStore
+
+        self._create_store(capacity=3)
+        store = KLineStore(self.root_dir, mode='r')
+
+        with self.assertRaises(PermissionError):
+            store.add_stocks(['sh600519'])
+
+    def test_open_missing_store(self):
+        """测试未构建的存储返回None"""
+        from factor_factory.kline_store import open_kline_store
+
+        self.assertIsNone(open_kline_store(os.path.join(self.root_dir, 'missing')))
+
+
+if __name__ == '__main__':
+    # 设置日志级别避免测试时的日志干扰
+    import logging
+    logging.getLogger().setLevel(logging.CRITICAL)
+
+    unittest.main(verbosity=2)
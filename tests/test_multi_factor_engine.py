@@ -39,77 +39,76 @@ class TestMultiFactorEngine(unittest.TestCase):
 
     def test_validate_expression_safe(self):
         """测试安全表达式验证"""
-        from factor_factory.multi_factor_engine import MultiFactorEngine
-
-        with patch.object(MultiFactorEngine, '__init__', lambda x: None):
-            engine = MultiFactorEngine()
+        from factor_factory.expression_compiler import compile_expression
+
+        safe_expressions = [
+            "MA(CLOSE(), 5)",
+            "RSI(CLOSE(), 14)",
+            "CLOSE() - REF(CLOSE(), 1)",
+            "MA(CLOSE(), 5) - MA(CLOSE(), 20)",
+            "VOL() / MA(VOL(), 20)",
+            "IF(RSI(CLOSE(), 14) > 70, -1, 0)"
+        ]
 
-            safe_expressions = [
-                "MA(CLOSE(), 5)",
-                "RSI(CLOSE(), 14)",
-                "CLOSE() - REF(CLOSE(), 1)",
-                "MA(CLOSE(), 5) - MA(CLOSE(), 20)",
-                "VOL() / MA(VOL(), 20)",
-                "IF(RSI(CLOSE(), 14) > 70, -1, 0)"
-            ]
-
-            for expr in safe_expressions:
-                try:
-                    engine._validate_expression(expr)
-                except Exception as e:
-                    self.fail(f"安全表达式 '{expr}' 验证失败: {e}")
+        for expr in safe_expressions:
+            try:
+                compile_expression(expr)
+            except Exception as e:
+                self.fail(f"安全表达式 '{expr}' 验证失败: {e}")
 
     def test_validate_expression_unsafe(self):
         """测试不安全表达式验证"""
+        from factor_factory.expression_compiler import compile_expression
         from factor_factory.multi_factor_engine import MultiFactorEngine
 
         with patch.object(MultiFactorEngine, '__init__', lambda x: None):
             engine = MultiFactorEngine()
 
-            unsafe_expressions = [
-                "import os",
-                "exec('print(1)')",
-                "__import__('os')",
-                "open('/etc/passwd')",
-                "eval('1+1')",
-                "getattr(obj, 'attr')",
-                "globals()",
-                "locals()"
-            ]
-
-            for expr in unsafe_expressions:
-                with self.assertRaises(ValueError, msg=f"不安全表达式 '{expr}' 应该被拒绝"):
-                    engine._validate_expression(expr)
+        unsafe_expressions = [
+            "import os",
+            "exec('print(1)')",
+            "__import__('os')",
+            "open('/etc/passwd')",
+            "eval('1+1')",
+            "getattr(obj, 'attr')",
+            "globals()",
+            "locals()",
+            "CLOSE().__class__",
+            "(lambda: 1)()"
+        ]
+
+        for expr in unsafe_expressions:
+            with self.assertRaises(ValueError, msg=f"不安全表达式 '{expr}' 应该被拒绝"):
+                compile_expression(expr)
+            with self.assertRaises(ValueError, msg=f"不安全表达式 '{expr}' 不应创建指标"):
+                engine.create_factor_indicator(expr)
 
     def test_validate_expression_edge_cases(self):
         """测试表达式验证边界情况"""
-        from factor_factory.multi_factor_engine import MultiFactorEngine
+        from factor_factory.expression_compiler import compile_expression
 
-        with patch.object(MultiFactorEngine, '__init__', lambda x: None):
-            engine = MultiFactorEngine()
+        # 空表达式
+        with self.assertRaises(ValueError):
+            compile_expression("")
 
-            # 空表达式
-            with self.assertRaises(ValueError):
-                engine._validate_expression("")
+        # None值
+        with self.assertRaises(ValueError):
+            compile_expression(None)
 
-            # None值
-            with self.assertRaises(ValueError):
-                engine._validate_expression(None)
+        # 非字符串类型
+        with self.assertRaises(ValueError):
+            compile_expression(123)
 
-            # 非字符串类型
-            with self.assertRaises(ValueError):
-                engine._validate_expression(123)
+        # 过长表达式
+        long_expr = "MA(CLOSE(), 5)" * 200
+        with self.assertRaises(ValueError):
+            compile_expression(long_expr)
 
-            # 过长表达式
-            long_expr = "MA(CLOSE(), 5)" * 200
+        # 包含危险字符模式
+        dangerous_patterns = ["../", "//", "\\\\", "${", "#{"]
+        for pattern in dangerous_patterns:
             with self.assertRaises(ValueError):
-                engine._validate_expression(long_expr)
-
-            # 包含危险字符模式
-            dangerous_patterns = ["../", "//", "\\\\", "${", "#{"]
-            for pattern in dangerous_patterns:
-                with self.assertRaises(ValueError):
-                    engine._validate_expression(f"MA(CLOSE(), 5){pattern}")
+                compile_expression(f"MA(CLOSE(), 5){pattern}")
 
     @patch('factor_factory.multi_factor_engine.StockManager')
     @patch('factor_factory.multi_factor_engine.get_factor_registry')
@@ -158,6 +157,130 @@ class TestMultiFactorEngine(unittest.TestCase):
             single_std = engine._calculate_std([5])
             self.assertEqual(single_std, 0)
 
+    def test_sweep_template(self):
+        """测试参数扫描返回IC曲面，结果与单独评估一致"""
+        import numpy as np
+        from factor_factory.multi_factor_engine import MultiFactorEngine
+        from factor_factory.ic_evaluator import evaluate_ic, forward_returns_from_close
+        from factor_factory.rolling_primitives import RollingPrimitives
+
+        rng = np.random.default_rng(0)
+        close = np.cumprod(1 + rng.normal(0, 0.02, (120, 60)), axis=0) * 10
+        stocks = [Mock(market_code=f"sz{i:06d}") for i in range(60)]
+
+        with patch.object(MultiFactorEngine, '__init__', lambda x: None):
+            engine = MultiFactorEngine()
+            engine._field_matrices = Mock(return_value={'CLOSE': close})
+            engine._forward_returns = lambda s, q, c: forward_returns_from_close(c)
+
+            result = engine.sweep_template(
+                "MA(CLOSE(), {a}) - MA(CLOSE(), {b})", {'a': [3, 5, 10], 'b': [20, 30]},
+                stock_list=stocks, query=Mock()
+            )
+
+        self.assertEqual(result['ic_mean'].shape, (3, 2))
+        self.assertEqual(result['errors'], {})
+        engine._field_matrices.assert_called_once()
+
+        primitives = RollingPrimitives()
+        factor = primitives.ma(close, 5) - primitives.ma(close, 30)
+        expected = evaluate_ic(factor, forward_returns_from_close(close))['ic_mean']
+        self.assertAlmostEqual(result['ic_mean'][1, 1], float(expected))
+        self.assertEqual(result['best']['ic_mean'], float(np.nanmax(result['ic_mean'])))
+
+    def test_vectorized_dag_matrices(self):
+        """测试向量化DAG计算跳过停牌日，不支持的函数退回逐只股票计算"""
+        import numpy as np
+        from factor_factory.multi_factor_engine import MultiFactorEngine
+        from factor_factory.expression_dag import ExpressionDAG
+        from factor_factory.rolling_primitives import RollingPrimitives
+
+        rng = np.random.default_rng(1)
+        close = np.cumprod(1 + rng.normal(0, 0.02, (50, 4)), axis=0) * 10
+        close[10:13, 2] = np.nan
+        stocks = [Mock(market_code=f"sz{i:06d}") for i in range(4)]
+        dag = ExpressionDAG({'ma': "MA(CLOSE(), 5) / CLOSE()", 'bad': "LOG(CLOSE() - 1000)"})
+
+        with patch.object(MultiFactorEngine, '__init__', lambda x: None):
+            engine = MultiFactorEngine()
+            engine._field_matrices = Mock(return_value={'CLOSE': close})
+            engine.kline_store = None
+            engine._compute_dag_matrices = Mock(return_value='per-stock')
+
+            with patch.dict('factor_factory.multi_factor_engine.EVALUATION_CONFIG',
+                            {'vectorized_kernels': True}):
+                factors, close_matrix, failed = engine._compute_factor_matrices(dag, stocks, Mock())
+                rsi_dag = ExpressionDAG({'rsi': "RSI(CLOSE(), 14)"})
+                self.assertEqual(engine._compute_factor_matrices(rsi_dag, stocks, Mock()), 'per-stock')
+
+        self.assertIs(close_matrix, close)
+        self.assertEqual(failed, {})
+        self.assertTrue(np.isnan(factors['ma'][10:13, 2]).all())
+        traded = close[np.isfinite(close[:, 2]), 2:3]
+        expected = RollingPrimitives().ma(traded, 5)[:, 0] / traded[:, 0]
+        np.testing.assert_allclose(factors['ma'][np.isfinite(close[:, 2]), 2], expected)
+        self.assertTrue(np.isnan(factors['bad']).all())
+
+    def test_cross_section_dag_matrices(self):
+        """测试截面函数在矩阵上计算，不支持向量化的输入先逐只股票计算"""
+        import numpy as np
+        from factor_factory.multi_factor_engine import MultiFactorEngine
+        from factor_factory.expression_dag import ExpressionDAG
+        from factor_factory.rolling_primitives import RollingPrimitives
+        from factor_factory.cross_section import cs_rank, group_demean
+
+        rng = np.random.default_rng(2)
+        close = np.cumprod(1 + rng.normal(0, 0.02, (40, 6)), axis=0) * 10
+        close[5:8, 1] = np.nan
+        rsi = rng.uniform(0, 100, close.shape)
+        stocks = [Mock(market_code=f"sz{i:06d}") for i in range(6)]
+        blocks = [[stocks[0], stocks[1], stocks[2]], [stocks[3], stocks[4]]]
+
+        with patch.object(MultiFactorEngine, '__init__', lambda x: None):
+            engine = MultiFactorEngine()
+            engine.kline_store = None
+            engine.sm = Mock()
+            engine.sm.get_block_list.return_value = blocks
+            engine._field_matrices = Mock(return_value={'CLOSE': close})
+            inner_dags = []
+
+            def per_stock(dag, stock_list, query):
+                inner_dags.append(sorted(dag.roots))
+                return ({key: rsi if key.startswith('RSI') else close for key in dag.roots},
+                        close, {'RSI(CLOSE(),14)': 1})
+
+            engine._compute_dag_matrices = Mock(side_effect=per_stock)
+
+            dag = ExpressionDAG({'ind': "INDNEUTRALIZE(MA(CLOSE(), 5))"})
+            factors, _, failed = engine._compute_factor_matrices(dag, stocks, Mock())
+            engine._compute_dag_matrices.assert_not_called()
+
+            dag = ExpressionDAG({'rank': "RANK(RSI(CLOSE(), 14)) * 2", 'close': "CLOSE()"})
+            mixed, _, mixed_failed = engine._compute_factor_matrices(dag, stocks, Mock())
+
+            # 批量中有不支持向量化的因子时，截面函数之上的时序函数使用向量化内核
+            mixed_inner = list(inner_dags)
+            inner_dags.clear()
+            dag = ExpressionDAG({'ts': "MA(RANK(RSI(CLOSE(), 14)), 5)",
+                                 'ind': "INDNEUTRALIZE(RSI(CLOSE(), 14))"})
+            upper, _, _ = engine._compute_factor_matrices(dag, stocks, Mock())
+
+        valid = np.isfinite(close)
+        ma = RollingPrimitives(valid).ma(close, 5)
+        np.testing.assert_allclose(factors['ind'], group_demean(ma, np.array([0, 0, 0, 1, 1, -1])))
+        self.assertEqual(failed, {})
+
+        self.assertEqual(mixed_inner, [['CLOSE()', 'RSI(CLOSE(),14)']])
+        np.testing.assert_allclose(mixed['rank'], cs_rank(np.where(valid, rsi, np.nan)) * 2)
+        np.testing.assert_allclose(mixed['close'], close)
+        self.assertEqual(mixed_failed, {'rank': 1})
+
+        self.assertEqual(inner_dags, [['RSI(CLOSE(),14)']])
+        masked_rsi = np.where(valid, rsi, np.nan)
+        expected = RollingPrimitives(valid).ma(cs_rank(masked_rsi), 5)
+        np.testing.assert_allclose(upper['ts'], np.where(valid, expected, np.nan))
+        self.assertFalse(np.isnan(upper['ts'][10:, 0]).any())
+
     @patch('factor_factory.multi_factor_engine.constant')
     @patch('factor_factory.multi_factor_engine.StockManager')
     @patch('factor_factory.multi_factor_engine.get_factor_registry')
@@ -224,7 +347,7 @@ class TestExpressionSecurity(unittest.TestCase):
 
         for pattern in sql_patterns:
             with self.assertRaises(ValueError, msg=f"SQL注入模式 '{pattern}' 应该被拒绝"):
-                self.engine._validate_expression(pattern)
+                self.engine.create_factor_indicator(pattern)
 
     def test_script_injection_patterns(self):
         """测试脚本注入模式防护"""
@@ -237,7 +360,7 @@ class TestExpressionSecurity(unittest.TestCase):
 
         for pattern in script_patterns:
             with self.assertRaises(ValueError, msg=f"脚本注入模式 '{pattern}' 应该被拒绝"):
-                self.engine._validate_expression(pattern)
+                self.engine.create_factor_indicator(pattern)
 
     def test_system_access_patterns(self):
         """测试系统访问模式防护"""
@@ -248,7 +371,7 @@ class TestExpressionSecurity(unittest.TestCase):
 
         for pattern in system_patterns:
             with self.assertRaises(ValueError, msg=f"系统访问模式 '{pattern}' 应该被拒绝"):
-                self.engine._validate_expression(pattern)
+                self.engine.create_factor_indicator(pattern)
 
 
 if __name__ == '__main__':
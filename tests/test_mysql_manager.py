@@ -80,66 +80,185 @@ class TestMySQLManager(unittest.TestCase):
                        if 'CREATE DATABASE' in str(call)]
         self.assertTrue(len(create_calls) > 0)
 
-    def test_expression_validation_safe(self):
-        """测试安全表达式验证"""
-        from factor_factory.multi_factor_engine import MultiFactorEngine
+    def test_execute_batch_chunks(self):
+        """测试分块批量执行，每块一个事务"""
+        mock_connection = Mock()
+        mock_cursor = Mock()
+        mock_connection.cursor.return_value = mock_cursor
 
-        with patch.object(MultiFactorEngine, '__init__', lambda x: None):
-            engine = MultiFactorEngine()
+        with patch.object(MySQLManager, 'initialize_pool'), \
+             patch.object(MySQLManager, 'initialize_tables'), \
+             patch.object(MySQLManager, 'get_connection', return_value=mock_connection):
+            manager = MySQLManager()
+            failures = manager.execute_batch("INSERT", [(i,) for i in range(5)], chunk_size=2)
 
-            # 安全表达式应该通过
-            safe_expressions = [
-                "MA(CLOSE(), 5)",
-                "RSI(CLOSE(), 14)",
-                "CLOSE() - REF(CLOSE(), 1)",
-                "VOL() / MA(VOL(), 20)"
-            ]
+        self.assertEqual(failures, [])
+        self.assertEqual(mock_cursor.executemany.call_count, 3)
+        self.assertEqual(mock_connection.commit.call_count, 3)
 
-            for expr in safe_expressions:
-                try:
-                    engine._validate_expression(expr)
-                except Exception as e:
-                    self.fail(f"安全表达式 '{expr}' 验证失败: {e}")
+    def test_execute_batch_row_failures(self):
+        """测试批量执行失败时逐行重试并报告失败行"""
+        from mysql.connector import Error
 
-    def test_expression_validation_unsafe(self):
-        """测试不安全表达式验证"""
-        from factor_factory.multi_factor_engine import MultiFactorEngine
+        mock_connection = Mock()
+        mock_cursor = Mock()
+        mock_connection.cursor.return_value = mock_cursor
+        mock_cursor.executemany.side_effect = Error("duplicate")
 
-        with patch.object(MultiFactorEngine, '__init__', lambda x: None):
-            engine = MultiFactorEngine()
+        def execute(query, params):
+            if params == (1,):
+                raise Error("duplicate")
+        mock_cursor.execute.side_effect = execute
 
-            # 不安全表达式应该被拒绝
-            unsafe_expressions = [
-                "import os",
-                "exec('print(1)')",
-                "__import__('os')",
-                "open('/etc/passwd')",
-                "eval('1+1')"
-            ]
+        with patch.object(MySQLManager, 'initialize_pool'), \
+             patch.object(MySQLManager, 'initialize_tables'), \
+             patch.object(MySQLManager, 'get_connection', return_value=mock_connection):
+            manager = MySQLManager()
+            failures = manager.execute_batch("INSERT", [(0,), (1,), (2,)])
 
-            for expr in unsafe_expressions:
-                with self.assertRaises(ValueError):
-                    engine._validate_expression(expr)
+        self.assertEqual([index for index, _ in failures], [1])
+        self.assertEqual(mock_cursor.execute.call_count, 3)
+        mock_connection.rollback.assert_called_once()
+        self.assertEqual(mock_connection.commit.call_count, 1)
 
-    def test_expression_validation_edge_cases(self):
-        """测试表达式验证边界情况"""
-        from factor_factory.multi_factor_engine import MultiFactorEngine
+    def test_stream_query_batches(self):
+        """测试流式查询分批读取并在结束后归还连接"""
+        mock_connection = Mock()
+        mock_cursor = Mock()
+        mock_connection.cursor.return_value = mock_cursor
+        mock_cursor.column_names = ('factor_id', 'ic_value')
+        mock_cursor.fetchmany.side_effect = [[(1, 0.1), (2, 0.2)], [(3, 0.3)], []]
+
+        with patch.object(MySQLManager, 'initialize_pool'), \
+             patch.object(MySQLManager, 'initialize_tables'), \
+             patch.object(MySQLManager, 'get_connection', return_value=mock_connection):
+            manager = MySQLManager()
+            stream = manager.stream_query("SELECT", batch_size=2, as_numpy=True)
+            mock_connection.cursor.assert_not_called()
+            batches = list(stream)
+
+        mock_connection.cursor.assert_called_once_with(buffered=False)
+        self.assertEqual([len(batch) for batch in batches], [2, 1])
+        self.assertEqual(list(batches[0].factor_id), [1, 2])
+        mock_connection.consume_results.assert_not_called()
+        mock_connection.close.assert_called_once()
+
+    def test_stream_query_early_close(self):
+        """测试提前结束迭代时丢弃剩余结果并归还连接"""
+        mock_connection = Mock()
+        mock_cursor = Mock()
+        mock_connection.cursor.return_value = mock_cursor
+        mock_cursor.column_names = ('factor_id',)
+        mock_cursor.fetchmany.return_value = [(1,), (2,)]
 
-        with patch.object(MultiFactorEngine, '__init__', lambda x: None):
-            engine = MultiFactorEngine()
+        with patch.object(MySQLManager, 'initialize_pool'), \
+             patch.object(MySQLManager, 'initialize_tables'), \
+             patch.object(MySQLManager, 'get_connection', return_value=mock_connection):
+            manager = MySQLManager()
+            stream = manager.stream_query("SELECT")
+            self.assertEqual(next(stream), (1,))
+            stream.close()
 
-            # 空表达式
-            with self.assertRaises(ValueError):
-                engine._validate_expression("")
+        mock_connection.consume_results.assert_called_once()
+        mock_cursor.close.assert_called_once()
+        mock_connection.close.assert_called_once()
 
-            # None值
-            with self.assertRaises(ValueError):
-                engine._validate_expression(None)
+    def test_startup_only_detects_missing_unique_keys(self):
+        """测试启动时只检查结果表唯一键，不删除数据也不修改表结构"""
+        mock_connection = Mock()
+        with patch.object(MySQLManager, 'initialize_pool'), \
+             patch.object(MySQLManager, 'get_connection', return_value=mock_connection), \
+             patch('factor_factory.mysql_manager.SCHEMA_MODE', 'standard'), \
+             patch('factor_factory.mysql_manager.UPSERT_RESULTS', True), \
+             patch.object(MySQLManager, 'execute_query', side_effect=[[(0,)], [(1,)], [(1,)]]), \
+             patch.object(MySQLManager, 'execute_update') as mock_update, \
+             self.assertLogs('factor_factory.mysql_manager', level='WARNING') as logs:
+            MySQLManager()
+
+        mock_update.assert_not_called()
+        self.assertEqual(len(logs.records), 1)
+        self.assertIn('factor_performance', logs.records[0].getMessage())
+
+    def test_migrate_result_unique_keys(self):
+        """测试为旧结果表补建唯一键前删除重复记录"""
+        with patch.object(MySQLManager, 'initialize_pool'), \
+             patch.object(MySQLManager, 'initialize_tables'):
+            manager = MySQLManager()
+
+        # factor_performance 和 factor_quantile_stats 缺少唯一键，backtest_results 已有
+        with patch.object(manager, 'execute_query', side_effect=[[(0,)], [(1,)], [(0,)]]), \
+             patch.object(manager, 'execute_update', side_effect=[3, 0, 2, 0]) as mock_update:
+            removed = manager.migrate_result_unique_keys()
+
+        self.assertEqual(removed, {'factor_performance': 3, 'factor_quantile_stats': 2})
+        delete_sql, alter_sql, quantile_delete_sql, quantile_alter_sql = [
+            call[0][0] for call in mock_update.call_args_list
+        ]
+        self.assertIn("a.evaluation_date = b.evaluation_date AND a.horizon = b.horizon",
+                      quantile_delete_sql)
+        self.assertEqual(
+            quantile_alter_sql,
+            "ALTER TABLE factor_quantile_stats ADD UNIQUE KEY uk_factor_date_horizon "
+            "(factor_id, evaluation_date, horizon)"
+        )
+        self.assertIn("a.factor_id = b.factor_id AND a.evaluation_date = b.evaluation_date", delete_sql)
+        self.assertIn("a.id < b.id", delete_sql)
+        self.assertEqual(
+            alter_sql,
+            "ALTER TABLE factor_performance ADD UNIQUE KEY uk_factor_date (factor_id, evaluation_date)"
+        )
+
+    def test_expression_validation_safe(self):
+        """测试安全表达式验证"""
+        from factor_factory.expression_compiler import compile_expression
+
+        # 安全表达式应该通过
+        safe_expressions = [
+            "MA(CLOSE(), 5)",
+            "RSI(CLOSE(), 14)",
+            "CLOSE() - REF(CLOSE(), 1)",
+            "VOL() / MA(VOL(), 20)"
+        ]
+
+        for expr in safe_expressions:
+            try:
+                compile_expression(expr)
+            except Exception as e:
+                self.fail(f"安全表达式 '{expr}' 验证失败: {e}")
 
-            # 过长表达式
-            long_expr = "MA(CLOSE(), 5)" * 200
+    def test_expression_validation_unsafe(self):
+        """测试不安全表达式验证"""
+        from factor_factory.expression_compiler import compile_expression
+
+        # 不安全表达式应该被拒绝
+        unsafe_expressions = [
+            "import os",
+            "exec('print(1)')",
+            "__import__('os')",
+            "open('/etc/passwd')",
+            "eval('1+1')"
+        ]
+
+        for expr in unsafe_expressions:
             with self.assertRaises(ValueError):
-                engine._validate_expression(long_expr)
+                compile_expression(expr)
+
+    def test_expression_validation_edge_cases(self):
+        """测试表达式验证边界情况"""
+        from factor_factory.expression_compiler import compile_expression
+
+        # 空表达式
+        with self.assertRaises(ValueError):
+            compile_expression("")
+
+        # None值
+        with self.assertRaises(ValueError):
+            compile_expression(None)
+
+        # 过长表达式
+        long_expr = "MA(CLOSE(), 5)" * 200
+        with self.assertRaises(ValueError):
+            compile_expression(long_expr)
 
     def test_singleton_pattern(self):
         """测试单例模式"""
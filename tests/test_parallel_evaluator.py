@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+多进程并行因子评估单元测试
+"""
+
+import unittest
+from unittest.mock import patch
+from concurrent.futures import Future
+import sys
+import os
+
+# 添加项目根目录到路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+class FakeExecutor:
+    """在当前进程中同步执行任务的执行器"""
+
+    created = 0
+
+    def __init__(self, *args, **kwargs):
+        FakeExecutor.created += 1
+        self.closed = False
+
+    def shutdown(self):
+        self.closed = True
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        return False
+
+    def submit(self, func, *args):
+        future = Future()
+        try:
+            future.set_result(func(*args))
+        except Exception as e:
+            future.set_exception(e)
+        return future
+
+
+class TestParallelFactorEvaluator(unittest.TestCase):
+    """并行评估器测试类"""
+
+    def setUp(self):
+        """测试前准备"""
+        self.factors = [
+            {'id': 100 + i, 'expression': f"MA(CLOSE(), {i + 2})"}
+            for i in range(10)
+        ]
+
+    def test_make_shards(self):
+        """测试分片覆盖所有因子且保持顺序"""
+        from factor_factory.parallel_evaluator import ParallelFactorEvaluator
+
+        evaluator = ParallelFactorEvaluator(max_workers=2)
+        shards = evaluator._make_shards(self.factors)
+
+        flattened = [task for shard in shards for task in shard]
+        self.assertEqual([task[1] for task in flattened], [f['id'] for f in self.factors])
+        self.assertEqual(len(shards), 5)
+
+        evaluator = ParallelFactorEvaluator(max_workers=2, chunk_size=3)
+        self.assertEqual([len(s) for s in evaluator._make_shards(self.factors)], [3, 3, 3, 1])
+
+    @patch('factor_factory.parallel_evaluator.ProcessPoolExecutor', FakeExecutor)
+    def test_evaluate_merges_in_order(self):
+        """测试结果按输入顺序合并，失败的分片记录错误"""
+        from factor_factory.parallel_evaluator import ParallelFactorEvaluator
+
+        def fake_evaluate_shard(shard, lookback):
+            if shard[0][1] == 103:
+                raise RuntimeError("工作进程崩溃")
+            # 打乱分片内部顺序，验证按序号合并
+            return [(index, factor_id, {'ic_mean': factor_id / 1000}, None)
+                    for index, factor_id, _ in reversed(shard)]
+
+        with patch('factor_factory.parallel_evaluator._evaluate_shard', fake_evaluate_shard):
+            evaluator = ParallelFactorEvaluator(max_workers=2, chunk_size=3)
+            results = evaluator.evaluate(self.factors, lookback=50)
+
+        self.assertEqual([r['factor_id'] for r in results], [f['id'] for f in self.factors])
+        for item in results:
+            if 103 <= item['factor_id'] <= 105:
+                self.assertIsNone(item['result'])
+                self.assertIn("崩溃", item['error'])
+            else:
+                self.assertIsNone(item['error'])
+                self.assertAlmostEqual(item['result']['ic_mean'], item['factor_id'] / 1000)
+
+    @patch('factor_factory.parallel_evaluator.ProcessPoolExecutor', FakeExecutor)
+    def test_started_pool_reused(self):
+        """测试常驻进程池在多次评估之间复用，股票列表不同时使用临时进程池"""
+        from factor_factory.parallel_evaluator import ParallelFactorEvaluator
+
+        def fake_evaluate_shard(shard, lookback):
+            return [(index, factor_id, {'ic_mean': 0.0}, None) for index, factor_id, _ in shard]
+
+        FakeExecutor.created = 0
+        with patch('factor_factory.parallel_evaluator._evaluate_shard', fake_evaluate_shard):
+            with ParallelFactorEvaluator(max_workers=2).start(['sh600000']) as evaluator:
+                pool = evaluator._executor
+                evaluator.evaluate(self.factors, stock_codes=['sh600000'])
+                evaluator.evaluate(self.factors, stock_codes=['sh600000'])
+                self.assertEqual(FakeExecutor.created, 1)
+
+                evaluator.evaluate(self.factors, stock_codes=['sz000001'])
+                self.assertEqual(FakeExecutor.created, 2)
+
+        self.assertTrue(pool.closed)
+        self.assertIsNone(evaluator._executor)
+
+    def test_evaluate_empty(self):
+        """测试空因子列表"""
+        from factor_factory.parallel_evaluator import ParallelFactorEvaluator
+
+        self.assertEqual(ParallelFactorEvaluator(max_workers=4).evaluate([]), [])
+
+
+if __name__ == '__main__':
+    # 设置日志级别避免测试时的日志干扰
+    import logging
+    logging.getLogger().setLevel(logging.CRITICAL)
+
+    unittest.main(verbosity=2)
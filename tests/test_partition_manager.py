@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+分区表维护单元测试
+"""
+
+import unittest
+from unittest.mock import Mock
+import sys
+import os
+from datetime import date
+
+# 添加项目根目录到路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from factor_factory.partition_manager import (
+    PartitionManager, add_months, partition_definitions, create_table_sql
+)
+
+
+def partition_rows(*bounds):
+    """构造 information_schema.PARTITIONS 查询结果"""
+    rows = [('p_history', f"'{bounds[0]}'", 10)]
+    for lower, upper in zip(bounds, bounds[1:]):
+        rows.append((f"p{lower[:4]}{lower[5:7]}", f"'{upper}'", 100))
+    rows.append(('p_future', 'MAXVALUE', 0))
+    return rows
+
+
+class TestPartitionManager(unittest.TestCase):
+    """分区表维护测试类"""
+
+    def setUp(self):
+        """测试前准备"""
+        self.db = Mock()
+        self.manager = PartitionManager(self.db, months_ahead=2)
+
+    def test_month_arithmetic(self):
+        """测试月份计算跨年"""
+        self.assertEqual(add_months(date(2023, 11, 15), 3), date(2024, 2, 1))
+        self.assertEqual(
+            partition_definitions(date(2023, 12, 1), date(2024, 1, 1)),
+            ["PARTITION p202312 VALUES LESS THAN ('2024-01-01')",
+             "PARTITION p202401 VALUES LESS THAN ('2024-02-01')"]
+        )
+
+    def test_create_table_sql(self):
+        """测试分区表建表语句"""
+        sql = create_table_sql('factor_performance', name='factor_performance_partitioned',
+                               first_month=date(2020, 3, 9), months_ahead=1)
+
+        self.assertIn('CREATE TABLE IF NOT EXISTS factor_performance_partitioned', sql)
+        self.assertIn('UNIQUE KEY uk_factor_date (factor_id, evaluation_date)', sql)
+        self.assertIn("PARTITION p_history VALUES LESS THAN ('2020-03-01')", sql)
+        self.assertIn("PARTITION p202003 VALUES LESS THAN ('2020-04-01')", sql)
+        self.assertIn('PARTITION p_future VALUES LESS THAN (MAXVALUE)', sql)
+        self.assertNotIn('FOREIGN KEY', sql)
+
+    def test_ensure_future_partitions(self):
+        """测试从 p_future 拆分出缺少的月份分区"""
+        self.db.execute_query.return_value = partition_rows('2024-01-01', '2024-02-01', '2024-03-01')
+
+        created = self.manager.ensure_future_partitions('factor_performance', today=date(2024, 3, 20))
+
+        self.assertEqual(created, 3)
+        sql = self.db.execute_update.call_args[0][0]
+        self.assertIn('REORGANIZE PARTITION p_future INTO', sql)
+        self.assertIn("PARTITION p202403 VALUES LESS THAN ('2024-04-01')", sql)
+        self.assertIn("PARTITION p202405 VALUES LESS THAN ('2024-06-01')", sql)
+        self.assertTrue(sql.rstrip(')').endswith('PARTITION p_future VALUES LESS THAN (MAXVALUE'))
+
+    def test_ensure_future_partitions_up_to_date(self):
+        """测试分区已足够时不修改表"""
+        self.db.execute_query.return_value = partition_rows('2024-01-01', '2024-02-01')
+
+        created = self.manager.ensure_future_partitions('factor_performance', today=date(2023, 11, 5))
+
+        self.assertEqual(created, 0)
+        self.db.execute_update.assert_not_called()
+
+    def test_drop_before(self):
+        """测试过期分区整体删除，截止月份内的旧记录逐行删除"""
+        self.db.execute_query.return_value = partition_rows('2024-01-01', '2024-02-01', '2024-03-01')
+        self.db.execute_update.side_effect = [0, 7]
+
+        result = self.manager.drop_before('backtest_results', date(2024, 2, 15))
+
+        drop_sql, delete_call = self.db.execute_update.call_args_list
+        self.assertEqual(drop_sql[0][0], 'ALTER TABLE backtest_results DROP PARTITION p_history, p202401')
+        self.assertIn('backtest_date < %s', delete_call[0][0])
+        self.assertEqual(result, {'partitions_dropped': 2, 'rows_dropped': 110, 'rows_deleted': 7})
+
+    def test_migrate(self):
+        """测试迁移：建分区表、分块复制、原子重命名"""
+        self.db.execute_query.side_effect = [
+            [],                                   # 原表未分区
+            [(date(2023, 6, 2), 1, 250)],         # 最早日期和ID范围
+            [(240,)]                              # 分区表行数
+        ]
+
+        copied = self.manager.migrate('factor_performance', chunk_rows=100)
+
+        statements = [call[0] for call in self.db.execute_update.call_args_list]
+        self.assertEqual(statements[0][0], 'DROP TABLE IF EXISTS factor_performance_partitioned')
+        self.assertIn("PARTITION p_history VALUES LESS THAN ('2023-06-01')", statements[1][0])
+        copies = statements[2:5]
+        self.assertEqual([params for _, params in copies], [(1, 100), (101, 200), (201, 300)])
+        self.assertIn('ON DUPLICATE KEY UPDATE', copies[0][0])
+        self.assertEqual(
+            statements[5][0],
+            'RENAME TABLE factor_performance TO factor_performance_legacy, '
+            'factor_performance_partitioned TO factor_performance'
+        )
+        self.assertEqual(copied, 240)
+
+    def test_migrate_already_partitioned(self):
+        """测试已分区的表不重复迁移"""
+        self.db.execute_query.return_value = partition_rows('2024-01-01', '2024-02-01')
+
+        self.assertEqual(self.manager.migrate('factor_performance'), 0)
+        self.db.execute_update.assert_not_called()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+向量化组合回测单元测试
+"""
+
+import unittest
+import sys
+import os
+import numpy as np
+
+# 添加项目根目录到路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from factor_factory.portfolio_backtest import quantile_buckets, portfolio_backtest
+
+
+class TestPortfolioBacktest(unittest.TestCase):
+    """组合回测测试类"""
+
+    def setUp(self):
+        """测试前准备"""
+        # 4只股票，因子值恒定，收益率与因子值同序
+        self.factor = np.tile([1.0, 2.0, 3.0, 4.0], (6, 1))
+        self.returns = np.tile([-0.02, -0.01, 0.01, 0.02], (6, 1))
+
+    def test_quantile_buckets(self):
+        """测试分位划分，缺失值为-1"""
+        buckets = quantile_buckets(np.array([[5.0, 1.0, np.nan, 3.0, 2.0]]), 2)
+        np.testing.assert_array_equal(buckets, [[1, 0, -1, 1, 0]])
+
+    def test_long_only_top_quantile(self):
+        """测试只做多最高分位"""
+        result = portfolio_backtest(self.factor, self.returns, n_quantiles=2,
+                                    rebalance_period=3, cost_rate=0.0)
+
+        np.testing.assert_allclose(result['daily_returns'], 0.015)
+        self.assertAlmostEqual(float(result['total_return']), 1.015 ** 6 - 1)
+        self.assertEqual(float(result['max_drawdown']), 0.0)
+        np.testing.assert_allclose(result['quantile_returns'], [-0.015, 0.015])
+        # 因子不变，只有首次建仓产生换手
+        self.assertEqual(int(result['trade_count']), 2)
+
+    def test_long_short_costs(self):
+        """测试多空组合的换手成本"""
+        result = portfolio_backtest(self.factor, self.returns, n_quantiles=2,
+                                    long_short=True, rebalance_period=3, cost_rate=0.001)
+
+        # 首次调仓换手率200%，第二次调仓无换手
+        self.assertAlmostEqual(float(result['turnover']), 1.0)
+        self.assertAlmostEqual(float(result['total_cost']), 0.002)
+        self.assertAlmostEqual(float(result['daily_returns'][0]), 0.03 - 0.002)
+        self.assertAlmostEqual(float(result['daily_returns'][1]), 0.03)
+
+    def test_rebalance_holds_weights(self):
+        """测试持有期内沿用调仓日权重"""
+        factor = self.factor.copy()
+        factor[1] = factor[1][::-1]
+        result = portfolio_backtest(factor, self.returns, n_quantiles=2,
+                                    rebalance_period=3, cost_rate=0.0)
+
+        # 第1行因子反转，但不是调仓日，仍持有第0行选出的股票
+        self.assertAlmostEqual(float(result['daily_returns'][1]), 0.015)
+
+    def test_stacked_factors_and_missing_returns(self):
+        """测试多因子堆叠与缺失收益率"""
+        returns = self.returns.copy()
+        returns[:, 3] = np.nan
+        result = portfolio_backtest(np.stack([self.factor, -self.factor]), returns,
+                                    n_quantiles=2, rebalance_period=1, cost_rate=0.0)
+
+        self.assertEqual(result['daily_returns'].shape, (2, 6))
+        # 缺失收益率按0计入组合
+        np.testing.assert_allclose(result['daily_returns'][0], 0.005)
+        np.testing.assert_allclose(result['daily_returns'][1], -0.015)
+        np.testing.assert_allclose(result['quantile_returns'][0], [-0.015, 0.01])
+
+
+if __name__ == '__main__':
+    # 设置日志级别避免测试时的日志干扰
+    import logging
+    logging.getLogger().setLevel(logging.CRITICAL)
+
+    unittest.main(verbosity=2)
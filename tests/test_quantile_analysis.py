@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+分位数收益分析单元测试
+"""
+
+import unittest
+import sys
+import os
+import numpy as np
+
+# 添加项目根目录到路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from factor_factory.quantile_analysis import (
+    quantile_buckets, quantile_mean_returns, monotonicity,
+    rank_autocorrelation, top_quantile_turnover, analyze_quantiles
+)
+
+
+class TestQuantileAnalysis(unittest.TestCase):
+    """分位数分析测试类"""
+
+    def setUp(self):
+        """测试前准备"""
+        # 4只股票，价格每日按固定比例增长，增长率与因子值同序
+        growth = np.array([0.99, 1.00, 1.01, 1.02])
+        self.close = 10.0 * growth ** np.arange(8)[:, None]
+        self.factor = np.tile([1.0, 2.0, 3.0, 4.0], (8, 1))
+
+    def test_quantile_mean_returns(self):
+        """测试分位平均收益，缺失收益率不参与平均"""
+        buckets = np.array([[0, 0, 1, 1], [0, 0, 1, 1]])
+        returns = np.array([[0.01, np.nan, 0.03, 0.05], [0.02, 0.04, np.nan, 0.07]])
+        result = quantile_mean_returns(buckets, returns, 2)
+        np.testing.assert_allclose(result, [(0.01 + 0.03) / 2, (0.04 + 0.07) / 2])
+
+    def test_monotonicity(self):
+        """测试分位收益单调性"""
+        self.assertAlmostEqual(float(monotonicity(np.array([0.1, 0.2, 0.3]))), 1.0)
+        self.assertAlmostEqual(float(monotonicity(np.array([0.3, 0.2, 0.1]))), -1.0)
+
+    def test_rank_autocorrelation(self):
+        """测试排名自相关：排名不变为1，每日反转为-1"""
+        self.assertAlmostEqual(float(rank_autocorrelation(self.factor)), 1.0)
+        flipping = self.factor.copy()
+        flipping[1::2] = flipping[1::2, ::-1]
+        self.assertAlmostEqual(float(rank_autocorrelation(flipping)), -1.0)
+
+    def test_top_quantile_turnover(self):
+        """测试最高分位换手率"""
+        buckets = np.array([[0, 1, 1], [1, 1, 0], [1, 1, 0]])
+        # 第二日2只中1只为新进入，第三日无变化
+        self.assertAlmostEqual(float(top_quantile_turnover(buckets, 2)), 0.25)
+
+    def test_analyze_quantiles(self):
+        """测试多持有期分析"""
+        result = analyze_quantiles(self.factor, self.close, horizons=(1, 5), n_quantiles=2)
+
+        np.testing.assert_allclose(result['quantile_returns'][1], [-0.005, 0.015])
+        self.assertAlmostEqual(float(result['spread'][1]), 0.02)
+        expected_spread = (1.01 ** 5 + 1.02 ** 5) / 2 - (0.99 ** 5 + 1.0) / 2
+        self.assertAlmostEqual(float(result['spread'][5]), expected_spread)
+        self.assertAlmostEqual(float(result['monotonicity'][5]), 1.0)
+        self.assertAlmostEqual(float(result['autocorrelation']), 1.0)
+        self.assertAlmostEqual(float(result['top_turnover']), 0.0)
+
+    def test_stacked_factors(self):
+        """测试因子堆叠与逐个计算结果一致"""
+        reversed_factor = -self.factor
+        stacked = analyze_quantiles(np.stack([self.factor, reversed_factor]), self.close,
+                                    horizons=(1,), n_quantiles=2)
+        single = analyze_quantiles(reversed_factor, self.close, horizons=(1,), n_quantiles=2)
+
+        np.testing.assert_allclose(stacked['quantile_returns'][1][1], single['quantile_returns'][1])
+        self.assertAlmostEqual(float(stacked['spread'][1][1]), -0.02)
+        self.assertAlmostEqual(float(stacked['monotonicity'][1][1]), -1.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+"""
+向量化滚动指标单元测试
+"""
+
+import unittest
+import sys
+import os
+import numpy as np
+
+# 添加项目根目录到路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from collections import deque
+
+from factor_factory.rolling_primitives import RollingPrimitives, rolling_max, rolling_min
+
+try:
+    from hikyuu import PRICELIST, MA, STD, HHV, LLV, REF
+    HIKYUU_AVAILABLE = True
+except ImportError:
+    HIKYUU_AVAILABLE = False
+
+
+def naive_rolling(values, window, func, partial=False):
+    """
+    逐行逐列的滚动计算，窗口内有缺失值时为NaN
+
+    partial 为True时序列开头不足一个窗口按已有数据计算（hikyuu的MA/HHV/LLV），
+    否则需要完整窗口
+    """
+    result = np.full(values.shape, np.nan)
+    for row in range(values.shape[0]):
+        if row < window - 1 and not partial:
+            continue
+        block = values[max(row - window + 1, 0):row + 1]
+        for col in range(values.shape[1]):
+            if np.isfinite(block[:, col]).all():
+                result[row, col] = func(block[:, col])
+    return result
+
+
+def deque_max(series, window):
+    """单调队列计算窗口最高值，作为分块算法的参照"""
+    result = np.full(len(series), np.nan)
+    window_deque = deque()
+    for i, value in enumerate(series):
+        while window_deque and series[window_deque[-1]] <= value:
+            window_deque.pop()
+        window_deque.append(i)
+        if window_deque[0] <= i - window:
+            window_deque.popleft()
+        result[i] = series[window_deque[0]]
+    return result
+
+
+class TestRollingPrimitives(unittest.TestCase):
+    """向量化滚动指标测试类"""
+
+    def setUp(self):
+        """测试前准备"""
+        rng = np.random.default_rng(11)
+        self.values = np.cumprod(1 + rng.normal(0, 0.02, size=(60, 8)), axis=0) * 10
+        self.values[20:23, 2] = np.nan
+        self.primitives = RollingPrimitives()
+
+    def test_ma_and_std_match_naive(self):
+        """测试前缀和计算的MA和STD与逐窗口计算一致，MA开头按已有数据计算"""
+        for window in (1, 5, 20):
+            np.testing.assert_allclose(
+                self.primitives.ma(self.values, window),
+                naive_rolling(self.values, window, np.mean, partial=True), atol=1e-9
+            )
+        for window in (2, 10):
+            np.testing.assert_allclose(
+                self.primitives.std(self.values, window),
+                naive_rolling(self.values, window, lambda x: np.std(x, ddof=1)), atol=1e-9
+            )
+
+    def test_prefix_sums_shared(self):
+        """测试同一输入的前缀和只计算一次"""
+        self.primitives.ma(self.values, 5)
+        self.primitives.std(self.values, 10)
+        self.primitives.ma(self.values + 1, 5)
+
+        self.assertEqual(len(self.primitives._prefix), 2)
+
+    def test_leading_missing_is_warmup(self):
+        """测试前导缺失值视为预热期，之后的窗口从第一个有效值开始"""
+        values = self.values.copy()
+        values[:4, 0] = np.nan
+
+        ma = self.primitives.ma(values, 10)
+        self.assertTrue(np.isnan(ma[:4, 0]).all())
+        self.assertAlmostEqual(ma[4, 0], values[4, 0])
+        self.assertAlmostEqual(ma[6, 0], values[4:7, 0].mean())
+
+        hhv = self.primitives.hhv(values, 10)
+        self.assertTrue(np.isnan(hhv[:4, 0]).all())
+        self.assertEqual(hhv[6, 0], values[4:7, 0].max())
+
+        std = self.primitives.std(values, 5)
+        self.assertTrue(np.isnan(std[:8, 0]).all())
+        self.assertTrue(np.isfinite(std[8, 0]))
+
+    def test_window_longer_than_data(self):
+        """测试窗口超过数据长度时MA/HHV按已有数据计算，STD全为NaN"""
+        np.testing.assert_allclose(self.primitives.ma(self.values[:, :2], 100)[-1],
+                                   self.values[:, :2].mean(axis=0))
+        np.testing.assert_array_equal(self.primitives.hhv(self.values[:, :2], 100)[-1],
+                                      self.values[:, :2].max(axis=0))
+        self.assertTrue(np.isnan(self.primitives.std(self.values, 100)).all())
+
+    def test_extremes_match_monotonic_deque(self):
+        """测试分块极值算法与单调队列结果一致"""
+        rng = np.random.default_rng(5)
+        values = rng.normal(size=(97, 6))
+        for window in (1, 2, 7, 32, 97, 120):
+            expected = np.column_stack([deque_max(values[:, col], window)
+                                        for col in range(values.shape[1])])
+            np.testing.assert_array_equal(rolling_max(values, window), expected)
+            expected = -np.column_stack([deque_max(-values[:, col], window)
+                                         for col in range(values.shape[1])])
+            np.testing.assert_array_equal(rolling_min(values, window), expected)
+
+    def test_ref_hhv_llv_ema(self):
+        """测试REF、HHV、LLV和EMA"""
+        ref = self.primitives.ref(self.values, 3)
+        np.testing.assert_array_equal(ref[3:], self.values[:-3])
+        self.assertTrue(np.isnan(ref[:3]).all())
+
+        np.testing.assert_allclose(self.primitives.hhv(self.values, 5),
+                                   naive_rolling(self.values, 5, np.max, partial=True))
+        np.testing.assert_allclose(self.primitives.llv(self.values, 5),
+                                   naive_rolling(self.values, 5, np.min, partial=True))
+
+        ema = self.primitives.ema(self.values[:, :1], 3)
+        expected = self.values[0, 0]
+        for row in range(1, 5):
+            expected = 0.5 * self.values[row, 0] + 0.5 * expected
+        self.assertAlmostEqual(ema[4, 0], expected)
+
+    def test_suspension_skips_non_trading_rows(self):
+        """测试给定交易日标记时窗口跳过停牌日，结果与只用交易日计算一致"""
+        values = self.values.copy()
+        valid = np.ones(values.shape, dtype=bool)
+        valid[10:15, 1] = False
+        valid[[3, 30, 31], 4] = False
+        values[~valid] = np.nan
+        primitives = RollingPrimitives(valid)
+
+        for name, window in (('ma', 5), ('std', 5), ('hhv', 6), ('llv', 6), ('ref', 2), ('ema', 4)):
+            result = getattr(primitives, name)(values, window)
+            self.assertTrue(np.isnan(result[~valid]).all())
+            for col in (1, 4):
+                traded = values[valid[:, col], col:col + 1]
+                expected = getattr(RollingPrimitives(), name)(traded, window)[:, 0]
+                np.testing.assert_allclose(result[valid[:, col], col], expected, atol=1e-9)
+
+    @unittest.skipUnless(HIKYUU_AVAILABLE, "需要hikyuu环境")
+    def test_matches_hikyuu(self):
+        """测试向量化内核与hikyuu指标的计算结果一致"""
+        values = self.values[:, :3]
+        primitives = RollingPrimitives()
+        cases = [(MA, primitives.ma, 5), (MA, primitives.ma, 20), (STD, primitives.std, 10),
+                 (HHV, primitives.hhv, 10), (LLV, primitives.llv, 10), (REF, primitives.ref, 3)]
+        for col in (0, 1):
+            series = PRICELIST(list(values[:, col]))
+            for indicator, kernel, window in cases:
+                np.testing.assert_allclose(
+                    kernel(values, window)[:, col], indicator(series, window).to_np(),
+                    rtol=1e-9, atol=1e-9, err_msg=f"{indicator.__name__}({window})"
+                )
+
+
+if __name__ == '__main__':
+    unittest.main()
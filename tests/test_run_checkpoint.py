@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+评估运行检查点单元测试
+"""
+
+import unittest
+from unittest.mock import Mock
+import sys
+import os
+from datetime import date
+
+# 添加项目根目录到路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from factor_factory.run_checkpoint import RunCheckpoint
+
+
+class TestRunCheckpoint(unittest.TestCase):
+    """评估运行检查点测试类"""
+
+    def setUp(self):
+        """测试前准备"""
+        self.db = Mock()
+        self.db.execute_batch.return_value = []
+        self.checkpoint = RunCheckpoint(self.db)
+
+    def test_start_new_run(self):
+        """测试没有未完成运行时新建运行"""
+        self.db.execute_query.return_value = []
+
+        run_id, completed = self.checkpoint.start('daily_evaluation', date(2024, 3, 5), 3000)
+
+        self.assertTrue(run_id.startswith('daily_evaluation-20240305-'))
+        self.assertEqual(completed, set())
+        abandon_sql, abandon_params = self.db.execute_update.call_args_list[0][0]
+        self.assertIn("status = 'abandoned'", abandon_sql)
+        self.assertEqual(abandon_params, ('daily_evaluation', date(2024, 3, 5)))
+        insert_sql, insert_params = self.db.execute_update.call_args_list[1][0]
+        self.assertIn('INSERT INTO evaluation_runs', insert_sql)
+        self.assertEqual(insert_params, (run_id, 'daily_evaluation', date(2024, 3, 5), 3000))
+
+    def test_resume_running_run(self):
+        """测试恢复同一天未完成的运行并返回已完成的因子"""
+        self.db.execute_query.side_effect = [
+            [('daily_evaluation-20240305-abcd1234',)],
+            [(1,), (2,), (5,)]
+        ]
+
+        run_id, completed = self.checkpoint.start('daily_evaluation', date(2024, 3, 5), 3000)
+
+        self.assertEqual(run_id, 'daily_evaluation-20240305-abcd1234')
+        self.assertEqual(completed, {1, 2, 5})
+        # 恢复时不新建运行
+        self.assertEqual(self.db.execute_update.call_count, 1)
+
+    def test_mark_completed(self):
+        """测试批量记录完成的因子，失败的行不计入"""
+        self.db.execute_batch.return_value = [(1, 'lock wait timeout')]
+
+        saved = self.checkpoint.mark_completed('run-1', [7, 8, 9], chunk_size=2)
+
+        self.assertEqual(saved, 2)
+        sql, rows, chunk_size = self.db.execute_batch.call_args[0]
+        self.assertIn('INSERT IGNORE INTO evaluation_run_factors', sql)
+        self.assertEqual(rows, [('run-1', 7), ('run-1', 8), ('run-1', 9)])
+        self.assertEqual(chunk_size, 2)
+
+    def test_mark_completed_empty(self):
+        """测试没有完成的因子时不访问数据库"""
+        self.assertEqual(self.checkpoint.mark_completed('run-1', []), 0)
+        self.db.execute_batch.assert_not_called()
+
+    def test_finish(self):
+        """测试标记运行完成"""
+        self.checkpoint.finish('run-1')
+
+        sql, params = self.db.execute_update.call_args[0]
+        self.assertIn("status = 'completed'", sql)
+        self.assertEqual(params, ('run-1',))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+A股股票池单元测试
+"""
+
+import unittest
+from unittest.mock import Mock, patch
+import sys
+import os
+from datetime import date, datetime
+
+# 添加项目根目录到路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def make_stock(market, code, start, valid=True, stock_type=1):
+    """创建模拟股票"""
+    stock = Mock()
+    stock.market = market
+    stock.code = code
+    stock.market_code = f"{market}{code}"
+    stock.start_datetime = start
+    stock.valid = valid
+    stock.type = stock_type
+    stock.is_null.return_value = False
+    return stock
+
+
+class TestStockUniverse(unittest.TestCase):
+    """A股股票池测试类"""
+
+    def setUp(self):
+        """测试前准备"""
+        self.stocks = [
+            make_stock('SH', '600000', datetime(1999, 11, 10)),
+            make_stock('SZ', '300750', datetime(2018, 6, 11)),
+            make_stock('SH', '688981', datetime(2020, 7, 16)),
+            make_stock('BJ', '830799', datetime(2021, 11, 15)),
+            make_stock('SZ', '000001', datetime(1991, 4, 3), valid=False),
+            make_stock('SH', '000300', datetime(2005, 4, 8), stock_type=2),
+        ]
+        self.sm = Mock()
+        self.sm.__iter__ = Mock(side_effect=lambda: iter(self.stocks))
+
+        patcher = patch('factor_factory.stock_universe.StockUniverse._is_a_share',
+                        lambda self, stock: stock.type == 1)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_classify_board(self):
+        """测试板块识别"""
+        from factor_factory.stock_universe import classify_board
+
+        self.assertEqual(classify_board('SH', '601318'), 'main')
+        self.assertEqual(classify_board('SH', '688981'), 'star')
+        self.assertEqual(classify_board('SZ', '002415'), 'main')
+        self.assertEqual(classify_board('sz', '301269'), 'chinext')
+        self.assertEqual(classify_board('BJ', '830799'), 'bse')
+        self.assertIsNone(classify_board('SH', '900901'))
+
+    def test_filters(self):
+        """测试按市场、板块、上市日期和有效性筛选"""
+        from factor_factory.stock_universe import StockUniverse
+
+        universe = StockUniverse(self.sm)
+        codes = lambda stocks: [stock.market_code for stock in stocks]
+
+        self.assertEqual(codes(universe.get_stocks()),
+                         ['SH600000', 'SZ300750', 'SH688981', 'BJ830799'])
+        self.assertEqual(len(universe.get_stocks(valid_only=False)), 5)
+        self.assertEqual(codes(universe.get_stocks(market='sh')), ['SH600000', 'SH688981'])
+        self.assertEqual(codes(universe.get_stocks(board='main', valid_only=False)),
+                         ['SH600000', 'SZ000001'])
+        self.assertEqual(codes(universe.get_stocks(listed_before=20180611)),
+                         ['SH600000', 'SZ300750'])
+        self.assertEqual(codes(universe.get_stocks(market='SZ', listed_before=20200101)),
+                         ['SZ300750'])
+        self.assertIs(universe.get_stock('bj830799'), self.stocks[3])
+        self.assertIsNone(universe.get_stock('sh000300'))
+
+    def test_cached_within_day(self):
+        """测试同一交易日只构建一次，日期变化后重建"""
+        from factor_factory import stock_universe
+
+        universe = stock_universe.StockUniverse(self.sm)
+        first = universe.get_stocks(board='star')
+        self.assertIs(universe.get_stocks(board='star'), first)
+        self.assertEqual(self.sm.__iter__.call_count, 1)
+
+        with patch.object(stock_universe, 'date') as mock_date:
+            mock_date.today.return_value = date(2099, 1, 1)
+            universe.get_stocks()
+        self.assertEqual(self.sm.__iter__.call_count, 2)
+
+
+if __name__ == '__main__':
+    # 设置日志级别避免测试时的日志干扰
+    import logging
+    logging.getLogger().setLevel(logging.CRITICAL)
+
+    unittest.main(verbosity=2)